@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试 - 对本地合成站点运行 ImageCrawler.crawl()
+
+记录 套图/分钟、图片/秒、字节/秒 和 峰值内存，结果可保存为JSON并与之前的结果对比:
+
+  python bench_crawl.py --sets 10 --output bench_results/base.json
+  python bench_crawl.py --sets 10 --compare bench_results/base.json
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict
+
+from config import Config
+from crawler import ImageCrawler
+from fixture_server import FixtureSite, FixtureServer
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """本进程与已回收子进程（Chrome/ChromeDriver）的峰值RSS（MB）"""
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def make_bench_config(base_url: str, output_dir: str, list_pages: int, detail_depth: int) -> Config:
+    """生成指向本地站点的爬虫配置（关闭延迟、代理和Cookie）"""
+    config = Config()
+    config.START_URL = f"{base_url}/photos/sort-hot.html"
+    config.LIST_PAGES = list_pages
+    config.DETAIL_DEPTH = detail_depth
+    config.OUTPUT_DIR = output_dir
+    config.MIN_DELAY = 0
+    config.MAX_DELAY = 0
+    config.USE_PROXY = False
+    config.HEADLESS = True
+    config.SKIP_EXISTING = False
+    config.COOKIE_FILE = os.path.join(output_dir, 'no_cookies.json')
+    config.TRACE_FILE = ''
+    return config
+
+
+def write_results(results: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {path}")
+
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(results: Dict, baseline: Dict, keys):
+    """打印与基线结果的对比"""
+    print(f"\n与基线对比 ({baseline.get('label') or baseline.get('date', '')}):")
+    for key in keys:
+        old, new = baseline.get(key), results.get(key)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            continue
+        change = ((new - old) / old * 100) if old else 0.0
+        print(f"  {key:<24} {old:>12.2f} -> {new:>12.2f}  ({change:+.1f}%)")
+
+
+def run_crawl_benchmark(site: FixtureSite, label: str = '', overrides: Dict = None) -> Dict:
+    """启动本地站点并运行一次完整爬取，overrides 中的键值覆盖配置"""
+    with FixtureServer(site) as server, tempfile.TemporaryDirectory() as output_dir:
+        config = make_bench_config(server.base_url, output_dir, site.list_pages, site.pages_per_set)
+        for key, value in (overrides or {}).items():
+            setattr(config, key, value)
+        crawler = ImageCrawler(config)
+
+        start = time.perf_counter()
+        crawler.crawl()
+        elapsed = time.perf_counter() - start
+
+        sets_done = crawler.run_log.aggregates.succeeded
+        images = crawler.stats['images_downloaded']
+        bytes_downloaded = crawler.stats['bytes_downloaded']
+
+        return {
+            'label': label,
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'sets': site.sets,
+            'pages_per_set': site.pages_per_set,
+            'images_per_page': site.images_per_page,
+            'image_size': site.image_size,
+            'page_latency': site.page_latency,
+            'image_latency': site.image_latency,
+            'asset_size': site.asset_size,
+            'elapsed_seconds': round(elapsed, 3),
+            'sets_completed': sets_done,
+            'images_downloaded': images,
+            'bytes_downloaded': bytes_downloaded,
+            'sets_per_min': round(sets_done / elapsed * 60, 3) if elapsed else 0.0,
+            'images_per_sec': round(images / elapsed, 3) if elapsed else 0.0,
+            'bytes_per_sec': round(bytes_downloaded / elapsed, 1) if elapsed else 0.0,
+            'server_requests': dict(server.requests),
+            'server_bytes_sent': server.bytes_sent,
+            'stages': crawler._stage_summary(),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='爬虫端到端吞吐量基准测试')
+    parser.add_argument('--sets', type=int, default=5, help='套图数量 (默认: 5)')
+    parser.add_argument('--sets-per-list-page', type=int, default=20, help='每个列表页的套图数 (默认: 20)')
+    parser.add_argument('--pages-per-set', type=int, default=2, help='每个套图的分页数 (默认: 2)')
+    parser.add_argument('--images-per-page', type=int, default=10, help='每页图片数 (默认: 10)')
+    parser.add_argument('--image-size', type=int, default=64 * 1024, help='图片大小（字节） (默认: 65536)')
+    parser.add_argument('--asset-size', type=int, default=32 * 1024,
+                        help='页面引用的样式/字体/脚本大小（字节），0 表示不提供 (默认: 32768)')
+    parser.add_argument('--latency', type=float, default=0.0, help='页面响应延迟（秒）')
+    parser.add_argument('--image-latency', type=float, default=0.0, help='图片响应延迟（秒）')
+    parser.add_argument('--page-load-strategy', choices=['normal', 'eager', 'none'],
+                        help='浏览器页面加载策略（默认使用配置）')
+    parser.add_argument('--no-block', action='store_true', help='不屏蔽任何资源（用于对比）')
+    parser.add_argument('--no-js-pages', nargs='*', choices=['list', 'detail', 'show', 'generic'],
+                        help='禁用JavaScript的页面类型')
+    parser.add_argument('--label', type=str, default='', help='结果标签（如分支名）')
+    parser.add_argument('--output', type=str, help='保存结果的JSON文件')
+    parser.add_argument('--compare', type=str, help='用于对比的基线结果JSON文件')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    site = FixtureSite(sets=args.sets, sets_per_list_page=args.sets_per_list_page,
+                       pages_per_set=args.pages_per_set, images_per_page=args.images_per_page,
+                       image_size=args.image_size, page_latency=args.latency,
+                       image_latency=args.image_latency, asset_size=args.asset_size)
+
+    overrides = {}
+    if args.page_load_strategy:
+        overrides['PAGE_LOAD_STRATEGY'] = args.page_load_strategy
+    if args.no_block:
+        overrides['BLOCKED_RESOURCE_TYPES'] = []
+        overrides['BLOCKED_URL_PATTERNS'] = []
+    if args.no_js_pages is not None:
+        overrides['NO_JS_PAGE_TYPES'] = args.no_js_pages
+
+    results = run_crawl_benchmark(site, args.label, overrides)
+
+    print("=" * 60)
+    print("端到端基准测试结果")
+    print("=" * 60)
+    print(f"耗时:         {results['elapsed_seconds']:.2f} 秒")
+    print(f"完成套图:     {results['sets_completed']}/{results['sets']}")
+    print(f"下载图片:     {results['images_downloaded']}")
+    print(f"套图/分钟:    {results['sets_per_min']:.2f}")
+    print(f"图片/秒:      {results['images_per_sec']:.2f}")
+    print(f"字节/秒:      {results['bytes_per_sec']:.0f}")
+    print(f"峰值内存:     本进程 {results['peak_rss_mb']['self']} MB, "
+          f"子进程 {results['peak_rss_mb']['children']} MB")
+    for stage, metrics in results['stages'].items():
+        print(f"阶段 {stage:<8} {metrics['count']:>5} 次  平均 {metrics['avg_seconds']:.3f} 秒  "
+              f"平均 {metrics['avg_bytes']} 字节")
+
+    if args.output:
+        write_results(results, args.output)
+    if args.compare:
+        compare_results(results, load_results(args.compare),
+                        ['elapsed_seconds', 'sets_per_min', 'images_per_sec', 'bytes_per_sec'])
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
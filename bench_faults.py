@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+失败路径基准测试 - 在注入 403/429/5xx/超时/重置/截断 的情况下测量图片下载
+
+对每个故障配置，使用 _download_images（即 _download_single_image 的重试、
+retry_delays 和高清回退逻辑）下载一组图片，记录总耗时以及每张成功保存的图片
+所浪费的请求数:
+
+  python bench_faults.py --profiles none forbidden too_many --images 20
+  python bench_faults.py --photo-show --output bench_results/faults.json
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict
+
+from crawler import ImageCrawler
+from fixture_server import FixtureSite, FixtureServer, FAULT_PROFILES
+from bench_crawl import make_bench_config, write_results, load_results, compare_results
+
+
+def run_fault_benchmark(profile: str, images: int, image_size: int, workers: int,
+                        photo_show: bool) -> Dict:
+    """在指定故障配置下下载一个套图的图片"""
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=images, image_size=image_size,
+                       faults=FAULT_PROFILES[profile]())
+    set_id = site.set_id(0)
+
+    with FixtureServer(site) as server, tempfile.TemporaryDirectory() as output_dir:
+        config = make_bench_config(server.base_url, output_dir, 1, 1)
+        config.MAX_WORKERS = workers
+        crawler = ImageCrawler(config)
+        urls = [f"{server.base_url}{path}" for path in site.image_paths(set_id, 1)]
+
+        start = time.perf_counter()
+        if photo_show:
+            # 传入photo_id，第3次尝试时会走photoShow回退（需要Chrome）
+            crawler._download_images(urls, set_id)
+        else:
+            page_dir = os.path.join(output_dir, set_id)
+            os.makedirs(page_dir, exist_ok=True)
+            for url in urls:
+                crawler._download_single_image(url, page_dir)
+        elapsed = time.perf_counter() - start
+
+        saved = crawler.stats['images_downloaded']
+        total_requests = sum(count for kind, count in server.requests.items() if kind in ('image', 'page'))
+        wasted = total_requests - saved
+
+        return {
+            'profile': profile,
+            'images': images,
+            'elapsed_seconds': round(elapsed, 3),
+            'images_saved': saved,
+            'images_failed': crawler.stats['images_failed'],
+            'total_requests': total_requests,
+            'wasted_requests': wasted,
+            'wasted_per_saved': round(wasted / saved, 3) if saved else None,
+            'seconds_per_saved': round(elapsed / saved, 3) if saved else None,
+            'faults_injected': {k: v for k, v in server.requests.items() if k not in ('image', 'page')},
+        }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='失败路径基准测试（故障注入）')
+    parser.add_argument('--profiles', nargs='+', choices=sorted(FAULT_PROFILES),
+                        default=['none', 'forbidden_first', 'forbidden', 'too_many', 'server_error',
+                                 'reset', 'truncate'],
+                        help='要运行的故障配置')
+    parser.add_argument('--images', type=int, default=10, help='每个配置下载的图片数 (默认: 10)')
+    parser.add_argument('--image-size', type=int, default=64 * 1024, help='图片大小（字节）')
+    parser.add_argument('--workers', type=int, default=5, help='下载线程数（仅 --photo-show 模式）')
+    parser.add_argument('--photo-show', action='store_true',
+                        help='传入photo_id以启用photoShow回退（需要Chrome）')
+    parser.add_argument('--output', type=str, help='保存结果的JSON文件')
+    parser.add_argument('--compare', type=str, help='用于对比的基线结果JSON文件')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    results = {
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'profiles': {}
+    }
+
+    print(f"{'配置':<16}{'耗时(秒)':>10}{'成功':>6}{'失败':>6}{'请求数':>8}{'浪费/成功':>10}{'秒/成功':>9}")
+    for profile in args.profiles:
+        result = run_fault_benchmark(profile, args.images, args.image_size, args.workers, args.photo_show)
+        results['profiles'][profile] = result
+        print(f"{profile:<16}{result['elapsed_seconds']:>10.2f}{result['images_saved']:>6}"
+              f"{result['images_failed']:>6}{result['total_requests']:>8}"
+              f"{str(result['wasted_per_saved']):>10}{str(result['seconds_per_saved']):>9}")
+
+    if args.output:
+        write_results(results, args.output)
+    if args.compare:
+        baseline = load_results(args.compare).get('profiles', {})
+        for profile, result in results['profiles'].items():
+            if profile in baseline:
+                print(f"\n[{profile}]")
+                compare_results(result, baseline[profile],
+                                ['elapsed_seconds', 'wasted_per_saved', 'seconds_per_saved'])
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
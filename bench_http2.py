@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+HTTP 客户端基准测试 - 用下载线程池从本地站点并发下载同一主机的图片
+
+对比 HTTP/1.1（每个请求新建连接 / requests 连接池）与 HTTP/2 多路复用的
+服务器端连接数和请求延迟分布（p50/p95/p99）:
+
+  python bench_http2.py --images 200 --workers 32 --image-latency 0.05
+  python bench_http2.py --output bench_results/http2.json
+
+HTTP/2 需要 pip install 'httpx[http2]'，未安装时只运行 HTTP/1.1 的两项。
+"""
+
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import requests
+
+from fixture_server import FixtureSite, FixtureServer, H2FixtureServer
+from http_client import Http2Client, RequestsClient
+from bench_crawl import write_results, load_results, compare_results
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_client(get: Callable, server, site: FixtureSite, images: int, workers: int) -> Dict:
+    """用 workers 个线程下载 images 张图片，返回耗时、连接数和延迟分布"""
+    paths = site.image_paths(site.set_id(0), 1)
+    urls = [f"{server.base_url}{paths[n % len(paths)]}?n={n}" for n in range(images)]
+    latencies = []
+    failed = 0
+
+    def fetch(url: str):
+        start = time.perf_counter()
+        with get(url) as response:
+            response.content
+            ok = response.status_code == 200
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for seconds, ok in executor.map(fetch, urls):
+            latencies.append(seconds)
+            failed += not ok
+    elapsed = time.perf_counter() - start
+
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'images_per_sec': round(images / elapsed, 1) if elapsed else 0.0,
+        'connections': server.connections,
+        'failed': failed,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def run_benchmark(images: int, workers: int, image_size: int, image_latency: float,
+                  max_connections: int) -> Dict:
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=20, image_size=image_size,
+                       image_latency=image_latency)
+    results = {}
+
+    # 改动前的行为: 每次 requests.get 新建连接
+    with FixtureServer(site) as server:
+        results['http1_no_pool'] = run_client(lambda url: requests.get(url, timeout=15), server, site,
+                                              images, workers)
+
+    client = RequestsClient(pool_size=workers)
+    with FixtureServer(site) as server:
+        results['http1_pool'] = run_client(lambda url: client.get(url, timeout=15), server, site,
+                                           images, workers)
+    client.close()
+
+    try:
+        client = Http2Client(max_connections=max_connections, prior_knowledge=True)
+        server = H2FixtureServer(site)
+    except ImportError:
+        print("未安装 httpx[http2]，跳过 HTTP/2")
+        return results
+    with server:
+        results['http2'] = run_client(lambda url: client.get(url, timeout=15), server, site, images, workers)
+    client.close()
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='HTTP/1.1 与 HTTP/2 图片下载基准测试')
+    parser.add_argument('--images', type=int, default=200, help='下载的图片数 (默认: 200)')
+    parser.add_argument('--workers', type=int, default=32, help='下载线程数 (默认: 32)')
+    parser.add_argument('--image-size', type=int, default=64 * 1024, help='图片大小（字节）')
+    parser.add_argument('--image-latency', type=float, default=0.05, help='图片响应延迟（秒） (默认: 0.05)')
+    parser.add_argument('--max-connections', type=int, default=4, help='HTTP/2 最大连接数 (默认: 4)')
+    parser.add_argument('--output', type=str, help='保存结果的JSON文件')
+    parser.add_argument('--compare', type=str, help='用于对比的基线结果JSON文件')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    results = {
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'images': args.images,
+        'workers': args.workers,
+        'clients': run_benchmark(args.images, args.workers, args.image_size, args.image_latency,
+                                 args.max_connections),
+    }
+
+    print(f"{'客户端':<16}{'耗时(秒)':>10}{'图片/秒':>10}{'连接数':>8}{'失败':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, result in results['clients'].items():
+        print(f"{name:<16}{result['elapsed_seconds']:>10.2f}{result['images_per_sec']:>10.1f}"
+              f"{result['connections']:>8}{result['failed']:>6}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+    if args.output:
+        write_results(results, args.output)
+    if args.compare:
+        baseline = load_results(args.compare).get('clients', {})
+        for name, result in results['clients'].items():
+            if name in baseline:
+                print(f"\n[{name}]")
+                compare_results(result, baseline[name], ['elapsed_seconds', 'connections', 'p95_ms', 'p99_ms'])
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+页面就绪基准测试 - 对比旧的固定延迟等待和基于事件的就绪检测（需要Chrome）
+
+旧实现: readyState 之后滚动到底部 sleep(2)，再滚动到顶部 sleep(1)
+新实现: ImageCrawler._wait_for_page_load（目标元素 + 网络空闲 + 懒加载滚动）
+
+对本地站点的列表页、详情页和懒加载页面分别测量每页等待耗时，
+并记录页面上最终可见的图片数，确认没有因提前返回而漏掉懒加载图片:
+
+  python bench_page_load.py --rounds 5
+  python bench_page_load.py --latency 0.2 --image-latency 0.1 --output bench_results/page_load.json
+"""
+
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict
+
+from crawler import ImageCrawler
+from fixture_server import FixtureSite, FixtureServer
+from bench_crawl import make_bench_config, write_results, load_results, compare_results
+
+
+COUNT_IMAGES_SCRIPT = "return document.querySelectorAll('img, [style*=\"background-image\"]').length;"
+
+
+def legacy_wait(driver, url):
+    """重构前 _wait_for_page_load 的等待逻辑"""
+    driver.execute_script("return document.readyState")
+    driver.execute_script("return performance.now()")
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    time.sleep(2)
+    driver.execute_script("window.scrollTo(0, 0);")
+    time.sleep(1)
+
+
+def measure(driver, url: str, wait: Callable, rounds: int) -> Dict:
+    """返回平均等待耗时（毫秒）和等待结束时的图片数"""
+    total = 0.0
+    images = 0
+    for _ in range(rounds):
+        driver.get(url)
+        start = time.perf_counter()
+        wait(driver, url)
+        total += time.perf_counter() - start
+        images = driver.execute_script(COUNT_IMAGES_SCRIPT)
+    return {'wait_ms': round(total / rounds * 1000, 1), 'images': images}
+
+
+def run_page_load_benchmark(site: FixtureSite, rounds: int, lazy_batches: int) -> Dict:
+    with FixtureServer(site) as server, tempfile.TemporaryDirectory() as output_dir:
+        config = make_bench_config(server.base_url, output_dir, 1, site.pages_per_set)
+        crawler = ImageCrawler(config)
+        set_id = site.set_id(0)
+        pages = {
+            'list': (f"{server.base_url}/photos/sort-hot.html", crawler.LIST_SELECTORS),
+            'detail': (f"{server.base_url}/photo/id-{set_id}/1.html", crawler.DETAIL_SELECTORS),
+            'lazy': (f"{server.base_url}/lazy.html?id={set_id}&batches={lazy_batches}", None),
+        }
+
+        driver = crawler._create_driver()
+        try:
+            results = {}
+            for kind, (url, selectors) in pages.items():
+                def new_wait(d, u, selectors=selectors):
+                    crawler._wait_for_page_load(d, u, selectors)
+
+                before = measure(driver, url, legacy_wait, rounds)
+                after = measure(driver, url, new_wait, rounds)
+                results[kind] = {
+                    'legacy_wait_ms': before['wait_ms'],
+                    'wait_ms': after['wait_ms'],
+                    'saved_ms': round(before['wait_ms'] - after['wait_ms'], 1),
+                    'legacy_images': before['images'],
+                    'images': after['images'],
+                }
+            return results
+        finally:
+            driver.quit()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='页面就绪等待基准测试（需要Chrome）')
+    parser.add_argument('--rounds', type=int, default=3, help='每种页面的重复次数 (默认: 3)')
+    parser.add_argument('--images-per-page', type=int, default=10, help='每页图片数 (默认: 10)')
+    parser.add_argument('--lazy-batches', type=int, default=3, help='懒加载页面的批次数 (默认: 3)')
+    parser.add_argument('--latency', type=float, default=0.0, help='页面响应延迟（秒）')
+    parser.add_argument('--image-latency', type=float, default=0.0, help='图片响应延迟（秒）')
+    parser.add_argument('--output', type=str, help='保存结果的JSON文件')
+    parser.add_argument('--compare', type=str, help='用于对比的基线结果JSON文件')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    site = FixtureSite(sets=3, pages_per_set=2, images_per_page=args.images_per_page,
+                       image_size=16 * 1024, page_latency=args.latency,
+                       image_latency=args.image_latency)
+
+    results = {
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'pages': run_page_load_benchmark(site, args.rounds, args.lazy_batches),
+    }
+
+    print(f"{'页面类型':<10}{'旧(ms)':>10}{'新(ms)':>10}{'节省(ms)':>10}{'旧图片数':>10}{'新图片数':>10}")
+    for kind, result in results['pages'].items():
+        print(f"{kind:<10}{result['legacy_wait_ms']:>10.1f}{result['wait_ms']:>10.1f}"
+              f"{result['saved_ms']:>10.1f}{result['legacy_images']:>10}{result['images']:>10}")
+
+    if args.output:
+        write_results(results, args.output)
+    if args.compare:
+        baseline = load_results(args.compare).get('pages', {})
+        for kind, result in results['pages'].items():
+            if kind in baseline:
+                print(f"\n[{kind}]")
+                compare_results(result, baseline[kind], ['wait_ms', 'saved_ms'])
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+解析器微基准测试 - 对比旧的 BeautifulSoup 解析和单次遍历的 lxml 提取
+
+旧实现:
+  - 通用页面: _extract_images_from_page 和 _extract_links_from_page 各用 lxml 解析一次
+  - 列表页/详情页/photoShow页: 使用 html.parser 解析
+新实现:
+  - extractor.extract_page 单次遍历同时得到图片、链接、标题和分页器状态
+
+  python bench_parser.py                      # 使用合成页面
+  python bench_parser.py --pages recorded/    # 使用录制的页面（*.html）
+  python bench_parser.py --save-pages recorded/
+"""
+
+import os
+import re
+import glob
+import time
+import argparse
+from typing import Callable, List, Tuple
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from config import Config
+from extractor import extract_page, image_suffixes
+from fixture_server import FixtureSite
+
+
+# ---- 旧实现（与重构前的 ImageCrawler 逻辑一致） ----
+
+def _legacy_is_image_url(url: str) -> bool:
+    path = urlparse(url).path.lower()
+    return any(path.endswith(f'.{fmt}') for fmt in Config.ALLOWED_IMAGE_FORMATS)
+
+
+def _legacy_style_url(style: str):
+    match = re.search(r'url\(["\']?(.*?)["\']?\)', style)
+    return match.group(1) if match else None
+
+
+def legacy_generic(html: str, base_url: str):
+    soup = BeautifulSoup(html, 'lxml')
+    image_urls = set()
+    for img in soup.find_all('img'):
+        src = img.get('src') or img.get('data-src') or img.get('data-original')
+        if src:
+            full_url = urljoin(base_url, src)
+            if _legacy_is_image_url(full_url):
+                image_urls.add(full_url)
+    for picture in soup.find_all('picture'):
+        for source in picture.find_all('source'):
+            srcset = source.get('srcset')
+            if srcset:
+                for url in [s.strip().split()[0] for s in srcset.split(',')]:
+                    full_url = urljoin(base_url, url)
+                    if _legacy_is_image_url(full_url):
+                        image_urls.add(full_url)
+    for link in soup.find_all('a'):
+        href = link.get('href')
+        if href and _legacy_is_image_url(href):
+            image_urls.add(urljoin(base_url, href))
+
+    soup = BeautifulSoup(html, 'lxml')
+    links = [urljoin(base_url, a['href']) for a in soup.find_all('a', href=True)]
+    return list(image_urls), links
+
+
+def legacy_detail(html: str, base_url: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    title_elem = soup.find('h1') or soup.find('title')
+    title = title_elem.get_text(strip=True) if title_elem else None
+    images = []
+    for item in soup.find_all('div', class_='item photo-image'):
+        img_div = item.find('div', class_='img')
+        if img_div and img_div.get('style'):
+            img_url = _legacy_style_url(img_div['style'])
+            if img_url:
+                images.append(urljoin(base_url, img_url))
+    pager = soup.find('div', class_='pager')
+    has_next = False
+    if pager:
+        next_link = pager.find('a', class_='next')
+        has_next = bool(next_link) and 'disabled' not in next_link.get('class', [])
+    return title, images, has_next
+
+
+def legacy_list(html: str, base_url: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    urls = []
+    for item in soup.find_all('div', class_='item photo'):
+        link = item.find('a')
+        if link and 'href' in link.attrs:
+            urls.append(urljoin(base_url, link['href']))
+    return urls
+
+
+def legacy_photo_show(html: str, base_url: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    urls = []
+    for img in soup.find_all('img'):
+        src = img.get('src') or img.get('data-src') or img.get('data-original')
+        if src and _legacy_is_image_url(src):
+            urls.append(urljoin(base_url, src))
+    for div in soup.find_all('div', style=True):
+        if 'background-image' in div.get('style', ''):
+            bg_url = _legacy_style_url(div['style'])
+            if bg_url:
+                urls.append(urljoin(base_url, bg_url))
+    return urls
+
+
+LEGACY = {
+    'generic': legacy_generic,
+    'detail': legacy_detail,
+    'list': legacy_list,
+    'show': legacy_photo_show,
+}
+
+
+# ---- 页面样本 ----
+
+def synthetic_pages() -> List[Tuple[str, str, str]]:
+    """生成 (类型, URL, HTML) 样本"""
+    site = FixtureSite(sets=60, sets_per_list_page=60, pages_per_set=3, images_per_page=40)
+    set_id = site.set_id(0)
+    base = 'https://8se.me'
+
+    generic_items = []
+    for n in range(200):
+        generic_items.append(
+            f'<div class="card"><a href="/post/{n}.html">文章 {n}</a>'
+            f'<img src="/static/thumb/{n}.jpg" alt="">'
+            f'<picture><source srcset="/static/{n}@2x.webp 2x, /static/{n}.webp 1x"></picture>'
+            f'<a href="/download/{n}.png">下载</a><span>{"文本" * 20}</span></div>'
+        )
+    generic = f'<html><head><title>首页</title></head><body>{"".join(generic_items)}</body></html>'
+
+    return [
+        ('list', f'{base}/photos/sort-hot.html', site.render_list_page(1)),
+        ('detail', f'{base}/photo/id-{set_id}/2.html', site.render_detail_page(set_id, 2)),
+        ('show', f'{base}/photoShow.html?id={set_id}', site.render_photo_show_page(set_id)),
+        ('generic', f'{base}/', generic),
+    ]
+
+
+def recorded_pages(directory: str) -> List[Tuple[str, str, str]]:
+    """读取录制页面，文件名前缀表示类型: list_*.html / detail_*.html / show_*.html / 其它为通用页面"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        name = os.path.basename(path)
+        kind = name.split('_', 1)[0] if name.split('_', 1)[0] in LEGACY else 'generic'
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((kind, 'https://8se.me/', f.read()))
+    return pages
+
+
+def time_per_page(func: Callable, html: str, base_url: str, rounds: int) -> float:
+    """返回每页平均耗时（毫秒）"""
+    func(html, base_url)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(html, base_url)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML解析微基准测试')
+    parser.add_argument('--pages', type=str, help='录制页面目录（*.html）')
+    parser.add_argument('--save-pages', type=str, help='将合成页面保存到目录后退出')
+    parser.add_argument('--rounds', type=int, default=50, help='每页重复次数 (默认: 50)')
+    args = parser.parse_args()
+
+    if args.save_pages:
+        os.makedirs(args.save_pages, exist_ok=True)
+        for kind, _, html in synthetic_pages():
+            with open(os.path.join(args.save_pages, f'{kind}_sample.html'), 'w', encoding='utf-8') as f:
+                f.write(html)
+        print(f"已保存合成页面到 {args.save_pages}")
+        return 0
+
+    pages = recorded_pages(args.pages) if args.pages else synthetic_pages()
+    suffixes = image_suffixes(Config.ALLOWED_IMAGE_FORMATS)
+
+    def new_extract(html, base_url):
+        return extract_page(html, base_url, suffixes)
+
+    print(f"{'页面类型':<10}{'大小(KB)':>10}{'旧(ms)':>10}{'新(ms)':>10}{'加速':>8}")
+    for kind, base_url, html in pages:
+        before = time_per_page(LEGACY[kind], html, base_url, args.rounds)
+        after = time_per_page(new_extract, html, base_url, args.rounds)
+        print(f"{kind:<10}{len(html) / 1024:>10.1f}{before:>10.3f}{after:>10.3f}{before / after:>7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
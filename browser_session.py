@@ -0,0 +1,295 @@
+"""
+混合模式 - 浏览器只负责建立会话，页面和图片由 HTTP 客户端获取
+
+  python main.py --hybrid
+
+BrowserSession 持有一个长期使用的浏览器，第一次需要时:
+  1. 通过一次 CDP Network.setCookies 调用载入 Cookie 文件（不可用时逐条 add_cookie）
+  2. 打开 START_URL，等待 HYBRID_SETTLE 秒让验证页面/脚本完成
+  3. 导出浏览器的 Cookie、User-Agent、语言和 Client Hints（Sec-Ch-Ua*），以及浏览器使用的代理
+
+之后下载客户端的连接池（多个下载线程共用）带着这份会话发送全部页面和图片请求，浏览器保持空闲。
+每个请求的状态码通过 record() 记入最近 HYBRID_WINDOW 个请求的滑动窗口，
+403 比例达到 HYBRID_REFRESH_RATE（且至少 HYBRID_MIN_SAMPLES 个请求、距上次刷新至少
+HYBRID_REFRESH_INTERVAL 秒）时由同一个浏览器重新打开 START_URL 并重新导出；浏览器出错时重建。
+"""
+
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from selenium.common.exceptions import WebDriverException
+
+
+# 在页面中读取浏览器指纹（userAgentData 只在 Chromium 中存在）
+FINGERPRINT_SCRIPT = """
+const data = navigator.userAgentData;
+return {
+    userAgent: navigator.userAgent,
+    languages: navigator.languages || [],
+    brands: data ? data.brands : null,
+    mobile: data ? data.mobile : null,
+    platform: data ? data.platform : null
+};
+"""
+CLIENT_HINT_HEADERS = ('Sec-Ch-Ua', 'Sec-Ch-Ua-Mobile', 'Sec-Ch-Ua-Platform')
+
+
+class SessionState(NamedTuple):
+    """导出的会话，整体替换（读取方不需要加锁）"""
+    cookies: Dict[str, str]
+    headers: Dict[str, str]
+    proxies: Optional[Dict[str, str]]
+    # 第几次建立的会话（1 为首次）
+    generation: int
+
+
+def cookie_params(cookies: Iterable[Dict], url: str) -> List[Dict]:
+    """Cookie 文件中的 Cookie 转换为 CDP Network.setCookies 的参数，没有 domain 的 Cookie 属于 url"""
+    params = []
+    for cookie in cookies:
+        if not cookie.get('name') or cookie.get('value') is None:
+            continue
+        param = {'name': cookie['name'], 'value': cookie['value']}
+        if cookie.get('domain'):
+            param['domain'] = cookie['domain']
+            param['path'] = cookie.get('path') or '/'
+        else:
+            param['url'] = url
+            if cookie.get('path'):
+                param['path'] = cookie['path']
+        for key in ('secure', 'httpOnly'):
+            if cookie.get(key) is not None:
+                param[key] = bool(cookie[key])
+        if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+            param['sameSite'] = cookie['sameSite']
+        expires = cookie.get('expiry') or cookie.get('expires')
+        if expires and expires > 0:
+            param['expires'] = expires
+        params.append(param)
+    return params
+
+
+def load_cookies(driver, cookies: List[Dict], url: str, logger=None) -> int:
+    """
+    把 Cookie 载入浏览器，返回载入的条数
+    优先用一次 CDP 调用全部写入（不需要先打开页面）；不支持 CDP 时逐条 add_cookie（需要已打开该站点）
+    """
+    params = cookie_params(cookies, url)
+    if not params:
+        return 0
+    try:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': params})
+        return len(params)
+    except (WebDriverException, AttributeError) as e:
+        if logger:
+            logger.debug(f"CDP写入Cookie不可用，逐条添加: {str(e)[:100]}")
+    loaded = 0
+    for param in params:
+        cookie = {key: value for key, value in param.items() if key not in ('url', 'httpOnly', 'expires')}
+        if param.get('expires'):
+            cookie['expiry'] = int(param['expires'])
+        try:
+            driver.add_cookie(cookie)
+            loaded += 1
+        except WebDriverException as e:
+            if logger:
+                logger.warning(f"添加Cookie失败: {str(e)[:100]}")
+    return loaded
+
+
+def fingerprint_headers(info: Dict) -> Dict[str, str]:
+    """由浏览器指纹生成请求头（User-Agent、Accept-Language，Chromium 时加上 Client Hints）"""
+    headers = {'User-Agent': info['userAgent']}
+    languages = [language for language in info.get('languages') or [] if language]
+    if languages:
+        headers['Accept-Language'] = ','.join(
+            [languages[0]] + [f"{language};q={max(0.1, 1 - index / 10):.1f}"
+                              for index, language in enumerate(languages[1:], 1)])
+    if info.get('brands'):
+        headers['Sec-Ch-Ua'] = ', '.join(f'"{brand["brand"]}";v="{brand["version"]}"'
+                                         for brand in info['brands'])
+        headers['Sec-Ch-Ua-Mobile'] = '?1' if info.get('mobile') else '?0'
+        if info.get('platform'):
+            headers['Sec-Ch-Ua-Platform'] = f'"{info["platform"]}"'
+    return headers
+
+
+class NullSession:
+    """未启用混合模式时使用的空实现，页面由各自的浏览器获取"""
+    enabled = False
+    refreshes = 0
+
+    def state(self) -> Optional[SessionState]:
+        return None
+
+    def headers(self, base: Dict[str, str]) -> Dict[str, str]:
+        return base
+
+    def record(self, status: int) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+
+class BrowserSession(NullSession):
+    """
+    一个浏览器建立的共享会话（线程安全）
+    start_driver() 返回 (driver, 代理配置或None)，浏览器的生命周期由本对象管理
+    """
+    enabled = True
+
+    def __init__(self, start_driver: Callable[[], Tuple[object, Optional[Dict]]], url: str,
+                 cookies: List[Dict] = (), refresh_rate: float = 0.3, window: int = 50,
+                 min_samples: int = 10, min_interval: float = 60.0, settle: float = 3.0,
+                 logger=None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self._start_driver = start_driver
+        self.url = url
+        self._cookies = list(cookies)
+        self.refresh_rate = refresh_rate
+        self.window = max(1, window)
+        self.min_samples = max(1, min(min_samples, self.window))
+        self.min_interval = min_interval
+        self.settle = settle
+        self.logger = logger
+        self._clock = clock
+        self._sleep = sleep
+        # 建立/刷新会话时持有（同一时间只有一个线程使用浏览器）
+        self._lock = threading.Lock()
+        self._window_lock = threading.Lock()
+        # 最近请求是否为403
+        self._recent: List[bool] = []
+        self._driver = None
+        self._proxy = None
+        self._state: Optional[SessionState] = None
+        # 最近一次建立/刷新会话的时间
+        self._attempted_at: Optional[float] = None
+        # 建立失败的时间，min_interval 内不再重试
+        self._failed_at: Optional[float] = None
+        self.refreshes = 0
+
+    def state(self) -> SessionState:
+        """当前会话，第一次调用时由浏览器建立"""
+        state = self._state
+        if state is not None:
+            return state
+        with self._lock:
+            if self._state is None:
+                if self._failed_at is not None and self._clock() - self._failed_at < self.min_interval:
+                    raise RuntimeError("浏览器会话不可用")
+                self._establish()
+            return self._state
+
+    def _establish(self):
+        """由浏览器打开起始页并导出会话，调用方持有 _lock"""
+        self._attempted_at = self._clock()
+        try:
+            if self._driver is None:
+                self._driver, self._proxy = self._start_driver()
+                if self._cookies:
+                    # 先打开站点: CDP 不可用时 add_cookie 只能写入当前站点的 Cookie
+                    self._driver.get(self.url)
+                    count = load_cookies(self._driver, self._cookies, self.url, self.logger)
+                    if self.logger:
+                        self.logger.info(f"已向会话浏览器载入 {count} 条Cookie")
+            self._driver.get(self.url)
+            self._sleep(self.settle)
+            state = self._export()
+        except Exception as e:
+            self._failed_at = self._clock()
+            self._quit_driver()
+            if self.logger:
+                self.logger.error(f"建立浏览器会话失败: {str(e)[:200]}")
+            raise
+        self._failed_at = None
+        self._state = state
+        if self.logger:
+            self.logger.info(f"浏览器会话已建立 (第 {state.generation} 次): {len(state.cookies)} 条Cookie, "
+                             f"User-Agent: {state.headers['User-Agent']}")
+
+    def _export(self) -> SessionState:
+        driver = self._driver
+        cookies = {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+        headers = fingerprint_headers(driver.execute_script(FINGERPRINT_SCRIPT))
+        proxies = None
+        if self._proxy:
+            proxies = {'http': self._proxy['server'], 'https': self._proxy['server']}
+        generation = self._state.generation + 1 if self._state else 1
+        return SessionState(cookies, headers, proxies, generation)
+
+    def headers(self, base: Dict[str, str]) -> Dict[str, str]:
+        """在请求头上换成浏览器的指纹（非 Chromium 浏览器时去掉 Client Hints）"""
+        exported = self.state().headers
+        headers = {key: value for key, value in base.items()
+                   if key not in CLIENT_HINT_HEADERS or key in exported}
+        headers.update(exported)
+        return headers
+
+    def record(self, status: int) -> bool:
+        """记录一个请求的状态码，403 比例过高时刷新会话；返回是否已刷新（之后的请求使用新会话）"""
+        with self._window_lock:
+            self._recent.append(status == 403)
+            if len(self._recent) > self.window:
+                del self._recent[0]
+            samples = len(self._recent)
+            forbidden = sum(self._recent)
+        if samples < self.min_samples or forbidden < samples * self.refresh_rate:
+            return False
+        if self._attempted_at is not None and self._clock() - self._attempted_at < self.min_interval:
+            return False
+        # 其它线程正在刷新时不等待
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self.logger:
+                self.logger.warning(f"最近 {samples} 个请求中 {forbidden} 个返回403，刷新浏览器会话")
+            return self._refresh()
+        finally:
+            self._lock.release()
+
+    def refresh(self) -> bool:
+        """立即刷新会话，返回是否成功"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        try:
+            try:
+                self._establish()
+            except WebDriverException:
+                # 浏览器已失效（_establish 已关闭），用新浏览器重试一次
+                self._establish()
+        except Exception:
+            return False
+        finally:
+            with self._window_lock:
+                self._recent.clear()
+        self.refreshes += 1
+        return True
+
+    def _quit_driver(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"关闭WebDriver时出错: {str(e)}")
+            self._driver = None
+            self._proxy = None
+
+    def close(self):
+        with self._lock:
+            self._quit_driver()
+
+
+def create_browser_session(config, start_driver: Callable[[], Tuple[object, Optional[Dict]]],
+                           cookies: List[Dict] = (), logger=None):
+    """HYBRID 时创建共享的浏览器会话（浏览器在第一次请求时才启动）"""
+    if not config.HYBRID:
+        return NullSession()
+    return BrowserSession(start_driver, config.START_URL, cookies,
+                          refresh_rate=config.HYBRID_REFRESH_RATE, window=config.HYBRID_WINDOW,
+                          min_samples=config.HYBRID_MIN_SAMPLES, min_interval=config.HYBRID_REFRESH_INTERVAL,
+                          settle=config.HYBRID_SETTLE, logger=logger)
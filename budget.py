@@ -0,0 +1,178 @@
+"""
+运行预算 - 在固定的时间窗口或流量上限内尽量多地完成套图
+
+  --time-budget 30m   运行时间上限（包括爬取列表页的时间）
+  --byte-budget 5G    图片下载字节数上限
+
+每个套图结束后用指数滑动平均更新每张图片的耗时和字节数，以及每个套图的平均图片数。
+开始下一个套图前估算其成本（已知图片数时按图片数，否则按平均值，再乘以 MARGIN），
+剩余预算不足时在优先级最高的若干个套图中找一个放得下的；都放不下时停止开始新的套图，
+当前套图正常结束，元数据、运行日志和 .part 文件保留，下次运行可以继续。
+"""
+
+import re
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+SIZE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?$', re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)([smh]?)$')
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+# 估算成本的安全系数
+MARGIN = 1.2
+# 滑动平均系数
+ALPHA = 0.3
+
+
+def parse_duration(value: str) -> float:
+    """解析时长: 90 / 90s / 30m / 1.5h，空值为0（不限制）"""
+    if not value:
+        return 0.0
+    match = DURATION_RE.match(str(value).strip().lower())
+    if not match:
+        raise ValueError(f"无法解析时长: {value}")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_size(value: str) -> int:
+    """解析字节数: 500M / 5G / 1.5GB / 1024，空值为0（不限制）"""
+    if not value:
+        return 0
+    match = SIZE_RE.match(str(value).strip())
+    if not match:
+        raise ValueError(f"无法解析大小: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+class NullBudget:
+    """未设置预算时使用的空实现"""
+    enabled = False
+    stopped = None
+
+    def fits(self, images: Optional[int] = None) -> bool:
+        return True
+
+    def record_set(self, seconds: float, bytes_count: int, images: int, downloaded: Optional[int] = None):
+        pass
+
+    def summary(self) -> Optional[Dict]:
+        return None
+
+
+class CrawlBudget(NullBudget):
+    """时间/字节预算与套图成本估算"""
+    enabled = True
+
+    def __init__(self, seconds: float = 0, bytes_limit: int = 0, bytes_used: Callable[[], int] = lambda: 0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self.bytes_limit = bytes_limit
+        self._bytes_used = bytes_used
+        self._clock = clock
+        self._started = clock()
+        # 每张图片的耗时/字节数、每个套图的图片数（滑动平均，没有数据时为None）
+        self.seconds_per_image: Optional[float] = None
+        self.bytes_per_image: Optional[float] = None
+        self.images_per_set: Optional[float] = None
+        self.sets_started = 0
+        self.sets_skipped = 0
+        # 停止开始新套图的原因（'time' / 'bytes'）
+        self.stopped: Optional[str] = None
+        # 最近一次 fits() 拒绝套图时不足的一项（'time' / 'bytes'）
+        self.rejected_by: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return self._clock() - self._started
+
+    def remaining(self) -> Tuple[Optional[float], Optional[int]]:
+        """剩余的 (秒, 字节)，未限制的一项为None"""
+        seconds = self.seconds - self.elapsed() if self.seconds else None
+        bytes_left = self.bytes_limit - self._bytes_used() if self.bytes_limit else None
+        return seconds, bytes_left
+
+    def estimate(self, images: Optional[int] = None) -> Tuple[float, float]:
+        """估算一个套图的 (秒, 字节)，还没有完成过套图时为 (0, 0)"""
+        if self.seconds_per_image is None:
+            return 0.0, 0.0
+        count = images or self.images_per_set or 0
+        return (count * self.seconds_per_image * MARGIN,
+                count * self.bytes_per_image * MARGIN)
+
+    def _exhausted(self) -> Optional[str]:
+        seconds, bytes_left = self.remaining()
+        if seconds is not None and seconds <= 0:
+            return 'time'
+        if bytes_left is not None and bytes_left <= 0:
+            return 'bytes'
+        return None
+
+    def fits(self, images: Optional[int] = None) -> bool:
+        """剩余预算是否足够开始该套图"""
+        if self.stopped:
+            return False
+        reason = self._exhausted()
+        if reason:
+            self.stopped = reason
+            return False
+        seconds, bytes_left = self.remaining()
+        cost_seconds, cost_bytes = self.estimate(images)
+        if seconds is not None and cost_seconds > seconds:
+            self.rejected_by = 'time'
+            return False
+        if bytes_left is not None and cost_bytes > bytes_left:
+            self.rejected_by = 'bytes'
+            return False
+        return True
+
+    def stop(self):
+        """没有放得下的套图时停止，原因取最近一次拒绝套图的一项（只可能是已设置的预算）"""
+        if not self.stopped:
+            self.stopped = self.rejected_by or ('time' if self.seconds else 'bytes')
+
+    def record_set(self, seconds: float, bytes_count: int, images: int, downloaded: Optional[int] = None):
+        """
+        套图结束后更新成本估算: images 为套图中发现的图片数，downloaded 为实际下载的图片数（默认同 images）
+        每张图片的成本按实际下载的图片计算，跳过的已有图片和近似重复不会摊低成本（续传的运行）
+        """
+        self.sets_started += 1
+        if images > 0:
+            if self.images_per_set is None:
+                self.images_per_set = float(images)
+            else:
+                self.images_per_set += ALPHA * (images - self.images_per_set)
+        downloaded = images if downloaded is None else downloaded
+        if downloaded <= 0:
+            return
+        per_image_seconds = seconds / downloaded
+        per_image_bytes = bytes_count / downloaded
+        if self.seconds_per_image is None:
+            self.seconds_per_image, self.bytes_per_image = per_image_seconds, per_image_bytes
+        else:
+            self.seconds_per_image += ALPHA * (per_image_seconds - self.seconds_per_image)
+            self.bytes_per_image += ALPHA * (per_image_bytes - self.bytes_per_image)
+
+    def summary(self) -> Dict:
+        seconds, bytes_left = self.remaining()
+        return {
+            'time_budget_seconds': self.seconds or None,
+            'byte_budget': self.bytes_limit or None,
+            'elapsed_seconds': round(self.elapsed(), 1),
+            'bytes_used': self._bytes_used(),
+            'remaining_seconds': round(seconds, 1) if seconds is not None else None,
+            'remaining_bytes': bytes_left,
+            'stopped': self.stopped,
+            'sets_skipped': self.sets_skipped,
+            'seconds_per_image': round(self.seconds_per_image, 3) if self.seconds_per_image is not None else None,
+            'bytes_per_image': int(self.bytes_per_image) if self.bytes_per_image is not None else None,
+        }
+
+
+def create_budget(config, bytes_used: Callable[[], int] = lambda: 0):
+    """根据 TIME_BUDGET / BYTE_BUDGET 创建预算，都未设置时返回空实现"""
+    seconds = parse_duration(config.TIME_BUDGET)
+    bytes_limit = parse_size(config.BYTE_BUDGET)
+    if not seconds and not bytes_limit:
+        return NullBudget()
+    return CrawlBudget(seconds, bytes_limit, bytes_used)
@@ -0,0 +1,366 @@
+"""
+下载目录的 SQLite 索引 - 套图、分页和图片
+
+爬虫在运行过程中把记录放入缓冲区，按批次（BATCH_SIZE 条或 FLUSH_INTERVAL 秒）
+在一个事务中写入，不再需要遍历 OUTPUT_DIR/*/metadata.json 来回答
+“有多少套图不完整”“上周哪些图片下载失败”之类的问题:
+
+  python main.py catalog status
+  python main.py catalog incomplete --limit 50
+  python main.py catalog failures --since 7d
+  python main.py catalog import          # 从已有的 metadata.json 回填
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sets (
+    photo_id TEXT PRIMARY KEY,
+    url TEXT,
+    title TEXT,
+    status TEXT,
+    total_pages INTEGER,
+    images_downloaded INTEGER NOT NULL DEFAULT 0,
+    images_failed INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    started REAL,
+    finished REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS sets_finished ON sets (finished);
+CREATE INDEX IF NOT EXISTS sets_incomplete ON sets (finished) WHERE status != 'success' OR images_failed > 0;
+
+CREATE TABLE IF NOT EXISTS pages (
+    photo_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    url TEXT,
+    status TEXT,
+    images INTEGER NOT NULL DEFAULT 0,
+    crawled REAL,
+    PRIMARY KEY (photo_id, page)
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    photo_id TEXT,
+    filename TEXT,
+    status TEXT,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    sha1 TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS images_photo ON images (photo_id);
+CREATE INDEX IF NOT EXISTS images_status ON images (status, updated);
+CREATE INDEX IF NOT EXISTS images_sha1 ON images (sha1);
+
+-- 按状态的计数由触发器维护，status 查询不需要扫描整张表
+CREATE TABLE IF NOT EXISTS set_totals (
+    status TEXT PRIMARY KEY,
+    sets INTEGER NOT NULL DEFAULT 0,
+    incomplete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS image_totals (
+    status TEXT PRIMARY KEY,
+    images INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS sets_insert AFTER INSERT ON sets BEGIN
+    INSERT INTO set_totals (status, sets, incomplete)
+    VALUES (COALESCE(new.status, ''), 1, new.status IS NOT 'success' OR new.images_failed > 0)
+    ON CONFLICT (status) DO UPDATE SET sets = sets + 1, incomplete = incomplete + excluded.incomplete;
+END;
+CREATE TRIGGER IF NOT EXISTS sets_update AFTER UPDATE OF status, images_failed ON sets BEGIN
+    UPDATE set_totals SET sets = sets - 1,
+        incomplete = incomplete - (old.status IS NOT 'success' OR old.images_failed > 0)
+    WHERE status = COALESCE(old.status, '');
+    INSERT INTO set_totals (status, sets, incomplete)
+    VALUES (COALESCE(new.status, ''), 1, new.status IS NOT 'success' OR new.images_failed > 0)
+    ON CONFLICT (status) DO UPDATE SET sets = sets + 1, incomplete = incomplete + excluded.incomplete;
+END;
+
+CREATE TRIGGER IF NOT EXISTS images_insert AFTER INSERT ON images BEGIN
+    INSERT INTO image_totals (status, images, bytes) VALUES (COALESCE(new.status, ''), 1, new.bytes)
+    ON CONFLICT (status) DO UPDATE SET images = images + 1, bytes = bytes + excluded.bytes;
+END;
+CREATE TRIGGER IF NOT EXISTS images_update AFTER UPDATE OF status, bytes ON images BEGIN
+    UPDATE image_totals SET images = images - 1, bytes = bytes - old.bytes
+    WHERE status = COALESCE(old.status, '');
+    INSERT INTO image_totals (status, images, bytes) VALUES (COALESCE(new.status, ''), 1, new.bytes)
+    ON CONFLICT (status) DO UPDATE SET images = images + 1, bytes = bytes + excluded.bytes;
+END;
+"""
+
+UPSERT_SET = """
+INSERT INTO sets (photo_id, url, title, status, total_pages, images_downloaded, images_failed,
+                  bytes, started, finished, error)
+VALUES (:photo_id, :url, :title, :status, :total_pages, :images_downloaded, :images_failed,
+        (SELECT COALESCE(SUM(bytes), 0) FROM images WHERE photo_id = :photo_id AND status = 'downloaded'),
+        :started, :finished, :error)
+ON CONFLICT (photo_id) DO UPDATE SET
+    url = excluded.url, title = excluded.title, status = excluded.status,
+    total_pages = excluded.total_pages, images_downloaded = excluded.images_downloaded,
+    images_failed = excluded.images_failed, bytes = excluded.bytes,
+    started = COALESCE(sets.started, excluded.started), finished = excluded.finished,
+    error = excluded.error
+"""
+
+UPSERT_PAGE = """
+INSERT OR REPLACE INTO pages (photo_id, page, url, status, images, crawled)
+VALUES (:photo_id, :page, :url, :status, :images, :crawled)
+"""
+
+UPSERT_IMAGE = """
+INSERT INTO images (url, photo_id, filename, status, bytes, sha1, attempts, error, updated)
+VALUES (:url, :photo_id, :filename, :status, :bytes, :sha1, :attempts, :error, :updated)
+ON CONFLICT (url) DO UPDATE SET
+    photo_id = COALESCE(excluded.photo_id, images.photo_id),
+    filename = COALESCE(excluded.filename, images.filename),
+    status = excluded.status, bytes = excluded.bytes, sha1 = COALESCE(excluded.sha1, images.sha1),
+    attempts = images.attempts + excluded.attempts, error = excluded.error, updated = excluded.updated
+"""
+
+
+class NullCatalog:
+    """关闭索引时使用的空实现"""
+    enabled = False
+
+    def record_set(self, photo_id: str, **fields):
+        pass
+
+    def record_page(self, photo_id: str, page: int, **fields):
+        pass
+
+    def record_image(self, url: str, **fields):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Catalog(NullCatalog):
+    """SQLite 索引，写入按批次合并为事务"""
+    enabled = True
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 2.0,
+                 clock=time.time, logger=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logger
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+        # 写入失败（如其它节点锁住数据库）后，flush_interval 内不再由 _add 触发写入
+        self._retry_at = 0.0
+        self._db = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """第一次读写时才创建数据库文件（调用方持有 _lock）"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            # WAL 允许查询命令与正在运行的爬虫并发读取
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _add(self, sql: str, params: Dict):
+        with self._lock:
+            self._pending.append((sql, params))
+            now = time.monotonic()
+            due = now >= self._retry_at and (len(self._pending) >= self.batch_size or
+                                             now - self._last_flush >= self.flush_interval)
+        if due:
+            self._flush_logged()
+
+    def record_set(self, photo_id: str, url: str = None, title: str = None, status: str = None,
+                   total_pages: int = None, images_downloaded: int = 0, images_failed: int = 0,
+                   started: float = None, finished: float = None, error: str = None):
+        """套图结果（bytes 由已登记的图片汇总）"""
+        self._add(UPSERT_SET, {
+            'photo_id': photo_id, 'url': url, 'title': title, 'status': status,
+            'total_pages': total_pages, 'images_downloaded': images_downloaded,
+            'images_failed': images_failed, 'started': started,
+            'finished': finished if finished is not None else self._clock(), 'error': error,
+        })
+
+    def record_page(self, photo_id: str, page: int, url: str = None, status: str = None, images: int = 0):
+        self._add(UPSERT_PAGE, {'photo_id': photo_id, 'page': page, 'url': url, 'status': status,
+                                'images': images, 'crawled': self._clock()})
+
+    def record_image(self, url: str, photo_id: str = None, filename: str = None, status: str = None,
+                     bytes: int = 0, sha1: str = None, attempts: int = 1, error: str = None):
+        self._add(UPSERT_IMAGE, {'url': url, 'photo_id': photo_id, 'filename': filename,
+                                 'status': status, 'bytes': bytes, 'sha1': sha1, 'attempts': attempts,
+                                 'error': error, 'updated': self._clock()})
+
+    def flush(self):
+        """在一个事务中写入缓冲区中的全部记录，失败时记录放回缓冲区（下次写入时重试）并抛出异常"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for sql, params in pending:
+                        self._conn.execute(sql, params)
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    raise
+            except Exception:
+                self._pending[:0] = pending
+                self._retry_at = time.monotonic() + self.flush_interval
+                raise
+            self._retry_at = 0.0
+
+    def _flush_logged(self):
+        """爬虫调用的写入: 数据库错误只记录日志，不影响图片和套图的下载"""
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            if self.logger:
+                self.logger.error(f"写入目录索引失败 {self.path}（{len(self._pending)} 条记录稍后重试）: {e}")
+
+    def close(self):
+        self._flush_logged()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ---- 查询 ----
+
+    def status(self) -> Dict:
+        """套图和图片的按状态计数以及总字节数"""
+        with self._lock:
+            set_rows = self._conn.execute(
+                'SELECT status, sets, incomplete FROM set_totals WHERE sets > 0').fetchall()
+            image_rows = self._conn.execute(
+                'SELECT status, images, bytes FROM image_totals WHERE images > 0').fetchall()
+            last = self._conn.execute('SELECT MAX(finished) FROM sets').fetchone()[0]
+        sets = {status: count for status, count, _ in set_rows}
+        images = {status: count for status, count, _ in image_rows}
+        incomplete = sum(row[2] for row in set_rows)
+        total_bytes = sum(row[2] for row in image_rows if row[0] == 'downloaded')
+        return {
+            'sets': sets,
+            'sets_total': sum(sets.values()),
+            'sets_incomplete': incomplete,
+            'images': images,
+            'images_total': sum(images.values()),
+            'bytes_downloaded': total_bytes,
+            'last_finished': last,
+        }
+
+    def incomplete(self, limit: int = 100) -> List[Dict]:
+        """未成功或有失败图片的套图，最近的在前"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT photo_id, title, status, images_downloaded, images_failed, finished, error, url "
+                "FROM sets WHERE status != 'success' OR images_failed > 0 "
+                "ORDER BY finished DESC LIMIT ?",
+                (limit,)
+            )
+            return _rows(cursor)
+
+    def failures(self, since: float = 0.0, limit: int = 100) -> List[Dict]:
+        """since 之后最终失败的图片，最近的在前"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT url, photo_id, filename, attempts, error, updated FROM images "
+                "WHERE status = 'failed' AND updated >= ? ORDER BY updated DESC LIMIT ?",
+                (since, limit)
+            )
+            return _rows(cursor)
+
+    def import_metadata(self, output_dir: str) -> int:
+        """从 OUTPUT_DIR/*/metadata.json 回填索引，返回导入的套图数"""
+        count = 0
+        for path in glob.glob(os.path.join(output_dir, '*', 'metadata.json')):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            photo_id = metadata.get('photo_id') or os.path.basename(os.path.dirname(path))
+            finished = _parse_date(metadata.get('last_update') or metadata.get('download_date'))
+            failed = metadata.get('failed_images') or []
+            self.record_set(photo_id, url=metadata.get('photo_url'), title=metadata.get('title'),
+                            status='success', total_pages=metadata.get('total_pages'),
+                            images_downloaded=metadata.get('images_downloaded', 0),
+                            images_failed=metadata.get('images_failed', len(failed)),
+                            finished=finished)
+            for record in failed:
+                if record.get('url'):
+                    self.record_image(record['url'], photo_id=photo_id, filename=record.get('filename'),
+                                      status='failed', attempts=0, error=record.get('reason'))
+            count += 1
+        self.flush()
+        return count
+
+
+def _rows(cursor) -> List[Dict]:
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp()
+    except ValueError:
+        return None
+
+
+DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhdw])$')
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_since(value: str, now: float = None) -> float:
+    """解析时间起点: 7d / 12h / 30m 等相对时长，或 YYYY-MM-DD[ HH:MM:SS] 日期"""
+    now = time.time() if now is None else now
+    match = DURATION_RE.match(value.strip())
+    if match:
+        return now - float(match.group(1)) * DURATION_UNITS[match.group(2)]
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value.strip(), fmt).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"无法解析时间: {value}")
+
+
+def catalog_path(config) -> str:
+    """索引文件路径，相对路径基于 OUTPUT_DIR"""
+    return os.path.join(config.OUTPUT_DIR, config.CATALOG_FILE)
+
+
+def create_catalog(config, logger=None):
+    """根据配置创建索引，CATALOG_FILE 为空时返回空实现"""
+    if not getattr(config, 'CATALOG_FILE', ''):
+        return NullCatalog()
+    return Catalog(catalog_path(config), batch_size=config.CATALOG_BATCH_SIZE, logger=logger)
@@ -20,10 +20,26 @@ class Config:
     
     MAX_PAGES = int(os.getenv('MAX_PAGES', '50'))
     
+    # 站点爬取模式（--mode site）: 并发页面线程数、同一域名同时进行的页面数，
+    # 允许爬取的域名（逗号分隔，包括子域名；留空只爬取起始URL的主机）
+    PAGE_WORKERS = int(os.getenv('PAGE_WORKERS', '2'))
+    DOMAIN_CONCURRENCY = int(os.getenv('DOMAIN_CONCURRENCY', '1'))
+    ALLOWED_DOMAINS = [d.strip().lower() for d in os.getenv('ALLOWED_DOMAINS', '').split(',') if d.strip()]
+    
+    # 已访问页面/已下载图片的URL集合: memory（Python set）/ compact（64位指纹表，适合千万级URL）
+    # compact 时 VISITED_SET_SNAPSHOT=true 将指纹表映射到 OUTPUT_DIR/*.fpset，跨运行保留
+    VISITED_SET = os.getenv('VISITED_SET', 'memory')
+    VISITED_SET_SNAPSHOT = os.getenv('VISITED_SET_SNAPSHOT', 'false').lower() == 'true'
+    
     OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'output')
     
     LOGS_DIR = os.getenv('LOGS_DIR', 'logs')
     
+    # 日志文件格式（text / json）；同一代码位置每 LOG_RATE_INTERVAL 秒最多输出的日志条数（0 不限制）
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '20'))
+    LOG_RATE_INTERVAL = float(os.getenv('LOG_RATE_INTERVAL', '10'))
+    
     MIN_DELAY = float(os.getenv('MIN_DELAY', '1'))
     MAX_DELAY = float(os.getenv('MAX_DELAY', '3'))
     
@@ -57,12 +73,126 @@ class Config:
     HEADLESS = os.getenv('HEADLESS', 'true').lower() == 'true'
 
     RESPECT_ROBOTS_TXT = os.getenv('RESPECT_ROBOTS_TXT', 'true').lower() == 'true'
+    # robots.txt 缓存有效期（秒，0 表示只在本次运行中缓存）、匹配的 User-agent 名称、获取超时（秒）
+    ROBOTS_CACHE_TTL = float(os.getenv('ROBOTS_CACHE_TTL', '86400'))
+    ROBOTS_USER_AGENT = os.getenv('ROBOTS_USER_AGENT', '*')
+    ROBOTS_TIMEOUT = float(os.getenv('ROBOTS_TIMEOUT', '10'))
 
     MIN_IMAGE_SIZE = int(os.getenv('MIN_IMAGE_SIZE', '10240'))
 
     ALLOWED_IMAGE_FORMATS = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp']
 
     SKIP_EXISTING = os.getenv('SKIP_EXISTING', 'true').lower() == 'true'
+    # 图片下载的 HTTP 客户端: http1（requests 连接池）或 http2（httpx 多路复用，需要 httpx[http2]），
+    # 以及 HTTP/2 时每个代理最多打开的连接数
+    HTTP_CLIENT = os.getenv('HTTP_CLIENT', 'http1')
+    HTTP2_MAX_CONNECTIONS = int(os.getenv('HTTP2_MAX_CONNECTIONS', '4'))
+    # DNS缓存的有效期（秒，0 禁用，结果保存在 OUTPUT_DIR/dns_cache.json）和发现新图片主机时预先打开的连接数
+    DNS_CACHE_TTL = int(os.getenv('DNS_CACHE_TTL', '300'))
+    PREWARM_CONNECTIONS = int(os.getenv('PREWARM_CONNECTIONS', '2'))
+    # 套图处理顺序: 逗号分隔的优先级（rank 发现顺序 / partial 未完成的优先 / small 图片少的优先 /
+    # healthy 主机失败率低的优先），按顺序逐级比较
+    FRONTIER_PRIORITY = os.getenv('FRONTIER_PRIORITY', 'rank')
+    # 套图发现方式: list（渲染列表页）/ sitemap（读取站点地图，只处理新的或已更新的套图）
+    # SITEMAP_URLS 指定站点地图（逗号分隔），留空时从 robots.txt 或常用地址查找
+    DISCOVERY = os.getenv('DISCOVERY', 'list')
+    SITEMAP_URLS = [u.strip() for u in os.getenv('SITEMAP_URLS', '').split(',') if u.strip()]
+    # 混合模式: 一个浏览器建立会话（Cookie、User-Agent、Client Hints），页面和图片由 HTTP 客户端带着该会话获取；
+    # 最近 HYBRID_WINDOW 个请求中403的比例达到 HYBRID_REFRESH_RATE（至少 HYBRID_MIN_SAMPLES 个请求）时刷新会话，
+    # 两次刷新至少间隔 HYBRID_REFRESH_INTERVAL 秒；HYBRID_SETTLE 为打开起始页后等待验证完成的秒数
+    HYBRID = os.getenv('HYBRID', 'false').lower() == 'true'
+    HYBRID_REFRESH_RATE = float(os.getenv('HYBRID_REFRESH_RATE', '0.3'))
+    HYBRID_WINDOW = int(os.getenv('HYBRID_WINDOW', '50'))
+    HYBRID_MIN_SAMPLES = int(os.getenv('HYBRID_MIN_SAMPLES', '10'))
+    HYBRID_REFRESH_INTERVAL = float(os.getenv('HYBRID_REFRESH_INTERVAL', '60'))
+    HYBRID_SETTLE = float(os.getenv('HYBRID_SETTLE', '3'))
+    # 运行预算: 时间上限（如 30m / 2h）和图片下载字节数上限（如 500M / 5G），留空不限制
+    TIME_BUDGET = os.getenv('TIME_BUDGET', '')
+    BYTE_BUDGET = os.getenv('BYTE_BUDGET', '')
+    # 中断的图片下载保留为 .part 文件，之后用 Range 请求续传
+    RESUME_DOWNLOADS = os.getenv('RESUME_DOWNLOADS', 'true').lower() == 'true'
+
+    # 工作进程数（大于1时将套图分片给多个进程爬取）
+    PROCESSES = int(os.getenv('PROCESSES', '1'))
+
+    # 套图任务队列（SQLite文件路径、sqlite:///path 或 memory://，为空则不使用）
+    WORK_QUEUE = os.getenv('WORK_QUEUE', '')
+
+    # 工作节点模式: 不爬列表页，只从任务队列领取套图
+    QUEUE_WORKER = os.getenv('QUEUE_WORKER', 'false').lower() == 'true'
+
+    # 任务租约时长（秒），节点在此时间内未续租则任务被重新领取
+    QUEUE_VISIBILITY_TIMEOUT = float(os.getenv('QUEUE_VISIBILITY_TIMEOUT', '600'))
+
+    # 每个套图最多尝试次数，以及没有可领取任务时的轮询间隔（秒）
+    QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', '3'))
+    QUEUE_POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', '5'))
+
+    # 本节点名称（租约和运行日志/摘要文件名），为空时使用 主机名-进程号
+    QUEUE_NODE = os.getenv('QUEUE_NODE', '')
+
+    # 套图元数据落盘: 距上次写入的秒数，或新增图片数，满足其一即写入
+    METADATA_FLUSH_INTERVAL = float(os.getenv('METADATA_FLUSH_INTERVAL', '5'))
+    METADATA_FLUSH_EVERY = int(os.getenv('METADATA_FLUSH_EVERY', '50'))
+
+    # 下载目录索引: SQLite 文件（相对路径基于 OUTPUT_DIR，留空禁用）和每个事务的记录数
+    CATALOG_FILE = os.getenv('CATALOG_FILE', 'catalog.db')
+    CATALOG_BATCH_SIZE = int(os.getenv('CATALOG_BATCH_SIZE', '500'))
+
+    # 下载后的图片处理: 转码格式（webp / avif，留空禁用）、编码质量、缩略图最长边（0 不生成）、
+    # 进程数（0 为CPU核数）和同时处理中的最大图片数
+    POSTPROCESS_FORMAT = os.getenv('POSTPROCESS_FORMAT', '')
+    POSTPROCESS_QUALITY = int(os.getenv('POSTPROCESS_QUALITY', '80'))
+    POSTPROCESS_THUMBNAIL = int(os.getenv('POSTPROCESS_THUMBNAIL', '320'))
+    POSTPROCESS_WORKERS = int(os.getenv('POSTPROCESS_WORKERS', '0'))
+    POSTPROCESS_QUEUE_SIZE = int(os.getenv('POSTPROCESS_QUEUE_SIZE', '64'))
+
+    # 感知哈希近似去重: 索引文件（相对 OUTPUT_DIR，留空禁用）、判定为重复的最大汉明距离（64 位 dHash），
+    # 新图片分辨率更高时是否替换已有文件
+    PHASH_INDEX = os.getenv('PHASH_INDEX', '')
+    PHASH_THRESHOLD = int(os.getenv('PHASH_THRESHOLD', '6'))
+    PHASH_REPLACE = os.getenv('PHASH_REPLACE', 'true').lower() == 'true'
+
+    # 运行日志: 每个套图结束时追加到 OUTPUT_DIR/run_log.jsonl；运行中每隔多少秒写入一次中间摘要
+    RUN_LOG = os.getenv('RUN_LOG', 'true').lower() == 'true'
+    SUMMARY_INTERVAL = float(os.getenv('SUMMARY_INTERVAL', '30'))
+
+    # 页面就绪检测: 等待目标元素的超时（秒）
+    PAGE_READY_TIMEOUT = float(os.getenv('PAGE_READY_TIMEOUT', '10'))
+
+    # 网络空闲判定: 多少毫秒内没有新资源完成加载，以及最长等待时间（秒）
+    NETWORK_IDLE_MS = int(os.getenv('NETWORK_IDLE_MS', '500'))
+    NETWORK_IDLE_TIMEOUT = float(os.getenv('NETWORK_IDLE_TIMEOUT', '5'))
+
+    # 懒加载滚动: 最大滚动轮数，以及每轮滚动后的空闲等待（毫秒）
+    LAZY_SCROLL_MAX_ROUNDS = int(os.getenv('LAZY_SCROLL_MAX_ROUNDS', '5'))
+    LAZY_SCROLL_IDLE_MS = int(os.getenv('LAZY_SCROLL_IDLE_MS', '300'))
+
+    # 页面加载策略: normal / eager（DOMContentLoaded 即返回）/ none
+    PAGE_LOAD_STRATEGY = os.getenv('PAGE_LOAD_STRATEGY', 'eager')
+
+    # 通过 CDP Network.setBlockedURLs 屏蔽的资源类型（stylesheet, font, media, image）
+    BLOCKED_RESOURCE_TYPES = [t.strip() for t in os.getenv('BLOCKED_RESOURCE_TYPES', 'stylesheet,font,media').split(',')
+                              if t.strip()]
+
+    # 额外屏蔽的URL模式（支持 * 通配符），默认为常见的广告和统计脚本
+    BLOCKED_URL_PATTERNS = [p.strip() for p in os.getenv(
+        'BLOCKED_URL_PATTERNS',
+        '*google-analytics.com*,*googletagmanager.com*,*doubleclick.net*,*googlesyndication.com*,'
+        '*hm.baidu.com*,*cnzz.com*,*51.la*'
+    ).split(',') if p.strip()]
+
+    # 静态页面类型（list, detail, show, generic），这些页面通过 CDP 禁用JavaScript
+    NO_JS_PAGE_TYPES = [t.strip() for t in os.getenv('NO_JS_PAGE_TYPES', '').split(',') if t.strip()]
+
+    # 在页面内执行脚本提取数据（不传输完整 page_source）
+    JS_EXTRACTION = os.getenv('JS_EXTRACTION', 'true').lower() == 'true'
+
+    # Span追踪输出文件（为空则关闭追踪）
+    TRACE_FILE = os.getenv('TRACE_FILE', '')
+
+    # 追踪格式: jsonl 或 chrome（为空时 .json 后缀使用 chrome，其余使用 jsonl）
+    TRACE_FORMAT = os.getenv('TRACE_FORMAT', '')
 
     @classmethod
     def load_proxies_from_file(cls):
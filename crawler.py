@@ -2,16 +2,16 @@ import os
 import time
 import random
 import hashlib
-import re
 import base64
 import json
+import socket
+import threading
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 from typing import Set, List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
-from bs4 import BeautifulSoup
 from PIL import Image
 from io import BytesIO
 from selenium import webdriver
@@ -22,33 +22,69 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
-from urllib.robotparser import RobotFileParser
 from tqdm import tqdm
 
 from config import Config
 from proxy_manager import ProxyManager
 from logger_config import setup_logger
+from tracer import create_tracer
+from sharded import run_sharded
+from browser_session import create_browser_session, load_cookies
+from sitemap import PHOTO_URL_RE, find_sitemaps, iter_sitemap_entries
+from site_crawl import BrowserPageWorker, SiteFrontier, domain_allowed, normalize_url, run_site_crawl
+from catalog import create_catalog
+from budget import create_budget
+from dns_cache import create_dns_cache, create_warmer
+from frontier import Frontier, parse_priorities
+from http_client import create_http_client
+from partial_download import PartialDownload
+from phash_index import create_dedupe
+from postprocess import create_postprocessor
+from robots_cache import create_robots_cache
+from url_set import create_url_set
+from run_log import RUN_LOG_FILE, RunLog, build_summary, node_file, write_summary
+from metadata_store import METADATA_FILE, MetadataStore, load_metadata, write_json_atomic
+from work_queue import WorkQueue, LeaseKeeper, create_work_queue
+from extractor import EXTRACT_SCRIPT, PageData, extract_page, image_suffixes, style_image_url
 
 
 class ImageCrawler:
     """图片爬虫类 - Selenium版本"""
     
+    # 页面就绪的目标元素
+    LIST_SELECTORS = ['div.item.photo', 'div.pager']
+    DETAIL_SELECTORS = ['div.item.photo-image', 'div.pager']
+    
+    # 资源类型对应的 Network.setBlockedURLs 模式
+    RESOURCE_TYPE_PATTERNS = {
+        'stylesheet': ['*.css', '*.css?*'],
+        'font': ['*.woff', '*.woff?*', '*.woff2', '*.woff2?*', '*.ttf', '*.ttf?*', '*.otf', '*.eot'],
+        'media': ['*.mp4', '*.mp4?*', '*.webm', '*.mp3', '*.m3u8', '*.ts?*'],
+        'image': ['*.jpg', '*.jpg?*', '*.jpeg', '*.png', '*.png?*', '*.gif', '*.webp', '*.webp?*', '*.svg', '*.ico'],
+    }
+    
     def __init__(self, config: Config):
         self.config = config
         self.logger = setup_logger('crawler')
+        self.tracer = create_tracer(config)
         
-        self.visited_urls: Set[str] = set()
-        self.downloaded_images: Set[str] = set()
+        # 已访问的页面和已下载的图片URL（VISITED_SET=compact 时只保存 64 位指纹）
+        self.visited_urls = create_url_set(config, 'visited_urls', self.logger)
+        self.downloaded_images = create_url_set(config, 'downloaded_images', self.logger)
+        # 套图调度队列，crawl() 发现套图后建立；运行中可通过 frontier.update() 调整优先级
+        self.frontier: Optional[Frontier] = None
+        # 任务队列和本节点名称（配置 WORK_QUEUE 时由 crawl() 设置，运行日志和摘要文件名带节点名称）
+        self.work_queue: Optional[WorkQueue] = None
+        self.node: Optional[str] = None
+        
+        # 预先生成图片后缀元组，避免每个URL都重新构造
+        self._image_suffixes = image_suffixes(config.ALLOWED_IMAGE_FORMATS)
         
         self.proxy_manager = None
         if config.USE_PROXY and config.PROXY_LIST:
             self.proxy_manager = ProxyManager(config.PROXY_LIST, self.logger)
             self.logger.info(f"代理管理器已初始化，代理数量: {len(config.PROXY_LIST)}")
         
-        self.robot_parser = None
-        if config.RESPECT_ROBOTS_TXT:
-            self._init_robots_parser()
-        
         self.stats = {
             'pages_crawled': 0,
             'photos_found': 0,
@@ -56,44 +92,98 @@ class ImageCrawler:
             'images_downloaded': 0,
             'images_failed': 0,
             'images_skipped': 0,
+            'images_duplicate': 0,
+            'bytes_downloaded': 0,
+            'bytes_resumed': 0,
             'start_time': time.time()
         }
+        # 页面线程和下载线程并发累加计数
+        self._stats_lock = threading.Lock()
         
-        # 套图追踪列表
-        self.photo_sets: List[Dict] = []
+        # 时间/字节预算（--time-budget / --byte-budget），从此刻开始计时
+        self.budget = create_budget(config, lambda: self.stats['bytes_downloaded'])
+        
+        # 各阶段（页面类型）的次数、耗时和传输字节数
+        self.stage_metrics: Dict[str, Dict] = {}
+        self._stage_lock = threading.Lock()
+        
+        # 套图结果: 逐个追加到 run_log.jsonl，内存中只保留滚动汇总
+        self.run_log = RunLog(
+            os.path.join(config.OUTPUT_DIR, RUN_LOG_FILE) if config.RUN_LOG else None,
+            checkpoint=lambda: self._generate_download_summary(final=False),
+            checkpoint_interval=config.SUMMARY_INTERVAL,
+            logger=self.logger
+        )
         
         # 失败的下载记录
         self.failed_downloads: Dict[str, List[Dict]] = {}
+        
+        # 套图元数据（内存中维护，定期原子写入 metadata.json）
+        self.metadata = MetadataStore(self._image_suffixes, self.logger, self.tracer,
+                                      flush_interval=config.METADATA_FLUSH_INTERVAL,
+                                      flush_every=config.METADATA_FLUSH_EVERY)
+
+        # 下载目录的 SQLite 索引（套图、分页、图片），批量写入
+        self.catalog = create_catalog(config, self.logger)
+        
+        # 图片下载的 HTTP 客户端（HTTP/1.1 连接池或 HTTP/2 多路复用）
+        self.http_client = create_http_client(config, self.logger)
+        
+        # robots.txt 规则: 每个主机第一次检查时通过下载客户端获取，缓存到 OUTPUT_DIR
+        self.robots = create_robots_cache(config, self._fetch_text, self.logger)
+        
+        # DNS缓存（跨运行保存，运行期间安装）和新图片主机的连接预热
+        self.dns_cache = create_dns_cache(config, self.logger)
+        self.warmer = create_warmer(config, self.http_client, self.dns_cache, self.logger,
+                                    use_proxy=self.proxy_manager is not None)
+        
+        # 感知哈希近似去重（跳过同一照片的其它分辨率或裁剪版本）
+        self.dedupe = create_dedupe(config, self.logger)
+        
+        # 下载后的图片处理（转码/去除EXIF/缩略图），在进程池中执行，结果写入套图元数据
+        self.postprocessor = create_postprocessor(config, on_result=self.metadata.add_processed,
+                                                  logger=self.logger)
 
         self.cookies = self.config.load_cookies()
         if self.cookies:
             self.logger.info(f"已加载 {len(self.cookies)} 条Cookie")
+        # Cookie 文件的 {名称: 值}，不使用浏览器Cookie时随每个请求发送
+        self._file_cookies = {cookie['name']: cookie['value'] for cookie in self.cookies
+                              if cookie.get('name') and cookie.get('value')}
+        
+        # 混合模式: 一个浏览器建立的共享会话（第一次请求时启动），页面和图片通过下载客户端获取
+        self.session = create_browser_session(config, self._start_session_driver, self.cookies, self.logger)
 
         if not os.path.exists(config.OUTPUT_DIR):
             os.makedirs(config.OUTPUT_DIR)
             self.logger.info(f"创建输出目录: {config.OUTPUT_DIR}")
     
-    def _init_robots_parser(self):
-        """初始化robots.txt解析器"""
-        try:
-            self.robot_parser = RobotFileParser()
-            robots_url = urljoin(self.config.START_URL, '/robots.txt')
-            self.robot_parser.set_url(robots_url)
-            self.robot_parser.read()
-            self.logger.info(f"已加载 robots.txt: {robots_url}")
-        except Exception as e:
-            self.logger.warning(f"无法加载 robots.txt: {str(e)}")
-            self.robot_parser = None
+    def _request_proxies(self) -> Optional[Dict[str, str]]:
+        """requests 风格的代理设置，未使用代理时为None"""
+        proxy = self.proxy_manager.get_proxy() if self.proxy_manager else None
+        if not proxy:
+            return None
+        return {'http': proxy['server'], 'https': proxy['server']}
+    
+    def _start_session_driver(self):
+        """混合模式的会话浏览器，返回 (driver, 代理配置)"""
+        proxy_config = self.proxy_manager.get_proxy() if self.proxy_manager else None
+        return self._create_driver(proxy_config), proxy_config
+    
+    def _fetch_text(self, url: str, timeout: float = None):
+        """通过下载客户端获取文本资源（robots.txt 等），返回 (状态码, 文本)"""
+        headers = {'User-Agent': random.choice(self.config.USER_AGENTS), 'Accept': 'text/plain,*/*;q=0.8'}
+        with self.http_client.get(url, headers=headers, proxies=self._request_proxies(),
+                                  timeout=timeout or self.config.ROBOTS_TIMEOUT) as response:
+            return response.status_code, response.content.decode('utf-8', errors='replace')
     
     def can_fetch(self, url: str) -> bool:
-        """检查是否允许爬取该URL"""
-        if not self.robot_parser:
-            return True
-        try:
-            return self.robot_parser.can_fetch("*", url)
-        except Exception as e:
-            self.logger.warning(f"检查robots.txt时出错: {str(e)}")
-            return True
+        """检查是否允许爬取该URL（robots.txt）"""
+        return self.robots.can_fetch(url)
+    
+    def _request_delay(self, url: str) -> float:
+        """同一主机两次页面请求的间隔: MIN_DELAY 与 robots.txt 的 Crawl-delay / Request-rate 中较大的"""
+        return max(self.config.MIN_DELAY, self.robots.delay(url))
     
     def _get_page_name(self, url: str) -> str:
         """从URL生成页面名称"""
@@ -114,24 +204,41 @@ class ImageCrawler:
             return False
         
         parsed = urlparse(url)
-        base_parsed = urlparse(base_url)
+        base_parsed = urlparse(normalize_url(base_url) or base_url)
         
         if parsed.scheme not in ['http', 'https']:
             return False
         
+        # 设置了 ALLOWED_DOMAINS 时允许这些域名（包括子域名），否则只允许起始URL的主机
+        if self.config.ALLOWED_DOMAINS:
+            return domain_allowed(parsed.hostname, self.config.ALLOWED_DOMAINS)
+        
         if parsed.netloc != base_parsed.netloc:
             return False
         
         return True
     
-    def _normalize_url(self, url: str) -> str:
-        """标准化URL"""
-        parsed = urlparse(url)
-        return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+    def _site_url(self, path: str) -> str:
+        """基于 START_URL 所在站点生成绝对URL"""
+        return urljoin(self.config.START_URL, path)
+    
+    @staticmethod
+    def _photo_id_from_url(photo_url: str) -> Optional[str]:
+        """
+        提取 photo_id
+        示例: https://8se.me/photo/id-697cc68a53ac0.html -> 697cc68a53ac0
+        或者: https://8se.me/photo/id-697cc68a53ac0/1.html -> 697cc68a53ac0
+        """
+        return photo_url.split('id-')[-1].split('.')[0].split('/')[0] if '/id-' in photo_url else None
+    
+    def _normalize_url(self, url: str) -> Optional[str]:
+        """标准化URL（见 site_crawl.normalize_url），无效时返回None"""
+        return normalize_url(url)
     
     def _create_driver(self, proxy_config=None, download_dir=None):
         """创建WebDriver（Selenium版本替代Playwright浏览器）"""
         chrome_options = Options()
+        chrome_options.page_load_strategy = self.config.PAGE_LOAD_STRATEGY
         
         # 设置偏好
         prefs = {
@@ -186,78 +293,242 @@ class ImageCrawler:
             # 设置隐式等待
             driver.implicitly_wait(10)
             
+            self._block_resources(driver)
+            
             return driver
             
         except Exception as e:
             self.logger.error(f"WebDriver创建失败: {str(e)}")
             raise
     
-    def _load_cookies(self, driver):
-        """加载Cookie到浏览器"""
-        if not self.cookies:
+    def _blocked_url_patterns(self) -> List[str]:
+        """根据配置的资源类型和URL模式生成屏蔽列表"""
+        patterns = []
+        for resource_type in self.config.BLOCKED_RESOURCE_TYPES:
+            patterns.extend(self.RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+        patterns.extend(self.config.BLOCKED_URL_PATTERNS)
+        return list(dict.fromkeys(patterns))
+    
+    def _block_resources(self, driver):
+        """通过 CDP 屏蔽样式、字体、媒体以及广告/统计请求"""
+        patterns = self._blocked_url_patterns()
+        if not patterns:
             return
-            
         try:
-            for cookie in self.cookies:
-                try:
-                    # Selenium Cookie格式与Playwright不同，需要转换
-                    cookie_dict = {
-                        'name': cookie.get('name'),
-                        'value': cookie.get('value')
-                    }
-                    
-                    # 添加可选字段
-                    if cookie.get('domain'):
-                        cookie_dict['domain'] = cookie['domain']
-                    if cookie.get('path'):
-                        cookie_dict['path'] = cookie['path']
-                    if cookie.get('secure') is not None:
-                        cookie_dict['secure'] = cookie['secure']
-                    if cookie.get('expiry'):
-                        cookie_dict['expiry'] = cookie['expiry']
-                    
-                    driver.add_cookie(cookie_dict)
-                except Exception as e:
-                    self.logger.warning(f"添加Cookie失败: {str(e)}")
-                    continue
-                    
-            self.logger.info(f"成功加载 {len(self.cookies)} 条Cookie")
-            
-        except Exception as e:
-            self.logger.warning(f"加载Cookie时出错: {str(e)}")
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            self.logger.debug(f"已屏蔽 {len(patterns)} 个URL模式")
+        except (WebDriverException, AttributeError) as e:
+            self.logger.debug(f"CDP资源屏蔽不可用: {str(e)}")
     
-    def _wait_for_page_load(self, driver, url):
-        """等待页面加载完成"""
+    def _set_javascript_enabled(self, driver, enabled: bool):
+        """通过 CDP 开关页面脚本（对下一次导航生效）"""
         try:
-            # 等待页面标题变化，表示页面开始加载
-            WebDriverWait(driver, 10).until(
-                lambda d: d.execute_script("return document.readyState") in ["complete", "interactive"]
-            )
-            
-            # 等待网络空闲（通过检查是否有未完成的请求）
-            WebDriverWait(driver, 15).until(
-                lambda d: d.execute_script("return performance.now()") > 0
-            )
-            
-            # 执行滚动操作触发懒加载
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            
-            # 再次滚动确保触发所有懒加载
-            driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
+            driver.execute_cdp_cmd('Emulation.setScriptExecutionDisabled', {'value': not enabled})
+        except (WebDriverException, AttributeError) as e:
+            self.logger.debug(f"CDP脚本开关不可用: {str(e)}")
+    
+    def _navigate(self, driver, url: str, kind: str, selectors: List[str] = None, lazy_scroll: bool = False):
+        """
+        按页面类型的配置打开页面并等待就绪，记录该阶段的耗时和传输字节数
+        kind: list / detail / show / generic，NO_JS_PAGE_TYPES 中的类型禁用JavaScript
+        """
+        javascript = kind not in self.config.NO_JS_PAGE_TYPES
+        if self.config.NO_JS_PAGE_TYPES:
+            self._set_javascript_enabled(driver, javascript)
+        
+        start = time.perf_counter()
+        driver.get(url)
+        self._wait_for_page_load(driver, url, selectors, lazy_scroll=lazy_scroll and javascript,
+                                 network_idle=javascript)
+        self._record_stage(kind, time.perf_counter() - start, self._page_transfer_bytes(driver))
+    
+    def _page_transfer_bytes(self, driver) -> int:
+        """当前页面文档和子资源的传输字节数（Resource Timing transferSize）"""
+        script = """
+        var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+        var total = 0;
+        for (var i = 0; i < entries.length; i++) { total += entries[i].transferSize || 0; }
+        return total;
+        """
+        try:
+            return int(driver.execute_script(script) or 0)
+        except (WebDriverException, TypeError, ValueError):
+            return 0
+    
+    def _count(self, **deltas):
+        """累加统计计数"""
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+    
+    def _record_stage(self, stage: str, seconds: float, bytes_count: int = 0, count: int = 1):
+        """累加阶段指标"""
+        with self._stage_lock:
+            metrics = self.stage_metrics.setdefault(stage, {'count': 0, 'seconds': 0.0, 'bytes': 0})
+            metrics['count'] += count
+            metrics['seconds'] += seconds
+            metrics['bytes'] += bytes_count
+    
+    def _stage_summary(self) -> Dict[str, Dict]:
+        """每个阶段的总量和平均值"""
+        summary = {}
+        for stage, metrics in sorted(self.stage_metrics.items()):
+            count = metrics['count'] or 1
+            summary[stage] = {
+                'count': metrics['count'],
+                'seconds': round(metrics['seconds'], 3),
+                'bytes': metrics['bytes'],
+                'avg_seconds': round(metrics['seconds'] / count, 3),
+                'avg_bytes': int(metrics['bytes'] / count),
+            }
+        return summary
+    
+    def _load_cookies(self, driver):
+        """加载Cookie到浏览器（一次 CDP 调用写入全部Cookie，不可用时逐条添加）"""
+        if not self.cookies:
+            return
+        count = load_cookies(driver, self.cookies, self.config.START_URL, self.logger)
+        self.logger.info(f"成功加载 {count} 条Cookie")
+    
+    def _wait_for_page_load(self, driver, url, selectors: List[str] = None, lazy_scroll: bool = True,
+                            network_idle: bool = True):
+        """
+        等待页面就绪（基于真实信号而非固定延迟）:
+          1. DOM 可交互，且任一目标选择器出现（或文档已完成加载）
+          2. 网络空闲: 在 NETWORK_IDLE_MS 内没有新的资源请求完成
+          3. 懒加载: 滚动到底部，直到图片数量和页面高度不再增长
+        """
+        start = time.perf_counter()
+        with self.tracer.span('page_ready', url=url) as span:
+            try:
+                WebDriverWait(driver, self.config.PAGE_READY_TIMEOUT).until(
+                    lambda d: d.execute_script("return document.readyState") in ["complete", "interactive"]
+                )
+                
+                if selectors:
+                    selector = ', '.join(selectors)
+                    WebDriverWait(driver, self.config.PAGE_READY_TIMEOUT).until(
+                        lambda d: d.execute_script(
+                            "return !!document.querySelector(arguments[0]) || document.readyState === 'complete';",
+                            selector
+                        )
+                    )
+                
+                if network_idle:
+                    span.set(resources=self._wait_for_network_idle(driver))
+                
+                if lazy_scroll:
+                    span.set(scroll_rounds=self._scroll_until_stable(driver))
+
+            except TimeoutException:
+                self.logger.warning(f"页面加载超时: {url}")
+                span.set(status='timeout')
+            except Exception as e:
+                self.logger.warning(f"页面加载等待异常: {str(e)}")
+                span.set(status='error', error=str(e)[:200])
             
-        except TimeoutException:
-            self.logger.warning(f"页面加载超时: {url}")
-        except Exception as e:
-            self.logger.warning(f"页面加载等待异常: {str(e)}")
+            span.set(wait_ms=round((time.perf_counter() - start) * 1000, 1))
+    
+    def _wait_for_network_idle(self, driver, idle_ms: int = None) -> int:
+        """通过 PerformanceObserver 观察资源请求，空闲 idle_ms 后返回已加载的资源数"""
+        script = """
+        var idleMs = arguments[0];
+        var timeoutMs = arguments[1];
+        var done = arguments[arguments.length - 1];
+        var start = performance.now();
+        var last = start;
+        var observer = null;
+        try {
+            observer = new PerformanceObserver(function() { last = performance.now(); });
+            observer.observe({type: 'resource'});
+        } catch (e) {}
+        (function check() {
+            var now = performance.now();
+            if (now - last >= idleMs || now - start >= timeoutMs) {
+                if (observer) { observer.disconnect(); }
+                done(performance.getEntriesByType('resource').length);
+            } else {
+                setTimeout(check, 50);
+            }
+        })();
+        """
+        idle_ms = self.config.NETWORK_IDLE_MS if idle_ms is None else idle_ms
+        timeout_ms = int(self.config.NETWORK_IDLE_TIMEOUT * 1000)
+        return driver.execute_async_script(script, idle_ms, timeout_ms) or 0
+    
+    def _scroll_until_stable(self, driver) -> int:
+        """滚动到底部触发懒加载，图片数量和页面高度不再变化时停止，返回滚动轮数"""
+        script = """
+        window.scrollTo(0, document.body ? document.body.scrollHeight : 0);
+        return [
+            document.querySelectorAll('img, [style*="background-image"]').length,
+            document.body ? document.body.scrollHeight : 0
+        ];
+        """
+        previous = None
+        rounds = 0
+        for rounds in range(1, self.config.LAZY_SCROLL_MAX_ROUNDS + 1):
+            current = driver.execute_script(script)
+            if current == previous:
+                break
+            previous = current
+            # 等待本轮滚动触发的请求完成
+            self._wait_for_network_idle(driver, idle_ms=self.config.LAZY_SCROLL_IDLE_MS)
+        return rounds
     
     def _extract_image_url_from_style(self, style: str) -> str:
         """从 style 属性中提取 background-image URL"""
-        match = re.search(r'url\(["\']?(.*?)["\']?\)', style)
-        if match:
-            return match.group(1)
-        return None
+        return style_image_url(style)
+    
+    def _extract_page(self, html: str, base_url: str) -> PageData:
+        """单次解析页面，提取图片、链接、标题和分页器状态"""
+        return extract_page(html, base_url, self._image_suffixes)
+    
+    def _extract_driver_page(self, driver, url: str, kind: str) -> PageData:
+        """
+        从浏览器中提取页面数据
+        启用 JS_EXTRACTION 时在页面内执行脚本只返回所需字段，失败时回退到解析 page_source
+        """
+        page_data = None
+        if self.config.JS_EXTRACTION:
+            try:
+                data = driver.execute_script(EXTRACT_SCRIPT, kind, list(self._image_suffixes))
+                if isinstance(data, dict):
+                    page_data = PageData.from_dict(data)
+            except WebDriverException as e:
+                self.logger.debug(f"页面内提取失败，回退到解析page_source: {str(e)[:100]}")
+        if page_data is None:
+            page_data = self._extract_page(driver.page_source, url)
+        # 新的图片主机在下载开始前预热连接
+        self.warmer.observe(page_data.photo_images or page_data.images)
+        return page_data
+    
+    def _fetch_page(self, url: str, kind: str) -> PageData:
+        """
+        混合模式: 带着浏览器会话通过下载客户端获取页面并解析，非200时抛出异常
+        403 使会话刷新时用新会话重试一次
+        """
+        for attempt in range(2):
+            state = self.session.state()
+            headers = self.session.headers({
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Referer': self.config.START_URL,
+            })
+            start = time.perf_counter()
+            with self.http_client.get(url, headers=headers, proxies=state.proxies,
+                                      timeout=self.config.TIMEOUT, cookies=state.cookies) as response:
+                status = response.status_code
+                content = response.content if status == 200 else b''
+            refreshed = self.session.record(status)
+            if status == 200:
+                break
+            if not (status == 403 and refreshed and attempt == 0):
+                raise RuntimeError(f"HTTP {status}: {url}")
+        self._record_stage(kind, time.perf_counter() - start, len(content))
+        page_data = self._extract_page(content.decode('utf-8', errors='replace'), url)
+        self.warmer.observe(page_data.photo_images or page_data.images)
+        return page_data
 
     def _generate_list_page_urls(self, list_pages: int) -> List[str]:
         """根据列表页数量生成所有列表页URL"""
@@ -281,169 +552,143 @@ class ImageCrawler:
     
     def _load_photo_metadata(self, photo_folder: str) -> Optional[Dict]:
         """读取套图元数据（用于恢复下载）"""
-        metadata_path = os.path.join(photo_folder, 'metadata.json')
-        if not os.path.exists(metadata_path):
-            return None
-        
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            self.logger.info(f"加载已存在的元数据: {photo_folder}")
-            return metadata
+            metadata = load_metadata(photo_folder)
         except Exception as e:
-            self.logger.warning(f"加载元数据失败 {metadata_path}: {e}")
+            self.logger.warning(f"加载元数据失败 {photo_folder}: {e}")
             return None
+        if metadata:
+            self.logger.info(f"加载已存在的元数据: {photo_folder}")
+        return metadata
     
     def _save_photo_metadata(self, photo_folder: str, metadata: Dict):
-        """保存套图元数据"""
-        metadata_path = os.path.join(photo_folder, 'metadata.json')
-        try:
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-            self.logger.debug(f"保存元数据: {metadata_path}")
-        except Exception as e:
-            self.logger.error(f"保存元数据失败 {metadata_path}: {e}")
+        """保存套图元数据（临时文件 + 原子替换）"""
+        metadata_path = os.path.join(photo_folder, METADATA_FILE)
+        with self.tracer.span('metadata_write', path=metadata_path,
+                              images=metadata.get('images_downloaded', 0)):
+            try:
+                write_json_atomic(metadata_path, metadata, indent=2)
+                self.logger.debug(f"保存元数据: {metadata_path}")
+            except Exception as e:
+                self.logger.error(f"保存元数据失败 {metadata_path}: {e}")
     
     def _update_photo_metadata(self, photo_folder: str, photo_id: str, photo_url: str, 
                               title: str = None, total_pages: int = None):
-        """更新套图元数据"""
-        metadata = self._load_photo_metadata(photo_folder) or {}
-        
-        # 初始化或更新基本信息
-        if not metadata:
-            metadata = {
-                'title': title or f'套图 {photo_id}',
-                'photo_id': photo_id,
-                'photo_url': photo_url,
-                'total_pages': total_pages or 0,
-                'total_images': 0,
-                'download_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'images_downloaded': 0,
-                'images_failed': 0,
-                'image_files': [],
-                'failed_images': []
-            }
-        else:
-            # 更新时间戳
-            metadata['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            if title:
-                metadata['title'] = title
-            if total_pages:
-                metadata['total_pages'] = total_pages
-        
-        # 统计当前文件夹中的图片
-        image_files = []
-        if os.path.exists(photo_folder):
-            for filename in os.listdir(photo_folder):
-                if filename.lower().endswith(tuple(f'.{fmt}' for fmt in self.config.ALLOWED_IMAGE_FORMATS)):
-                    image_files.append(filename)
-        
-        metadata['image_files'] = sorted(image_files)
-        metadata['images_downloaded'] = len(image_files)
+        """更新套图元数据并写入磁盘（套图结束时调用）"""
+        # 未打开的套图在这里打开（读取已有元数据并扫描一次目录）
+        self.metadata.open(photo_folder, photo_id, photo_url)
+        self.metadata.update(photo_folder, title=title, total_pages=total_pages or None)
         
         # 更新失败记录
         if photo_id in self.failed_downloads:
-            metadata['failed_images'] = self.failed_downloads[photo_id]
-            metadata['images_failed'] = len(self.failed_downloads[photo_id])
-        
-        # 保存元数据
-        self._save_photo_metadata(photo_folder, metadata)
+            self.metadata.set_failures(photo_folder, self.failed_downloads[photo_id])
         
-        return metadata
+        # 等待该套图的图片处理完成，处理结果写入最终的元数据
+        self.postprocessor.wait(photo_folder)
+        return self.metadata.flush(photo_folder, final=True)
     
-    def _generate_download_summary(self):
-        """生成下载摘要报告"""
+    def _queue_state(self) -> Optional[Dict]:
+        """整个任务队列的状态（各状态的任务数和最终失败的任务），未使用任务队列时返回None"""
+        if self.work_queue is None:
+            return None
+        try:
+            return {'counts': self.work_queue.counts(), 'failures': self.work_queue.failures()}
+        except Exception as e:
+            self.logger.warning(f"读取任务队列状态失败: {e}")
+            return None
+    
+    def _generate_download_summary(self, final: bool = True):
+        """
+        由滚动汇总生成下载摘要报告（JSON + 文本）
+        final=False 时为运行中的中间摘要，进程崩溃后输出目录中仍有可用的摘要
+        """
         elapsed_time = time.time() - self.stats['start_time']
-        
-        # 计算平均值
-        avg_images = 0
-        if len(self.photo_sets) > 0:
-            total_images = sum(p.get('images_count', 0) for p in self.photo_sets)
-            avg_images = total_images / len(self.photo_sets)
-        
-        # 统计成功和失败的套图
-        photo_sets_downloaded = sum(1 for p in self.photo_sets if p.get('status') == 'success')
-        photo_sets_failed = sum(1 for p in self.photo_sets if p.get('status') == 'failed')
-        
-        summary = {
-            'run_date': datetime.fromtimestamp(self.stats['start_time']).strftime('%Y-%m-%d %H:%M:%S'),
-            'total_duration_seconds': int(elapsed_time),
-            'list_pages_crawled': self.config.LIST_PAGES,
-            'photo_sets_found': self.stats['photos_found'],
-            'photo_sets_downloaded': photo_sets_downloaded,
-            'photo_sets_failed': photo_sets_failed,
-            'total_images_downloaded': self.stats['images_downloaded'],
-            'total_images_failed': self.stats['images_failed'],
-            'total_images_skipped': self.stats['images_skipped'],
-            'average_images_per_set': round(avg_images, 2),
-            'photos': self.photo_sets
-        }
-        
-        summary_path = os.path.join(self.config.OUTPUT_DIR, 'download_summary.json')
+        summary = build_summary(
+            self.run_log.aggregates,
+            run_date=datetime.fromtimestamp(self.stats['start_time']).strftime('%Y-%m-%d %H:%M:%S'),
+            elapsed=elapsed_time,
+            list_pages=self.config.LIST_PAGES,
+            photos_found=self.stats['photos_found'],
+            stats=self.stats,
+            stages=self._stage_summary(),
+            run_log=self.run_log.path,
+            complete=final,
+            budget=self.budget.summary(),
+            queue=self._queue_state()
+        )
         try:
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"下载摘要已保存: {summary_path}")
-            
-            # 同时生成一个美化的文本版本
-            self._generate_summary_text(summary, elapsed_time)
-            
+            summary_path = write_summary(self.config.OUTPUT_DIR, summary, self.node)
+            if final:
+                self.logger.info(f"下载摘要已保存: {summary_path}")
             return summary_path
         except Exception as e:
             self.logger.error(f"保存下载摘要失败: {e}")
             return None
-    
-    def _generate_summary_text(self, summary: Dict, elapsed_time: float):
-        """生成美化的文本摘要"""
-        summary_text_path = os.path.join(self.config.OUTPUT_DIR, 'download_summary.txt')
+
+    def _store_image(self, content: bytes, filepath: str, url: str, photo_id: str = None) -> bool:
+        """
+        近似重复检查后保存图片，返回False表示已有同一照片的不低分辨率版本、无需保存
+        新图片写入临时文件并原子替换后才写入去重索引；分辨率更高时随后删除旧文件并更新其套图的元数据。
+        写入失败时撤销索引中的预留并抛出异常，旧文件保持不变
+        """
+        decision = self.dedupe.claim(content, filepath, url)
+        filename = os.path.basename(filepath)
+        photo_id = photo_id or os.path.basename(os.path.dirname(filepath))
+        if decision.action == 'skip':
+            self.logger.info(f"近似重复，跳过: {filename} ≈ {decision.match_path} (距离 {decision.distance})")
+            self.downloaded_images.add(url)
+            self._count(images_duplicate=1)
+            self.catalog.record_image(url, photo_id=photo_id, filename=filename, status='duplicate',
+                                      bytes=len(content), error=decision.match_path)
+            return False
+
+        tmp_path = f"{filepath}.tmp.{threading.get_ident()}"
         try:
-            with open(summary_text_path, 'w', encoding='utf-8') as f:
-                f.write("=" * 80 + "\n")
-                f.write("                        下载摘要报告\n")
-                f.write("=" * 80 + "\n\n")
-                
-                f.write(f"运行时间: {summary['run_date']}\n")
-                f.write(f"总耗时: {elapsed_time:.2f} 秒 ({int(elapsed_time // 60)} 分 {int(elapsed_time % 60)} 秒)\n\n")
-                
-                f.write("-" * 80 + "\n")
-                f.write("统计信息\n")
-                f.write("-" * 80 + "\n")
-                f.write(f"列表页爬取数: {summary['list_pages_crawled']}\n")
-                f.write(f"套图发现数: {summary['photo_sets_found']}\n")
-                f.write(f"套图下载成功: {summary['photo_sets_downloaded']}\n")
-                f.write(f"套图下载失败: {summary['photo_sets_failed']}\n")
-                f.write(f"图片下载成功: {summary['total_images_downloaded']}\n")
-                f.write(f"图片下载失败: {summary['total_images_failed']}\n")
-                f.write(f"图片跳过: {summary['total_images_skipped']}\n")
-                f.write(f"平均每套图片数: {summary['average_images_per_set']:.2f}\n\n")
-                
-                if summary['photo_sets_found'] > 0:
-                    success_rate = (summary['photo_sets_downloaded'] / summary['photo_sets_found']) * 100
-                    f.write(f"套图下载成功率: {success_rate:.2f}%\n")
-                
-                if summary['total_images_downloaded'] + summary['total_images_failed'] > 0:
-                    img_success_rate = (summary['total_images_downloaded'] / 
-                                       (summary['total_images_downloaded'] + summary['total_images_failed'])) * 100
-                    f.write(f"图片下载成功率: {img_success_rate:.2f}%\n")
-                
-                f.write("\n" + "-" * 80 + "\n")
-                f.write("套图详情\n")
-                f.write("-" * 80 + "\n\n")
-                
-                for idx, photo in enumerate(summary['photos'], 1):
-                    status_symbol = "✓" if photo['status'] == 'success' else "✗"
-                    f.write(f"{idx}. [{status_symbol}] {photo['title']}\n")
-                    f.write(f"   ID: {photo['photo_id']}\n")
-                    f.write(f"   图片数: {photo['images_count']}\n")
-                    if photo.get('images_failed', 0) > 0:
-                        f.write(f"   失败数: {photo['images_failed']}\n")
-                    f.write("\n")
-                
-                f.write("=" * 80 + "\n")
-            
-            self.logger.info(f"文本摘要已保存: {summary_text_path}")
-        except Exception as e:
-            self.logger.error(f"保存文本摘要失败: {e}")
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            self.dedupe.release(decision)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.dedupe.commit(decision)
+
+        if decision.action == 'replace':
+            self.logger.info(f"近似重复，保留更高分辨率版本: {filename} 替换 {decision.match_path}")
+            match_file = os.path.join(self.config.OUTPUT_DIR, decision.match_path)
+            match_folder, match_filename = os.path.split(match_file)
+            try:
+                os.remove(match_file)
+            except OSError as e:
+                self.logger.warning(f"删除低分辨率版本失败 {decision.match_path}: {e}")
+            # 旧文件可能属于其它（已结束的）套图，从该套图的 metadata.json 中移除
+            self.metadata.remove_image(match_folder, match_filename)
+            if decision.match_url:
+                self.catalog.record_image(decision.match_url, photo_id=os.path.basename(match_folder),
+                                          filename=match_filename, status='replaced', attempts=0,
+                                          error=os.path.relpath(filepath, self.config.OUTPUT_DIR))
+        return True
+
+    def _skip_existing(self, url: str, filepath: str) -> bool:
+        """
+        SKIP_EXISTING 时跳过已存在的文件，以及之前因近似重复而未保存的图片（没有文件，不登记到元数据），
+        返回是否已跳过
+        """
+        if not self.config.SKIP_EXISTING:
+            return False
+        output_dir, filename = os.path.split(filepath)
+        if os.path.exists(filepath):
+            self.logger.debug(f"文件已存在，跳过: {filename}")
+            self._count(images_skipped=1)
+            self.metadata.add_image(output_dir, filename)
+        elif self.dedupe.is_duplicate(filepath):
+            self.logger.debug(f"之前判定为近似重复，跳过: {filename}")
+            self._count(images_duplicate=1)
+        else:
+            return False
+        self.downloaded_images.add(url)
+        return True
 
     def _download_image_via_selenium(self, driver, img_url, photo_id, output_dir):
         """
@@ -454,235 +699,236 @@ class ImageCrawler:
         filename = self._get_image_filename(img_url, photo_id)
         filepath = os.path.join(output_dir, filename)
         
-        if os.path.exists(filepath) and self.config.SKIP_EXISTING:
-            self.logger.debug(f"文件已存在，跳过: {filename}")
-            self.downloaded_images.add(img_url)
-            self.stats['images_skipped'] += 1
+        if self._skip_existing(img_url, filepath):
             return True
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                self.logger.debug(f"尝试下载 (Selenium, 尝试 {attempt}/{max_retries}): {img_url}")
-                
-                # 在新标签页中打开图片URL
-                driver.execute_script(f"window.open('{img_url}', '_blank');")
-                
-                # 切换到新标签页
-                driver.switch_to.window(driver.window_handles[-1])
-                
-                # 等待加载，虽然禁用了图片，但文档加载还是需要的
-                # 我们可以等待 document.readyState
-                try:
-                    WebDriverWait(driver, 10).until(
-                        lambda d: d.execute_script("return document.readyState") == "complete"
-                    )
-                except:
-                    pass
-                
-                # 使用 JavaScript 触发 XHR 下载并返回 base64
-                # 这种方法即使在禁用图片显示的情况下也工作，只要网络请求能成功
-                script = """
-                var url = arguments[0];
-                var callback = arguments[1];
-                var xhr = new XMLHttpRequest();
-                xhr.open('GET', url, true);
-                xhr.responseType = 'blob';
-                xhr.onload = function() {
-                    var reader = new FileReader();
-                    reader.readAsDataURL(xhr.response);
-                    reader.onloadend = function() {
-                        callback(reader.result);
-                    }
-                };
-                xhr.onerror = function() {
-                    callback(null);
-                };
-                xhr.send();
-                """
-                
-                base64_data = driver.execute_async_script(script, img_url)
-                
-                if base64_data:
-                    # 移除 data:image/xxx;base64, 前缀
-                    if ',' in base64_data:
-                        base64_data = base64_data.split(',')[1]
-                    
-                    image_data = base64.b64decode(base64_data)
-                    
-                    if len(image_data) < self.config.MIN_IMAGE_SIZE:
-                        self.logger.warning(f"下载的图片太小: {len(image_data)} bytes")
-                    else:
-                        with open(filepath, 'wb') as f:
-                            f.write(image_data)
-                        
-                        self.logger.info(f"下载成功: {filename} ({len(image_data)} bytes)")
-                        self.downloaded_images.add(img_url)
-                        self.stats['images_downloaded'] += 1
-                        
-                        # 关闭新标签页
-                        driver.close()
-                        driver.switch_to.window(driver.window_handles[0])
+        with self.tracer.span('image', url=img_url, method='selenium') as image_span:
+            for attempt in range(1, max_retries + 1):
+                with self.tracer.span('attempt', url=img_url, attempt=attempt) as attempt_span:
+                    if self._selenium_download_attempt(driver, img_url, filepath, filename, attempt,
+                                                       max_retries, attempt_span):
+                        image_span.set(status='success', attempts=attempt)
                         return True
-                
-                # 如果 JS 方法失败，关闭标签页重试
-                driver.close()
-                driver.switch_to.window(driver.window_handles[0])
-                time.sleep(1)
-                
-            except Exception as e:
-                self.logger.warning(f"下载失败 (尝试 {attempt}/{max_retries}): {str(e)[:100]}")
-                
-                # 关闭额外标签页并返回主标签页
-                try:
-                    while len(driver.window_handles) > 1:
-                        driver.switch_to.window(driver.window_handles[-1])
-                        driver.close()
-                    driver.switch_to.window(driver.window_handles[0])
-                except:
-                    pass
-                
-                if attempt < max_retries:
-                    time.sleep(2)
-        
-        self.stats['images_failed'] += 1
+            image_span.set(status='failed', attempts=max_retries)
+
+        self._count(images_failed=1)
+        self.catalog.record_image(img_url, photo_id=photo_id, filename=filename, status='failed',
+                                  attempts=max_retries, error='下载失败（所有重试均失败）')
         self.logger.error(f"最终下载失败，已放弃: {img_url}")
         return False
 
-    def _crawl_photo_detail(self, photo_url: str, max_pages: int):
-        """爬取单个套图的详情页（可能有多个分页）"""
-        photo_start_time = time.time()
-        photo_title = None
-        photo_id = None
-        
+    def _selenium_download_attempt(self, driver, img_url, filepath, filename, attempt,
+                                   max_retries, span) -> bool:
+        """通过浏览器执行单次下载尝试，成功返回True"""
         try:
-            # 提取 photo_id
-            # 示例: https://8se.me/photo/id-697cc68a53ac0.html -> 697cc68a53ac0
-            # 或者: https://8se.me/photo/id-697cc68a53ac0/1.html -> 697cc68a53ac0
-            photo_id = photo_url.split('id-')[-1].split('.')[0].split('/')[0] if '/id-' in photo_url else None
+            self.logger.debug(f"尝试下载 (Selenium, 尝试 {attempt}/{max_retries}): {img_url}")
             
-            if not photo_id:
-                self.logger.warning(f"无法从URL提取photo_id: {photo_url}")
-                return
+            # 在新标签页中打开图片URL
+            driver.execute_script(f"window.open('{img_url}', '_blank');")
             
-            # 准备输出目录
-            output_dir = os.path.join(self.config.OUTPUT_DIR, photo_id)
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+            # 切换到新标签页
+            driver.switch_to.window(driver.window_handles[-1])
             
-            # 检查是否已有元数据（支持断点续传）
-            existing_metadata = self._load_photo_metadata(output_dir)
-            if existing_metadata:
-                self.logger.info(f"发现已存在的下载，继续下载: {photo_id}")
-                photo_title = existing_metadata.get('title')
+            # 等待加载，虽然禁用了图片，但文档加载还是需要的
+            # 我们可以等待 document.readyState
+            try:
+                WebDriverWait(driver, 10).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete"
+                )
+            except:
+                pass
             
-            # 使用同一个driver处理所有分页，减少启动开销
-            driver = None
-            proxy_config = None
+            # 使用 JavaScript 触发 XHR 下载并返回 base64
+            # 这种方法即使在禁用图片显示的情况下也工作，只要网络请求能成功
+            script = """
+            var url = arguments[0];
+            var callback = arguments[1];
+            var xhr = new XMLHttpRequest();
+            xhr.open('GET', url, true);
+            xhr.responseType = 'blob';
+            xhr.onload = function() {
+                var reader = new FileReader();
+                reader.readAsDataURL(xhr.response);
+                reader.onloadend = function() {
+                    callback(reader.result);
+                }
+            };
+            xhr.onerror = function() {
+                callback(null);
+            };
+            xhr.send();
+            """
             
-            try:
-                if self.proxy_manager:
-                    proxy_config = self.proxy_manager.get_proxy()
-                
-                # 创建带有下载目录配置的Driver
-                driver = self._create_driver(proxy_config, download_dir=output_dir)
-
-                for page in range(1, max_pages + 1):
-                    page_url = f"https://8se.me/photo/id-{photo_id}/{page}.html"
-                    self.logger.info(f"  爬取套图分页: {page}/{max_pages} -> {page_url}")
-                    
-                    try:
-                        driver.get(page_url)
-                        time.sleep(self.config.MIN_DELAY) # 使用配置的延迟
-                        
-                        soup = BeautifulSoup(driver.page_source, 'html.parser')
-                        
-                        # 第一页时提取标题
-                        if page == 1 and not photo_title:
-                            title_elem = soup.find('h1')
-                            if not title_elem:
-                                title_elem = soup.find('title')
-                            if title_elem:
-                                photo_title = title_elem.get_text(strip=True)
-                                self.logger.info(f"  套图标题: {photo_title}")
-                        
-                        # 提取该分页的所有图片
-                        photo_images = soup.find_all('div', class_='item photo-image')
-                        
-                        self.logger.info(f"  发现 {len(photo_images)} 张图片")
-                        
-                        for img_item in photo_images:
-                            # 提取图片信息
-                            img_div = img_item.find('div', class_='img')
-                            
-                            if img_div and img_div.get('style'):
-                                # 从 background-image 提取URL
-                                img_url = self._extract_image_url_from_style(img_div['style'])
-                                if img_url:
-                                    if not img_url.startswith('http'):
-                                        img_url = urljoin(page_url, img_url)
-                                    
-                                    self.stats['images_found'] += 1
-                                    
-                                    # 使用 Selenium 直接下载
-                                    self._download_image_via_selenium(driver, img_url, photo_id, output_dir)
-                                    
-                                    # 图片间稍微延迟，避免太快
-                                    time.sleep(0.5)
-                        
-                        self.stats['pages_crawled'] += 1
-                        
-                        # 检查是否还有下一页
-                        pager = soup.find('div', class_='pager')
-                        if pager:
-                            next_link = pager.find('a', class_='next')
-                            if not next_link or 'disabled' in next_link.get('class', []):
-                                self.logger.info(f"  套图 {photo_id} 已到最后一页")
-                                break
-                        else:
-                            # 如果没发现分页器，可能就一页
-                            break
-                        
-                        # 随机延迟，避免请求过于频繁
-                        time.sleep(0.5 + random.uniform(0, 1))
-                        
-                    except Exception as e:
-                        self.logger.warning(f"爬取分页失败 {page_url}: {e}")
-                        break
-                        
-                if self.proxy_manager and proxy_config:
-                    self.proxy_manager.mark_proxy_success()
+            base64_data = driver.execute_async_script(script, img_url)
+            
+            if base64_data:
+                # 移除 data:image/xxx;base64, 前缀
+                if ',' in base64_data:
+                    base64_data = base64_data.split(',')[1]
                 
-                # 更新元数据
-                metadata = self._update_photo_metadata(
-                    output_dir, 
-                    photo_id, 
-                    photo_url, 
-                    title=photo_title, 
-                    total_pages=max_pages
-                )
+                image_data = base64.b64decode(base64_data)
+                span.set(bytes=len(image_data))
                 
-                # 添加到套图列表
-                photo_duration = time.time() - photo_start_time
-                photo_info = {
-                    'title': photo_title or f'套图 {photo_id}',
-                    'photo_id': photo_id,
-                    'photo_url': photo_url,
-                    'status': 'success',
-                    'images_count': metadata['images_downloaded'],
-                    'images_failed': metadata.get('images_failed', 0),
-                    'total_pages': max_pages,
-                    'duration_seconds': int(photo_duration)
-                }
-                self.photo_sets.append(photo_info)
-                self.logger.info(f"套图 {photo_id} 下载完成，成功 {metadata['images_downloaded']} 张，失败 {metadata.get('images_failed', 0)} 张")
+                if len(image_data) < self.config.MIN_IMAGE_SIZE:
+                    self.logger.warning(f"下载的图片太小: {len(image_data)} bytes")
+                    span.set(status='too_small')
+                elif not self._store_image(image_data, filepath, img_url):
+                    span.set(status='duplicate')
+                    driver.close()
+                    driver.switch_to.window(driver.window_handles[0])
+                    return True
+                else:
+                    self.metadata.add_image(os.path.dirname(filepath), filename)
+                    self.postprocessor.submit(os.path.dirname(filepath), filename)
+                    self.catalog.record_image(img_url, photo_id=os.path.basename(os.path.dirname(filepath)),
+                                              filename=filename, status='downloaded', bytes=len(image_data),
+                                              sha1=hashlib.sha1(image_data).hexdigest(), attempts=attempt)
                     
-            except Exception as e:
-                self.logger.error(f"处理套图详情页出错 {photo_url}: {e}")
-                if self.proxy_manager and proxy_config:
-                    self.proxy_manager.mark_proxy_failed()
-                
-                # 标记为失败的套图
-                if photo_id:
+                    self.logger.info(f"下载成功: {filename} ({len(image_data)} bytes)")
+                    self.downloaded_images.add(img_url)
+                    self._count(images_downloaded=1, bytes_downloaded=len(image_data))
+                    span.set(status='success')
+                    
+                    # 关闭新标签页
+                    driver.close()
+                    driver.switch_to.window(driver.window_handles[0])
+                    return True
+            else:
+                span.set(status='no_data')
+            
+            # 如果 JS 方法失败，关闭标签页重试
+            driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+            time.sleep(1)
+            
+        except Exception as e:
+            self.logger.warning(f"下载失败 (尝试 {attempt}/{max_retries}): {str(e)[:100]}")
+            span.set(status='error', error=str(e)[:200])
+            
+            # 关闭额外标签页并返回主标签页
+            try:
+                while len(driver.window_handles) > 1:
+                    driver.switch_to.window(driver.window_handles[-1])
+                    driver.close()
+                driver.switch_to.window(driver.window_handles[0])
+            except:
+                pass
+            
+            if attempt < max_retries:
+                time.sleep(2)
+        return False
+
+    def _add_photo_set(self, photo_info: Dict, started: float = None):
+        """记录套图结果（运行日志 + 索引）"""
+        self.run_log.append(photo_info)
+        self.catalog.record_set(
+            photo_info['photo_id'], url=photo_info.get('photo_url'), title=photo_info.get('title'),
+            status=photo_info.get('status'), total_pages=photo_info.get('total_pages'),
+            images_downloaded=photo_info.get('images_count', 0),
+            images_failed=photo_info.get('images_failed', 0),
+            started=started, error=photo_info.get('error')
+        )
+
+    def _crawl_photo_detail(self, photo_url: str, max_pages: int):
+        """爬取单个套图的详情页（可能有多个分页）"""
+        with self.tracer.span('photo_set', url=photo_url, max_pages=max_pages) as set_span:
+            photo_start_time = time.time()
+            photo_title = None
+            photo_id = None
+
+            try:
+                photo_id = self._photo_id_from_url(photo_url)
+
+                if not photo_id:
+                    self.logger.warning(f"无法从URL提取photo_id: {photo_url}")
+                    set_span.set(status='invalid_url')
+                    return
+                set_span.set(photo_id=photo_id)
+
+                # 准备输出目录
+                output_dir = os.path.join(self.config.OUTPUT_DIR, photo_id)
+                if not os.path.exists(output_dir):
+                    os.makedirs(output_dir)
+
+                # 检查是否已有元数据（支持断点续传），之后只在内存中更新
+                existing_metadata = self.metadata.open(output_dir, photo_id, photo_url)
+                if 'last_update' in existing_metadata:  # 读取到已有的 metadata.json
+                    self.logger.info(f"发现已存在的下载，继续下载: {photo_id}")
+                    photo_title = existing_metadata.get('title')
+
+                # 使用同一个driver处理所有分页，减少启动开销
+                driver = None
+                proxy_config = None
+
+                try:
+                    # 创建带有下载目录配置的Driver（混合模式通过共享会话获取，不创建浏览器）
+                    if not self.session.enabled:
+                        if self.proxy_manager:
+                            proxy_config = self.proxy_manager.get_proxy()
+                        driver = self._create_driver(proxy_config, download_dir=output_dir)
+
+                    for page in range(1, max_pages + 1):
+                        page_url = self._site_url(f"/photo/id-{photo_id}/{page}.html")
+                        self.logger.info(f"  爬取套图分页: {page}/{max_pages} -> {page_url}")
+
+                        with self.tracer.span('page', url=page_url, page=page,
+                                              proxy=proxy_config['server'] if proxy_config else None) as page_span:
+                            try:
+                                if driver:
+                                    self._navigate(driver, page_url, 'detail', self.DETAIL_SELECTORS)
+                                    time.sleep(self._request_delay(page_url))
+                                    page_data = self._extract_driver_page(driver, page_url, 'detail')
+                                else:
+                                    page_data = self._fetch_page(page_url, 'detail')
+                                    time.sleep(self._request_delay(page_url))
+
+                                # 第一页时提取标题
+                                if page == 1 and not photo_title and page_data.title:
+                                    photo_title = page_data.title
+                                    self.logger.info(f"  套图标题: {photo_title}")
+
+                                # 提取该分页的所有图片（div.item.photo-image 的 background-image）
+                                self.logger.info(f"  发现 {len(page_data.photo_images)} 张图片")
+                                page_span.set(images=len(page_data.photo_images))
+                                self.catalog.record_page(photo_id, page, url=page_url, status='success',
+                                                         images=len(page_data.photo_images))
+
+                                if driver:
+                                    for img_url in page_data.photo_images:
+                                        self._count(images_found=1)
+
+                                        # 使用 Selenium 直接下载
+                                        self._download_image_via_selenium(driver, img_url, photo_id, output_dir)
+
+                                        # 图片间稍微延迟，避免太快
+                                        time.sleep(0.5)
+                                else:
+                                    # 混合模式: 多个下载线程带着共享会话并发下载
+                                    self._count(images_found=len(page_data.photo_images))
+                                    self._download_images(page_data.photo_images, photo_id,
+                                                          [page_url] * len(page_data.photo_images))
+
+                                self._count(pages_crawled=1)
+
+                                # 检查是否还有下一页（没有分页器时可能就一页）
+                                if not page_data.has_next:
+                                    if page_data.has_pager:
+                                        self.logger.info(f"  套图 {photo_id} 已到最后一页")
+                                    break
+
+                                # 随机延迟，避免请求过于频繁
+                                time.sleep(0.5 + random.uniform(0, 1))
+
+                            except Exception as e:
+                                self.logger.warning(f"爬取分页失败 {page_url}: {e}")
+                                page_span.set(status='error', error=str(e)[:200])
+                                self.catalog.record_page(photo_id, page, url=page_url, status='error')
+                                break
+
+                    if self.proxy_manager and proxy_config:
+                        self.proxy_manager.mark_proxy_success()
+
+                    # 更新元数据
                     metadata = self._update_photo_metadata(
                         output_dir, 
                         photo_id, 
@@ -690,38 +936,75 @@ class ImageCrawler:
                         title=photo_title, 
                         total_pages=max_pages
                     )
+
+                    # 添加到套图列表
+                    photo_duration = time.time() - photo_start_time
                     photo_info = {
                         'title': photo_title or f'套图 {photo_id}',
                         'photo_id': photo_id,
                         'photo_url': photo_url,
-                        'status': 'failed',
-                        'images_count': metadata.get('images_downloaded', 0),
+                        'status': 'success',
+                        'images_count': metadata['images_downloaded'],
                         'images_failed': metadata.get('images_failed', 0),
+                        'total_pages': max_pages,
+                        'duration_seconds': int(photo_duration)
+                    }
+                    self._add_photo_set(photo_info, photo_start_time)
+                    set_span.set(status='success', images=metadata['images_downloaded'],
+                                 images_failed=metadata.get('images_failed', 0))
+                    self.logger.info(f"套图 {photo_id} 下载完成，成功 {metadata['images_downloaded']} 张，失败 {metadata.get('images_failed', 0)} 张")
+                    
+                except Exception as e:
+                    self.logger.error(f"处理套图详情页出错 {photo_url}: {e}")
+                    set_span.set(status='failed', error=str(e)[:200])
+                    if self.proxy_manager and proxy_config:
+                        self.proxy_manager.mark_proxy_failed()
+
+                    # 标记为失败的套图
+                    if photo_id:
+                        metadata = self._update_photo_metadata(
+                            output_dir, 
+                            photo_id, 
+                            photo_url, 
+                            title=photo_title, 
+                            total_pages=max_pages
+                        )
+                        photo_info = {
+                            'title': photo_title or f'套图 {photo_id}',
+                            'photo_id': photo_id,
+                            'photo_url': photo_url,
+                            'status': 'failed',
+                            'images_count': metadata.get('images_downloaded', 0),
+                            'images_failed': metadata.get('images_failed', 0),
+                            'error': str(e),
+                            'duration_seconds': int(time.time() - photo_start_time)
+                        }
+                        self._add_photo_set(photo_info, photo_start_time)
+                finally:
+                    if driver:
+                        driver.quit()
+
+            except Exception as e:
+                self.logger.error(f"处理套图详情页逻辑出错 {photo_url}: {e}")
+                set_span.set(status='failed', error=str(e)[:200])
+                # 记录失败的套图
+                if photo_id:
+                    photo_info = {
+                        'title': photo_title or f'套图 {photo_id}',
+                        'photo_id': photo_id,
+                        'photo_url': photo_url,
+                        'status': 'failed',
+                        'images_count': 0,
                         'error': str(e),
                         'duration_seconds': int(time.time() - photo_start_time)
                     }
-                    self.photo_sets.append(photo_info)
-            finally:
-                if driver:
-                    driver.quit()
-        
-        except Exception as e:
-            self.logger.error(f"处理套图详情页逻辑出错 {photo_url}: {e}")
-            # 记录失败的套图
-            if photo_id:
-                photo_info = {
-                    'title': photo_title or f'套图 {photo_id}',
-                    'photo_id': photo_id,
-                    'photo_url': photo_url,
-                    'status': 'failed',
-                    'images_count': 0,
-                    'error': str(e),
-                    'duration_seconds': int(time.time() - photo_start_time)
-                }
-                self.photo_sets.append(photo_info)
+                    self._add_photo_set(photo_info, photo_start_time)
 
-    def crawl_page(self, url: str, depth: int = 0) -> List[str]:
-        """爬取单个页面，返回页面中的链接（Selenium版本）"""
+    def crawl_page(self, url: str, depth: int = 0, driver=None, proxy_config=None) -> List[str]:
+        """
+        爬取单个页面，返回页面中的链接（Selenium版本）
+        传入 driver 时复用该浏览器且不关闭，WebDriver 错误会重新抛出以便调用方重建浏览器
+        """
         if depth > self.config.MAX_DEPTH:
             self.logger.debug(f"达到最大深度，跳过: {url}")
             return []
@@ -741,113 +1024,85 @@ class ImageCrawler:
         self.visited_urls.add(url)
         self.logger.info(f"爬取页面 (深度 {depth}): {url}")
 
-        driver = None
-        proxy_config = None
-        
-        try:
-            # 获取代理配置
-            if self.proxy_manager:
-                proxy_config = self.proxy_manager.get_proxy()
-            
-            # 创建WebDriver
-            driver = self._create_driver(proxy_config)
-            
-            # 访问页面
-            self.logger.debug(f"正在加载页面: {url}")
-            driver.get(url)
-            
-            # 等待页面加载完成
-            self._wait_for_page_load(driver, url)
-            
-            # 获取页面内容
-            content = driver.page_source
-            
-            # 提取图片
-            image_urls = self._extract_images_from_page(content, url)
-            self.stats['images_found'] += len(image_urls)
-            self.logger.info(f"在页面中找到 {len(image_urls)} 张图片")
+        with self.tracer.span('page', url=url, depth=depth) as page_span:
+            own_driver = driver is None
 
-            # 下载图片
-            page_name = self._get_page_name(url)
-            self._download_images_simple(image_urls, page_name)
+            try:
+                if own_driver:
+                    # 获取代理配置
+                    if self.proxy_manager:
+                        proxy_config = self.proxy_manager.get_proxy()
 
-            # 提取链接
-            links = self._extract_links_from_page(content, url)
+                    # 创建WebDriver
+                    driver = self._create_driver(proxy_config)
 
-            self.stats['pages_crawled'] += 1
-            
-            # 标记代理成功（如果使用了代理）
-            if self.proxy_manager and proxy_config:
-                self.proxy_manager.mark_proxy_success()
-            
-            return links
+                # 访问页面
+                self.logger.debug(f"正在加载页面: {url}")
+                self._navigate(driver, url, 'generic', lazy_scroll=True)
 
-        except WebDriverException as e:
-            self.logger.error(f"WebDriver错误 {url}: {str(e)}")
-            if self.proxy_manager and proxy_config:
-                self.proxy_manager.mark_proxy_failed()
-            return []
-        except Exception as e:
-            self.logger.error(f"页面处理失败 {url}: {str(e)}")
-            if self.proxy_manager and proxy_config:
-                self.proxy_manager.mark_proxy_failed()
-            return []
-        finally:
-            # 关闭浏览器
-            if driver:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    self.logger.warning(f"关闭WebDriver时出错: {str(e)}")
-        
-        # 添加随机延迟
-        self._random_delay()
-        return []
+                # 提取页面数据
+                page_data = self._extract_driver_page(driver, url, 'generic')
+
+                # 提取图片
+                image_urls = page_data.images
+                self._count(images_found=len(image_urls))
+                self.logger.info(f"在页面中找到 {len(image_urls)} 张图片")
+                page_span.set(images=len(image_urls),
+                              proxy=proxy_config['server'] if proxy_config else None)
+
+                # 下载图片
+                page_name = self._get_page_name(url)
+                self._download_images_simple(image_urls, page_name)
+
+                # 提取链接
+                links = self._filter_links(page_data.links)
+
+                self._count(pages_crawled=1)
+
+                # 标记代理成功（如果使用了代理）
+                if self.proxy_manager and proxy_config:
+                    self.proxy_manager.mark_proxy_success()
+
+                return links
+
+            except WebDriverException as e:
+                self.logger.error(f"WebDriver错误 {url}: {str(e)}")
+                page_span.set(status='error', error=str(e)[:200])
+                if self.proxy_manager and proxy_config:
+                    self.proxy_manager.mark_proxy_failed()
+                if not own_driver:
+                    raise
+                return []
+            except Exception as e:
+                self.logger.error(f"页面处理失败 {url}: {str(e)}")
+                page_span.set(status='error', error=str(e)[:200])
+                if self.proxy_manager and proxy_config:
+                    self.proxy_manager.mark_proxy_failed()
+                return []
+            finally:
+                # 关闭浏览器（复用的浏览器由调用方关闭）
+                if own_driver and driver:
+                    try:
+                        driver.quit()
+                    except Exception as e:
+                        self.logger.warning(f"关闭WebDriver时出错: {str(e)}")
     
     def _extract_images_from_page(self, html: str, base_url: str) -> List[str]:
         """从页面中提取图片URL"""
-        soup = BeautifulSoup(html, 'lxml')
-        image_urls = set()
-        
-        for img in soup.find_all('img'):
-            src = img.get('src') or img.get('data-src') or img.get('data-original')
-            if src:
-                full_url = urljoin(base_url, src)
-                if self._is_image_url(full_url):
-                    image_urls.add(full_url)
-        
-        for picture in soup.find_all('picture'):
-            for source in picture.find_all('source'):
-                srcset = source.get('srcset')
-                if srcset:
-                    urls = [s.strip().split()[0] for s in srcset.split(',')]
-                    for url in urls:
-                        full_url = urljoin(base_url, url)
-                        if self._is_image_url(full_url):
-                            image_urls.add(full_url)
-        
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            if href and self._is_image_url(href):
-                full_url = urljoin(base_url, href)
-                image_urls.add(full_url)
-        
-        return list(image_urls)
+        return self._extract_page(html, base_url).images
     
     def _is_image_url(self, url: str) -> bool:
         """检查URL是否为图片"""
-        parsed = urlparse(url)
-        path = parsed.path.lower()
-        return any(path.endswith(f'.{fmt}') for fmt in self.config.ALLOWED_IMAGE_FORMATS)
+        return urlparse(url).path.lower().endswith(self._image_suffixes)
     
     def _extract_links_from_page(self, html: str, base_url: str) -> List[str]:
         """从页面中提取链接"""
-        soup = BeautifulSoup(html, 'lxml')
+        return self._filter_links(self._extract_page(html, base_url).links)
+    
+    def _filter_links(self, urls: List[str]) -> List[str]:
+        """标准化链接并过滤掉站外和已访问的URL"""
         links = []
-        
-        for a in soup.find_all('a', href=True):
-            href = a['href']
-            full_url = urljoin(base_url, href)
+        for full_url in urls:
             normalized_url = self._normalize_url(full_url)
             
             if self._is_valid_url(normalized_url, self.config.START_URL):
@@ -872,7 +1127,7 @@ class ImageCrawler:
             
             for idx, url in enumerate(image_urls):
                 show_url = show_urls[idx] if show_urls and idx < len(show_urls) else None
-                future = executor.submit(self._download_single_image, url, output_dir, photo_id, show_url)
+                future = executor.submit(self.tracer.bind(self._download_single_image), url, output_dir, photo_id, show_url)
                 futures.append(future)
             
             with tqdm(total=len(image_urls), desc=f"下载图片 [{photo_id}]") as pbar:
@@ -896,7 +1151,7 @@ class ImageCrawler:
         
         with ThreadPoolExecutor(max_workers=self.config.MAX_WORKERS) as executor:
             futures = {
-                executor.submit(self._download_single_image, url, output_dir, None, None): url
+                executor.submit(self.tracer.bind(self._download_single_image), url, output_dir, None, None): url
                 for url in image_urls
             }
             
@@ -955,44 +1210,29 @@ class ImageCrawler:
         return urls_to_try
 
     def _get_image_from_photo_show_page(self, driver, photo_id: str) -> List[str]:
-        """访问photoShow页面获取高清图片链接"""
+        """访问photoShow页面获取高清图片链接（driver 为None时通过混合模式的共享会话获取）"""
         image_urls = []
         
         try:
             # 构造photoShow页面URL
             show_urls = [
-                f"https://8se.me/photoShow.html?id={photo_id}",
-                f"https://8se.me/photo/show/id-{photo_id}.html"
+                self._site_url(f"/photoShow.html?id={photo_id}"),
+                self._site_url(f"/photo/show/id-{photo_id}.html")
             ]
             
             for show_url in show_urls:
                 try:
                     self.logger.debug(f"访问photoShow页面: {show_url}")
-                    driver.get(show_url)
-                    time.sleep(2)
-                    
-                    soup = BeautifulSoup(driver.page_source, 'html.parser')
-                    
-                    # 查找图片标签
-                    img_tags = soup.find_all('img')
-                    for img in img_tags:
-                        src = img.get('src') or img.get('data-src') or img.get('data-original')
-                        if src and self._is_image_url(src):
-                            if not src.startswith('http'):
-                                src = urljoin(show_url, src)
-                            if src not in image_urls:
-                                image_urls.append(src)
+                    if driver:
+                        self._navigate(driver, show_url, 'show')
+                        page_data = self._extract_driver_page(driver, show_url, 'show')
+                    else:
+                        page_data = self._fetch_page(show_url, 'show')
                     
-                    # 查找背景图片
-                    for div in soup.find_all('div', style=True):
-                        style = div.get('style', '')
-                        if 'background-image' in style:
-                            bg_url = self._extract_image_url_from_style(style)
-                            if bg_url:
-                                if not bg_url.startswith('http'):
-                                    bg_url = urljoin(show_url, bg_url)
-                                if bg_url not in image_urls:
-                                    image_urls.append(bg_url)
+                    # 图片标签和背景图片
+                    for src in page_data.images + page_data.background_images:
+                        if src not in image_urls:
+                            image_urls.append(src)
                     
                     if image_urls:
                         self.logger.debug(f"从photoShow页面获取到 {len(image_urls)} 个图片链接")
@@ -1008,7 +1248,7 @@ class ImageCrawler:
         return image_urls
 
     def _get_current_cookies(self, driver=None) -> dict:
-        """获取当前浏览器会话的有效Cookie"""
+        """获取当前有效的Cookie: 浏览器的Cookie、混合模式的会话Cookie或Cookie文件中的Cookie"""
         try:
             if driver:
                 # 获取Selenium的Cookie
@@ -1017,16 +1257,10 @@ class ImageCrawler:
                 for cookie in selenium_cookies:
                     cookie_dict[cookie['name']] = cookie['value']
                 return cookie_dict
-            else:
-                # 返回配置文件中的Cookie
-                if self.cookies:
-                    cookie_dict = {}
-                    for cookie in self.cookies:
-                        name = cookie.get('name')
-                        value = cookie.get('value')
-                        if name and value:
-                            cookie_dict[name] = value
-                    return cookie_dict
+            if self.session.enabled:
+                return self.session.state().cookies
+            # 返回配置文件中的Cookie
+            return self._file_cookies
         except Exception as e:
             self.logger.warning(f"获取Cookie失败: {e}")
         return {}
@@ -1034,7 +1268,7 @@ class ImageCrawler:
     def _download_single_image(self, url: str, output_dir: str, photo_id: str = None, show_url: str = None, driver=None) -> bool:
         """下载单张图片（增强版，支持反爬虫对策）"""
         if url in self.downloaded_images:
-            self.stats['images_skipped'] += 1
+            self._count(images_skipped=1)
             return True
         
         url_hash = hashlib.md5(url.encode()).hexdigest()
@@ -1042,10 +1276,7 @@ class ImageCrawler:
         filename = f"{url_hash}{ext}"
         filepath = os.path.join(output_dir, filename)
         
-        if self.config.SKIP_EXISTING and os.path.exists(filepath):
-            self.logger.debug(f"文件已存在，跳过: {filename}")
-            self.downloaded_images.add(url)
-            self.stats['images_skipped'] += 1
+        if self._skip_existing(url, filepath):
             return True
         
         # 重试配置
@@ -1055,123 +1286,171 @@ class ImageCrawler:
         # 获取完整的URL列表（缩略图 + 高清版本）
         urls_to_try = self._get_hq_image_url(url)
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                # 如果是403错误且有photo_id，尝试从photoShow页面获取
-                if attempt == 3 and photo_id:
-                    driver = None
+        # 之前中断的下载从 .part 文件继续
+        partial = PartialDownload(filepath) if self.config.RESUME_DOWNLOADS else None
+        
+        with self.tracer.span('image', url=url, photo_id=photo_id) as image_span:
+            for attempt in range(1, max_retries + 1):
+                with self.tracer.span('attempt', url=url, attempt=attempt) as attempt_span:
                     try:
-                        self.logger.info(f"403错误，尝试通过photoShow页面获取高清图片: {photo_id}")
-                        driver = self._create_driver()
-                        show_image_urls = self._get_image_from_photo_show_page(driver, photo_id)
-                        if show_image_urls:
-                            # 将photoShow页面的URL添加到尝试列表前面
-                            urls_to_try = show_image_urls + urls_to_try
-                    finally:
-                        if driver:
-                            driver.quit()
-                
-                # 尝试不同的URL
-                current_url = None
-                for try_url in urls_to_try:
-                    self.logger.debug(f"尝试下载: {try_url}")
-                    
-                    headers = self._get_browser_headers(show_url or self.config.START_URL)
-                    
-                    proxies = None
-                    if self.proxy_manager:
-                        proxy = self.proxy_manager.get_proxy()
-                        if proxy:
-                            proxy_url = proxy['server']
-                            proxies = {
-                                'http': proxy_url,
-                                'https': proxy_url
-                            }
-
-                    # 使用当前有效的Cookie
-                    cookies = self._get_current_cookies(driver)
-
-                    response = requests.get(
-                        try_url,
-                        headers=headers,
-                        proxies=proxies,
-                        timeout=15,  # 增加超时时间
-                        stream=True,
-                        cookies=cookies,
-                        allow_redirects=True
-                    )
-
-                    # 检查响应状态
-                    if response.status_code == 200:
-                        # 验证是否为有效的图片
-                        content_type = response.headers.get('content-type', '').lower()
-                        if 'image' in content_type:
-                            content = response.content
-                            
-                            if len(content) < self.config.MIN_IMAGE_SIZE:
-                                self.logger.debug(f"图片太小，跳过: {try_url} ({len(content)} bytes)")
-                                continue  # 尝试下一个URL
-                            
+                        # 如果是403错误且有photo_id，尝试从photoShow页面获取
+                        if attempt == 3 and photo_id:
+                            driver = None
                             try:
-                                img = Image.open(BytesIO(content))
-                                img.verify()
-                            except Exception as e:
-                                self.logger.warning(f"图片验证失败: {try_url} - {str(e)}")
-                                continue  # 尝试下一个URL
+                                self.logger.info(f"403错误，尝试通过photoShow页面获取高清图片: {photo_id}")
+                                with self.tracer.span('photo_show', photo_id=photo_id):
+                                    if not self.session.enabled:
+                                        driver = self._create_driver()
+                                    show_image_urls = self._get_image_from_photo_show_page(driver, photo_id)
+                                if show_image_urls:
+                                    # 将photoShow页面的URL添加到尝试列表前面
+                                    urls_to_try = show_image_urls + urls_to_try
+                            finally:
+                                if driver:
+                                    driver.quit()
+                        
+                        # 尝试不同的URL
+                        for try_url in urls_to_try:
+                            self.logger.debug(f"尝试下载: {try_url}")
                             
-                            # 保存图片
-                            with open(filepath, 'wb') as f:
-                                f.write(content)
+                            headers = self.session.headers(self._get_browser_headers(show_url or self.config.START_URL))
+                            if partial:
+                                headers.update(partial.request_headers(try_url))
                             
-                            self.downloaded_images.add(url)
-                            self.stats['images_downloaded'] += 1
-                            self.logger.info(f"下载成功: {filename} ({len(content)} bytes) from {try_url}")
-                            return True
-                        else:
-                            self.logger.debug(f"响应不是图片: {content_type} from {try_url}")
-                            continue
-                    
-                    elif response.status_code == 403:
-                        self.logger.warning(f"403 Forbidden: {try_url}")
-                        if attempt == max_retries - 1:
-                            break  # 最后一次尝试，不再尝试其他URL
-                        continue  # 尝试下一个URL
-                    
-                    elif response.status_code == 429:
-                        self.logger.warning(f"429 Too Many Requests: {try_url}")
-                        break  # 暂停所有重试
+                            proxies = None
+                            proxy_url = None
+                            if self.session.enabled:
+                                # 混合模式使用建立会话的浏览器的代理
+                                proxies = self.session.state().proxies
+                                proxy_url = proxies['http'] if proxies else None
+                            elif self.proxy_manager:
+                                proxy = self.proxy_manager.get_proxy()
+                                if proxy:
+                                    proxy_url = proxy['server']
+                                    proxies = {
+                                        'http': proxy_url,
+                                        'https': proxy_url
+                                    }
+
+                            # 使用当前有效的Cookie
+                            cookies = self._get_current_cookies(driver)
+
+                            request_start = time.perf_counter()
+                            with self.tracer.span('request', url=try_url, proxy=proxy_url) as request_span, \
+                                    self.http_client.get(try_url, headers=headers, proxies=proxies,
+                                                         timeout=15, cookies=cookies, stream=True) as response:
+                                request_span.set(status=response.status_code, http=self.http_client.backend)
+                                self.session.record(response.status_code)
+
+                                # 检查响应状态（206 为续传的剩余部分）
+                                if response.status_code in (200, 206):
+                                    # 验证是否为有效的图片
+                                    content_type = response.headers.get('content-type', '').lower()
+                                    if 'image' in content_type:
+                                        if partial:
+                                            content, resumed = partial.receive(try_url, response)
+                                        else:
+                                            content, resumed = response.content, 0
+                                        if resumed:
+                                            self.logger.debug(f"断点续传: {filename} 已有 {resumed} bytes")
+                                            self._count(bytes_resumed=resumed)
+                                        request_span.set(bytes=len(content) - resumed, resumed=resumed)
+                                        self._record_stage('image', time.perf_counter() - request_start,
+                                                           len(content) - resumed)
+                                        
+                                        if len(content) < self.config.MIN_IMAGE_SIZE:
+                                            self.logger.debug(f"图片太小，跳过: {try_url} ({len(content)} bytes)")
+                                            if partial:
+                                                partial.discard()
+                                            continue  # 尝试下一个URL
+                                        
+                                        try:
+                                            img = Image.open(BytesIO(content))
+                                            img.verify()
+                                        except Exception as e:
+                                            self.logger.warning(f"图片验证失败: {try_url} - {str(e)}")
+                                            if partial:
+                                                partial.discard()
+                                            continue  # 尝试下一个URL
+                                        
+                                        if partial:
+                                            partial.discard()
+                                        # 保存图片（近似重复时不保存）
+                                        if not self._store_image(content, filepath, url, photo_id):
+                                            image_span.set(status='duplicate', attempts=attempt, source=try_url)
+                                            return True
+                                        self.metadata.add_image(output_dir, filename)
+                                        self.postprocessor.submit(output_dir, filename)
+                                        self.catalog.record_image(url, photo_id=photo_id, filename=filename,
+                                                                  status='downloaded', bytes=len(content),
+                                                                  sha1=hashlib.sha1(content).hexdigest(),
+                                                                  attempts=attempt)
+                                        
+                                        self.downloaded_images.add(url)
+                                        # 续传时只计入本次传输的字节
+                                        self._count(images_downloaded=1, bytes_downloaded=len(content) - resumed)
+                                        self.logger.info(f"下载成功: {filename} ({len(content)} bytes) from {try_url}")
+                                        image_span.set(status='success', attempts=attempt, bytes=len(content),
+                                                       source=try_url)
+                                        return True
+                                    else:
+                                        self.logger.debug(f"响应不是图片: {content_type} from {try_url}")
+                                        continue
+                                
+                                elif response.status_code == 403:
+                                    self.logger.warning(f"403 Forbidden: {try_url}")
+                                    if attempt == max_retries - 1:
+                                        break  # 最后一次尝试，不再尝试其他URL
+                                    continue  # 尝试下一个URL
+                                
+                                elif response.status_code == 416 and partial:
+                                    # .part 文件与服务器上的图片不一致，下次从头下载
+                                    self.logger.debug(f"416 Range Not Satisfiable，丢弃部分下载: {try_url}")
+                                    partial.discard()
+                                    continue
+                                
+                                elif response.status_code == 429:
+                                    self.logger.warning(f"429 Too Many Requests: {try_url}")
+                                    break  # 暂停所有重试
+                                
+                                elif response.status_code >= 500:
+                                    self.logger.warning(f"服务器错误 {response.status_code}: {try_url}")
+                                    continue  # 尝试下一个URL
+                                
+                                else:
+                                    self.logger.debug(f"HTTP {response.status_code}: {try_url}")
+                                    continue  # 尝试下一个URL
+                        
+                        # 如果尝试了所有URL都失败，进行延迟重试
+                        if attempt < max_retries:
+                            delay = retry_delays[attempt - 1]
+                            self.logger.info(f"等待 {delay} 秒后重试... (尝试 {attempt}/{max_retries})")
+                            time.sleep(delay)
+
+                    except requests.exceptions.Timeout:
+                        self.logger.warning(f"下载超时 (尝试 {attempt}/{max_retries}): {url}")
+                        attempt_span.set(status='timeout')
+                        if attempt < max_retries:
+                            time.sleep(retry_delays[attempt - 1])
                     
-                    elif response.status_code >= 500:
-                        self.logger.warning(f"服务器错误 {response.status_code}: {try_url}")
-                        continue  # 尝试下一个URL
+                    except requests.exceptions.ConnectionError:
+                        self.logger.warning(f"连接错误 (尝试 {attempt}/{max_retries}): {url}")
+                        attempt_span.set(status='connection_error')
+                        if attempt < max_retries:
+                            time.sleep(retry_delays[attempt - 1])
                     
-                    else:
-                        self.logger.debug(f"HTTP {response.status_code}: {try_url}")
-                        continue  # 尝试下一个URL
-                
-                # 如果尝试了所有URL都失败，进行延迟重试
-                if attempt < max_retries:
-                    delay = retry_delays[attempt - 1]
-                    self.logger.info(f"等待 {delay} 秒后重试... (尝试 {attempt}/{max_retries})")
-                    time.sleep(delay)
-                
-            except requests.exceptions.Timeout:
-                self.logger.warning(f"下载超时 (尝试 {attempt}/{max_retries}): {url}")
-                if attempt < max_retries:
-                    time.sleep(retry_delays[attempt - 1])
-            
-            except requests.exceptions.ConnectionError:
-                self.logger.warning(f"连接错误 (尝试 {attempt}/{max_retries}): {url}")
-                if attempt < max_retries:
-                    time.sleep(retry_delays[attempt - 1])
+                    except Exception as e:
+                        self.logger.error(f"下载出错 (尝试 {attempt}/{max_retries}): {url} - {str(e)}")
+                        attempt_span.set(status='error', error=str(e)[:200])
+                        if attempt < max_retries:
+                            time.sleep(retry_delays[attempt - 1])
             
-            except Exception as e:
-                self.logger.error(f"下载出错 (尝试 {attempt}/{max_retries}): {url} - {str(e)}")
-                if attempt < max_retries:
-                    time.sleep(retry_delays[attempt - 1])
+            image_span.set(status='failed', attempts=max_retries)
         
         # 所有重试都失败了
-        self.stats['images_failed'] += 1
+        self._count(images_failed=1)
+        self.catalog.record_image(url, photo_id=photo_id, filename=filename, status='failed',
+                                  attempts=max_retries, error='下载失败（所有重试均失败）')
         self.logger.error(f"最终下载失败，已放弃: {url}")
         
         # 记录失败的下载
@@ -1187,93 +1466,372 @@ class ImageCrawler:
         
         return False
     
-    def crawl(self):
-        """
-        主爬取方法，根据 list_pages 参数爬取多个列表页
-        """
+    def _discover_photo_urls(self) -> List[str]:
+        """爬取所有列表页，按发现顺序返回去重后的套图详情页URL"""
+        # 获取所有列表页URL
+        list_urls = self._generate_list_page_urls(self.config.LIST_PAGES)
+        self.logger.info(f"将爬取 {len(list_urls)} 页列表页")
+
+        all_photo_urls = []
+
+        driver = None
+        proxy_config = None
         try:
-            self.logger.info(f"=" * 60)
-            self.logger.info(f"开始爬取 (8se.me 优化版): {self.config.START_URL}")
-            self.logger.info(f"列表页数: {self.config.LIST_PAGES}, 套图深度: {self.config.DETAIL_DEPTH}")
-            self.logger.info(f"输出目录: {self.config.OUTPUT_DIR}")
-            self.logger.info(f"使用代理: {self.config.USE_PROXY}")
-            self.logger.info(f"=" * 60)
-
-            # 获取所有列表页URL
-            list_urls = self._generate_list_page_urls(self.config.LIST_PAGES)
-            self.logger.info(f"将爬取 {len(list_urls)} 页列表页")
-            
-            all_photo_urls = []
-            
-            # 1. 爬取所有列表页，收集套图详情页URL
-            driver = None
-            proxy_config = None
-            try:
+            # 混合模式通过共享会话获取列表页
+            if not self.session.enabled:
                 if self.proxy_manager:
                     proxy_config = self.proxy_manager.get_proxy()
                 driver = self._create_driver(proxy_config)
 
-                for idx, list_url in enumerate(list_urls, 1):
-                    self.logger.info(f"爬取列表页 {idx}/{len(list_urls)}: {list_url}")
-                    
+            for idx, list_url in enumerate(list_urls, 1):
+                self.logger.info(f"爬取列表页 {idx}/{len(list_urls)}: {list_url}")
+
+                with self.tracer.span('list_page', url=list_url, page=idx) as list_span:
                     try:
-                        driver.get(list_url)
-                        time.sleep(self.config.MIN_DELAY)
-                        
-                        # 解析页面，提取套图链接
-                        soup = BeautifulSoup(driver.page_source, 'html.parser')
-                        photo_items = soup.find_all('div', class_='item photo')
-                        
-                        page_count = len(photo_items)
+                        if driver:
+                            self._navigate(driver, list_url, 'list', self.LIST_SELECTORS)
+                            time.sleep(self._request_delay(list_url))
+                            # 解析页面，提取套图链接
+                            page_data = self._extract_driver_page(driver, list_url, 'list')
+                        else:
+                            page_data = self._fetch_page(list_url, 'list')
+                            time.sleep(self._request_delay(list_url))
+
+                        page_count = len(page_data.photo_links)
                         self.logger.info(f"列表页 {idx} 发现 {page_count} 个套图")
-                        
-                        # 提取每个套图的详情页URL
-                        for item in photo_items:
-                            link = item.find('a')
-                            if link and 'href' in link.attrs:
-                                photo_url = link['href']
-                                if not photo_url.startswith('http'):
-                                    photo_url = urljoin(self.config.START_URL, photo_url)
-                                
-                                if photo_url not in all_photo_urls:
-                                    all_photo_urls.append(photo_url)
-                                    # self.logger.debug(f"发现套图: {photo_url}")
-                        
-                        self.stats['pages_crawled'] += 1
+                        list_span.set(photo_sets=page_count)
+
+                        # 收集每个套图的详情页URL
+                        for photo_url in page_data.photo_links:
+                            if photo_url not in all_photo_urls:
+                                all_photo_urls.append(photo_url)
+
+                        self._count(pages_crawled=1)
                     except Exception as e:
                         self.logger.error(f"处理列表页失败 {list_url}: {e}")
-                
-                if self.proxy_manager and proxy_config:
-                    self.proxy_manager.mark_proxy_success()
-            finally:
-                if driver:
-                    driver.quit()
+
+            if self.proxy_manager and proxy_config:
+                self.proxy_manager.mark_proxy_success()
+        finally:
+            if driver:
+                driver.quit()
+
+        self.logger.info(f"总共发现 {len(all_photo_urls)} 个套图")
+        return all_photo_urls
+    
+    def _open_stream(self, url: str):
+        """流式获取（站点地图等），返回 requests 风格的响应"""
+        headers = {'User-Agent': random.choice(self.config.USER_AGENTS)}
+        return self.http_client.get(url, headers=headers, proxies=self._request_proxies(),
+                                    timeout=self.config.TIMEOUT, stream=True)
+    
+    def _discover_from_sitemaps(self) -> Optional[List[str]]:
+        """
+        从站点地图枚举套图详情页，只返回新的、lastmod 晚于上次下载的以及未下载完整的套图；
+        找不到站点地图时返回None
+        """
+        sitemap_urls = self.config.SITEMAP_URLS or find_sitemaps(
+            self.robots.sitemaps(self.config.START_URL), self.config.START_URL, self._open_stream)
+        if not sitemap_urls:
+            return None
+        self.logger.info(f"从站点地图发现套图: {', '.join(sitemap_urls)}")
+        
+        counts = {'new': 0, 'modified': 0, 'incomplete': 0, 'unchanged': 0}
+        photo_urls = []
+        seen = set()
+        with self.tracer.span('sitemap', sitemaps=len(sitemap_urls)) as span:
+            for entry in iter_sitemap_entries(self._open_stream, sitemap_urls, self.logger):
+                if not PHOTO_URL_RE.search(entry.loc) or entry.loc in seen:
+                    continue
+                seen.add(entry.loc)
+                state = self._sitemap_set_state(entry.loc, entry.lastmod)
+                counts[state] += 1
+                if state != 'unchanged':
+                    photo_urls.append(entry.loc)
+            span.set(**counts)
+        
+        self.logger.info(f"站点地图中共 {len(seen)} 个套图: 新 {counts['new']}, 已更新 {counts['modified']}, "
+                         f"未完成 {counts['incomplete']}, 跳过未变化 {counts['unchanged']}")
+        return photo_urls
+    
+    def _sitemap_set_state(self, photo_url: str, lastmod: Optional[float]) -> str:
+        """按已有的 metadata.json 判断套图: new / modified / incomplete / unchanged"""
+        metadata = self._existing_metadata(photo_url)
+        if not metadata:
+            return 'new'
+        updated = metadata.get('last_update') or metadata.get('download_date')
+        try:
+            downloaded_at = time.mktime(time.strptime(updated, '%Y-%m-%d %H:%M:%S')) if updated else 0.0
+        except ValueError:
+            downloaded_at = 0.0
+        if lastmod is not None and lastmod > downloaded_at:
+            return 'modified'
+        if self._progress_features(metadata).get('partial'):
+            return 'incomplete'
+        return 'unchanged'
+    
+    def _build_frontier(self, photo_urls: List[str]) -> Frontier:
+        """按 FRONTIER_PRIORITY 建立套图调度队列，需要时从已有的 metadata.json 读取下载进度"""
+        frontier = Frontier(parse_priorities(self.config.FRONTIER_PRIORITY))
+        # 设置预算时用已知的图片数估算套图成本
+        read_metadata = frontier.uses('partial') or frontier.uses('small') or self.budget.enabled
+        for rank, photo_url in enumerate(photo_urls):
+            frontier.push(photo_url, rank, **(self._frontier_features(photo_url) if read_metadata else {}))
+        return frontier
+    
+    def _frontier_features(self, photo_url: str) -> Dict:
+        """套图之前的下载进度: 是否部分下载、已知的图片数"""
+        return self._progress_features(self._existing_metadata(photo_url))
+    
+    def _existing_metadata(self, photo_url: str) -> Optional[Dict]:
+        """读取套图已有的 metadata.json，不存在或无法读取时返回None"""
+        photo_id = self._photo_id_from_url(photo_url)
+        try:
+            return load_metadata(os.path.join(self.config.OUTPUT_DIR, photo_id)) if photo_id else None
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _progress_features(metadata: Optional[Dict]) -> Dict:
+        if not metadata:
+            return {}
+        downloaded = metadata.get('images_downloaded', 0)
+        total = max(metadata.get('total_images', 0), downloaded + metadata.get('images_failed', 0))
+        return {'partial': 0 < downloaded < total or metadata.get('images_failed', 0) > 0, 'images': total}
+    
+    def _next_photo_set(self) -> Optional[str]:
+        """
+        按优先级取下一个套图；设置了预算时取剩余预算放得下的套图，
+        都放不下时返回None，不再开始新的套图
+        """
+        if not self.budget.enabled:
+            return self.frontier.pop()
+        photo_url = self.frontier.pop_where(lambda item: self.budget.fits(item.features.get('images')))
+        if photo_url is None and self.frontier:
+            self.budget.stop()
+            self.budget.sets_skipped = len(self.frontier)
+            self.logger.warning(f"剩余预算不足（{self.budget.stopped}），停止开始新的套图，"
+                                f"未开始 {len(self.frontier)} 个套图，下次运行可继续")
+        return photo_url
+    
+    def _crawl_budgeted(self, photo_url: str) -> Optional[Dict]:
+        """爬取一个套图，返回其结果并更新预算的成本估算"""
+        previous = self.run_log.last
+        started = time.monotonic()
+        bytes_before = self.stats['bytes_downloaded']
+        images_before = self.stats['images_found']
+        downloaded_before = self.stats['images_downloaded']
+        self._crawl_photo_detail(photo_url, self.config.DETAIL_DEPTH)
+        # 每张图片的成本按实际下载的图片计算（续传时跳过的已有图片不计）
+        self.budget.record_set(time.monotonic() - started, self.stats['bytes_downloaded'] - bytes_before,
+                               self.stats['images_found'] - images_before,
+                               self.stats['images_downloaded'] - downloaded_before)
+        return self.run_log.last if self.run_log.last is not previous else None
+    
+    def _work_queue(self, queue: WorkQueue) -> int:
+        """
+        从任务队列领取套图直到队列处理完毕，返回本节点处理的套图数
+        处理期间后台续租；节点宕机后租约过期，任务由其他节点重新领取
+        """
+        worker = self.node or f"{socket.gethostname()}-{os.getpid()}"
+        timeout = self.config.QUEUE_VISIBILITY_TIMEOUT
+        processed = 0
+        
+        while True:
+            if not self.budget.fits():
+                self.budget.stop()
+                self.logger.warning(f"剩余预算不足（{self.budget.stopped}），停止领取新的套图任务")
+                break
+            task = queue.lease(worker, timeout)
+            if not task:
+                if queue.is_drained():
+                    break
+                # 其他节点仍在处理，等待其完成或租约过期
+                time.sleep(self.config.QUEUE_POLL_INTERVAL)
+                continue
+            
+            self.logger.info(f"领取套图任务 (第 {task.attempts} 次): {task.url}")
+            self._count(photos_found=1)
+            with LeaseKeeper(queue, task, timeout, self.logger) as keeper:
+                photo_info = self._crawl_budgeted(task.url)
+            processed += 1
             
-            self.logger.info(f"总共发现 {len(all_photo_urls)} 个套图")
-            self.stats['photos_found'] = len(all_photo_urls)
+            # 重试的套图由运行日志的汇总以最后一次结果替换
+            if keeper.lost:
+                self.logger.warning(f"租约已被其他节点接管，不确认任务: {task.url}")
+            elif photo_info and photo_info.get('status') == 'success':
+                queue.ack(task)
+            else:
+                queue.nack(task, (photo_info or {}).get('error', 'photo set failed'))
             
-            # 2. 对每个套图进行深度爬取（分页）
-            for photo_idx, photo_url in enumerate(all_photo_urls, 1):
-                self.logger.info(f"正在处理套图 {photo_idx}/{len(all_photo_urls)}: {photo_url}")
+            time.sleep(self._request_delay(task.url))
+        
+        counts = queue.counts()
+        self.logger.info(f"任务队列已处理完毕: 完成 {counts.get('done', 0)}, 失败 {counts.get('failed', 0)}")
+        return processed
+    
+    def crawl(self):
+        """
+        主爬取方法，根据 list_pages 参数爬取多个列表页
+        配置 WORK_QUEUE 时，发现的套图写入任务队列并从队列领取；
+        QUEUE_WORKER 模式下不爬列表页，只从队列领取任务
+        """
+        with self.tracer.span('crawl', start_url=self.config.START_URL,
+                              list_pages=self.config.LIST_PAGES, detail_depth=self.config.DETAIL_DEPTH):
+            queue = None
+            try:
+                self.dns_cache.install()
+                self.logger.info(f"=" * 60)
+                self.logger.info(f"开始爬取 (8se.me 优化版): {self.config.START_URL}")
+                self.logger.info(f"列表页数: {self.config.LIST_PAGES}, 套图深度: {self.config.DETAIL_DEPTH}")
+                self.logger.info(f"输出目录: {self.config.OUTPUT_DIR}")
+                self.logger.info(f"使用代理: {self.config.USE_PROXY}")
+                self.logger.info(f"=" * 60)
                 
-                # 调用详情页爬取方法
-                self._crawl_photo_detail(photo_url, self.config.DETAIL_DEPTH)
+                if self.config.WORK_QUEUE:
+                    queue = self.work_queue = create_work_queue(self.config.WORK_QUEUE,
+                                                                self.config.QUEUE_MAX_ATTEMPTS)
+                    # 多个节点共享输出目录: 每个节点写自己的运行日志和摘要，不覆盖其它节点的
+                    self.node = self.config.QUEUE_NODE or f"{socket.gethostname()}-{os.getpid()}"
+                    if self.run_log.path:
+                        self.run_log.path = os.path.join(self.config.OUTPUT_DIR, node_file(RUN_LOG_FILE, self.node))
                 
-                # 请求延迟
-                time.sleep(self.config.MIN_DELAY)
+                self.run_log.start(
+                    run_date=datetime.fromtimestamp(self.stats['start_time']).strftime('%Y-%m-%d %H:%M:%S'),
+                    start_url=self.config.START_URL,
+                    list_pages=self.config.LIST_PAGES,
+                    node=self.node
+                )
+                
+                if queue and self.config.QUEUE_WORKER:
+                    # 工作节点模式: 只从队列领取任务
+                    processed = self._work_queue(queue)
+                    self.logger.info(f"爬取完成！本节点共处理 {processed} 个套图")
+                else:
+                    # 1. 从站点地图或列表页收集套图详情页URL
+                    all_photo_urls = None
+                    if self.config.DISCOVERY == 'sitemap':
+                        all_photo_urls = self._discover_from_sitemaps()
+                        if all_photo_urls is None:
+                            self.logger.warning("未找到站点地图，改为爬取列表页")
+                    if all_photo_urls is None:
+                        all_photo_urls = self._discover_photo_urls()
+                    self.stats['photos_found'] = len(all_photo_urls)
+
+                    # 2. 按优先级对每个套图进行深度爬取（分页），多进程模式和任务队列按优先级顺序分配
+                    self.frontier = self._build_frontier(all_photo_urls)
+                    if queue:
+                        added = queue.put(self.frontier.drain())
+                        self.logger.info(f"已加入任务队列 {added} 个新套图")
+                        self.stats['photos_found'] = 0
+                        self._work_queue(queue)
+                    elif self.config.PROCESSES > 1 and len(all_photo_urls) > 1:
+                        if self.budget.enabled:
+                            self.logger.warning("多进程模式不支持运行预算，将处理全部套图")
+                        run_sharded(self, self.frontier.drain(), self.config.PROCESSES)
+                    else:
+                        photo_idx = 0
+                        while self.frontier:
+                            photo_url = self._next_photo_set()
+                            if photo_url is None:
+                                break
+                            photo_idx += 1
+                            self.logger.info(f"正在处理套图 {photo_idx}/{len(all_photo_urls)}: {photo_url}")
+
+                            # 调用详情页爬取方法
+                            photo_info = self._crawl_budgeted(photo_url)
+                            self.frontier.record(photo_url, bool(photo_info) and photo_info.get('status') == 'success')
+
+                            # 请求延迟
+                            time.sleep(self._request_delay(photo_url))
+
+                    self.logger.info(f"爬取完成！共处理 {self.run_log.aggregates.sets} 个套图")
             
-            self.logger.info(f"爬取完成！共处理 {len(all_photo_urls)} 个套图")
+            except Exception as e:
+                self.logger.error(f"爬虫执行出错: {e}")
+            finally:
+                try:
+                    self._finish_run()
+                finally:
+                    # 最终摘要包含队列状态，结束后才关闭
+                    if queue:
+                        queue.close()
+
+        self.tracer.close()
+    
+    def crawl_site(self):
+        """
+        通用站点爬取: 从 START_URL 开始并发广度优先爬取 crawl_page 返回的链接
+        （深度 MAX_DEPTH、页面数 MAX_PAGES、域名 ALLOWED_DOMAINS，PAGE_WORKERS 个页面线程各复用一个浏览器）
+        """
+        with self.tracer.span('site_crawl', start_url=self.config.START_URL, max_depth=self.config.MAX_DEPTH,
+                              page_workers=self.config.PAGE_WORKERS):
+            try:
+                self.dns_cache.install()
+                self.logger.info(f"=" * 60)
+                self.logger.info(f"开始站点爬取 (广度优先): {self.config.START_URL}")
+                self.logger.info(f"最大深度: {self.config.MAX_DEPTH}, 最大页面数: {self.config.MAX_PAGES}, "
+                                 f"页面线程: {self.config.PAGE_WORKERS}")
+                domains = ', '.join(self.config.ALLOWED_DOMAINS) or urlparse(self.config.START_URL).netloc
+                self.logger.info(f"允许的域名: {domains}")
+                self.logger.info(f"=" * 60)
+                
+                self.run_log.start(
+                    run_date=datetime.fromtimestamp(self.stats['start_time']).strftime('%Y-%m-%d %H:%M:%S'),
+                    start_url=self.config.START_URL,
+                    mode='site'
+                )
+                
+                frontier = SiteFrontier(self.config.MAX_DEPTH, self.config.MAX_PAGES,
+                                        domain_delay=self.config.MIN_DELAY,
+                                        domain_concurrency=self.config.DOMAIN_CONCURRENCY,
+                                        delay_for=self.robots.cached_delay)
+                frontier.add(normalize_url(self.config.START_URL), 0)
+                processed = run_site_crawl(frontier, lambda: BrowserPageWorker(self), self.config.PAGE_WORKERS,
+                                           bind=self.tracer.bind, logger=self.logger)
+                self.logger.info(f"站点爬取完成！共处理 {processed} 个页面，队列中剩余 {len(frontier)} 个")
             
-        except Exception as e:
-            self.logger.error(f"爬虫执行出错: {e}")
-        finally:
-            self._print_stats()
-            # 生成下载摘要
-            summary_path = self._generate_download_summary()
-            if summary_path:
-                self.logger.info(f"\n{'='*60}")
-                self.logger.info(f"下载摘要已生成: {summary_path}")
-                self.logger.info(f"{'='*60}\n")
+            except Exception as e:
+                self.logger.error(f"爬虫执行出错: {e}")
+            finally:
+                self._finish_run()
+
+        self.tracer.close()
+    
+    def _close_components(self):
+        """关闭各组件并写入缓冲的数据（_finish_run 和多进程的工作进程共用）"""
+        # 异常中断时仍有未结束的套图，等待其图片处理完成后写入元数据
+        self.postprocessor.close()
+        self.metadata.flush_all()
+        self.dedupe.close()
+        self.warmer.close()
+        self.http_client.close()
+        self.dns_cache.close()
+        self.robots.close()
+        self.session.close()
+        self.catalog.close()
+        self.visited_urls.close()
+        self.downloaded_images.close()
+    
+    def _finish_run(self):
+        """结束运行: 关闭各组件、输出统计并写入运行日志和下载摘要"""
+        self._close_components()
+        self._print_stats()
+        self.run_log.end(
+            photos_found=self.stats['photos_found'],
+            elapsed=time.time() - self.stats['start_time'],
+            stats={key: value for key, value in self.stats.items() if key != 'start_time'},
+            stages=self._stage_summary(),
+            budget=self.budget.summary(),
+            queue=self._queue_state()
+        )
+        self.run_log.close()
+        # 生成下载摘要
+        summary_path = self._generate_download_summary()
+        if summary_path:
+            self.logger.info(f"\n{'='*60}")
+            self.logger.info(f"下载摘要已生成: {summary_path}")
+            self.logger.info(f"{'='*60}\n")
     
     def _print_stats(self):
         """打印统计信息"""
@@ -1288,8 +1846,8 @@ class ImageCrawler:
         self.logger.info(f"套图发现数: {self.stats['photos_found']}")
         
         # 套图统计
-        photo_sets_downloaded = sum(1 for p in self.photo_sets if p.get('status') == 'success')
-        photo_sets_failed = sum(1 for p in self.photo_sets if p.get('status') == 'failed')
+        photo_sets_downloaded = self.run_log.aggregates.succeeded
+        photo_sets_failed = self.run_log.aggregates.failed
         self.logger.info(f"套图下载成功: {photo_sets_downloaded}")
         self.logger.info(f"套图下载失败: {photo_sets_failed}")
         
@@ -1297,6 +1855,16 @@ class ImageCrawler:
         self.logger.info(f"图片下载成功: {self.stats['images_downloaded']}")
         self.logger.info(f"图片下载失败: {self.stats['images_failed']}")
         self.logger.info(f"图片跳过: {self.stats['images_skipped']}")
+        self.logger.info(f"近似重复: {self.stats['images_duplicate']}")
+        self.logger.info(f"下载字节数: {self.stats['bytes_downloaded']}")
+        if self.stats['bytes_resumed']:
+            self.logger.info(f"断点续传节省: {self.stats['bytes_resumed']} bytes")
+        if self.session.enabled:
+            self.logger.info(f"混合模式会话刷新: {self.session.refreshes} 次")
+        
+        for stage, metrics in self._stage_summary().items():
+            self.logger.info(f"阶段 {stage}: {metrics['count']} 次, 平均 {metrics['avg_seconds']:.3f} 秒, "
+                             f"平均 {metrics['avg_bytes']} 字节")
         
         if self.stats['photos_found'] > 0:
             photo_success_rate = (photo_sets_downloaded / self.stats['photos_found']) * 100
@@ -0,0 +1,237 @@
+"""
+DNS 缓存和连接预热
+
+DnsCache 在 crawl() 开始时替换进程内的 socket.getaddrinfo（requests/urllib3 建立连接时调用），
+结束时恢复。同时有多个爬虫运行时使用最后安装的缓存，全部卸载后才恢复原来的函数。解析结果按
+DNS_CACHE_TTL 秒缓存并保存到 OUTPUT_DIR/dns_cache.json，下次运行和多进程模式下的工作进程
+启动时直接加载。解析失败时使用已过期的旧结果（最多再保留 STALE_FACTOR 倍 TTL）。
+
+HostWarmer 在页面提取到新的图片主机时，在后台线程中解析该主机并向下载客户端的连接池
+预先打开 PREWARM_CONNECTIONS 个连接，套图的第一张图片不再等待 DNS 和 TLS 握手。
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+
+DNS_CACHE_FILE = 'dns_cache.json'
+# 安装缓存前的系统解析函数
+_system_getaddrinfo = socket.getaddrinfo
+# 已安装的缓存（最后安装的生效）和安装前的 getaddrinfo，由 _install_lock 保护
+_active: List['DnsCache'] = []
+_original_getaddrinfo = None
+_install_lock = threading.Lock()
+# 解析失败时旧结果在过期后仍可使用的时长（TTL 的倍数）
+STALE_FACTOR = 12
+
+
+class NullDnsCache:
+    """未启用 DNS 缓存时使用的空实现"""
+    enabled = False
+
+    def prefetch(self, host: str, port: int):
+        pass
+
+    def install(self):
+        return self
+
+    def close(self):
+        pass
+
+
+class DnsCache(NullDnsCache):
+    """带 TTL 的 getaddrinfo 缓存，install() 后对整个进程生效，close() 时卸载"""
+    enabled = True
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 300, resolver=None, clock=time.time, logger=None):
+        self.path = path
+        self.ttl = ttl
+        self.logger = logger
+        self._resolver = resolver or _system_getaddrinfo
+        self._clock = clock
+        self._lock = threading.Lock()
+        # 查询参数 -> (过期时间, getaddrinfo 结果)
+        self._entries: Dict[Tuple, Tuple[float, List]] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = self._clock()
+        for item in data.get('entries', []):
+            expires = item['expires']
+            if expires + self.ttl * STALE_FACTOR < now:
+                continue
+            results = [(socket.AddressFamily(family), socket.SocketKind(kind), proto, canonname, tuple(address))
+                       for family, kind, proto, canonname, address in item['results']]
+            self._entries[tuple(item['key'])] = (expires, results)
+        if self.logger and self._entries:
+            self.logger.debug(f"已加载 {len(self._entries)} 条DNS缓存")
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """与 socket.getaddrinfo 参数相同"""
+        if isinstance(host, bytes):
+            host = host.decode('idna')
+        key = (host, port, int(family), int(type), proto, flags)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        try:
+            results = self._resolver(host, port, family, type, proto, flags)
+        except socket.gaierror:
+            if entry and entry[0] + self.ttl * STALE_FACTOR > now:
+                if self.logger:
+                    self.logger.debug(f"DNS解析失败，使用过期的缓存: {host}")
+                return list(entry[1])
+            raise
+        with self._lock:
+            self._entries[key] = (now + self.ttl, list(results))
+            self._dirty = True
+        return results
+
+    def prefetch(self, host: str, port: int):
+        """提前解析 urllib3 建立连接时会查询的地址"""
+        try:
+            self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except OSError:
+            pass
+
+    def install(self) -> 'DnsCache':
+        """替换 socket.getaddrinfo（重复调用无效）"""
+        global _original_getaddrinfo
+        with _install_lock:
+            if self not in _active:
+                if not _active:
+                    _original_getaddrinfo = socket.getaddrinfo
+                    socket.getaddrinfo = _getaddrinfo
+                _active.append(self)
+        return self
+
+    def uninstall(self):
+        """移除本缓存，没有其它已安装的缓存时恢复原来的 socket.getaddrinfo"""
+        with _install_lock:
+            if self not in _active:
+                return
+            _active.remove(self)
+            if not _active and socket.getaddrinfo is _getaddrinfo:
+                socket.getaddrinfo = _original_getaddrinfo
+
+    def save(self):
+        """把缓存写入文件（写入临时文件后原子替换）"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [
+                {'key': list(key), 'expires': expires,
+                 'results': [[int(family), int(kind), proto, canonname, list(address)]
+                             for family, kind, proto, canonname, address in results]}
+                for key, (expires, results) in self._entries.items()
+            ]
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        self.uninstall()
+        self.save()
+
+
+def _getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """安装后的 socket.getaddrinfo: 交给最后安装的缓存"""
+    active = _active
+    if active:
+        return active[-1].getaddrinfo(host, port, family, type, proto, flags)
+    return (_original_getaddrinfo or _system_getaddrinfo)(host, port, family, type, proto, flags)
+
+
+class NullWarmer:
+    """未启用连接预热时使用的空实现"""
+    enabled = False
+
+    def observe(self, urls: Iterable[str]):
+        pass
+
+    def close(self):
+        pass
+
+
+class HostWarmer(NullWarmer):
+    """发现新的图片主机时在后台解析DNS并预先打开连接"""
+    enabled = True
+
+    def __init__(self, http_client, dns_cache=None, connections: int = 2, logger=None):
+        self.http_client = http_client
+        self.dns_cache = dns_cache or NullDnsCache()
+        self.connections = connections
+        self.logger = logger
+        self._seen: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='prewarm')
+
+    def observe(self, urls: Iterable[str]):
+        """页面提取到的图片URL，每个新主机只预热一次"""
+        for url in urls:
+            parsed = urlparse(url)
+            if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+                continue
+            origin = f"{parsed.scheme}://{parsed.netloc}"
+            with self._lock:
+                if origin in self._seen:
+                    continue
+                self._seen.add(origin)
+            self._executor.submit(self._warm, origin, parsed.hostname,
+                                  parsed.port or (443 if parsed.scheme == 'https' else 80))
+
+    def _warm(self, origin: str, host: str, port: int):
+        start = time.perf_counter()
+        self.dns_cache.prefetch(host, port)
+        try:
+            opened = self.http_client.warm(origin, self.connections)
+        except Exception as e:
+            if self.logger:
+                self.logger.debug(f"预热连接失败 {origin}: {e}")
+            return
+        if self.logger:
+            self.logger.debug(f"已预热 {origin}: {opened} 个连接 ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_dns_cache(config, logger=None):
+    """根据配置创建 DNS 缓存（运行开始时 install()，close() 时卸载），DNS_CACHE_TTL <= 0 时返回空实现"""
+    if config.DNS_CACHE_TTL <= 0:
+        return NullDnsCache()
+    return DnsCache(os.path.join(config.OUTPUT_DIR, DNS_CACHE_FILE), config.DNS_CACHE_TTL, logger=logger)
+
+
+def create_warmer(config, http_client, dns_cache=None, logger=None, use_proxy: bool = False):
+    """PREWARM_CONNECTIONS > 0 且不使用代理时创建连接预热（经代理的连接无法按主机预先建立）"""
+    if config.PREWARM_CONNECTIONS <= 0 or use_proxy:
+        return NullWarmer()
+    return HostWarmer(http_client, dns_cache, config.PREWARM_CONNECTIONS, logger)
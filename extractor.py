@@ -0,0 +1,258 @@
+import re
+from typing import List, Optional, Sequence
+from urllib.parse import urljoin, urlparse
+
+import lxml.html
+from lxml import etree
+
+
+STYLE_URL_RE = re.compile(r'url\(["\']?(.*?)["\']?\)')
+
+
+def image_suffixes(formats: Sequence[str]) -> tuple:
+    """将图片格式列表转换为 str.endswith 可用的后缀元组"""
+    return tuple(f'.{fmt.lower()}' for fmt in formats)
+
+
+def is_image_url(url: str, suffixes: tuple) -> bool:
+    """检查URL路径是否以图片后缀结尾"""
+    return urlparse(url).path.lower().endswith(suffixes)
+
+
+def style_image_url(style: str) -> Optional[str]:
+    """从 style 属性中提取 background-image URL"""
+    match = STYLE_URL_RE.search(style)
+    if match:
+        return match.group(1)
+    return None
+
+
+class PageData:
+    """一次解析得到的页面数据"""
+    __slots__ = ('images', 'links', 'title', 'has_pager', 'has_next',
+                 'photo_images', 'photo_links', 'background_images')
+
+    def __init__(self):
+        # 通用页面: <img>/<picture>/<a> 中的图片URL
+        self.images: List[str] = []
+        # 所有 <a href> 的绝对URL
+        self.links: List[str] = []
+        # <h1> 文本，没有时为 <title> 文本
+        self.title: Optional[str] = None
+        # 分页器状态（div.pager 中的 a.next 未禁用时 has_next 为True）
+        self.has_pager = False
+        self.has_next = False
+        # 8se.me 详情页: div.item.photo-image div.img 的背景图
+        self.photo_images: List[str] = []
+        # 8se.me 列表页: div.item.photo 中的套图链接
+        self.photo_links: List[str] = []
+        # 所有带 background-image 的 div
+        self.background_images: List[str] = []
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PageData':
+        page = cls()
+        for name in cls.__slots__:
+            if name in data and data[name] is not None:
+                setattr(page, name, data[name])
+        return page
+
+
+# 在浏览器内执行的提取脚本，返回与 PageData 字段相同的紧凑JSON，
+# 避免通过 WebDriver 传输整个 page_source 再在 Python 中解析。
+# 参数: arguments[0] 页面类型 (list/detail/show/generic)，arguments[1] 图片后缀列表
+EXTRACT_SCRIPT = r"""
+var kind = arguments[0];
+var suffixes = arguments[1];
+var base = document.baseURI;
+
+function abs(url) {
+    if (!url) { return null; }
+    try { return new URL(url, base).href; } catch (e) { return null; }
+}
+function isImage(url) {
+    var path;
+    try { path = new URL(url, base).pathname.toLowerCase(); } catch (e) { return false; }
+    for (var i = 0; i < suffixes.length; i++) {
+        if (path.endsWith(suffixes[i])) { return true; }
+    }
+    return false;
+}
+function styleUrl(style) {
+    var match = /url\(["']?(.*?)["']?\)/.exec(style || '');
+    return match ? match[1] : null;
+}
+function text(el) {
+    return el ? el.textContent.replace(/\s+/g, ' ').trim() : '';
+}
+function unique(urls) {
+    var seen = {}, result = [];
+    for (var i = 0; i < urls.length; i++) {
+        var url = urls[i];
+        if (url && !seen[url]) { seen[url] = true; result.push(url); }
+    }
+    return result;
+}
+function all(selector) {
+    return Array.prototype.slice.call(document.querySelectorAll(selector));
+}
+
+var data = {};
+data.title = text(document.querySelector('h1')) || text(document.querySelector('title')) || null;
+
+var pager = document.querySelector('div.pager');
+var next = pager ? pager.querySelector('a.next') : null;
+data.has_pager = !!pager;
+data.has_next = !!next && !next.classList.contains('disabled');
+
+if (kind === 'detail') {
+    data.photo_images = unique(all('div.item.photo-image').map(function (item) {
+        var img = item.querySelector('div.img');
+        return img ? abs(styleUrl(img.getAttribute('style'))) : null;
+    }));
+} else if (kind === 'list') {
+    data.photo_links = unique(all('div.item.photo').map(function (item) {
+        var link = item.querySelector('a[href]');
+        return link ? abs(link.getAttribute('href')) : null;
+    }));
+} else {
+    var images = [];
+    all('img').forEach(function (img) {
+        var src = abs(img.getAttribute('src') || img.getAttribute('data-src') || img.getAttribute('data-original'));
+        if (src && isImage(src)) { images.push(src); }
+    });
+    all('picture source[srcset]').forEach(function (source) {
+        source.getAttribute('srcset').split(',').forEach(function (candidate) {
+            var url = abs(candidate.trim().split(/\s+/)[0]);
+            if (url && isImage(url)) { images.push(url); }
+        });
+    });
+    var links = [];
+    all('a[href]').forEach(function (link) {
+        var href = link.getAttribute('href');
+        var url = abs(href);
+        if (!url) { return; }
+        links.push(url);
+        if (isImage(href)) { images.push(url); }
+    });
+    data.images = unique(images);
+    data.links = unique(links);
+    data.background_images = unique(all('div[style*="background-image"]').map(function (div) {
+        return abs(styleUrl(div.getAttribute('style')));
+    }));
+}
+return data;
+"""
+
+
+def _classes(element) -> set:
+    return set(element.get('class', '').split())
+
+
+def _text(element) -> str:
+    return ' '.join(element.text_content().split())
+
+
+def _parse(html: str):
+    try:
+        return lxml.html.fromstring(html)
+    except ValueError:
+        # 带 XML 编码声明的字符串需要按字节解析
+        return lxml.html.fromstring(html.encode('utf-8'))
+
+
+def extract_page(html: str, base_url: str, suffixes: tuple) -> PageData:
+    """
+    单次遍历 lxml 文档树，同时提取图片、链接、标题、分页器状态
+    以及 8se.me 列表页/详情页特有的结构
+    """
+    page = PageData()
+    if not html or not html.strip():
+        return page
+    try:
+        root = _parse(html)
+    except (etree.ParserError, etree.XMLSyntaxError):
+        return page
+
+    images, links, backgrounds = {}, {}, {}
+    photo_images, photo_links = {}, {}
+    h1_title = title = None
+
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+
+        if tag == 'img':
+            src = element.get('src') or element.get('data-src') or element.get('data-original')
+            if src:
+                full_url = urljoin(base_url, src)
+                if is_image_url(full_url, suffixes):
+                    images[full_url] = None
+
+        elif tag == 'a':
+            href = element.get('href')
+            if href:
+                full_url = urljoin(base_url, href)
+                links[full_url] = None
+                if is_image_url(href, suffixes):
+                    images[full_url] = None
+
+        elif tag == 'source':
+            srcset = element.get('srcset')
+            parent = element.getparent()
+            if srcset and parent is not None and parent.tag == 'picture':
+                for candidate in srcset.split(','):
+                    parts = candidate.strip().split()
+                    if parts:
+                        full_url = urljoin(base_url, parts[0])
+                        if is_image_url(full_url, suffixes):
+                            images[full_url] = None
+
+        elif tag == 'div':
+            style = element.get('style')
+            if style and 'background-image' in style:
+                bg_url = style_image_url(style)
+                if bg_url:
+                    backgrounds[urljoin(base_url, bg_url)] = None
+
+            classes = _classes(element)
+            if 'item' in classes:
+                if 'photo-image' in classes:
+                    for img_div in element.iter('div'):
+                        if img_div is not element and 'img' in _classes(img_div):
+                            img_style = img_div.get('style')
+                            img_url = style_image_url(img_style) if img_style else None
+                            if img_url:
+                                photo_images[urljoin(base_url, img_url)] = None
+                            break
+                elif 'photo' in classes:
+                    for link in element.iter('a'):
+                        href = link.get('href')
+                        if href:
+                            photo_links[urljoin(base_url, href)] = None
+                        break
+            elif 'pager' in classes and not page.has_pager:
+                page.has_pager = True
+                for link in element.iter('a'):
+                    link_classes = _classes(link)
+                    if 'next' in link_classes:
+                        page.has_next = 'disabled' not in link_classes
+                        break
+
+        elif tag == 'h1' and h1_title is None:
+            h1_title = _text(element)
+
+        elif tag == 'title' and title is None:
+            title = _text(element)
+
+    page.images = list(images)
+    page.links = list(links)
+    page.background_images = list(backgrounds)
+    page.photo_images = list(photo_images)
+    page.photo_links = list(photo_links)
+    page.title = h1_title or title
+    return page
@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+本地测试站点 - 模拟 8se.me 的页面结构，用于基准测试
+
+提供:
+  /photos/sort-hot.html?page=N   列表页（div.item.photo）
+  /photo/id-<id>.html            套图详情页第1页
+  /photo/id-<id>/<n>.html        套图详情页分页（div.item.photo-image + div.pager）
+  /photoShow.html?id=<id>        photoShow页面
+  /photo/show/id-<id>.html       photoShow页面（备用地址）
+  /lazy.html?id=<id>&batches=N   懒加载页面（滚动到底部时追加下一批图片）
+  /img/<id>/<name>               图片（大小和延迟可配置，支持 Range / If-Range 断点续传）
+  /static/<name>                 样式、字体和脚本（asset_size > 0 时提供）
+  /robots.txt
+
+session_cookie 不为空时，套图、列表和图片请求必须带有 Cookie session=<session_cookie>，否则返回403
+（模拟需要浏览器通过验证后才能访问的站点；测试中修改它即模拟会话过期）。
+  /sitemap.xml                   站点地图索引，指向 gzip 压缩的 /sitemap-sets.xml.gz（全部套图及 lastmod）
+
+H2FixtureServer 以明文 HTTP/2（h2c）提供同样的图片，用于 HTTP/2 客户端的基准测试。
+
+可通过 FaultProfile 为匹配的URL注入故障: 403、429(Retry-After)、5xx、
+慢速响应体、超时、连接重置和截断的图片。
+"""
+
+import re
+import gzip
+import json
+import time
+import hashlib
+import random
+import socket
+import struct
+import threading
+from io import BytesIO
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+
+def make_jpeg(size: int) -> bytes:
+    """生成指定大小的有效JPEG（通过COM注释段填充到目标大小）"""
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 80)).save(buffer, 'JPEG', quality=80)
+    data = buffer.getvalue()
+
+    padding = []
+    remaining = size - len(data)
+    while remaining > 4:
+        # 每个COM段: FFFE + 2字节长度(包含自身) + 数据，最大65535
+        chunk = min(remaining - 4, 65533)
+        padding.append(b'\xff\xfe' + (chunk + 2).to_bytes(2, 'big') + b'\x00' * chunk)
+        remaining -= chunk + 4
+
+    # 插入到SOI(FFD8)之后
+    return data[:2] + b''.join(padding) + data[2:]
+
+
+class FaultRule:
+    """对匹配路径的请求按比例注入故障"""
+
+    KINDS = ('forbidden', 'too_many', 'server_error', 'timeout', 'reset', 'truncate', 'slow')
+
+    def __init__(self, pattern: str = r'^/img/', fail_first: int = 0, forbidden: float = 0.0,
+                 too_many: float = 0.0, server_error: float = 0.0, timeout: float = 0.0,
+                 reset: float = 0.0, truncate: float = 0.0, slow: float = 0.0,
+                 retry_after: int = 1, hang_seconds: float = 20.0, slow_seconds: float = 3.0):
+        self.pattern = re.compile(pattern)
+        # 每个URL的前 fail_first 次请求固定返回403
+        self.fail_first = fail_first
+        self.rates = {
+            'forbidden': forbidden,
+            'too_many': too_many,
+            'server_error': server_error,
+            'timeout': timeout,
+            'reset': reset,
+            'truncate': truncate,
+            'slow': slow,
+        }
+        self.retry_after = retry_after
+        self.hang_seconds = hang_seconds
+        self.slow_seconds = slow_seconds
+
+
+class FaultProfile:
+    """一组故障规则，使用固定种子保证可重复"""
+
+    def __init__(self, rules: List[FaultRule] = None, seed: int = 42):
+        self.rules = rules or []
+        self._random = random.Random(seed)
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def decide(self, path: str):
+        """返回 (规则, 故障类型)，不注入故障时返回 (None, None)"""
+        for rule in self.rules:
+            if not rule.pattern.search(path):
+                continue
+            with self._lock:
+                count = self._seen.get(path, 0)
+                self._seen[path] = count + 1
+                if count < rule.fail_first:
+                    return rule, 'forbidden'
+                roll = self._random.random()
+            for kind in FaultRule.KINDS:
+                rate = rule.rates[kind]
+                if roll < rate:
+                    return rule, kind
+                roll -= rate
+            return None, None
+        return None, None
+
+
+# 基准测试使用的预设故障配置
+FAULT_PROFILES = {
+    'none': lambda: FaultProfile(),
+    'forbidden': lambda: FaultProfile([FaultRule(forbidden=0.3)]),
+    'forbidden_first': lambda: FaultProfile([FaultRule(fail_first=2)]),
+    'too_many': lambda: FaultProfile([FaultRule(too_many=0.2, retry_after=2)]),
+    'server_error': lambda: FaultProfile([FaultRule(server_error=0.3)]),
+    'slow': lambda: FaultProfile([FaultRule(slow=0.3, slow_seconds=3.0)]),
+    'timeout': lambda: FaultProfile([FaultRule(timeout=0.1, hang_seconds=20.0)]),
+    'reset': lambda: FaultProfile([FaultRule(reset=0.2)]),
+    'truncate': lambda: FaultProfile([FaultRule(truncate=0.2)]),
+    'mixed': lambda: FaultProfile([FaultRule(forbidden=0.1, too_many=0.05, server_error=0.05,
+                                             reset=0.05, truncate=0.05, slow=0.05)]),
+}
+
+
+class FixtureSite:
+    """合成站点的内容配置"""
+
+    HEAD_ASSETS = (
+        '<link rel="stylesheet" href="/static/site.css">'
+        '<link rel="preload" as="font" type="font/woff2" href="/static/site.woff2" crossorigin>'
+        '<script src="/static/analytics.js"></script>'
+    )
+    ASSET_TYPES = {'.css': 'text/css', '.woff2': 'font/woff2', '.js': 'application/javascript'}
+
+    def __init__(self, sets: int = 10, sets_per_list_page: int = 20, pages_per_set: int = 2,
+                 images_per_page: int = 10, image_size: int = 64 * 1024,
+                 page_latency: float = 0.0, image_latency: float = 0.0,
+                 faults: FaultProfile = None, asset_size: int = 0, range_requests: bool = True,
+                 robots_txt: str = 'User-agent: *\nAllow: /\n', session_cookie: Optional[str] = None):
+        self.sets = sets
+        self.sets_per_list_page = sets_per_list_page
+        self.pages_per_set = pages_per_set
+        self.images_per_page = images_per_page
+        self.image_size = image_size
+        self.page_latency = page_latency
+        self.image_latency = image_latency
+        self.faults = faults or FaultProfile()
+        # 页面引用的 /static/ 样式、字体和脚本的大小（0 表示不提供，返回404）
+        self.asset_size = asset_size
+        # 是否响应图片的 Range 请求（False 时忽略 Range，始终返回完整内容）
+        self.range_requests = range_requests
+        self.robots_txt = robots_txt
+        self.session_cookie = session_cookie
+        # 站点地图中各套图的 lastmod（按套图序号覆盖默认值）
+        self.sitemap_lastmod: Dict[int, str] = {}
+        self._image_cache: Dict[int, bytes] = {}
+
+    @property
+    def list_pages(self) -> int:
+        return max(1, -(-self.sets // self.sets_per_list_page))
+
+    def set_id(self, index: int) -> str:
+        return f"f{index:012x}"
+
+    def set_index(self, set_id: str) -> Optional[int]:
+        try:
+            index = int(set_id[1:], 16)
+        except ValueError:
+            return None
+        return index if 0 <= index < self.sets else None
+
+    def image_paths(self, set_id: str, page: int) -> List[str]:
+        start = (page - 1) * self.images_per_page + 1
+        return [f"/img/{set_id}/{n:04d}_600x0.jpg" for n in range(start, start + self.images_per_page)]
+
+    def image_bytes(self) -> bytes:
+        if self.image_size not in self._image_cache:
+            self._image_cache[self.image_size] = make_jpeg(self.image_size)
+        return self._image_cache[self.image_size]
+
+    def image_etag(self) -> str:
+        return '"%s"' % hashlib.md5(self.image_bytes()).hexdigest()[:16]
+
+    def render_sitemap_index(self, base_url: str) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'<sitemap><loc>{base_url}/sitemap-sets.xml.gz</loc></sitemap></sitemapindex>'
+        )
+
+    def render_sitemap(self, base_url: str) -> bytes:
+        """全部套图的 urlset（gzip 压缩），每个 url 带一个 image:image 扩展"""
+        urls = []
+        for index in range(self.sets):
+            set_id = self.set_id(index)
+            lastmod = self.sitemap_lastmod.get(index, '2024-01-01T00:00:00+00:00')
+            urls.append(
+                f'<url><loc>{base_url}/photo/id-{set_id}.html</loc><lastmod>{lastmod}</lastmod>'
+                f'<image:image><image:loc>{base_url}/img/{set_id}/cover.jpg</image:loc></image:image></url>'
+            )
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+            'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+            f'<url><loc>{base_url}/photos/sort-hot.html</loc></url>{"".join(urls)}</urlset>'
+        )
+        return gzip.compress(xml.encode('utf-8'))
+
+    def render_list_page(self, page: int) -> str:
+        start = (page - 1) * self.sets_per_list_page
+        items = []
+        for index in range(start, min(start + self.sets_per_list_page, self.sets)):
+            set_id = self.set_id(index)
+            items.append(
+                f'<div class="item photo"><a href="/photo/id-{set_id}.html">'
+                f'<div class="img" style="background-image: url(\'/img/{set_id}/cover.jpg\')"></div>'
+                f'<div class="title">套图 {index}</div></a></div>'
+            )
+        return (
+            f'<html><head><title>热门套图</title>{self.HEAD_ASSETS}</head><body>'
+            f'<div class="list">{"".join(items)}</div>'
+            f'{self._render_pager(page, self.list_pages)}</body></html>'
+        )
+
+    def render_detail_page(self, set_id: str, page: int) -> str:
+        items = ''.join(
+            f'<div class="item photo-image"><div class="img" '
+            f'style="background-image: url(\'{path}\')"></div></div>'
+            for path in self.image_paths(set_id, page)
+        )
+        return (
+            f'<html><head><title>套图 {set_id} - 第{page}页</title>{self.HEAD_ASSETS}</head><body>'
+            f'<h1>套图 {set_id}</h1><div class="photos">{items}</div>'
+            f'{self._render_pager(page, self.pages_per_set)}</body></html>'
+        )
+
+    def render_photo_show_page(self, set_id: str) -> str:
+        images = ''.join(
+            f'<img src="{path.replace("_600x0", "")}">'
+            for page in range(1, self.pages_per_set + 1)
+            for path in self.image_paths(set_id, page)
+        )
+        return f'<html><body><div class="show">{images}</div></body></html>'
+
+    def render_lazy_page(self, set_id: str, batches: int) -> str:
+        """第一批图片直接渲染，其余每次滚动到底部时追加一批（模拟懒加载）"""
+        pages = [self.image_paths(set_id, (n % self.pages_per_set) + 1) for n in range(batches)]
+        first = ''.join(f'<img src="{path}" style="display:block;height:400px">' for path in pages[0])
+        return (
+            f'<html><head><title>懒加载 {set_id}</title></head><body>'
+            f'<div class="photos">{first}</div>'
+            f'<script>var batches = {json.dumps(pages[1:])}, loading = false;'
+            f'window.addEventListener("scroll", function () {{'
+            f'  if (loading || !batches.length || window.innerHeight + window.scrollY < document.body.scrollHeight - 50) {{ return; }}'
+            f'  loading = true;'
+            f'  setTimeout(function () {{'
+            f'    var box = document.querySelector("div.photos");'
+            f'    batches.shift().forEach(function (src) {{'
+            f'      var img = document.createElement("img"); img.src = src + "?lazy=" + batches.length;'
+            f'      img.style.cssText = "display:block;height:400px"; box.appendChild(img);'
+            f'    }});'
+            f'    loading = false;'
+            f'  }}, 100);'
+            f'}});</script></body></html>'
+        )
+
+    @staticmethod
+    def _render_pager(page: int, total: int) -> str:
+        next_class = 'next disabled' if page >= total else 'next'
+        return f'<div class="pager"><a class="prev">上一页</a><a class="{next_class}">下一页</a></div>'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """按路径分发到合成站点"""
+    protocol_version = 'HTTP/1.1'
+
+    RANGE_RE = re.compile(r'^bytes=(\d+)-(\d*)$')
+    LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+    DETAIL_RE = re.compile(r'^/photo/id-([0-9a-f]+)(?:/(\d+))?\.html$')
+    SHOW_RE = re.compile(r'^/photo/show/id-([0-9a-f]+)\.html$')
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+        site = server.site
+
+        if path.startswith('/img/'):
+            kind = 'image'
+        elif path.startswith('/static/'):
+            kind = 'asset'
+        else:
+            kind = 'page'
+        server.record(kind)
+        time.sleep(site.image_latency if kind == 'image' else site.page_latency)
+
+        if site.session_cookie and path.startswith(('/photo', '/img/')):
+            morsel = SimpleCookie(self.headers.get('Cookie', '')).get('session')
+            if morsel is None or morsel.value != site.session_cookie:
+                server.record(f"{kind}_no_session")
+                return self._send(403, b'forbidden', 'text/plain')
+
+        rule, fault = site.faults.decide(path)
+        if fault:
+            server.record(f"{kind}_{fault}")
+            if self._inject_fault(rule, fault, *(self._image_range() if kind == 'image' else (200, b'', {}))):
+                return
+
+        if kind == 'image':
+            status, body, headers = self._image_range()
+            return self._send(status, body, 'image/jpeg', headers)
+
+        if path.startswith('/static/') and site.asset_size:
+            suffix = path[path.rfind('.'):]
+            if suffix in site.ASSET_TYPES:
+                body = b'/*' + b' ' * max(0, site.asset_size - 4) + b'*/'
+                return self._send(200, body, site.ASSET_TYPES[suffix])
+
+        if path == '/robots.txt':
+            return self._send(200, site.robots_txt.encode('utf-8'), 'text/plain')
+
+        if path == '/sitemap.xml':
+            base_url = f"http://{self.headers.get('Host')}"
+            return self._send(200, site.render_sitemap_index(base_url).encode('utf-8'), 'application/xml')
+
+        if path == '/sitemap-sets.xml.gz':
+            return self._send(200, site.render_sitemap(f"http://{self.headers.get('Host')}"), 'application/gzip')
+
+        if path == '/photos/sort-hot.html':
+            page = int(query.get('page', ['1'])[0])
+            return self._send_html(site.render_list_page(page))
+
+        match = self.DETAIL_RE.match(path)
+        if match and site.set_index(match.group(1)) is not None:
+            page = int(match.group(2) or 1)
+            if page > site.pages_per_set:
+                return self._send(404, b'not found', 'text/plain')
+            return self._send_html(site.render_detail_page(match.group(1), page))
+
+        if path == '/lazy.html':
+            lazy_id = query.get('id', [site.set_id(0)])[0]
+            if site.set_index(lazy_id) is not None:
+                batches = max(1, int(query.get('batches', ['3'])[0]))
+                return self._send_html(site.render_lazy_page(lazy_id, batches))
+
+        show_id = query.get('id', [None])[0] if path == '/photoShow.html' else None
+        match = self.SHOW_RE.match(path)
+        if match:
+            show_id = match.group(1)
+        if show_id and site.set_index(show_id) is not None:
+            return self._send_html(site.render_photo_show_page(show_id))
+
+        return self._send(404, b'not found', 'text/plain')
+
+    def do_HEAD(self):
+        """连接预热使用的 HEAD 请求，只返回响应头"""
+        self.server.record('head')
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _image_range(self):
+        """按 Range / If-Range 选择图片内容，返回 (状态码, 响应体, 额外响应头)"""
+        site = self.server.site
+        body = site.image_bytes()
+        etag = site.image_etag()
+        headers = {'ETag': etag, 'Last-Modified': self.LAST_MODIFIED}
+        if not site.range_requests:
+            return 200, body, headers
+        headers['Accept-Ranges'] = 'bytes'
+
+        match = self.RANGE_RE.match(self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        if not match or (if_range and if_range not in (etag, self.LAST_MODIFIED)):
+            return 200, body, headers
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+        if start > end:
+            headers['Content-Range'] = f'bytes */{len(body)}'
+            return 416, b'', headers
+        headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+        return 206, body[start:end + 1], headers
+
+    def _inject_fault(self, rule: FaultRule, fault: str, status: int, body: bytes,
+                      headers: Dict[str, str]) -> bool:
+        """注入故障，返回True表示已处理完本次请求"""
+        if fault == 'forbidden':
+            self._send(403, b'forbidden', 'text/plain')
+        elif fault == 'too_many':
+            self._send(429, b'too many requests', 'text/plain',
+                       {'Retry-After': str(rule.retry_after)})
+        elif fault == 'server_error':
+            self._send(503, b'service unavailable', 'text/plain')
+        elif fault == 'timeout':
+            time.sleep(rule.hang_seconds)
+            self.close_connection = True
+        elif fault == 'reset':
+            # SO_LINGER=0 使关闭时发送RST
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.close_connection = True
+        elif fault == 'truncate':
+            # 声明完整长度但只发送一半后断开
+            self.send_response(status)
+            self.send_header('Content-Type', 'image/jpeg')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.server.record_bytes(len(body) // 2)
+            self.close_connection = True
+        elif fault == 'slow':
+            if not body:
+                return False
+            self.send_response(status)
+            self.send_header('Content-Type', 'image/jpeg')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            chunks = 10
+            step = -(-len(body) // chunks)
+            for offset in range(0, len(body), step):
+                time.sleep(rule.slow_seconds / chunks)
+                self.wfile.write(body[offset:offset + step])
+            self.server.record_bytes(len(body))
+        return True
+
+    def _send_html(self, html: str):
+        self._send(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record_bytes(len(body))
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """在后台线程中运行的本地站点"""
+    daemon_threads = True
+
+    def __init__(self, site: FixtureSite, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FixtureHandler)
+        self.site = site
+        self.requests: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # 注入重置/截断故障后客户端断开属于预期情况
+        pass
+
+    def record(self, kind: str):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def record_bytes(self, count: int):
+        with self._lock:
+            self.bytes_sent += count
+
+    def start(self) -> 'FixtureServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+class H2FixtureServer:
+    """
+    明文 HTTP/2（h2c prior knowledge）图片服务器，用于对比 HTTP/1.1 和 HTTP/2 的连接数与延迟
+    只提供 /img/ 图片，每个流在独立线程中按 image_latency 延迟后响应，需要 h2 库
+    """
+
+    def __init__(self, site: FixtureSite, host: str = '127.0.0.1', port: int = 0):
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.exceptions
+
+        self._h2 = h2
+        self.site = site
+        self.connections = 0
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._socket = socket.create_server((host, port))
+        self._closed = False
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def _record(self, kind: str):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        h2 = self._h2
+        h2conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        # 同一把锁保护 H2Connection 和 socket 写入；流量控制窗口不足的流在其上等待
+        window = threading.Condition()
+        with window:
+            h2conn.initiate_connection()
+            conn.sendall(h2conn.data_to_send())
+        try:
+            while True:
+                data = conn.recv(65535)
+                if not data:
+                    break
+                with window:
+                    events = h2conn.receive_data(data)
+                    for event in events:
+                        if isinstance(event, h2.events.RequestReceived):
+                            path = dict(event.headers).get(b':path', b'/').decode()
+                            threading.Thread(target=self._respond, daemon=True,
+                                             args=(conn, h2conn, window, event.stream_id, path)).start()
+                        elif isinstance(event, h2.events.DataReceived):
+                            h2conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    window.notify_all()
+                    conn.sendall(h2conn.data_to_send())
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            conn.close()
+
+    def _respond(self, conn: socket.socket, h2conn, window: threading.Condition, stream_id: int, path: str):
+        site = self.site
+        self._record('image' if path.startswith('/img/') else 'page')
+        time.sleep(site.image_latency)
+        if path.startswith('/img/'):
+            status, body, content_type = 200, site.image_bytes(), 'image/jpeg'
+        else:
+            status, body, content_type = 404, b'not found', 'text/plain'
+        try:
+            with window:
+                h2conn.send_headers(stream_id, [(':status', str(status)), ('content-type', content_type),
+                                                ('content-length', str(len(body)))])
+                conn.sendall(h2conn.data_to_send())
+            offset = 0
+            while True:
+                with window:
+                    size = 0
+                    while offset < len(body):
+                        size = min(h2conn.local_flow_control_window(stream_id), h2conn.max_outbound_frame_size,
+                                   len(body) - offset)
+                        if size > 0:
+                            break
+                        window.wait()
+                    end = offset + size >= len(body)
+                    h2conn.send_data(stream_id, body[offset:offset + size], end_stream=end)
+                    conn.sendall(h2conn.data_to_send())
+                offset += size
+                if end:
+                    return
+        except (OSError, self._h2.exceptions.H2Error):
+            pass
+
+    def start(self) -> 'H2FixtureServer':
+        threading.Thread(target=self._accept, name='h2-fixture-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._closed = True
+        self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='本地合成站点（用于基准测试）')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--sets', type=int, default=10)
+    parser.add_argument('--pages-per-set', type=int, default=2)
+    parser.add_argument('--images-per-page', type=int, default=10)
+    parser.add_argument('--image-size', type=int, default=64 * 1024)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--image-latency', type=float, default=0.0)
+    parser.add_argument('--asset-size', type=int, default=0)
+    parser.add_argument('--faults', choices=sorted(FAULT_PROFILES), default='none')
+    args = parser.parse_args()
+
+    fixture = FixtureSite(sets=args.sets, pages_per_set=args.pages_per_set,
+                          images_per_page=args.images_per_page, image_size=args.image_size,
+                          page_latency=args.latency, image_latency=args.image_latency,
+                          faults=FAULT_PROFILES[args.faults](), asset_size=args.asset_size)
+    server = FixtureServer(fixture, port=args.port)
+    print(f"本地站点已启动: {server.base_url}/photos/sort-hot.html")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
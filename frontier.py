@@ -0,0 +1,233 @@
+"""
+套图调度队列 - 按可插拔的优先级决定套图的处理顺序
+
+优先级由 FRONTIER_PRIORITY 中逗号分隔的名称组成，按顺序逐级比较（值越小越先处理）:
+
+  rank      发现顺序（列表页的热门排序），默认
+  partial   之前已部分下载的套图优先（补齐未完成的下载）
+  small     已知图片数少的套图优先（尽快完成更多套图），图片数未知的排在最后
+  healthy   所在主机近期失败率低的套图优先
+
+例如 FRONTIER_PRIORITY=partial,small,rank。其它优先级通过 register_priority(name, fn) 注册，
+fn(item, frontier) 返回可比较的值。
+
+实现为两级带惰性删除的二叉堆: 每个主机一个套图堆（不含健康度，同一主机的套图健康度相同），
+主机堆按各主机堆顶套图的完整优先级排序。push / pop / update 为 O(log n)，record() 只需重新排序
+该主机在主机堆中的位置（O(log 主机数)）。更新优先级时旧条目只做标记，弹出时跳过，
+失效条目过多时整体重建。
+"""
+
+import heapq
+import itertools
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+
+class FrontierItem:
+    """队列中的一个套图"""
+    __slots__ = ('url', 'rank', 'host', 'features')
+
+    def __init__(self, url: str, rank: int, features: Dict):
+        self.url = url
+        self.rank = rank
+        self.host = urlparse(url).netloc
+        self.features = features
+
+
+PRIORITIES: Dict[str, Callable] = {
+    'rank': lambda item, frontier: item.rank,
+    'partial': lambda item, frontier: 0 if item.features.get('partial') else 1,
+    'small': lambda item, frontier: item.features.get('images') or float('inf'),
+    'healthy': lambda item, frontier: frontier.host_failure_rate(item.host),
+}
+# 取决于主机健康度的优先级（值只由 item.host 决定），record() 后重新计算该主机的位置
+HEALTH_PRIORITIES: Set[str] = {'healthy'}
+
+# 主机失败率的指数滑动平均系数
+HEALTH_ALPHA = 0.2
+
+
+def register_priority(name: str, fn: Callable, uses_health: bool = False):
+    """注册自定义优先级，uses_health 时 fn 的值只能由套图所在的主机决定"""
+    PRIORITIES[name] = fn
+    if uses_health:
+        HEALTH_PRIORITIES.add(name)
+
+
+class Frontier:
+    """套图优先级队列"""
+
+    def __init__(self, priorities: Iterable[str] = ('rank',)):
+        self.priorities = [name.strip() for name in priorities if name.strip()] or ['rank']
+        unknown = [name for name in self.priorities if name not in PRIORITIES]
+        if unknown:
+            raise ValueError(f"未知的优先级: {', '.join(unknown)}（可选: {', '.join(sorted(PRIORITIES))}）")
+        self._keys = [PRIORITIES[name] for name in self.priorities]
+        # 主机堆内排序用的优先级: 健康度的位置取常数
+        self._item_keys = [(lambda item, frontier: 0) if name in HEALTH_PRIORITIES else PRIORITIES[name]
+                           for name in self.priorities]
+        self._uses_health = any(name in HEALTH_PRIORITIES for name in self.priorities)
+        # 主机 -> 该主机的套图堆，条目: [优先级（不含健康度）, 序号, FrontierItem]，失效条目的 FrontierItem 置为None
+        self._heaps: Dict[str, List[list]] = {}
+        self._entries: Dict[str, list] = {}
+        # 各主机堆中的条目总数（包括失效条目）
+        self._size = 0
+        # 主机堆，条目: [堆顶套图的完整优先级, 堆顶套图的序号, 条目序号, 主机]，失效条目的主机置为None
+        self._host_heap: List[list] = []
+        self._host_entries: Dict[str, list] = {}
+        self._health: Dict[str, float] = {}
+        self._counter = itertools.count()
+        self._next_rank = 0
+        # 最近一次 pop() 取出的条目
+        self._popped: Optional[FrontierItem] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def uses(self, name: str) -> bool:
+        return name in self.priorities
+
+    def _priority(self, item: FrontierItem) -> tuple:
+        return tuple(key(item, self) for key in self._keys)
+
+    def _item_priority(self, item: FrontierItem) -> tuple:
+        return tuple(key(item, self) for key in self._item_keys)
+
+    def _insert(self, item: FrontierItem):
+        entry = [self._item_priority(item), next(self._counter), item]
+        self._entries[item.url] = entry
+        heap = self._heaps.setdefault(item.host, [])
+        heapq.heappush(heap, entry)
+        self._size += 1
+        if heap[0] is entry:
+            self._schedule(item.host)
+
+    def _schedule(self, host: str):
+        """按主机堆顶的套图（重新）放入主机堆，主机没有套图时移除"""
+        old = self._host_entries.pop(host, None)
+        if old is not None:
+            old[-1] = None
+        heap = self._heaps.get(host)
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+            self._size -= 1
+        if not heap:
+            self._heaps.pop(host, None)
+            return
+        top = heap[0]
+        entry = [self._priority(top[-1]), top[1], next(self._counter), host]
+        self._host_entries[host] = entry
+        heapq.heappush(self._host_heap, entry)
+
+    def _invalidate(self, url: str) -> Optional[FrontierItem]:
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return None
+        item, entry[-1] = entry[-1], None
+        if self._heaps[item.host][0] is entry:
+            self._schedule(item.host)
+        # 失效条目超过一半时重建堆，避免堆无限增长
+        if self._size > 2 * len(self._entries) + 1024:
+            self.rescore()
+        return item
+
+    def push(self, url: str, rank: int = None, **features) -> bool:
+        """加入套图，已在队列中时返回False（用 update 修改优先级）"""
+        if url in self._entries:
+            return False
+        if rank is None:
+            rank = self._next_rank
+        self._next_rank = max(self._next_rank, rank + 1)
+        self._insert(FrontierItem(url, rank, features))
+        return True
+
+    def update(self, url: str, **features) -> bool:
+        """运行中更新套图的特征并重新排序，不在队列中时返回False"""
+        item = self._invalidate(url)
+        if item is None:
+            return False
+        item.features.update(features)
+        self._insert(item)
+        return True
+
+    def pop(self) -> Optional[str]:
+        """取出优先级最高的套图，队列为空时返回None"""
+        while self._host_heap:
+            host = heapq.heappop(self._host_heap)[-1]
+            if host is None:
+                continue
+            del self._host_entries[host]
+            # 主机堆中的条目总是对应该主机当前有效的堆顶
+            item = heapq.heappop(self._heaps[host])[-1]
+            self._size -= 1
+            del self._entries[item.url]
+            self._schedule(host)
+            self._popped = item
+            return item.url
+        return None
+
+    def pop_where(self, predicate: Callable[[FrontierItem], bool], lookahead: int = 50) -> Optional[str]:
+        """
+        在优先级最高的 lookahead 个套图中取出第一个满足条件的（例如剩余预算放得下的），
+        跳过的套图保持原优先级放回，都不满足时返回None
+        """
+        skipped = []
+        found = None
+        while len(skipped) < lookahead:
+            url = self.pop()
+            if url is None:
+                break
+            item = self._popped
+            if predicate(item):
+                found = url
+                break
+            skipped.append(item)
+        for item in skipped:
+            self._insert(item)
+        return found
+
+    def drain(self) -> List[str]:
+        """按优先级取出全部套图"""
+        urls = []
+        while True:
+            url = self.pop()
+            if url is None:
+                return urls
+            urls.append(url)
+
+    def host_failure_rate(self, host: str) -> float:
+        return round(self._health.get(host, 0.0), 2)
+
+    def record(self, url: str, success: bool):
+        """记录套图结果，更新所在主机的健康度并重新排序该主机（不需要重新计算其中的套图）"""
+        host = urlparse(url).netloc
+        previous = self._health.get(host, 0.0)
+        self._health[host] = previous + HEALTH_ALPHA * ((0.0 if success else 1.0) - previous)
+        if self._uses_health and host in self._heaps and self.host_failure_rate(host) != round(previous, 2):
+            self._schedule(host)
+
+    def rescore(self):
+        """重新计算所有套图的优先级（O(n)）"""
+        items = [entry[-1] for entry in self._entries.values()]
+        self._heaps = {}
+        self._entries = {}
+        self._host_heap = []
+        self._host_entries = {}
+        for item in items:
+            entry = [self._item_priority(item), next(self._counter), item]
+            self._entries[item.url] = entry
+            self._heaps.setdefault(item.host, []).append(entry)
+        self._size = len(items)
+        for host, heap in self._heaps.items():
+            heapq.heapify(heap)
+            top = heap[0]
+            self._host_entries[host] = [self._priority(top[-1]), top[1], next(self._counter), host]
+        self._host_heap = list(self._host_entries.values())
+        heapq.heapify(self._host_heap)
+
+
+def parse_priorities(value: str) -> List[str]:
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
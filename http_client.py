@@ -0,0 +1,169 @@
+"""
+图片下载的 HTTP 客户端
+
+  HTTP_CLIENT=http1   requests.Session 连接池（默认），同一主机的并发请求各占一个连接
+  HTTP_CLIENT=http2   httpx HTTP/2 客户端，多个图片请求在少数几个连接上多路复用（需要 pip install 'httpx[http2]'）
+
+两种客户端的 get() 参数和返回值与 requests.get 一致（status_code / headers / content /
+iter_content，可用作上下文管理器），网络错误统一抛出 requests.exceptions.Timeout / ConnectionError，
+下载逻辑不需要区分后端。
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+BACKENDS = ('http1', 'http2')
+
+
+class RequestsClient:
+    """共享的 requests.Session，连接池大小与下载线程数相同"""
+    backend = 'http1'
+
+    def __init__(self, pool_size: int = 10):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, headers: Dict = None, proxies: Dict = None, timeout: float = 15,
+            cookies: Dict = None, stream: bool = False):
+        return self.session.get(url, headers=headers, proxies=proxies, timeout=timeout, cookies=cookies,
+                                stream=stream, allow_redirects=True)
+
+    def warm(self, origin: str, count: int = 2) -> int:
+        """
+        向 origin 的连接池预先打开最多 count 个连接（包括 TLS 握手），返回成功的请求数
+        同时保持 count 个 stream=True 的 HEAD 响应（读取前不归还连接），每个请求各占一个连接
+        """
+        responses = []
+        try:
+            for _ in range(count):
+                responses.append(self.session.head(origin, timeout=10, stream=True, allow_redirects=False))
+        finally:
+            for response in responses:
+                # 读完（HEAD 没有响应体）后连接归还连接池，供之后的下载复用
+                response.content
+                response.close()
+        return len(responses)
+
+    def close(self):
+        self.session.close()
+
+
+class Http2Response:
+    """把 httpx.Response 包装成下载逻辑使用的 requests 风格接口"""
+
+    def __init__(self, response, errors):
+        self._response = response
+        self._errors = errors
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.http_version = response.http_version
+
+    @property
+    def content(self) -> bytes:
+        with self._errors():
+            return self._response.read()
+
+    def iter_content(self, chunk_size: int = 16 * 1024):
+        with self._errors():
+            yield from self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class Http2Client:
+    """
+    httpx HTTP/2 客户端，每个代理（或直连）一个 httpx.Client
+    HTTP/2 连接上的请求多路复用，max_connections 限制每个客户端打开的连接数
+    """
+    backend = 'http2'
+
+    def __init__(self, max_connections: int = 4, prior_knowledge: bool = False):
+        # 可选依赖，未安装时由 create_http_client 回退到 http1
+        import h2  # noqa: F401
+        import httpx
+
+        self._httpx = httpx
+        self.max_connections = max_connections
+        # 明文 http:// 地址只有在 prior_knowledge（h2c）时才使用 HTTP/2，https 通过 ALPN 协商
+        self.prior_knowledge = prior_knowledge
+        self._clients: Dict[Optional[str], object] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, proxy: Optional[str]):
+        with self._lock:
+            client = self._clients.get(proxy)
+            if client is None:
+                httpx = self._httpx
+                client = self._clients[proxy] = httpx.Client(
+                    http1=not self.prior_knowledge,
+                    http2=True,
+                    proxy=proxy,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections),
+                )
+            return client
+
+    @contextmanager
+    def _errors(self):
+        """把 httpx 的网络异常转换为 requests 的异常类型"""
+        httpx = self._httpx
+        try:
+            yield
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+    def get(self, url: str, headers: Dict = None, proxies: Dict = None, timeout: float = 15,
+            cookies: Dict = None, stream: bool = False) -> Http2Response:
+        proxy = (proxies or {}).get(urlparse(url).scheme)
+        headers = dict(headers or {})
+        if cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in cookies.items())
+        client = self._client(proxy)
+        request = client.build_request('GET', url, headers=headers, timeout=timeout)
+        with self._errors():
+            response = client.send(request, stream=stream)
+        return Http2Response(response, self._errors)
+
+    def warm(self, origin: str, count: int = 2) -> int:
+        """HTTP/2 只需要一个连接: 发送 HEAD 请求建立连接"""
+        with self._errors():
+            self._client(None).head(origin, timeout=10)
+        return 1
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+def create_http_client(config, logger=None):
+    """根据 HTTP_CLIENT 创建下载客户端，httpx 未安装时回退到 http1"""
+    backend = (getattr(config, 'HTTP_CLIENT', '') or 'http1').lower()
+    if backend == 'http2':
+        try:
+            return Http2Client(config.HTTP2_MAX_CONNECTIONS)
+        except ImportError:
+            if logger:
+                logger.warning("HTTP/2 需要安装 httpx[http2]，改用 HTTP/1.1")
+    return RequestsClient(config.MAX_WORKERS)
@@ -1,39 +1,170 @@
-import logging
+"""
+日志配置 - 队列化的非阻塞日志
+
+所有 logger 共享同一个 QueueHandler：调用线程只把日志记录放入内存队列，
+由一个 QueueListener 后台线程写入文件和控制台。每个进程每次运行只创建一个日志文件。
+
+  LOG_FORMAT=json       日志文件使用 JSON Lines 格式（控制台保持文本格式）
+  LOG_RATE_LIMIT=20     同一代码位置在 LOG_RATE_INTERVAL 秒内最多输出的 WARNING 及以下日志数，0 不限制
+"""
+
 import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+import logging.handlers
 from datetime import datetime
+from typing import Dict, Optional
+
+from config import Config
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+            'process': record.process,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按代码位置（文件 + 行号）限流: 每个窗口内最多放行 limit 条，
+    之后的记录丢弃并计数，下一个窗口的第一条日志附带省略的条数。
+    ERROR 及以上级别不限流。
+    """
+
+    def __init__(self, limit: int = 20, interval: float = 10.0, max_level: int = logging.WARNING,
+                 clock=time.monotonic):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.max_level = max_level
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (pathname, lineno) -> [窗口开始时间, 已放行条数, 已省略条数]
+        self._windows: Dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} (已省略 {suppressed} 条同一位置的日志)"
+            record.args = None
+        return True
+
+
+class _LogSink:
+    """进程内唯一的日志输出: 队列 + 后台写入线程"""
+
+    def __init__(self, log_dir: str, log_format: str, rate_limit: int, rate_interval: float):
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
 
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # 多进程模式下的工作进程各自写独立的文件
+        suffix = f'_{os.getpid()}' if multiprocessing.parent_process() is not None else ''
+        self.log_file = os.path.join(log_dir, f'crawler_{timestamp}{suffix}.log')
+
+        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        file_handler.setLevel(logging.DEBUG)
+        if log_format == 'json':
+            file_handler.setFormatter(JsonLinesFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            ))
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%H:%M:%S'
+        ))
+
+        self.queue = queue.SimpleQueue()
+        self.handler = logging.handlers.QueueHandler(self.queue)
+        self.handler.setLevel(logging.DEBUG)
+        self.handler.addFilter(RateLimitFilter(rate_limit, rate_interval))
+        self.listener = logging.handlers.QueueListener(
+            self.queue, file_handler, console_handler, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def stop(self):
+        """写完队列中剩余的日志并关闭文件"""
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_sink: Optional[_LogSink] = None
+_sink_lock = threading.Lock()
+
+
+def _get_sink(log_dir: Optional[str]) -> _LogSink:
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = _LogSink(log_dir or Config.LOGS_DIR, Config.LOG_FORMAT.lower(),
+                             Config.LOG_RATE_LIMIT, Config.LOG_RATE_INTERVAL)
+        return _sink
+
+
+def setup_logger(name='crawler', log_dir=None):
+    """获取连接到本次运行共享日志输出的 logger（多次调用不会创建新的日志文件）"""
+    sink = _get_sink(log_dir)
 
-def setup_logger(name='crawler', log_dir='logs'):
-    """设置日志记录器"""
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = os.path.join(log_dir, f'crawler_{timestamp}.log')
-    
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
-    
-    if logger.handlers:
+    logger.propagate = False
+    if sink.handler not in logger.handlers:
         logger.handlers.clear()
-    
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_formatter)
-    
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%H:%M:%S'
-    )
-    console_handler.setFormatter(console_formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+        logger.addHandler(sink.handler)
     return logger
+
+
+def current_log_file() -> Optional[str]:
+    """本次运行的日志文件路径"""
+    return _sink.log_file if _sink else None
+
+
+def shutdown_logging():
+    """停止后台写入线程（进程退出时自动调用）"""
+    global _sink
+    with _sink_lock:
+        if _sink is not None:
+            _sink.stop()
+            _sink = None
+
+
+atexit.register(shutdown_logging)
@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import sys
+import time
+from datetime import datetime
 from config import Config
+from catalog import Catalog, catalog_path, parse_since
+from run_log import rebuild_summary
+from budget import parse_duration, parse_size
+from frontier import Frontier, parse_priorities
 from crawler import ImageCrawler
 from logger_config import setup_logger
 
 
-def parse_arguments():
-    """解析命令行参数"""
+def parse_arguments(argv=None):
+    """解析命令行参数（argv 为空时使用 sys.argv）"""
     parser = argparse.ArgumentParser(
         description='图片爬虫 - 从网站爬取并下载图片',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -17,6 +24,15 @@ def parse_arguments():
   python main.py --url https://example.com --depth 2 --max-pages 20
   python main.py --use-proxy --proxy-file proxies.txt
   python main.py --output my_images --workers 10
+  python main.py --trace-file logs/trace.json
+  python main.py --list-pages 5 --processes 4
+  python main.py --discovery sitemap
+  python main.py --list-pages 5 --queue /mnt/shared/queue.db
+  python main.py --queue /mnt/shared/queue.db --worker
+  python main.py --mode site --url https://example.com/ --max-depth 2 --page-workers 4
+  python main.py catalog status
+  python main.py catalog failures --since 7d
+  python main.py summary --output output
         """
     )
     
@@ -27,6 +43,14 @@ def parse_arguments():
         help='列表页URL (默认: https://8se.me/photos/sort-hot.html)'
     )
     
+    parser.add_argument(
+        '--mode',
+        type=str,
+        choices=['sets', 'site'],
+        default='sets',
+        help='sets: 8se.me 套图爬取（默认）; site: 从 --url 开始并发广度优先爬取通用页面'
+    )
+    
     parser.add_argument(
         '--list-pages',
         type=int,
@@ -34,6 +58,21 @@ def parse_arguments():
         help=f'要爬取的列表页数量 (默认: {Config.LIST_PAGES})'
     )
     
+    parser.add_argument(
+        '--discovery',
+        type=str,
+        choices=['list', 'sitemap'],
+        default=Config.DISCOVERY,
+        help='套图发现方式: list 渲染列表页; sitemap 读取站点地图，只处理新的或已更新的套图 (默认: list)'
+    )
+    
+    parser.add_argument(
+        '--sitemap',
+        nargs='*',
+        default=None,
+        help='使用站点地图发现套图，可以指定地址（不指定时使用 SITEMAP_URLS，或从 robots.txt 或 /sitemap.xml 查找）'
+    )
+    
     parser.add_argument(
         '--depth',
         type=int,
@@ -48,6 +87,27 @@ def parse_arguments():
         help=f'最大爬取页面数 (默认: {Config.MAX_PAGES})'
     )
     
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        default=Config.MAX_DEPTH,
+        help=f'站点爬取模式的最大链接深度 (默认: {Config.MAX_DEPTH})'
+    )
+    
+    parser.add_argument(
+        '--page-workers',
+        type=int,
+        default=Config.PAGE_WORKERS,
+        help=f'站点爬取模式的并发页面数，每个页面线程复用一个浏览器 (默认: {Config.PAGE_WORKERS})'
+    )
+    
+    parser.add_argument(
+        '--allow-domains',
+        nargs='*',
+        default=Config.ALLOWED_DOMAINS,
+        help='站点爬取模式允许的域名（包括子域名，默认只爬取起始URL的主机）'
+    )
+    
     parser.add_argument(
         '--output',
         type=str,
@@ -108,12 +168,209 @@ def parse_arguments():
         action='store_true',
         help='不跳过已存在的文件'
     )
+
+    parser.add_argument(
+        '--no-js-extraction',
+        action='store_true',
+        help='不在页面内提取数据，改为传输完整page_source后在Python中解析'
+    )
+
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=Config.PROCESSES,
+        help=f'工作进程数，大于1时将套图分片到多个进程 (默认: {Config.PROCESSES})'
+    )
+
+    parser.add_argument(
+        '--queue',
+        type=str,
+        default=Config.WORK_QUEUE,
+        help='套图任务队列（SQLite文件路径或 sqlite:///path），多台机器共享时协调爬取'
+    )
+
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='工作节点模式: 不爬列表页，只从 --queue 领取套图'
+    )
+
+    parser.add_argument(
+        '--lease-timeout',
+        type=float,
+        default=Config.QUEUE_VISIBILITY_TIMEOUT,
+        help=f'任务租约时长（秒），超时未续租的任务会被重新领取 (默认: {Config.QUEUE_VISIBILITY_TIMEOUT:g})'
+    )
+
+    parser.add_argument(
+        '--page-load-strategy',
+        type=str,
+        choices=['normal', 'eager', 'none'],
+        default=Config.PAGE_LOAD_STRATEGY,
+        help=f'浏览器页面加载策略 (默认: {Config.PAGE_LOAD_STRATEGY})'
+    )
+
+    parser.add_argument(
+        '--no-js-pages',
+        nargs='*',
+        choices=['list', 'detail', 'show', 'generic'],
+        default=Config.NO_JS_PAGE_TYPES,
+        help='禁用JavaScript的页面类型（页面结构为静态HTML时使用）'
+    )
+
+    parser.add_argument(
+        '--postprocess',
+        type=str,
+        choices=['webp', 'avif'],
+        default=Config.POSTPROCESS_FORMAT or None,
+        help='下载后转码为 WebP/AVIF 并生成缩略图（在进程池中执行）'
+    )
+
+    parser.add_argument(
+        '--priority',
+        type=str,
+        default=Config.FRONTIER_PRIORITY,
+        help='套图处理顺序，逗号分隔的优先级: rank, partial, small, healthy (默认: rank)'
+    )
+
+    parser.add_argument(
+        '--time-budget',
+        type=str,
+        default=Config.TIME_BUDGET,
+        help='运行时间上限，如 30m、2h（剩余时间不够完成下一个套图时停止）'
+    )
+
+    parser.add_argument(
+        '--byte-budget',
+        type=str,
+        default=Config.BYTE_BUDGET,
+        help='图片下载流量上限，如 500M、5G'
+    )
+
+    parser.add_argument(
+        '--http2',
+        action='store_true',
+        help='使用 HTTP/2 多路复用下载图片（需要 pip install \'httpx[http2]\'）'
+    )
+
+    parser.add_argument(
+        '--hybrid',
+        action='store_true',
+        default=Config.HYBRID,
+        help='混合模式: 浏览器只建立一次会话，页面和图片通过 HTTP 获取，403 增多时刷新会话'
+    )
+
+    parser.add_argument(
+        '--dedupe',
+        action='store_true',
+        help='按感知哈希跳过近似重复的图片（同一照片的其它分辨率或裁剪版本）'
+    )
+
+    parser.add_argument(
+        '--trace-file',
+        type=str,
+        default=Config.TRACE_FILE,
+        help='Span追踪输出文件，留空则不追踪 (.jsonl 或 Chrome trace .json)'
+    )
+
+    parser.add_argument(
+        '--trace-format',
+        type=str,
+        choices=['jsonl', 'chrome'],
+        default=Config.TRACE_FORMAT or None,
+        help='追踪文件格式 (默认按扩展名推断)'
+    )
     
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def _format_time(timestamp) -> str:
+    if not timestamp:
+        return '-'
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def catalog_command(argv) -> int:
+    """查询下载目录索引: python main.py catalog {status,incomplete,failures,import}"""
+    parser = argparse.ArgumentParser(prog='main.py catalog', description='查询下载目录索引')
+    parser.add_argument('command', choices=['status', 'incomplete', 'failures', 'import'])
+    parser.add_argument('--output', type=str, default=Config.OUTPUT_DIR,
+                        help=f'输出目录 (默认: {Config.OUTPUT_DIR})')
+    parser.add_argument('--catalog', type=str, default=None,
+                        help=f'索引文件 (默认: <输出目录>/{Config.CATALOG_FILE or "catalog.db"})')
+    parser.add_argument('--limit', type=int, default=100, help='最多显示的条数 (默认: 100)')
+    parser.add_argument('--since', type=str, default=None, help='failures 的时间起点，如 7d、12h、2024-01-01')
+    parser.add_argument('--json', action='store_true', help='以JSON输出')
+    args = parser.parse_args(argv)
+
+    Config.OUTPUT_DIR = args.output
+    Config.CATALOG_FILE = Config.CATALOG_FILE or 'catalog.db'
+    catalog = Catalog(args.catalog or catalog_path(Config))
+    try:
+        if args.command == 'status':
+            result = catalog.status()
+        elif args.command == 'incomplete':
+            result = catalog.incomplete(args.limit)
+        elif args.command == 'failures':
+            since = parse_since(args.since) if args.since else 0.0
+            result = catalog.failures(since, args.limit)
+        else:
+            started = time.time()
+            count = catalog.import_metadata(args.output)
+            result = {'imported_sets': count, 'seconds': round(time.time() - started, 2)}
+    finally:
+        catalog.close()
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.command == 'status':
+        print(f"套图: {result['sets_total']} (不完整 {result['sets_incomplete']})")
+        for status, count in sorted(result['sets'].items(), key=lambda item: str(item[0])):
+            print(f"  {status}: {count}")
+        print(f"图片: {result['images_total']}")
+        for status, count in sorted(result['images'].items(), key=lambda item: str(item[0])):
+            print(f"  {status}: {count}")
+        print(f"已下载: {result['bytes_downloaded'] / 1024 / 1024:.2f} MB")
+        print(f"最近完成: {_format_time(result['last_finished'])}")
+    elif args.command == 'incomplete':
+        for row in result:
+            print(f"{row['photo_id']}  [{row['status']}] 成功 {row['images_downloaded']} 失败 {row['images_failed']}"
+                  f"  {_format_time(row['finished'])}  {row['title'] or ''}")
+        print(f"共 {len(result)} 个套图")
+    elif args.command == 'failures':
+        for row in result:
+            print(f"{_format_time(row['updated'])}  {row['photo_id'] or '-'}  尝试 {row['attempts']}  "
+                  f"{row['url']}  {row['error'] or ''}")
+        print(f"共 {len(result)} 张图片")
+    else:
+        print(f"已导入 {result['imported_sets']} 个套图 ({result['seconds']} 秒)")
+    return 0
+
+
+def summary_command(argv) -> int:
+    """从运行日志重新生成下载摘要（用于异常中断的运行）: python main.py summary"""
+    parser = argparse.ArgumentParser(prog='main.py summary', description='从 run_log.jsonl 重新生成下载摘要')
+    parser.add_argument('--output', type=str, default=Config.OUTPUT_DIR,
+                        help=f'输出目录 (默认: {Config.OUTPUT_DIR})')
+    parser.add_argument('--node', type=str, default=None,
+                        help='任务队列模式下的节点名称（读取 run_log.<节点>.jsonl）')
+    args = parser.parse_args(argv)
+
+    summary_path = rebuild_summary(args.output, args.node)
+    if not summary_path:
+        print(f"未找到运行日志: {args.output}")
+        return 1
+    print(f"下载摘要已生成: {summary_path}")
+    return 0
 
 
 def main():
     """主函数"""
+    if sys.argv[1:2] == ['catalog']:
+        sys.exit(catalog_command(sys.argv[2:]))
+    if sys.argv[1:2] == ['summary']:
+        sys.exit(summary_command(sys.argv[2:]))
+
     logger = setup_logger('main')
     
     try:
@@ -121,10 +378,21 @@ def main():
         
         Config.START_URL = args.url
         Config.LIST_PAGES = args.list_pages
+        # 不带地址的 --sitemap 同样启用站点地图发现
+        Config.DISCOVERY = 'sitemap' if args.sitemap is not None else args.discovery
+        if args.sitemap:
+            Config.SITEMAP_URLS = args.sitemap
         Config.DETAIL_DEPTH = args.depth
         Config.MAX_PAGES = args.max_pages
+        Config.MAX_DEPTH = args.max_depth
+        Config.PAGE_WORKERS = args.page_workers
+        Config.ALLOWED_DOMAINS = [domain.lower() for domain in args.allow_domains]
         Config.OUTPUT_DIR = args.output
         Config.MAX_WORKERS = args.workers
+        Config.PROCESSES = args.processes
+        Config.WORK_QUEUE = args.queue
+        Config.QUEUE_WORKER = Config.QUEUE_WORKER or args.worker
+        Config.QUEUE_VISIBILITY_TIMEOUT = args.lease_timeout
         Config.USE_PROXY = args.use_proxy
         Config.PROXY_LIST_FILE = args.proxy_file
         Config.HEADLESS = not args.no_headless
@@ -132,6 +400,32 @@ def main():
         Config.MIN_DELAY = args.min_delay
         Config.MAX_DELAY = args.max_delay
         Config.SKIP_EXISTING = not args.no_skip_existing
+        Config.JS_EXTRACTION = Config.JS_EXTRACTION and not args.no_js_extraction
+        Config.PAGE_LOAD_STRATEGY = args.page_load_strategy
+        Config.NO_JS_PAGE_TYPES = args.no_js_pages
+        Config.POSTPROCESS_FORMAT = args.postprocess or ''
+        Config.FRONTIER_PRIORITY = args.priority
+        Config.TIME_BUDGET = args.time_budget or ''
+        Config.BYTE_BUDGET = args.byte_budget or ''
+        if args.http2:
+            Config.HTTP_CLIENT = 'http2'
+        Config.HYBRID = args.hybrid
+        if args.dedupe and not Config.PHASH_INDEX:
+            Config.PHASH_INDEX = 'phash_index.jsonl'
+        Config.TRACE_FILE = args.trace_file
+        Config.TRACE_FORMAT = args.trace_format or ''
+        
+        if Config.QUEUE_WORKER and not Config.WORK_QUEUE:
+            logger.error("--worker 需要同时指定 --queue")
+            sys.exit(2)
+        
+        try:
+            Frontier(parse_priorities(Config.FRONTIER_PRIORITY))
+            parse_duration(Config.TIME_BUDGET)
+            parse_size(Config.BYTE_BUDGET)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(2)
         
         if Config.USE_PROXY:
             Config.load_proxies_from_file()
@@ -144,7 +438,10 @@ def main():
         
         crawler = ImageCrawler(Config)
         
-        crawler.crawl()
+        if args.mode == 'site':
+            crawler.crawl_site()
+        else:
+            crawler.crawl()
         
         logger.info("爬虫运行完成")
         
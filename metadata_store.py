@@ -0,0 +1,255 @@
+"""
+套图元数据的内存存储
+
+每个套图第一次打开时读取一次 metadata.json 并扫描一次目录（断点续传），
+之后每保存一张图片只更新内存中的记录；按时间间隔或图片数量定期落盘，
+套图结束时再写一次。写入使用临时文件 + os.replace，读者不会看到写了一半的文件。
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from tracer import NullTracer
+
+
+METADATA_FILE = 'metadata.json'
+
+
+def load_metadata(photo_folder: str) -> Optional[Dict]:
+    """读取 metadata.json，不存在时返回None（格式错误时抛出异常）"""
+    path = os.path.join(photo_folder, METADATA_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json_atomic(path: str, data, indent: Optional[int] = None):
+    """写入临时文件后原子替换目标文件"""
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if indent is None:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class _SetRecord:
+    """一个套图的内存元数据"""
+    __slots__ = ('metadata', 'image_files', 'processed', 'dirty', 'pending_images', 'last_flush')
+
+    def __init__(self, metadata: Dict, image_files: set):
+        self.metadata = metadata
+        self.image_files = image_files
+        self.processed: Dict[str, Dict] = dict(metadata.get('processed_images') or {})
+        self.dirty = False
+        self.pending_images = 0
+        self.last_flush = time.monotonic()
+
+
+class MetadataStore:
+    """按套图目录管理内存元数据，线程安全"""
+
+    def __init__(self, image_suffixes: tuple, logger=None, tracer=None,
+                 flush_interval: float = 5.0, flush_every: int = 50):
+        self.image_suffixes = image_suffixes
+        self.logger = logger
+        self.tracer = tracer or NullTracer()
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        # 串行化写盘，避免较旧的快照覆盖较新的文件
+        self._write_lock = threading.Lock()
+        self._sets: Dict[str, _SetRecord] = {}
+
+    def _log(self, level: str, message: str):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def open(self, photo_folder: str, photo_id: str, photo_url: str) -> Dict:
+        """
+        打开套图（已打开时直接返回内存中的元数据）
+        第一次打开时读取已有的 metadata.json，并扫描一次目录中的图片文件
+        """
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if record:
+                return record.metadata
+
+        try:
+            metadata = load_metadata(photo_folder)
+            if metadata:
+                self._log('info', f"加载已存在的元数据: {photo_folder}")
+        except (OSError, ValueError) as e:
+            self._log('warning', f"加载元数据失败 {photo_folder}: {e}")
+            metadata = None
+
+        if metadata:
+            metadata['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            metadata = {
+                'title': f'套图 {photo_id}',
+                'photo_id': photo_id,
+                'photo_url': photo_url,
+                'total_pages': 0,
+                'total_images': 0,
+                'download_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'images_downloaded': 0,
+                'images_failed': 0,
+                'image_files': [],
+                'failed_images': []
+            }
+
+        image_files = set()
+        if os.path.isdir(photo_folder):
+            with os.scandir(photo_folder) as entries:
+                image_files = {entry.name for entry in entries
+                               if entry.name.lower().endswith(self.image_suffixes)}
+
+        with self._lock:
+            record = self._sets.setdefault(photo_folder, _SetRecord(metadata, image_files))
+            return record.metadata
+
+    def is_open(self, photo_folder: str) -> bool:
+        with self._lock:
+            return photo_folder in self._sets
+
+    def update(self, photo_folder: str, **fields):
+        """更新基本信息（None 值忽略）"""
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if record:
+                record.metadata.update({k: v for k, v in fields.items() if v is not None})
+                record.dirty = True
+
+    def add_image(self, photo_folder: str, filename: str):
+        """登记已保存的图片，达到落盘条件时写入 metadata.json"""
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if not record or filename in record.image_files:
+                return
+            record.image_files.add(filename)
+            record.dirty = True
+            record.pending_images += 1
+            due = (record.pending_images >= self.flush_every or
+                   time.monotonic() - record.last_flush >= self.flush_interval)
+        if due:
+            self.flush(photo_folder)
+
+    def remove_image(self, photo_folder: str, filename: str):
+        """
+        移除已删除的图片（近似去重时被更高分辨率版本替换）
+        套图未打开时直接修改其 metadata.json（套图可能已在之前结束或属于之前的运行）
+        """
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if record:
+                if filename in record.image_files:
+                    record.image_files.discard(filename)
+                    record.processed.pop(filename, None)
+                    record.dirty = True
+                return
+        path = os.path.join(photo_folder, METADATA_FILE)
+        with self._write_lock:
+            try:
+                metadata = load_metadata(photo_folder)
+                if not metadata or filename not in metadata.get('image_files', []):
+                    return
+                metadata['image_files'] = [name for name in metadata['image_files'] if name != filename]
+                metadata['images_downloaded'] = len(metadata['image_files'])
+                write_json_atomic(path, metadata, indent=2)
+                self._log('debug', f"已从元数据中移除 {filename}: {path}")
+            except (OSError, ValueError) as e:
+                self._log('error', f"更新元数据失败 {path}: {e}")
+
+    def add_processed(self, photo_folder: str, result: Dict):
+        """记录一张图片的后处理结果（转码输出、缩略图和节省的字节数）"""
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if record:
+                entry = {key: value for key, value in result.items() if key != 'filename'}
+                record.processed[result['filename']] = entry
+                record.dirty = True
+
+    def set_failures(self, photo_folder: str, failures: list):
+        """记录失败的图片"""
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if record:
+                record.metadata['failed_images'] = list(failures)
+                record.metadata['images_failed'] = len(failures)
+                record.dirty = True
+
+    def snapshot(self, photo_folder: str) -> Optional[Dict]:
+        """返回当前元数据的副本（包含最新的图片列表）"""
+        with self._lock:
+            record = self._sets.get(photo_folder)
+            if not record:
+                return None
+            return self._materialize(record)
+
+    @staticmethod
+    def _materialize(record: _SetRecord) -> Dict:
+        metadata = dict(record.metadata)
+        metadata['image_files'] = sorted(record.image_files)
+        metadata['images_downloaded'] = len(record.image_files)
+        if record.processed:
+            metadata['processed_images'] = dict(record.processed)
+            done = [entry for entry in record.processed.values() if entry.get('status') == 'success']
+            original = sum(entry['original_bytes'] for entry in done)
+            output = sum(entry['output_bytes'] for entry in done)
+            metadata['processing'] = {
+                'images_processed': len(done),
+                'images_failed': len(record.processed) - len(done),
+                'original_bytes': original,
+                'output_bytes': output,
+                'saved_bytes': original - output,
+            }
+        return metadata
+
+    def flush(self, photo_folder: str, final: bool = False) -> Optional[Dict]:
+        """
+        将套图元数据写入磁盘（无变化时跳过），返回写入的元数据
+        final=True 时写入缩进格式并从内存中移除该套图
+        """
+        with self._write_lock:
+            with self._lock:
+                record = self._sets.get(photo_folder)
+                if not record:
+                    return None
+                metadata = self._materialize(record)
+                write = record.dirty or final
+                record.dirty = False
+                record.pending_images = 0
+                record.last_flush = time.monotonic()
+                if final:
+                    del self._sets[photo_folder]
+
+            if write:
+                path = os.path.join(photo_folder, METADATA_FILE)
+                with self.tracer.span('metadata_write', path=path, images=metadata['images_downloaded'],
+                                      final=final):
+                    try:
+                        write_json_atomic(path, metadata, indent=2 if final else None)
+                        self._log('debug', f"保存元数据: {path}")
+                    except OSError as e:
+                        self._log('error', f"保存元数据失败 {path}: {e}")
+            return metadata
+
+    def flush_all(self):
+        """写入所有仍打开的套图"""
+        with self._lock:
+            folders = list(self._sets)
+        for folder in folders:
+            self.flush(folder, final=True)
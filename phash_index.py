@@ -0,0 +1,293 @@
+"""
+感知哈希近似重复索引 - 跳过同一张照片的其它分辨率或轻微裁剪版本
+
+每张下载的图片计算 64 位 dHash，并放入多索引哈希表: 哈希分成 4 段 16 位，
+汉明距离 <= threshold 的两个哈希至少有一段的距离 <= threshold // 4（鸽巢原理），
+所以查询只需在每段的表中查找该段本身及其 1 位翻转（threshold < 8 时共 4 x 17 次字典查找），
+再对少量候选计算完整距离。百万级图片时单次查询仍在亚毫秒级。
+
+新图片与已有图片近似重复时:
+  新图片分辨率不高于已有图片  -> 不保存（skip）
+  新图片分辨率更高            -> 保存新图片并删除旧文件（replace，PHASH_REPLACE=false 时两者都保留）
+
+claim() 在锁内查询并在内存中预留条目（并发下载的近似图片能看到彼此），调用方写入文件后
+commit() 才把条目写入索引文件，写入失败时 release() 撤销预留并恢复被替换的条目；
+replace 的旧文件由调用方在 commit() 之后删除，任何一步失败都不会同时丢失新旧两张图片。
+
+索引持久化为 OUTPUT_DIR 下的追加写入 JSONL 文件，启动时加载。
+"""
+
+import os
+import json
+import threading
+from array import array
+from io import BytesIO
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+
+HASH_BITS = 64
+BLOCKS = 4
+BLOCK_BITS = HASH_BITS // BLOCKS
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+
+def dhash(img: Image.Image, size: int = 8) -> int:
+    """差值哈希: 缩放为 (size+1) x size 灰度图，逐行比较相邻像素"""
+    gray = img.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def image_hash(content: bytes) -> Tuple[int, int]:
+    """返回图片的 (dHash, 像素数)；JPEG 使用 draft 模式按 DCT 缩放解码，避免完整解码"""
+    with Image.open(BytesIO(content)) as img:
+        width, height = img.size
+        img.draft('L', (64, 64))
+        return dhash(img), width * height
+
+
+class MultiIndexHash:
+    """64 位哈希的多索引哈希表，查找汉明距离 <= threshold 的最近项"""
+
+    def __init__(self, threshold: int = 6):
+        self.threshold = threshold
+        self.radius = threshold // BLOCKS
+        self.hashes = array('Q')
+        self.pixels = array('Q')
+        self.alive = bytearray()
+        # 每段: 段值 -> 条目序号数组
+        self._tables: List[Dict[int, array]] = [{} for _ in range(BLOCKS)]
+        self._flips = [0] + [sum(1 << bit for bit in bits)
+                             for r in range(1, self.radius + 1)
+                             for bits in combinations(range(BLOCK_BITS), r)]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _blocks(value: int):
+        for index in range(BLOCKS):
+            yield index, (value >> (index * BLOCK_BITS)) & BLOCK_MASK
+
+    def add(self, value: int, pixels: int) -> int:
+        entry = len(self.hashes)
+        self.hashes.append(value)
+        self.pixels.append(pixels)
+        self.alive.append(1)
+        for index, block in self._blocks(value):
+            bucket = self._tables[index].get(block)
+            if bucket is None:
+                bucket = self._tables[index][block] = array('I')
+            bucket.append(entry)
+        self._count += 1
+        return entry
+
+    def remove(self, entry: int):
+        if self.alive[entry]:
+            self.alive[entry] = 0
+            self._count -= 1
+
+    def find(self, value: int) -> Optional[Tuple[int, int]]:
+        """返回 (条目序号, 距离)，没有阈值内的条目时返回None"""
+        best = None
+        best_distance = self.threshold + 1
+        hashes, alive = self.hashes, self.alive
+        for index, block in self._blocks(value):
+            table = self._tables[index]
+            for flip in self._flips:
+                bucket = table.get(block ^ flip)
+                if bucket is None:
+                    continue
+                for entry in bucket:
+                    if alive[entry]:
+                        distance = (hashes[entry] ^ value).bit_count()
+                        if distance < best_distance:
+                            best, best_distance = entry, distance
+                            if distance == 0:
+                                return best, 0
+        return (best, best_distance) if best is not None else None
+
+
+class Decision:
+    """近似重复检查的结果"""
+    __slots__ = ('action', 'hash', 'pixels', 'match_path', 'match_url', 'distance', 'path', 'url', 'restore')
+
+    def __init__(self, action: str, value: int = 0, pixels: int = 0, match_path: str = None,
+                 match_url: str = None, distance: int = None):
+        self.action = action          # 'new' / 'skip' / 'replace'
+        self.hash = value
+        self.pixels = pixels
+        self.match_path = match_path  # 相对 OUTPUT_DIR 的已有图片路径
+        self.match_url = match_url
+        self.distance = distance
+        # 预留的条目（相对路径和URL）及其替换掉的条目 [(哈希, 像素数, 路径, URL)]，由 commit/release 使用
+        self.path = None
+        self.url = None
+        self.restore = []
+
+
+class NullDedupe:
+    """未启用近似去重时使用的空实现"""
+    enabled = False
+
+    def claim(self, content: bytes, path: str, url: str) -> Decision:
+        return Decision('new')
+
+    def commit(self, decision: Decision):
+        pass
+
+    def release(self, decision: Decision):
+        pass
+
+    def is_duplicate(self, path: str) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+
+class PerceptualDedupe(NullDedupe):
+    """持久化的近似重复索引，claim() 在锁内完成查询和预留，commit() 写入索引文件"""
+    enabled = True
+
+    def __init__(self, index_path: str, root: str, threshold: int = 6, replace: bool = True, logger=None):
+        self.index_path = index_path
+        self.root = root
+        self.replace = replace
+        self.logger = logger
+        self.index = MultiIndexHash(threshold)
+        self._paths: List[Optional[str]] = []
+        self._urls: List[Optional[str]] = []
+        self._by_path: Dict[str, int] = {}
+        # 因近似重复而未保存的文件 -> 已有图片，重新运行时不再下载
+        self._duplicates: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(index_path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'dup' in record:
+                    self._duplicates[record['dup']] = record['of']
+                elif 'rm' in record:
+                    entry = self._by_path.pop(record['rm'], None)
+                    if entry is not None:
+                        self.index.remove(entry)
+                else:
+                    self._add(int(record['h'], 16), record['px'], record['path'], record.get('url'))
+        if self.logger:
+            self.logger.info(f"已加载感知哈希索引: {len(self.index)} 张图片")
+
+    def _add(self, value: int, pixels: int, path: str, url: Optional[str]):
+        previous = self._by_path.pop(path, None)
+        if previous is not None:
+            self.index.remove(previous)
+        entry = self.index.add(value, pixels)
+        self._paths.append(path)
+        self._urls.append(url)
+        self._by_path[path] = entry
+
+    def _append(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def _entry(self, entry: int) -> Tuple[int, int, str, Optional[str]]:
+        return self.index.hashes[entry], self.index.pixels[entry], self._paths[entry], self._urls[entry]
+
+    def claim(self, content: bytes, path: str, url: str) -> Decision:
+        """
+        检查即将保存的图片（path 为绝对路径）
+        new / replace 时在内存中预留条目，调用方写入文件后调用 commit()，写入失败时调用 release()；
+        replace 时由调用方在 commit() 之后删除旧文件
+        """
+        try:
+            value, pixels = image_hash(content)
+        except Exception:
+            return Decision('new')
+        relative = os.path.relpath(path, self.root)
+
+        with self._lock:
+            found = self.index.find(value)
+            decision = Decision('new', value, pixels)
+            if found is not None:
+                entry, distance = found
+                match_path, match_url = self._paths[entry], self._urls[entry]
+                if match_path == relative:
+                    pass  # 同一文件重新下载，更新索引条目
+                elif pixels <= self.index.pixels[entry]:
+                    self._duplicates[relative] = match_path
+                    self._append({'dup': relative, 'of': match_path})
+                    return Decision('skip', value, pixels, match_path, match_url, distance)
+                elif self.replace:
+                    decision = Decision('replace', value, pixels, match_path, match_url, distance)
+                    decision.restore.append(self._entry(entry))
+                    self.index.remove(entry)
+                    self._by_path.pop(match_path, None)
+                else:
+                    decision = Decision('new', value, pixels, match_path, match_url, distance)
+
+            previous = self._by_path.get(relative)
+            if previous is not None:
+                decision.restore.append(self._entry(previous))
+            self._add(value, pixels, relative, url)
+            decision.path, decision.url = relative, url
+        return decision
+
+    def commit(self, decision: Decision):
+        """新文件已写入: 把预留的条目（和被替换的旧文件）写入索引文件"""
+        if decision.path is None:
+            return
+        with self._lock:
+            if decision.action == 'replace':
+                self._append({'rm': decision.match_path})
+            self._append({'h': f'{decision.hash:016x}', 'px': decision.pixels, 'path': decision.path,
+                          'url': decision.url})
+
+    def release(self, decision: Decision):
+        """新文件写入失败: 撤销预留的条目，恢复被替换的条目"""
+        if decision.path is None:
+            return
+        with self._lock:
+            entry = self._by_path.get(decision.path)
+            if entry is not None and self.index.hashes[entry] == decision.hash:
+                del self._by_path[decision.path]
+                self.index.remove(entry)
+            for value, pixels, path, url in decision.restore:
+                if path not in self._by_path:
+                    self._add(value, pixels, path, url)
+
+    def is_duplicate(self, path: str) -> bool:
+        """该文件之前因近似重复而未保存"""
+        with self._lock:
+            return os.path.relpath(path, self.root) in self._duplicates
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def create_dedupe(config, logger=None):
+    """根据配置创建近似去重索引，PHASH_INDEX 为空时返回空实现"""
+    if not getattr(config, 'PHASH_INDEX', ''):
+        return NullDedupe()
+    return PerceptualDedupe(os.path.join(config.OUTPUT_DIR, config.PHASH_INDEX), config.OUTPUT_DIR,
+                            threshold=config.PHASH_THRESHOLD, replace=config.PHASH_REPLACE, logger=logger)
@@ -0,0 +1,169 @@
+"""
+下载后的图片处理 - 在进程池中转码（WebP/AVIF）、去除 EXIF 并生成缩略图
+
+下载线程保存图片后调用 ImagePostProcessor.submit()，任务交给 ProcessPoolExecutor，
+编码的 CPU 开销不占用下载线程。同时处理中的任务数由有界信号量限制（QUEUE_SIZE），
+处理跟不上时 submit() 才会等待，内存占用不会随积压无限增长。
+
+输出放在套图目录的子目录中，原图保留（断点续传和 metadata.json 的图片列表仍以原图为准）:
+
+  photo_id/abc.jpg            原图
+  photo_id/webp/abc.webp      转码后的图片（不含 EXIF）
+  photo_id/thumbs/abc.webp    缩略图
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+SUPPORTED_FORMATS = ('webp', 'avif')
+THUMBNAIL_DIR = 'thumbs'
+
+
+def process_image(path: str, fmt: str, quality: int, thumbnail: int) -> Dict:
+    """
+    工作进程中执行: 转码并生成缩略图，返回处理结果
+    先按 EXIF 方向旋转，重新编码时只保留 ICC 配置，EXIF 随之去除
+    """
+    from PIL import Image, ImageOps
+
+    folder, filename = os.path.split(path)
+    stem = os.path.splitext(filename)[0]
+    result = {'filename': filename, 'format': fmt, 'original_bytes': os.path.getsize(path)}
+    try:
+        with Image.open(path) as source:
+            img = ImageOps.exif_transpose(source)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+            icc_profile = img.info.get('icc_profile')
+
+            output = _save(img, os.path.join(folder, fmt, f'{stem}.{fmt}'), fmt, quality, icc_profile)
+            result['output'] = os.path.relpath(output, folder)
+            result['output_bytes'] = os.path.getsize(output)
+            result['saved_bytes'] = result['original_bytes'] - result['output_bytes']
+
+            if thumbnail > 0:
+                thumb = img.copy()
+                thumb.thumbnail((thumbnail, thumbnail))
+                thumb_path = _save(thumb, os.path.join(folder, THUMBNAIL_DIR, f'{stem}.{fmt}'),
+                                   fmt, quality, icc_profile)
+                result['thumbnail'] = os.path.relpath(thumb_path, folder)
+                result['thumbnail_bytes'] = os.path.getsize(thumb_path)
+        result['status'] = 'success'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)[:200]
+    return result
+
+
+def _save(img, path: str, fmt: str, quality: int, icc_profile: Optional[bytes]) -> str:
+    """写入临时文件后原子替换"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    params = {'quality': quality}
+    if icc_profile:
+        params['icc_profile'] = icc_profile
+    try:
+        img.save(tmp_path, format=fmt.upper(), **params)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class NullPostProcessor:
+    """未启用图片处理时使用的空实现"""
+    enabled = False
+
+    def submit(self, photo_folder: str, filename: str):
+        pass
+
+    def wait(self, photo_folder: str = None):
+        pass
+
+    def close(self):
+        pass
+
+
+class ImagePostProcessor(NullPostProcessor):
+    """进程池图片处理，结果通过 on_result(photo_folder, result) 回调"""
+    enabled = True
+
+    def __init__(self, fmt: str = 'webp', quality: int = 80, thumbnail: int = 320, workers: int = 0,
+                 queue_size: int = 64, on_result: Callable[[str, Dict], None] = None, logger=None,
+                 executor=None):
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt}")
+        self.fmt = fmt
+        self.quality = quality
+        self.thumbnail = thumbnail
+        self.on_result = on_result
+        self.logger = logger
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # photo_folder -> 处理中的任务数
+        self._pending: Dict[str, int] = {}
+        self._executor = executor or ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def submit(self, photo_folder: str, filename: str):
+        """提交一张已保存的图片，处理中的任务达到上限时等待"""
+        self._slots.acquire()
+        with self._lock:
+            self._pending[photo_folder] = self._pending.get(photo_folder, 0) + 1
+        try:
+            future = self._executor.submit(process_image, os.path.join(photo_folder, filename),
+                                           self.fmt, self.quality, self.thumbnail)
+        except Exception:
+            self._finish(photo_folder)
+            raise
+        future.add_done_callback(lambda f: self._done(photo_folder, filename, f))
+
+    def _done(self, photo_folder: str, filename: str, future):
+        try:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'filename': filename, 'status': 'failed', 'error': str(e)[:200]}
+            if result['status'] != 'success' and self.logger:
+                self.logger.warning(f"图片处理失败 {filename}: {result.get('error')}")
+            if self.on_result:
+                self.on_result(photo_folder, result)
+        finally:
+            self._finish(photo_folder)
+
+    def _finish(self, photo_folder: str):
+        with self._lock:
+            self._pending[photo_folder] -= 1
+            if not self._pending[photo_folder]:
+                del self._pending[photo_folder]
+            self._idle.notify_all()
+        self._slots.release()
+
+    def wait(self, photo_folder: str = None):
+        """等待某个套图（None 表示全部）的处理任务完成"""
+        with self._lock:
+            if photo_folder is None:
+                self._idle.wait_for(lambda: not self._pending)
+            else:
+                self._idle.wait_for(lambda: photo_folder not in self._pending)
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+
+def create_postprocessor(config, on_result: Callable[[str, Dict], None] = None, logger=None):
+    """根据配置创建图片处理器，POSTPROCESS_FORMAT 为空时返回空实现"""
+    fmt = (config.POSTPROCESS_FORMAT or '').lower()
+    if not fmt:
+        return NullPostProcessor()
+    return ImagePostProcessor(fmt, config.POSTPROCESS_QUALITY, config.POSTPROCESS_THUMBNAIL,
+                              config.POSTPROCESS_WORKERS, config.POSTPROCESS_QUEUE_SIZE,
+                              on_result=on_result, logger=logger)
@@ -0,0 +1,290 @@
+"""
+robots.txt 缓存 - 按主机延迟获取、编译规则并缓存到磁盘
+
+每个主机（scheme://host:port）第一次需要检查URL时才通过下载客户端的连接池获取 /robots.txt，
+结果按 ROBOTS_CACHE_TTL 秒缓存，并保存到 OUTPUT_DIR/robots_cache.json，下次运行直接使用。
+
+规则按 RFC 9309 处理:
+  - 选择 User-agent 与 ROBOTS_USER_AGENT 匹配的组（同名的组合并），没有时使用 * 组
+  - Allow / Disallow 中的 * 匹配任意字符，结尾的 $ 匹配URL结尾；匹配最长的规则生效，长度相同时 Allow 优先
+  - 4xx 视为没有限制；5xx 和网络错误时使用过期的旧规则，没有旧规则时暂不限制并在 ERROR_TTL 后重试
+  - Crawl-delay 和 Request-rate（如 1/5s）换算为同一主机两次请求的最小间隔，由爬虫的请求延迟使用
+  - Sitemap 行记录在规则中，供站点地图发现使用
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+ROBOTS_CACHE_FILE = 'robots_cache.json'
+# 只解析前 500 KiB（RFC 9309）
+MAX_ROBOTS_SIZE = 500 * 1024
+# 获取失败时的重试间隔（秒）
+ERROR_TTL = 600
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def compile_pattern(pattern: str):
+    """
+    编译路径规则: 不含通配符的规则用前缀比较，其余编译为正则
+    返回判断 path 是否匹配的函数
+    """
+    if '*' not in pattern and not pattern.endswith('$'):
+        return lambda path: path.startswith(pattern)
+    anchored = pattern.endswith('$')
+    body = pattern[:-1] if anchored else pattern
+    regex = re.compile('.*?'.join(re.escape(part) for part in body.split('*')) + ('$' if anchored else ''))
+    return lambda path: regex.match(path) is not None
+
+
+class RobotsRules:
+    """一个主机对当前 User-agent 生效的规则"""
+
+    def __init__(self, rules: List[Tuple[str, bool]] = (), crawl_delay: float = 0.0,
+                 request_rate: Optional[Tuple[int, float]] = None, sitemaps: List[str] = ()):
+        # 按规则长度从长到短排列，长度相同时 Allow 在前，第一个匹配的规则生效
+        ordered = sorted(rules, key=lambda rule: (-len(rule[0]), not rule[1]))
+        self._rules = [(compile_pattern(pattern), allow) for pattern, allow in ordered]
+        self.crawl_delay = crawl_delay
+        self.request_rate = request_rate
+        self.sitemaps = list(sitemaps)
+
+    @property
+    def delay(self) -> float:
+        """同一主机两次请求的最小间隔（秒）"""
+        delay = self.crawl_delay
+        if self.request_rate and self.request_rate[0] > 0:
+            delay = max(delay, self.request_rate[1] / self.request_rate[0])
+        return delay
+
+    def can_fetch(self, path: str) -> bool:
+        if path == '/robots.txt':
+            return True
+        for matches, allow in self._rules:
+            if matches(path):
+                return allow
+        return True
+
+
+# 没有 robots.txt 或获取失败时使用的规则
+ALLOW_ALL = RobotsRules()
+
+
+def _parse_rate(value: str) -> Optional[Tuple[int, float]]:
+    """Request-rate: 1/5、1/10s、30/1m"""
+    match = re.match(r'^\s*(\d+)\s*/\s*(\d+(?:\.\d+)?)\s*([smhd]?)', value.lower())
+    if not match:
+        return None
+    return int(match.group(1)), float(match.group(2)) * RATE_UNITS.get(match.group(3) or 's', 1)
+
+
+def parse_robots(text: str, user_agent: str = '*') -> RobotsRules:
+    """解析 robots.txt，返回 user_agent 适用的规则"""
+    agent = user_agent.lower()
+    groups: List[Tuple[List[str], List]] = []
+    sitemaps = []
+    current = None
+    for line in text[:MAX_ROBOTS_SIZE].splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        key, value = (part.strip() for part in line.split(':', 1))
+        key = key.lower()
+        if key == 'sitemap':
+            if value:
+                sitemaps.append(value)
+            continue
+        if key == 'user-agent':
+            # 连续的 User-agent 行属于同一组
+            if current is None or current[1]:
+                current = ([], [])
+                groups.append(current)
+            current[0].append(value.lower())
+        elif current is not None and key in ('allow', 'disallow', 'crawl-delay', 'request-rate'):
+            current[1].append((key, value))
+
+    # 选择最具体（最长）的匹配名称，合并同名的组
+    best = None
+    for names, _ in groups:
+        for name in names:
+            if name != '*' and name and name in agent and (best is None or len(name) > len(best)):
+                best = name
+    selected = best or '*'
+    lines = [line for names, group_lines in groups if selected in names for line in group_lines]
+
+    rules = []
+    crawl_delay = 0.0
+    request_rate = None
+    for key, value in lines:
+        if key in ('allow', 'disallow'):
+            if value:
+                rules.append((value, key == 'allow'))
+        elif key == 'crawl-delay':
+            try:
+                crawl_delay = max(crawl_delay, float(value))
+            except ValueError:
+                pass
+        else:
+            request_rate = _parse_rate(value) or request_rate
+    return RobotsRules(rules, crawl_delay, request_rate, sitemaps)
+
+
+class NullRobots:
+    """RESPECT_ROBOTS_TXT=false 时使用的空实现"""
+    enabled = False
+
+    def can_fetch(self, url: str) -> bool:
+        return True
+
+    def delay(self, url: str) -> float:
+        return 0.0
+
+    def cached_delay(self, host: str) -> float:
+        return 0.0
+
+    def sitemaps(self, url: str) -> List[str]:
+        return []
+
+    def close(self):
+        pass
+
+
+class RobotsCache(NullRobots):
+    """
+    按主机缓存的 robots.txt 规则（线程安全）
+    fetch(url) 返回 (HTTP状态码, 文本)，网络错误时抛出异常
+    """
+    enabled = True
+
+    def __init__(self, fetch: Callable[[str], Tuple[int, str]], path: Optional[str] = None,
+                 ttl: float = 86400, user_agent: str = '*', logger=None, clock=time.time):
+        self._fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self.logger = logger
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        # origin -> {'status', 'text', 'fetched', 'expires'}
+        self._entries: Dict[str, Dict] = {}
+        # origin -> 编译后的规则（加载或获取后生成）
+        self._rules: Dict[str, RobotsRules] = {}
+        # netloc -> 请求间隔，供请求调度查询（不触发获取）
+        self._delays: Dict[str, float] = {}
+        self._dirty = False
+        self.fetches = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get('hosts', {})
+        except (OSError, ValueError):
+            self._entries = {}
+        if self.logger and self._entries:
+            self.logger.debug(f"已加载 {len(self._entries)} 个主机的 robots.txt 缓存")
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _compile(self, origin: str, entry: Dict) -> RobotsRules:
+        rules = parse_robots(entry['text'], self.user_agent) if entry.get('text') else ALLOW_ALL
+        self._rules[origin] = rules
+        self._delays[urlparse(origin).netloc] = rules.delay
+        return rules
+
+    def rules(self, url: str) -> RobotsRules:
+        """URL所在主机的规则，未缓存或已过期时获取 robots.txt"""
+        origin = self._origin(url)
+        now = self._clock()
+        entry = self._entries.get(origin)
+        if entry and entry['expires'] > now:
+            return self._rules.get(origin) or self._compile(origin, entry)
+        with self._lock:
+            host_lock = self._host_locks.setdefault(origin, threading.Lock())
+        with host_lock:
+            # 其它线程可能已经获取
+            entry = self._entries.get(origin)
+            if entry and entry['expires'] > self._clock():
+                return self._rules.get(origin) or self._compile(origin, entry)
+            return self._refresh(origin, entry)
+
+    def _refresh(self, origin: str, stale: Optional[Dict]) -> RobotsRules:
+        robots_url = f"{origin}/robots.txt"
+        self.fetches += 1
+        try:
+            status, text = self._fetch(robots_url)
+        except Exception as e:
+            status, text = None, ''
+            if self.logger:
+                self.logger.warning(f"无法获取 robots.txt {robots_url}: {e}")
+        now = self._clock()
+        if status is not None and status < 500:
+            # 2xx 使用规则，3xx（重定向次数过多）和 4xx 视为没有限制
+            entry = {'status': status, 'text': text if 200 <= status < 300 else '',
+                     'fetched': now, 'expires': now + self.ttl}
+            if self.logger:
+                self.logger.debug(f"已获取 robots.txt: {robots_url} ({status})")
+        elif stale:
+            entry = dict(stale, expires=now + min(self.ttl, ERROR_TTL))
+        else:
+            entry = {'status': status or 0, 'text': '', 'fetched': now, 'expires': now + min(self.ttl, ERROR_TTL)}
+        with self._lock:
+            self._entries[origin] = entry
+            self._dirty = True
+        return self._compile(origin, entry)
+
+    def can_fetch(self, url: str) -> bool:
+        parsed = urlparse(url)
+        path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        return self.rules(url).can_fetch(path)
+
+    def delay(self, url: str) -> float:
+        """URL所在主机的 Crawl-delay / Request-rate 间隔（需要时获取 robots.txt）"""
+        return self.rules(url).delay
+
+    def cached_delay(self, host: str) -> float:
+        """已缓存的主机（netloc）请求间隔，不发起请求；未缓存时为0"""
+        return self._delays.get(host, 0.0)
+
+    def sitemaps(self, url: str) -> List[str]:
+        return self.rules(url).sitemaps
+
+    def save(self):
+        """写入缓存文件（写入临时文件后原子替换）"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'hosts': dict(self._entries)}
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        self.save()
+
+
+def create_robots_cache(config, fetch: Callable[[str], Tuple[int, str]], logger=None):
+    """RESPECT_ROBOTS_TXT 时创建 robots.txt 缓存，ROBOTS_CACHE_TTL <= 0 时不保存到磁盘（仍在本次运行中缓存）"""
+    if not config.RESPECT_ROBOTS_TXT:
+        return NullRobots()
+    ttl = config.ROBOTS_CACHE_TTL
+    path = os.path.join(config.OUTPUT_DIR, ROBOTS_CACHE_FILE) if ttl > 0 else None
+    return RobotsCache(fetch, path, ttl if ttl > 0 else float('inf'), config.ROBOTS_USER_AGENT, logger)
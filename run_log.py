@@ -0,0 +1,311 @@
+"""
+运行日志 - 每个套图结束时向 OUTPUT_DIR/run_log.jsonl 追加一行，并维护 O(1) 的滚动汇总
+
+  {"event": "start", "run_date": ..., "list_pages": ...}
+  {"event": "set", "photo_id": ..., "status": ..., "images_count": ..., ...}
+  {"event": "end", "stats": {...}}
+
+download_summary.json / .txt 只包含汇总和失败的套图，由滚动汇总生成；运行中每
+SUMMARY_INTERVAL 秒原子写入一次摘要，进程崩溃后输出目录中仍有可用的摘要，
+也可以用 rebuild_summary() 从 JSONL 重新生成（python main.py summary）。
+
+任务队列模式下多个节点共享输出目录，每个节点写自己的 run_log.<节点>.jsonl 和
+download_summary.<节点>.json/.txt（node_file()），摘要中附带整个队列的状态和失败的任务。
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from metadata_store import write_json_atomic
+
+
+RUN_LOG_FILE = 'run_log.jsonl'
+SUMMARY_JSON = 'download_summary.json'
+SUMMARY_TEXT = 'download_summary.txt'
+
+# 失败套图只保留这些字段，避免长时间运行时摘要随错误信息膨胀
+FAILED_SET_FIELDS = ('title', 'photo_id', 'photo_url', 'status', 'images_count', 'images_failed',
+                     'duration_seconds', 'error')
+
+
+def node_file(name: str, node: Optional[str] = None) -> str:
+    """节点使用的文件名: run_log.jsonl -> run_log.<节点>.jsonl，node 为空时不变"""
+    if not node:
+        return name
+    base, ext = os.path.splitext(name)
+    return f"{base}.{node}{ext}"
+
+
+class RunAggregates:
+    """
+    套图结果的滚动汇总
+    只有失败的套图按URL保留（用于摘要列表和重试去重），成功的套图只计数
+    """
+
+    def __init__(self):
+        self.sets = 0
+        self.by_status: Dict[str, int] = {}
+        self.images = 0
+        self.images_failed = 0
+        self.duration_seconds = 0
+        self.retried = 0
+        self.failed_sets: Dict[str, Dict] = {}
+
+    def _apply(self, record: Dict, sign: int):
+        status = record.get('status') or 'unknown'
+        self.sets += sign
+        self.by_status[status] = self.by_status.get(status, 0) + sign
+        if not self.by_status[status]:
+            del self.by_status[status]
+        self.images += sign * (record.get('images_count') or 0)
+        self.images_failed += sign * (record.get('images_failed') or 0)
+        self.duration_seconds += sign * (record.get('duration_seconds') or 0)
+
+    def add(self, record: Dict):
+        """加入一个套图结果；同一URL之前失败过时（重试）以新结果替换旧结果"""
+        url = record.get('photo_url')
+        previous = self.failed_sets.pop(url, None) if url else None
+        if previous:
+            self._apply(previous, -1)
+            self.retried += 1
+        self._apply(record, 1)
+        if url and record.get('status') != 'success':
+            self.failed_sets[url] = {key: record[key] for key in FAILED_SET_FIELDS if key in record}
+
+    @property
+    def succeeded(self) -> int:
+        return self.by_status.get('success', 0)
+
+    @property
+    def failed(self) -> int:
+        return self.by_status.get('failed', 0)
+
+
+class RunLog:
+    """追加写入的套图结果日志，path 为空时只在内存中汇总（工作进程使用）"""
+
+    def __init__(self, path: Optional[str] = None, checkpoint: Callable[[], None] = None,
+                 checkpoint_interval: float = 30.0, logger=None):
+        self.path = path
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.logger = logger
+        self.aggregates = RunAggregates()
+        self.last: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_checkpoint = time.monotonic()
+
+    def __len__(self) -> int:
+        return self.aggregates.sets
+
+    def _write(self, event: Dict, mode: str = 'a'):
+        """调用方持有 _lock；每行写入后立即 flush，崩溃时最多丢失正在写的一行"""
+        if not self.path:
+            return
+        try:
+            if self._file is None or mode == 'w':
+                if self._file:
+                    self._file.close()
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, mode, encoding='utf-8')
+            self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self._file.flush()
+        except OSError as e:
+            if self.logger:
+                self.logger.error(f"写入运行日志失败 {self.path}: {e}")
+
+    def start(self, **fields):
+        """开始新的运行（覆盖上一次运行的日志）"""
+        with self._lock:
+            self._write({'event': 'start', **fields, 'started': time.time()}, mode='w')
+
+    def append(self, record: Dict):
+        """记录一个结束的套图，到达间隔时写入一次中间摘要"""
+        with self._lock:
+            self.aggregates.add(record)
+            self.last = record
+            self._write({'event': 'set', **record, 'finished': time.time()})
+            due = (self.checkpoint is not None and
+                   time.monotonic() - self._last_checkpoint >= self.checkpoint_interval)
+            if due:
+                self._last_checkpoint = time.monotonic()
+        if due:
+            self.checkpoint()
+
+    def end(self, **fields):
+        with self._lock:
+            self._write({'event': 'end', **fields})
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def build_summary(aggregates: RunAggregates, run_date: str, elapsed: float, list_pages: int,
+                  photos_found: int, stats: Dict, stages: Dict = None, run_log: str = None,
+                  complete: bool = True, budget: Dict = None, queue: Dict = None) -> Dict:
+    """由滚动汇总生成摘要（不包含逐套图列表，完整记录见 run_log）"""
+    summary = {
+        'run_date': run_date,
+        'total_duration_seconds': int(elapsed),
+        'complete': complete,
+        'list_pages_crawled': list_pages,
+        'photo_sets_found': photos_found,
+        'photo_sets_processed': aggregates.sets,
+        'photo_sets_downloaded': aggregates.succeeded,
+        'photo_sets_failed': aggregates.failed,
+        'photo_sets_retried': aggregates.retried,
+        'total_images_downloaded': stats.get('images_downloaded', 0),
+        'total_images_failed': stats.get('images_failed', 0),
+        'total_images_skipped': stats.get('images_skipped', 0),
+        'total_images_duplicate': stats.get('images_duplicate', 0),
+        'total_bytes_downloaded': stats.get('bytes_downloaded', 0),
+        'total_bytes_resumed': stats.get('bytes_resumed', 0),
+        'stages': stages or {},
+        'average_images_per_set': round(aggregates.images / aggregates.sets, 2) if aggregates.sets else 0,
+        'failed_sets': list(aggregates.failed_sets.values()),
+        'run_log': run_log,
+    }
+    if budget:
+        summary['budget'] = budget
+    if queue:
+        # 整个任务队列（所有节点）的状态: {'counts': {...}, 'failures': [...]}
+        summary['queue'] = queue
+    return summary
+
+
+def write_summary(output_dir: str, summary: Dict, node: Optional[str] = None) -> str:
+    """原子写入 JSON 摘要和文本摘要（任务队列模式下文件名带节点），返回 JSON 摘要路径"""
+    summary_path = os.path.join(output_dir, node_file(SUMMARY_JSON, node))
+    write_json_atomic(summary_path, summary, indent=2)
+    write_summary_text(os.path.join(output_dir, node_file(SUMMARY_TEXT, node)), summary)
+    return summary_path
+
+
+def write_summary_text(path: str, summary: Dict):
+    """生成美化的文本摘要"""
+    elapsed = summary['total_duration_seconds']
+    lines = [
+        "=" * 80,
+        "                        下载摘要报告",
+        "=" * 80,
+        "",
+        f"运行时间: {summary['run_date']}",
+        f"总耗时: {elapsed:.2f} 秒 ({int(elapsed // 60)} 分 {int(elapsed % 60)} 秒)",
+    ]
+    if not summary.get('complete', True):
+        lines.append("状态: 运行未结束（中间摘要）")
+    lines += [
+        "",
+        "-" * 80,
+        "统计信息",
+        "-" * 80,
+        f"列表页爬取数: {summary['list_pages_crawled']}",
+        f"套图发现数: {summary['photo_sets_found']}",
+        f"套图下载成功: {summary['photo_sets_downloaded']}",
+        f"套图下载失败: {summary['photo_sets_failed']}",
+        f"图片下载成功: {summary['total_images_downloaded']}",
+        f"图片下载失败: {summary['total_images_failed']}",
+        f"图片跳过: {summary['total_images_skipped']}",
+        f"近似重复: {summary.get('total_images_duplicate', 0)}",
+        f"平均每套图片数: {summary['average_images_per_set']:.2f}",
+        "",
+    ]
+    if summary['photo_sets_found'] > 0:
+        success_rate = (summary['photo_sets_downloaded'] / summary['photo_sets_found']) * 100
+        lines.append(f"套图下载成功率: {success_rate:.2f}%")
+    images_total = summary['total_images_downloaded'] + summary['total_images_failed']
+    if images_total > 0:
+        lines.append(f"图片下载成功率: {summary['total_images_downloaded'] / images_total * 100:.2f}%")
+
+    if summary['failed_sets']:
+        lines += ["", "-" * 80, "失败的套图", "-" * 80, ""]
+        for idx, photo in enumerate(summary['failed_sets'], 1):
+            lines.append(f"{idx}. [✗] {photo.get('title') or photo.get('photo_id')}")
+            lines.append(f"   ID: {photo.get('photo_id')}")
+            lines.append(f"   图片数: {photo.get('images_count', 0)}")
+            if photo.get('error'):
+                lines.append(f"   错误: {photo['error']}")
+            lines.append("")
+    budget = summary.get('budget')
+    if budget and budget.get('stopped'):
+        reason = '时间' if budget['stopped'] == 'time' else '流量'
+        lines += ["", f"{reason}预算不足，提前停止: 未开始 {budget['sets_skipped']} 个套图"]
+    queue = summary.get('queue')
+    if queue:
+        counts = queue.get('counts', {})
+        lines += ["", "-" * 80, "任务队列（所有节点）", "-" * 80,
+                  f"待处理: {counts.get('pending', 0)}, 处理中: {counts.get('leased', 0)}, "
+                  f"完成: {counts.get('done', 0)}, 失败: {counts.get('failed', 0)}"]
+        for task in queue.get('failures', []):
+            lines.append(f"  [✗] {task['url']} (尝试 {task['attempts']} 次): {task.get('error') or ''}")
+    if summary.get('run_log'):
+        lines += ["", f"逐套图记录: {summary['run_log']}"]
+    lines.append("=" * 80)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def read_run_log(path: str):
+    """逐行读取运行日志，跳过崩溃时写了一半的行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def rebuild_summary(output_dir: str, node: Optional[str] = None) -> Optional[str]:
+    """
+    从 run_log.jsonl（node 不为空时为该节点的 run_log.<节点>.jsonl）重新生成摘要（用于崩溃后的运行）
+    没有 end 事件时，图片计数由各套图结果累加
+    """
+    path = os.path.join(output_dir, node_file(RUN_LOG_FILE, node))
+    if not os.path.exists(path):
+        return None
+
+    aggregates = RunAggregates()
+    start: Dict = {}
+    end: Optional[Dict] = None
+    last_time = None
+    for event in read_run_log(path):
+        kind = event.pop('event', None)
+        if kind == 'start':
+            start = event
+        elif kind == 'set':
+            aggregates.add(event)
+            last_time = event.get('finished', last_time)
+        elif kind == 'end':
+            end = event
+
+    if end:
+        stats, stages, elapsed = end.get('stats', {}), end.get('stages', {}), end.get('elapsed', 0)
+    else:
+        stats = {'images_downloaded': aggregates.images, 'images_failed': aggregates.images_failed}
+        stages = {}
+        elapsed = (last_time - start['started']) if last_time and start.get('started') else 0
+    summary = build_summary(
+        aggregates,
+        run_date=start.get('run_date') or datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S'),
+        elapsed=elapsed,
+        list_pages=start.get('list_pages', 0),
+        photos_found=(end or {}).get('photos_found', aggregates.sets),
+        stats=stats,
+        stages=stages,
+        run_log=path,
+        complete=end is not None,
+        budget=(end or {}).get('budget'),
+        queue=(end or {}).get('queue'),
+    )
+    return write_summary(output_dir, summary, node)
@@ -0,0 +1,142 @@
+"""
+多进程分片爬取 - 将已发现的套图分配给多个工作进程
+
+每个工作进程拥有独立的 ImageCrawler（WebDriver、代理和Cookie会话），
+每完成一个套图就通过队列向协调进程发送事件；协调进程把套图结果写入唯一的
+运行日志，汇总统计信息、阶段指标和 failed_downloads，最后由原来的 ImageCrawler
+写出唯一一份 download_summary.json/.txt。
+"""
+
+import os
+import time
+import queue
+import multiprocessing
+from typing import Callable, Dict, List
+
+from config import Config
+
+
+# 从工作进程合并到协调进程的计数
+MERGED_STATS = ('pages_crawled', 'images_found', 'images_downloaded', 'images_failed',
+                'images_skipped', 'images_duplicate', 'bytes_downloaded',
+                'bytes_resumed')
+
+
+def config_snapshot(config) -> Dict:
+    """提取配置中的全部大写属性（可序列化后传给子进程）"""
+    return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+
+
+def apply_config(snapshot: Dict):
+    """在子进程中恢复配置（与 main.py 一样直接设置 Config 类属性）"""
+    for name, value in snapshot.items():
+        setattr(Config, name, value)
+    return Config
+
+
+def shard_urls(urls: List[str], shards: int) -> List[List[str]]:
+    """按轮询方式分片，保证各进程的套图数最多相差1"""
+    return [urls[i::shards] for i in range(shards) if urls[i::shards]]
+
+
+def worker_trace_path(path: str, index: int) -> str:
+    """每个工作进程写独立的追踪文件: trace.jsonl -> trace.worker0.jsonl"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.worker{index}{ext}"
+
+
+def crawl_shard(index: int, snapshot: Dict, urls: List[str], events):
+    """工作进程入口: 依次爬取分到的套图，并把每个套图的结果发回协调进程"""
+    # 延迟导入，避免与 crawler 模块循环导入
+    from crawler import ImageCrawler
+
+    config = apply_config(snapshot)
+    # 运行日志和摘要由协调进程写入
+    config.RUN_LOG = False
+    # URL集合快照文件只由协调进程映射
+    config.VISITED_SET_SNAPSHOT = False
+    if config.TRACE_FILE:
+        config.TRACE_FILE = worker_trace_path(config.TRACE_FILE, index)
+    crawler = ImageCrawler(config)
+
+    try:
+        crawler.dns_cache.install()
+        for url in urls:
+            previous = crawler.run_log.last
+            crawler._crawl_photo_detail(url, config.DETAIL_DEPTH)
+            photo_info = crawler.run_log.last if crawler.run_log.last is not previous else None
+            failed = crawler.failed_downloads.get(photo_info.get('photo_id'), []) if photo_info else []
+            events.put(('photo_set', index, url, photo_info, failed))
+            # MIN_DELAY 与 robots.txt 的 Crawl-delay / Request-rate 中较大的
+            time.sleep(crawler._request_delay(url))
+    finally:
+        # 与 _finish_run 相同的收尾: 写入中断套图的元数据、保存 robots.txt 缓存等
+        crawler._close_components()
+        stats = {key: crawler.stats[key] for key in MERGED_STATS}
+        events.put(('done', index, stats, crawler.stage_metrics))
+        crawler.tracer.close()
+
+
+def run_sharded(crawler, urls: List[str], processes: int, target: Callable = crawl_shard):
+    """
+    协调进程: 启动工作进程并汇总结果到 crawler
+    异常退出的工作进程中未完成的套图记为失败
+    """
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    shards = shard_urls(urls, processes)
+    snapshot = config_snapshot(crawler.config)
+
+    workers = [
+        context.Process(target=target, args=(index, snapshot, shard, events), name=f"crawler-shard-{index}")
+        for index, shard in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    crawler.logger.info(f"已启动 {len(workers)} 个工作进程，共 {len(urls)} 个套图")
+
+    pending = set(range(len(workers)))
+    finished = set()
+    while pending:
+        try:
+            event = events.get(timeout=1)
+        except queue.Empty:
+            for index in list(pending):
+                if not workers[index].is_alive():
+                    crawler.logger.error(f"工作进程 {index} 异常退出 (exitcode={workers[index].exitcode})")
+                    pending.discard(index)
+            continue
+
+        kind, index = event[0], event[1]
+        if kind == 'photo_set':
+            _, _, url, photo_info, failed = event
+            finished.add(url)
+            if photo_info:
+                crawler.run_log.append(photo_info)
+                if failed:
+                    crawler.failed_downloads[photo_info['photo_id']] = failed
+            crawler.logger.info(f"[{len(finished)}/{len(urls)}] 进程 {index} 完成套图: {url}")
+        elif kind == 'done':
+            _, _, stats, stage_metrics = event
+            for key, value in stats.items():
+                crawler.stats[key] += value
+            for stage, metrics in stage_metrics.items():
+                crawler._record_stage(stage, metrics['seconds'], metrics['bytes'], metrics['count'])
+            pending.discard(index)
+
+    for worker in workers:
+        worker.join()
+
+    for url in urls:
+        if url not in finished:
+            photo_id = crawler._photo_id_from_url(url)
+            if photo_id:
+                crawler._add_photo_set({
+                    'title': f'套图 {photo_id}',
+                    'photo_id': photo_id,
+                    'photo_url': url,
+                    'status': 'failed',
+                    'images_count': 0,
+                    'error': '工作进程异常退出',
+                    'duration_seconds': 0
+                })
@@ -0,0 +1,229 @@
+"""
+通用站点爬取 - 以 crawl_page 为核心的并发广度优先爬取
+
+  python main.py --mode site --url https://example.com/ --max-depth 2 --max-pages 200 --page-workers 4
+
+SiteFrontier 保存标准化后的URL及其深度，每个域名一个 FIFO 队列:
+  - 同一URL（标准化后）只入队一次
+  - 每次从可以发起请求的域名中取深度最小的队首，整体保持广度优先
+  - 同一域名两次请求之间至少间隔 domain_delay 秒（robots.txt 的 Crawl-delay 更长时按其间隔），
+    同时进行的页面最多 domain_concurrency 个
+  - 深度超过 max_depth 的链接不入队，已分配 max_pages 个页面后停止分配
+
+run_site_crawl 启动 workers 个页面线程，每个线程持有一个长期使用的 BrowserPageWorker
+（浏览器只创建一次，出错后才重建），从队列取页面、调用 crawl_page，把返回的链接加入队列，
+所有队列为空且没有进行中的页面时结束。
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from selenium.common.exceptions import WebDriverException
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# 标准化时去掉的跟踪参数
+TRACKING_PARAMS = ('utm_', 'spm', 'fbclid', 'gclid')
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    标准化URL: 协议和主机名小写、去掉默认端口和片段、空路径改为 /、
+    查询参数排序并去掉跟踪参数；不是 http/https 地址时返回None
+    """
+    try:
+        parsed = urlparse(url.strip())
+        port = parsed.port
+    except ValueError:
+        return None
+    scheme = parsed.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parsed.hostname:
+        return None
+    netloc = parsed.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    query = sorted((key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                   if not key.lower().startswith(TRACKING_PARAMS))
+    return urlunparse((scheme, netloc, parsed.path or '/', '', urlencode(query), ''))
+
+
+def domain_allowed(host: str, domains: Iterable[str]) -> bool:
+    """主机是否属于允许的域名（包括子域名）"""
+    host = (host or '').lower().split(':')[0]
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class SiteFrontier:
+    """按域名分队列、带深度的广度优先URL队列（线程安全）"""
+
+    def __init__(self, max_depth: int, max_pages: int, domain_delay: float = 0.0,
+                 domain_concurrency: int = 1, delay_for: Callable[[str], float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.domain_delay = domain_delay
+        # 域名自己的请求间隔（如 robots.txt 的 Crawl-delay），与 domain_delay 取较大值；不能阻塞
+        self._delay_for = delay_for
+        self.domain_concurrency = max(1, domain_concurrency)
+        self._clock = clock
+        self._cond = threading.Condition()
+        # 域名 -> [(url, 深度)]
+        self._queues: Dict[str, Deque[Tuple[str, int]]] = {}
+        self._seen: Set[str] = set()
+        self._in_flight: Dict[str, int] = {}
+        # 域名 -> 下一次允许请求的时间
+        self._next_allowed: Dict[str, float] = {}
+        self._closed = False
+        self.dispatched = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def add(self, url: str, depth: int) -> bool:
+        """加入已标准化的URL，重复或超过最大深度时返回False"""
+        if depth > self.max_depth:
+            return False
+        host = urlparse(url).netloc
+        with self._cond:
+            if url in self._seen or self._closed:
+                return False
+            self._seen.add(url)
+            self._queues.setdefault(host, deque()).append((url, depth))
+            self._cond.notify()
+        return True
+
+    def _pick(self, now: float) -> Tuple[Optional[str], Optional[float]]:
+        """返回 (可以请求的域名中队首深度最小的域名, 最早可以请求的时间)"""
+        best, best_depth, earliest = None, None, None
+        for host, queue in self._queues.items():
+            if not queue or self._in_flight.get(host, 0) >= self.domain_concurrency:
+                continue
+            allowed = self._next_allowed.get(host, 0.0)
+            if allowed > now:
+                earliest = allowed if earliest is None else min(earliest, allowed)
+                continue
+            if best is None or queue[0][1] < best_depth:
+                best, best_depth = host, queue[0][1]
+        return best, earliest
+
+    def get(self) -> Optional[Tuple[str, int]]:
+        """
+        取下一个页面 (url, 深度)，需要时等待域名的请求间隔或其它页面返回新链接；
+        爬取结束（队列为空且没有进行中的页面，或已达到 max_pages）时返回None
+        """
+        with self._cond:
+            while True:
+                if self._closed or self.dispatched >= self.max_pages:
+                    return None
+                now = self._clock()
+                host, earliest = self._pick(now)
+                if host is not None:
+                    url, depth = self._queues[host].popleft()
+                    self._in_flight[host] = self._in_flight.get(host, 0) + 1
+                    delay = self.domain_delay
+                    if self._delay_for:
+                        delay = max(delay, self._delay_for(host))
+                    self._next_allowed[host] = now + delay
+                    self.dispatched += 1
+                    return url, depth
+                if not any(self._queues.values()) and not any(self._in_flight.values()):
+                    self._closed = True
+                    self._cond.notify_all()
+                    return None
+                self._cond.wait(None if earliest is None else max(0.0, earliest - now))
+
+    def done(self, url: str):
+        """页面处理结束（其链接已加入队列）"""
+        host = urlparse(url).netloc
+        with self._cond:
+            self._in_flight[host] = max(0, self._in_flight.get(host, 0) - 1)
+            self._cond.notify_all()
+
+    def close(self):
+        """停止分配新的页面"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class BrowserPageWorker:
+    """一个页面线程的浏览器，跨页面复用，WebDriver 出错后在下一个页面前重建"""
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.driver = None
+        self.proxy_config = None
+
+    def fetch(self, url: str, depth: int) -> List[str]:
+        crawler = self.crawler
+        if self.driver is None:
+            self.proxy_config = crawler.proxy_manager.get_proxy() if crawler.proxy_manager else None
+            self.driver = crawler._create_driver(self.proxy_config)
+        try:
+            return crawler.crawl_page(url, depth, driver=self.driver, proxy_config=self.proxy_config)
+        except WebDriverException:
+            self.close()
+            return []
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                self.crawler.logger.warning(f"关闭WebDriver时出错: {str(e)}")
+            self.driver = None
+
+
+def run_site_crawl(frontier: SiteFrontier, worker_factory: Callable, workers: int,
+                   normalize: Callable[[str], Optional[str]] = normalize_url,
+                   bind: Callable[[Callable], Callable] = lambda func: func, logger=None) -> int:
+    """
+    用 workers 个线程处理队列直到爬取结束，返回处理的页面数
+    worker_factory() 为每个线程创建页面处理器（fetch(url, depth) 返回页面中的链接，close() 释放资源）
+    """
+    processed = [0]
+    lock = threading.Lock()
+
+    def run():
+        worker = None
+        try:
+            while True:
+                task = frontier.get()
+                if task is None:
+                    return
+                url, depth = task
+                try:
+                    if worker is None:
+                        worker = worker_factory()
+                    links = worker.fetch(url, depth)
+                except Exception as e:
+                    if logger:
+                        logger.error(f"页面处理失败 {url}: {e}")
+                    links = []
+                try:
+                    for link in links:
+                        normalized = normalize(link)
+                        if normalized:
+                            frontier.add(normalized, depth + 1)
+                finally:
+                    frontier.done(url)
+                with lock:
+                    processed[0] += 1
+        finally:
+            if worker is not None:
+                worker.close()
+
+    threads = [threading.Thread(target=bind(run), name=f'page-worker-{index}', daemon=True)
+               for index in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        frontier.close()
+    return processed[0]
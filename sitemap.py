@@ -0,0 +1,162 @@
+"""
+站点地图发现 - 不渲染列表页，直接从 sitemap 枚举套图
+
+  python main.py --discovery sitemap
+
+站点地图地址取自 robots.txt 的 Sitemap 行，没有时依次尝试 WELL_KNOWN_PATHS。
+每个站点地图以流的方式下载和解析（iterparse，处理完的元素立即释放），内存占用与文件大小无关:
+  - gzip 压缩的站点地图（.xml.gz 或响应体以 gzip 魔数开头）边下载边解压
+  - sitemapindex 递归展开其中的站点地图（最多 MAX_INDEX_DEPTH 层，同一地址只读取一次）
+  - 只取 <url> 的 <loc> 和 <lastmod>，忽略图片等扩展标签
+"""
+
+import io
+import re
+import gzip
+import itertools
+import calendar
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+
+WELL_KNOWN_PATHS = ('/sitemap.xml', '/sitemap_index.xml', '/sitemap.xml.gz')
+MAX_INDEX_DEPTH = 3
+GZIP_MAGIC = b'\x1f\x8b'
+PHOTO_URL_RE = re.compile(r'/photo/id-[0-9A-Za-z]+\.html$')
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    # lastmod 的 Unix 时间戳，没有或无法解析时为None
+    lastmod: Optional[float]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """解析 W3C 日期时间（2024-01-02 / 2024-01-02T03:04:05+08:00 / ...Z），没有时区时按本地时间"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.timestamp()
+    return calendar.timegm(parsed.utctimetuple()) + parsed.microsecond / 1e6
+
+
+class ChunkStream(io.RawIOBase):
+    """把字节块迭代器包装成可读的文件对象"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        count = min(len(target), len(self._buffer))
+        target[:count] = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        return count
+
+
+def open_xml_stream(chunks: Iterable[bytes]):
+    """返回XML内容的文件对象，按魔数判断并透明解压 gzip"""
+    chunks = iter(chunks)
+    first = b''
+    for first in chunks:
+        if first:
+            break
+    stream = io.BufferedReader(ChunkStream(itertools.chain([first], chunks)))
+    if first.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def parse_sitemap(stream) -> Iterator[tuple]:
+    """
+    流式解析一个站点地图，逐个返回 (类型, SitemapEntry)
+    类型为 'url'（urlset 中的页面）或 'sitemap'（sitemapindex 中的站点地图）
+    """
+    root = None
+    depth = 0
+    loc = lastmod = None
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        # 只取 <url>/<sitemap> 的直接子元素，忽略 image:loc 等扩展
+        if depth == 2 and tag == 'loc':
+            loc = (elem.text or '').strip()
+        elif depth == 2 and tag == 'lastmod':
+            lastmod = elem.text
+        elif depth == 1 and tag in ('url', 'sitemap'):
+            if loc:
+                yield tag, SitemapEntry(loc, parse_lastmod(lastmod))
+            loc = lastmod = None
+            root.clear()
+
+
+def iter_sitemap_entries(open_url: Callable, sitemap_urls: Iterable[str], logger=None) -> Iterator[SitemapEntry]:
+    """
+    依次读取站点地图（展开 sitemapindex），返回其中的全部页面
+    open_url(url) 返回 requests 风格的流式响应（status_code、iter_content，可用作上下文管理器）
+    """
+    seen = set()
+
+    def read(url: str, level: int) -> Iterator[SitemapEntry]:
+        if url in seen or level > MAX_INDEX_DEPTH:
+            return
+        seen.add(url)
+        children = []
+        count = 0
+        try:
+            with open_url(url) as response:
+                if response.status_code != 200:
+                    if logger:
+                        logger.warning(f"无法获取站点地图 {url}: HTTP {response.status_code}")
+                    return
+                for kind, entry in parse_sitemap(open_xml_stream(response.iter_content(64 * 1024))):
+                    if kind == 'sitemap':
+                        children.append(entry.loc)
+                    else:
+                        count += 1
+                        yield entry
+        except (ElementTree.ParseError, OSError, EOFError) as e:
+            if logger:
+                logger.warning(f"站点地图解析失败 {url}: {e}")
+        if logger:
+            logger.info(f"站点地图 {url}: {count} 个页面" + (f", {len(children)} 个子站点地图" if children else ''))
+        for child in children:
+            yield from read(child, level + 1)
+
+    for sitemap_url in sitemap_urls:
+        yield from read(sitemap_url, 0)
+
+
+def find_sitemaps(robots_sitemaps: List[str], base_url: str, open_url: Callable) -> List[str]:
+    """robots.txt 中的站点地图；没有时返回第一个存在的常用地址"""
+    if robots_sitemaps:
+        return list(dict.fromkeys(robots_sitemaps))
+    for path in WELL_KNOWN_PATHS:
+        url = urljoin(base_url, path)
+        try:
+            with open_url(url) as response:
+                if response.status_code == 200:
+                    return [url]
+        except OSError:
+            continue
+    return []
@@ -8,6 +8,7 @@ import sys
 import os
 import time
 import hashlib
+import tempfile
 from unittest.mock import Mock, patch, MagicMock
 import requests
 
@@ -17,6 +18,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from crawler import ImageCrawler
 from config import Config
 
+# 测试输出写入临时目录（进程退出时删除）
+OUTPUT = tempfile.TemporaryDirectory()
+
 
 class MockResponse:
     """模拟HTTP响应"""
@@ -35,6 +39,7 @@ def test_browser_headers():
     print("🧪 测试1: 浏览器请求头生成")
     
     config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
     crawler = ImageCrawler(config)
     
     headers = crawler._get_browser_headers("https://8se.me/photo/id-test/1.html")
@@ -61,6 +66,7 @@ def test_hq_image_url_generation():
     print("🧪 测试2: 高清图片URL生成")
     
     config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
     crawler = ImageCrawler(config)
     
     # 测试缩略图URL转换为高清版本
@@ -88,6 +94,7 @@ def test_403_retry_logic():
     print("🧪 测试3: 403错误重试逻辑")
     
     config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
     crawler = ImageCrawler(config)
     
     # 模拟第一次403响应，然后200响应
@@ -123,6 +130,7 @@ def test_cookie_management():
     print("🧪 测试4: Cookie管理")
     
     config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
     
     # 模拟一些Cookie数据
     config.cookies = [
@@ -146,6 +154,7 @@ def test_photo_show_page_extraction():
     print("🧪 测试5: photoShow页面图片提取逻辑")
     
     config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
     crawler = ImageCrawler(config)
     
     # 模拟HTML内容
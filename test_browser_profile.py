@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试浏览器资源屏蔽、按页面类型禁用JavaScript和阶段指标
+"""
+
+import tempfile
+
+from config import Config
+from crawler import ImageCrawler
+
+# 测试输出写入临时目录（进程退出时删除）
+OUTPUT = tempfile.TemporaryDirectory()
+
+
+class FakeDriver:
+    """记录 CDP 命令和脚本调用的假浏览器"""
+
+    def __init__(self, transfer_bytes=0):
+        self.transfer_bytes = transfer_bytes
+        self.cdp_commands = []
+        self.visited = []
+        self.async_calls = 0
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp_commands.append((cmd, params))
+        return {}
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def execute_script(self, script, *args):
+        if 'readyState' in script and 'querySelector' not in script:
+            return 'complete'
+        if 'transferSize' in script:
+            return self.transfer_bytes
+        return True
+
+    def execute_async_script(self, script, *args):
+        self.async_calls += 1
+        return 3
+
+
+def make_crawler(**overrides) -> ImageCrawler:
+    config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
+    config.RESPECT_ROBOTS_TXT = False
+    config.TRACE_FILE = ''
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return ImageCrawler(config)
+
+
+def test_blocked_url_patterns():
+    """测试资源类型展开为URL模式并去重"""
+    print("🧪 测试1: 资源屏蔽列表")
+
+    crawler = make_crawler(BLOCKED_RESOURCE_TYPES=['stylesheet', 'font', 'unknown'],
+                           BLOCKED_URL_PATTERNS=['*.css', '*ads.example.com*'])
+    patterns = crawler._blocked_url_patterns()
+    assert patterns[:2] == ['*.css', '*.css?*']
+    assert '*.woff2' in patterns and patterns.count('*.css') == 1
+    assert patterns[-1] == '*ads.example.com*'
+
+    driver = FakeDriver()
+    crawler._block_resources(driver)
+    assert [cmd for cmd, _ in driver.cdp_commands] == ['Network.enable', 'Network.setBlockedURLs']
+    assert driver.cdp_commands[1][1] == {'urls': patterns}
+    print(f"  ✓ {len(patterns)} 个模式通过 Network.setBlockedURLs 下发")
+
+    crawler = make_crawler(BLOCKED_RESOURCE_TYPES=[], BLOCKED_URL_PATTERNS=[])
+    driver = FakeDriver()
+    crawler._block_resources(driver)
+    assert driver.cdp_commands == []
+    print("  ✓ 屏蔽列表为空时不发送CDP命令")
+    print()
+
+
+def test_page_profiles_and_stage_metrics():
+    """测试静态页面类型禁用JavaScript，并记录阶段耗时和字节数"""
+    print("🧪 测试2: 页面类型配置与阶段指标")
+
+    crawler = make_crawler(NO_JS_PAGE_TYPES=['list'], PAGE_READY_TIMEOUT=1)
+
+    driver = FakeDriver(transfer_bytes=2048)
+    crawler._navigate(driver, 'https://8se.me/photos/sort-hot.html', 'list', crawler.LIST_SELECTORS)
+    assert driver.cdp_commands == [('Emulation.setScriptExecutionDisabled', {'value': True})]
+    assert driver.async_calls == 0, "禁用JavaScript的页面不应等待网络空闲"
+    print("  ✓ 列表页禁用JavaScript，跳过网络空闲等待")
+
+    driver = FakeDriver(transfer_bytes=4096)
+    crawler._navigate(driver, 'https://8se.me/photo/id-x/1.html', 'detail', crawler.DETAIL_SELECTORS)
+    crawler._navigate(driver, 'https://8se.me/photo/id-x/2.html', 'detail', crawler.DETAIL_SELECTORS)
+    assert driver.cdp_commands[-1] == ('Emulation.setScriptExecutionDisabled', {'value': False})
+    assert driver.async_calls == 2
+    print("  ✓ 详情页保持JavaScript并等待网络空闲")
+
+    stages = crawler._stage_summary()
+    assert stages['list']['count'] == 1 and stages['list']['bytes'] == 2048
+    assert stages['detail']['count'] == 2 and stages['detail']['avg_bytes'] == 4096
+    print(f"  ✓ 阶段指标: {stages}")
+    print()
+
+
+if __name__ == '__main__':
+    test_blocked_url_patterns()
+    test_page_profiles_and_stage_metrics()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+测试混合模式: 一次 CDP 调用载入Cookie、导出浏览器指纹、按403比例刷新会话，以及不启动浏览器下载套图
+"""
+
+import os
+import tempfile
+
+from selenium.common.exceptions import WebDriverException
+
+from browser_session import BrowserSession, cookie_params, fingerprint_headers, load_cookies
+from config import Config
+from fixture_server import FixtureSite, FixtureServer
+
+
+FINGERPRINT = {
+    'userAgent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'languages': ['zh-CN', 'zh', 'en'],
+    'brands': [{'brand': 'Chromium', 'version': '126'}, {'brand': 'Google Chrome', 'version': '126'}],
+    'mobile': False,
+    'platform': 'Linux',
+}
+
+
+class FakeDriver:
+    """记录调用的浏览器，get_cookies() 返回 cookies() 的当前值（模拟通过验证后得到的Cookie）"""
+
+    def __init__(self, cookies=lambda: {'session': 's1'}, cdp=True):
+        self._cookies = cookies
+        self.cdp = cdp
+        self.cdp_calls = []
+        self.added = []
+        self.visited = []
+        self.quit_called = False
+
+    def execute_cdp_cmd(self, cmd, params):
+        if not self.cdp:
+            raise WebDriverException('CDP not supported')
+        self.cdp_calls.append((cmd, params))
+
+    def add_cookie(self, cookie):
+        self.added.append(cookie)
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_cookies(self):
+        return [{'name': name, 'value': value} for name, value in self._cookies().items()]
+
+    def execute_script(self, script, *args):
+        return FINGERPRINT
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_cookies_and_fingerprint():
+    """测试Cookie转换、一次 CDP 调用写入和请求头导出"""
+    print("🧪 测试1: Cookie 与指纹")
+
+    cookies = [{'name': 'a', 'value': '1', 'domain': '.8se.me', 'expiry': 1900000000, 'httpOnly': True},
+               {'name': 'b', 'value': '2'}, {'name': '', 'value': 'x'}]
+    params = cookie_params(cookies, 'https://8se.me/')
+    assert params == [{'name': 'a', 'value': '1', 'domain': '.8se.me', 'path': '/', 'httpOnly': True,
+                       'expires': 1900000000},
+                      {'name': 'b', 'value': '2', 'url': 'https://8se.me/'}], params
+    print("  ✓ 转换为 Network.setCookies 参数，跳过无效Cookie")
+
+    driver = FakeDriver()
+    assert load_cookies(driver, cookies, 'https://8se.me/') == 2
+    assert len(driver.cdp_calls) == 1 and not driver.added
+    driver = FakeDriver(cdp=False)
+    assert load_cookies(driver, cookies, 'https://8se.me/') == 2
+    assert driver.added[0] == {'name': 'a', 'value': '1', 'domain': '.8se.me', 'path': '/', 'expiry': 1900000000}
+    print("  ✓ 一次 CDP 调用写入全部Cookie，不支持时逐条 add_cookie")
+
+    headers = fingerprint_headers(FINGERPRINT)
+    assert headers['User-Agent'] == FINGERPRINT['userAgent']
+    assert headers['Accept-Language'] == 'zh-CN,zh;q=0.9,en;q=0.8'
+    assert headers['Sec-Ch-Ua'] == '"Chromium";v="126", "Google Chrome";v="126"'
+    assert headers['Sec-Ch-Ua-Platform'] == '"Linux"' and headers['Sec-Ch-Ua-Mobile'] == '?0'
+    firefox = fingerprint_headers({'userAgent': 'Firefox', 'languages': []})
+    assert firefox == {'User-Agent': 'Firefox'}
+    print("  ✓ 导出 User-Agent、Accept-Language 和 Client Hints")
+    print()
+
+
+def test_refresh_on_403_rate():
+    """测试会话只建立一次，403 比例达到阈值且超过最小间隔时才刷新"""
+    print("🧪 测试2: 按403比例刷新")
+
+    now = [0.0]
+    drivers = []
+
+    def start():
+        drivers.append(FakeDriver())
+        return drivers[-1], {'server': 'http://127.0.0.1:7890'}
+
+    session = BrowserSession(start, 'https://8se.me/', [{'name': 'a', 'value': '1'}], refresh_rate=0.5,
+                             window=4, min_samples=4, min_interval=60, settle=0, clock=lambda: now[0])
+    state = session.state()
+    assert session.state() is state and len(drivers) == 1
+    assert state.cookies == {'session': 's1'} and state.generation == 1
+    assert state.proxies == {'http': 'http://127.0.0.1:7890', 'https': 'http://127.0.0.1:7890'}
+    headers = session.headers({'User-Agent': 'random', 'Referer': 'https://8se.me/'})
+    assert headers['User-Agent'] == FINGERPRINT['userAgent'] and headers['Referer'] == 'https://8se.me/'
+    print("  ✓ 第一次使用时建立会话，之后直接复用")
+
+    now[0] = 100
+    assert not any(session.record(status) for status in (200, 200, 200, 403))
+    print("  ✓ 403 比例不够时不刷新")
+
+    assert session.record(403) is True
+    assert session.refreshes == 1 and session.state().generation == 2 and len(drivers) == 1
+    print("  ✓ 403 比例达到阈值时用同一个浏览器刷新会话")
+
+    assert not any(session.record(403) for _ in range(8))
+    now[0] = 200
+    assert session.record(403) is True and session.refreshes == 2
+    print("  ✓ 距上次刷新不足 min_interval 时不再刷新")
+
+    session.close()
+    assert drivers[0].quit_called
+    print()
+
+
+def test_hybrid_crawl():
+    """测试混合模式下载套图: 只启动一个浏览器，会话过期后刷新"""
+    print("🧪 测试3: 混合模式爬取")
+
+    from crawler import ImageCrawler
+
+    site = FixtureSite(sets=2, pages_per_set=2, images_per_page=3, session_cookie='s1')
+    with tempfile.TemporaryDirectory() as tmp, FixtureServer(site) as server:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.START_URL = f"{server.base_url}/photos/sort-hot.html"
+        config.RESPECT_ROBOTS_TXT = False
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        config.MIN_DELAY = 0
+        config.HYBRID = True
+        config.HYBRID_SETTLE = 0
+        config.HYBRID_WINDOW = 1
+        config.HYBRID_REFRESH_INTERVAL = 0
+        crawler = ImageCrawler(config)
+        drivers = []
+
+        def create_driver(proxy_config=None, download_dir=None):
+            drivers.append(FakeDriver(cookies=lambda: {'session': site.session_cookie}))
+            return drivers[-1]
+        crawler._create_driver = create_driver
+
+        assert crawler._discover_photo_urls() == [f"{server.base_url}/photo/id-{site.set_id(index)}.html"
+                                                  for index in range(2)]
+        crawler._crawl_photo_detail(f"{server.base_url}/photo/id-{site.set_id(0)}.html", 2)
+        assert crawler.stats['images_downloaded'] == 6, crawler.stats
+        print(f"  ✓ 列表页、详情页和图片都通过 HTTP 获取 (浏览器 {len(drivers)} 个)")
+
+        # 会话过期: 下一个请求返回403，刷新后用新Cookie重试
+        site.session_cookie = 's2'
+        crawler._crawl_photo_detail(f"{server.base_url}/photo/id-{site.set_id(1)}.html", 2)
+        assert crawler.stats['images_downloaded'] == 12, crawler.stats
+        assert crawler.session.refreshes == 1 and len(drivers) == 1
+        assert server.requests['page_no_session'] == 1
+        assert len(os.listdir(os.path.join(tmp, site.set_id(1)))) >= 6
+        print("  ✓ 403 后刷新会话并继续下载")
+
+        crawler._finish_run()
+        assert drivers[0].quit_called
+    print()
+
+
+if __name__ == '__main__':
+    test_cookies_and_fingerprint()
+    test_refresh_on_403_rate()
+    test_hybrid_crawl()
+    print("✅ 所有测试完成!")
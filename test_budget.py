@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+测试运行预算: 时长/大小解析、成本估算，以及预算不足时挑选放得下的套图
+"""
+
+from budget import CrawlBudget, parse_duration, parse_size
+from frontier import Frontier
+
+
+def test_parse():
+    """测试时长和大小解析"""
+    print("🧪 测试1: 解析预算")
+
+    assert parse_duration('90') == 90 and parse_duration('30m') == 1800 and parse_duration('1.5h') == 5400
+    assert parse_size('500M') == 500 * 1024 ** 2 and parse_size('5GB') == 5 * 1024 ** 3 and parse_size('') == 0
+    for bad in ('abc', '5x'):
+        try:
+            parse_size(bad)
+            raise AssertionError(f"应该无法解析: {bad}")
+        except ValueError:
+            pass
+    print("  ✓ 30m / 1.5h / 500M / 5GB")
+    print()
+
+
+def test_budget_picks_sets_that_fit():
+    """测试按估算成本挑选套图，都放不下时停止"""
+    print("🧪 测试2: 预算调度")
+
+    now = [0.0]
+    used = [0]
+    budget = CrawlBudget(seconds=100, bytes_limit=0, bytes_used=lambda: used[0], clock=lambda: now[0])
+    assert budget.fits(1000), "还没有成本数据时总是可以开始"
+
+    # 一个套图: 10张图片 20秒 -> 每张约2秒
+    now[0] += 20
+    budget.record_set(20, 10 * 100000, 10)
+    assert budget.fits(10) and budget.estimate(10)[0] == 10 * 2 * 1.2
+
+    frontier = Frontier(['rank'])
+    frontier.push('https://a.com/photo/id-big.html', images=60)
+    frontier.push('https://a.com/photo/id-mid.html', images=30)
+    frontier.push('https://a.com/photo/id-small.html', images=5)
+    now[0] += 10  # 剩余70秒: 60张需要144秒，30张需要72秒，5张需要12秒
+    url = frontier.pop_where(lambda item: budget.fits(item.features.get('images')))
+    assert url == 'https://a.com/photo/id-small.html', url
+    assert len(frontier) == 2 and frontier.pop() == 'https://a.com/photo/id-big.html'
+    print("  ✓ 跳过放不下的大套图，先完成小套图")
+
+    # 只设置了时间预算: 大套图放不下时停止原因是时间，不会是流量
+    assert not budget.fits(60) and budget.rejected_by == 'time'
+    budget.stop()
+    assert budget.stopped == 'time'
+    print("  ✓ 停止原因只来自已设置的预算")
+
+    now[0] += 80
+    assert not budget.fits(1) and budget.stopped == 'time'
+    summary = budget.summary()
+    assert summary['stopped'] == 'time' and summary['seconds_per_image'] == 2.0
+    print("  ✓ 时间用完后停止")
+
+    bytes_budget = CrawlBudget(bytes_limit=1000000, bytes_used=lambda: used[0])
+    bytes_budget.record_set(5, 500000, 5)
+    used[0] = 500000
+    assert bytes_budget.fits(3) and not bytes_budget.fits(5)
+    assert bytes_budget.rejected_by == 'bytes'
+    used[0] = 1000000
+    assert not bytes_budget.fits() and bytes_budget.stopped == 'bytes'
+
+    # 两项都设置时记录实际不足的一项
+    mixed = CrawlBudget(seconds=1000, bytes_limit=1000000, bytes_used=lambda: 0, clock=lambda: 0.0)
+    mixed.record_set(1, 500000, 5)
+    assert not mixed.fits(20)
+    mixed.stop()
+    assert mixed.stopped == 'bytes'
+    print("  ✓ 流量预算")
+
+    # 续传的套图: 发现20张，只下载了其中4张（其余已存在），成本按下载的4张计算
+    resumed = CrawlBudget(seconds=1000, clock=lambda: 0.0)
+    resumed.record_set(8, 400000, 20, downloaded=4)
+    assert resumed.seconds_per_image == 2.0 and resumed.bytes_per_image == 100000
+    assert resumed.images_per_set == 20
+    resumed.record_set(1, 0, 20, downloaded=0)
+    assert resumed.seconds_per_image == 2.0 and resumed.sets_started == 2
+    print("  ✓ 跳过的已有图片不摊低每张图片的成本")
+    print()
+
+
+if __name__ == '__main__':
+    test_parse()
+    test_budget_picks_sets_that_fit()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+测试下载目录索引的批量写入、查询和从 metadata.json 回填
+"""
+
+import os
+import json
+import sqlite3
+import tempfile
+
+from catalog import Catalog, create_catalog, parse_since
+from config import Config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_batched_writes_and_queries():
+    """测试记录在达到批次大小前只在缓冲区中，以及各查询的结果"""
+    print("🧪 测试1: 批量写入与查询")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        catalog = Catalog(os.path.join(tmp, 'catalog.db'), batch_size=4, flush_interval=3600, clock=clock)
+
+        catalog.record_image('https://img/a1.jpg', photo_id='a', filename='a1.jpg', status='downloaded',
+                             bytes=1000, sha1='aa', attempts=1)
+        catalog.record_image('https://img/a2.jpg', photo_id='a', filename='a2.jpg', status='failed',
+                             attempts=5, error='HTTP 403')
+        assert catalog.status()['images_total'] == 0, "未达到批次大小时不应写入"
+
+        catalog.record_set('a', url='https://8se.me/photo/id-a.html', title='A', status='success',
+                           total_pages=2, images_downloaded=1, images_failed=1)
+        catalog.record_page('a', 1, url='https://8se.me/photo/id-a/1.html', status='success', images=2)
+        assert catalog.status()['images_total'] == 2
+        print("  ✓ 第4条记录触发一次事务写入")
+
+        clock.now += 86400 * 10
+        catalog.record_image('https://img/b1.jpg', photo_id='b', filename='b1.jpg', status='downloaded',
+                             bytes=2000, sha1='bb')
+        catalog.record_image('https://img/b2.jpg', photo_id='b', filename='b2.jpg', status='failed', attempts=5)
+        catalog.record_image('https://img/b2.jpg', photo_id='b', filename='b2.jpg', status='downloaded',
+                             bytes=3000, sha1='cc', attempts=2)
+        catalog.record_set('b', title='B', status='success', images_downloaded=2)
+        catalog.record_set('c', title='C', status='failed', error='timeout')
+        catalog.flush()
+
+        status = catalog.status()
+        assert status['sets'] == {'success': 2, 'failed': 1} and status['sets_incomplete'] == 2, status
+        assert status['images'] == {'downloaded': 3, 'failed': 1}, status
+        assert status['bytes_downloaded'] == 6000
+        print(f"  ✓ status: {status['sets_total']} 个套图，{status['images_total']} 张图片")
+
+        incomplete = catalog.incomplete()
+        assert [row['photo_id'] for row in incomplete] == ['c', 'a'], incomplete
+        print("  ✓ incomplete: 失败和有失败图片的套图，最近的在前")
+
+        failures = catalog.failures(since=clock.now - 86400)
+        assert failures == [], "重试成功的图片不应计为失败"
+        failures = catalog.failures()
+        assert [row['url'] for row in failures] == ['https://img/a2.jpg']
+        print("  ✓ failures: 按时间过滤")
+
+        catalog.close()
+        reopened = Catalog(os.path.join(tmp, 'catalog.db'))
+        row = reopened._conn.execute(
+            "SELECT attempts, sha1 FROM images WHERE url = 'https://img/b2.jpg'").fetchone()
+        assert row == (7, 'cc'), row
+        bytes_b = reopened._conn.execute("SELECT bytes FROM sets WHERE photo_id = 'b'").fetchone()[0]
+        assert bytes_b == 5000, bytes_b
+        reopened.close()
+        print("  ✓ 重试次数累计，套图字节数由图片汇总")
+    print()
+
+
+def test_parse_since():
+    """测试时间起点解析"""
+    print("🧪 测试2: 解析 --since")
+
+    now = 1_700_000_000.0
+    assert parse_since('7d', now) == now - 7 * 86400
+    assert parse_since('12h', now) == now - 12 * 3600
+    assert parse_since('30m', now) == now - 1800
+    assert parse_since('2023-01-01', now) < now
+    try:
+        parse_since('last week', now)
+        assert False, "无法解析的时间应抛出异常"
+    except ValueError:
+        pass
+    print("  ✓ 相对时长和日期")
+    print()
+
+
+def test_import_metadata_and_factory():
+    """测试从已有的 metadata.json 回填，以及 CATALOG_FILE 为空时禁用"""
+    print("🧪 测试3: 回填与配置")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for photo_id, failed in (('x1', []), ('x2', [{'url': 'https://img/x2.jpg', 'filename': 'x2.jpg',
+                                                     'reason': '下载失败'}])):
+            os.makedirs(os.path.join(tmp, photo_id))
+            with open(os.path.join(tmp, photo_id, 'metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump({'title': photo_id, 'photo_id': photo_id, 'photo_url': f'https://8se.me/{photo_id}',
+                           'images_downloaded': 3, 'images_failed': len(failed), 'failed_images': failed,
+                           'download_date': '2024-05-01 10:00:00'}, f)
+
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        catalog = create_catalog(config)
+        assert isinstance(catalog, Catalog) and catalog.path == os.path.join(tmp, 'catalog.db')
+        assert catalog.import_metadata(tmp) == 2
+        assert catalog.status()['sets_incomplete'] == 1
+        assert catalog.failures()[0]['error'] == '下载失败'
+        catalog.close()
+        print("  ✓ 导入2个套图及失败图片")
+
+        config.CATALOG_FILE = ''
+        assert not create_catalog(config).enabled
+        print("  ✓ CATALOG_FILE 为空时使用空实现")
+    print()
+
+
+class ListLogger:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append(message)
+
+
+def test_locked_database_keeps_records():
+    """测试数据库被其它节点锁住时记录保留在缓冲区，爬虫的写入不抛出异常，解锁后写入"""
+    print("🧪 测试4: 数据库锁定")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.db')
+        logger = ListLogger()
+        catalog = Catalog(path, batch_size=2, flush_interval=3600, logger=logger)
+        catalog._conn.execute('PRAGMA busy_timeout = 50')
+        locker = sqlite3.connect(path, isolation_level=None)
+        locker.execute('BEGIN EXCLUSIVE')
+
+        catalog.record_image('https://img/a1.jpg', photo_id='a', status='downloaded', bytes=100)
+        catalog.record_image('https://img/a2.jpg', photo_id='a', status='downloaded', bytes=200)
+        assert len(catalog._pending) == 2 and len(logger.errors) == 1, logger.errors
+        # 失败后 flush_interval 内不再由每条新记录触发写入
+        catalog.record_image('https://img/a3.jpg', photo_id='a', status='downloaded', bytes=300)
+        assert len(logger.errors) == 1
+        try:
+            catalog.flush()
+            raise AssertionError("直接调用 flush() 时应抛出数据库错误")
+        except sqlite3.OperationalError:
+            pass
+        assert [params['url'] for _, params in catalog._pending] == [
+            'https://img/a1.jpg', 'https://img/a2.jpg', 'https://img/a3.jpg']
+        print("  ✓ 写入失败时记录放回缓冲区，下载线程只看到日志")
+
+        locker.execute('ROLLBACK')
+        locker.close()
+        catalog.close()
+        reopened = Catalog(path)
+        assert reopened.status()['images_total'] == 3
+        reopened.close()
+        print("  ✓ 解锁后全部记录写入")
+    print()
+
+
+if __name__ == '__main__':
+    test_batched_writes_and_queries()
+    test_parse_since()
+    test_import_metadata_and_factory()
+    test_locked_database_keeps_records()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试DNS缓存的有效期、跨运行保存、解析失败时使用旧结果，以及新图片主机的连接预热
+"""
+
+import os
+import time
+import socket
+import tempfile
+
+from dns_cache import DnsCache, HostWarmer
+from fixture_server import FixtureSite, FixtureServer
+from http_client import RequestsClient
+
+
+class FakeResolver:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, host, port, family=0, type=0, proto=0, flags=0):
+        self.calls += 1
+        if self.fail:
+            raise socket.gaierror(socket.EAI_NONAME, 'not found')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', port))]
+
+
+def test_ttl_persistence_and_stale():
+    """测试缓存有效期、保存后重新加载，以及解析失败时使用过期的结果"""
+    print("🧪 测试1: DNS缓存")
+
+    now = [1000.0]
+    resolver = FakeResolver()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dns_cache.json')
+        cache = DnsCache(path, ttl=60, resolver=resolver, clock=lambda: now[0])
+        for _ in range(3):
+            assert cache.getaddrinfo('cdn.example.com', 443, 0, socket.SOCK_STREAM)[0][4] == ('10.0.0.1', 443)
+        assert resolver.calls == 1 and cache.hits == 2
+        now[0] += 61
+        cache.getaddrinfo('cdn.example.com', 443, 0, socket.SOCK_STREAM)
+        assert resolver.calls == 2
+        print("  ✓ 有效期内只解析一次，过期后重新解析")
+        cache.save()
+
+        reloaded = DnsCache(path, ttl=60, resolver=resolver, clock=lambda: now[0])
+        result = reloaded.getaddrinfo('cdn.example.com', 443, 0, socket.SOCK_STREAM)
+        assert resolver.calls == 2 and result[0][0] == socket.AF_INET
+        print("  ✓ 下次运行从文件加载")
+
+        now[0] += 120
+        resolver.fail = True
+        assert reloaded.getaddrinfo('cdn.example.com', 443, 0, socket.SOCK_STREAM)[0][4] == ('10.0.0.1', 443)
+        try:
+            reloaded.getaddrinfo('other.example.com', 443)
+            raise AssertionError("没有缓存时应抛出解析错误")
+        except socket.gaierror:
+            pass
+        print("  ✓ 解析失败时使用过期的结果")
+
+    original = socket.getaddrinfo
+    first = DnsCache(ttl=60, resolver=resolver).install()
+    second = DnsCache(ttl=60, resolver=FakeResolver()).install()
+    try:
+        socket.getaddrinfo('chained.example.com', 443)
+        assert second.misses == 1 and first.misses == 0
+        first.uninstall()
+        socket.getaddrinfo('chained.example.com', 443)
+        assert second.hits == 1
+    finally:
+        first.uninstall()
+        second.uninstall()
+    assert socket.getaddrinfo is original
+    print("  ✓ 多个缓存使用最后安装的一个，全部卸载后恢复原来的解析函数（与卸载顺序无关）")
+    print()
+
+
+def test_crawler_installs_during_run():
+    """测试创建爬虫时不替换 socket.getaddrinfo，只在运行期间安装"""
+    print("🧪 测试2: 运行期间安装")
+
+    from crawler import ImageCrawler
+    from config import Config
+
+    original = socket.getaddrinfo
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.START_URL = 'http://127.0.0.1:9/photos/sort-hot.html'
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        config.RESPECT_ROBOTS_TXT = False
+        config.LIST_PAGES = 0
+        config.DNS_CACHE_TTL = 300
+        crawler = ImageCrawler(config)
+        assert socket.getaddrinfo is original
+        installed = []
+        crawler._discover_photo_urls = lambda: installed.append(socket.getaddrinfo is not original) or []
+        crawler.crawl()
+        assert installed == [True] and socket.getaddrinfo is original
+    print("  ✓ 创建爬虫不影响进程，crawl() 期间安装、结束后恢复")
+    print()
+
+
+def test_warmer_opens_connections():
+    """测试发现新主机后预先打开连接，之后的下载复用这些连接"""
+    print("🧪 测试3: 连接预热")
+
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=2, image_size=16 * 1024)
+    client = RequestsClient(pool_size=4)
+    with FixtureServer(site) as server:
+        urls = [f"{server.base_url}{path}" for path in site.image_paths(site.set_id(0), 1)]
+        warmer = HostWarmer(client, connections=2)
+        warmer.observe(urls)
+        warmer.observe(urls)
+        deadline = time.time() + 5
+        while server.connections < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert server.connections == 2, server.connections
+
+        for url in urls:
+            assert client.get(url, timeout=5).status_code == 200
+        assert server.connections == 2, "下载应复用预热的连接"
+        warmer.close()
+        client.close()
+        print("  ✓ 同一主机只预热一次，下载复用预热的连接")
+    print()
+
+
+if __name__ == '__main__':
+    test_ttl_persistence_and_stale()
+    test_crawler_installs_during_run()
+    test_warmer_opens_connections()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+测试单次遍历的HTML提取
+"""
+
+import tempfile
+
+from selenium.common.exceptions import WebDriverException
+
+from config import Config
+from crawler import ImageCrawler
+from extractor import extract_page, image_suffixes, is_image_url
+from fixture_server import FixtureSite
+
+# 测试输出写入临时目录（进程退出时删除）
+OUTPUT = tempfile.TemporaryDirectory()
+
+
+SUFFIXES = image_suffixes(Config.ALLOWED_IMAGE_FORMATS)
+
+
+def test_generic_page():
+    """测试通用页面的图片、链接和标题"""
+    print("🧪 测试1: 通用页面")
+
+    html = """
+    <html><head><title> 页面标题 </title></head><body>
+        <img src="/a.jpg"><img data-src="b.PNG"><img src="/icon.svg">
+        <picture><source srcset="/c@2x.webp 2x, /c.webp 1x"></picture>
+        <a href="/page/2.html">下一页</a><a href="https://cdn.example.com/d.gif">原图</a>
+        <a href="/page/2.html">重复</a>
+        <div style="background-image: url('/bg.jpg')"></div>
+    </body></html>
+    """
+    page = extract_page(html, 'https://example.com/list/', SUFFIXES)
+
+    assert page.title == '页面标题'
+    assert page.images == [
+        'https://example.com/a.jpg',
+        'https://example.com/list/b.PNG',
+        'https://example.com/c@2x.webp',
+        'https://example.com/c.webp',
+        'https://cdn.example.com/d.gif',
+    ], page.images
+    assert page.links == ['https://example.com/page/2.html', 'https://cdn.example.com/d.gif']
+    assert page.background_images == ['https://example.com/bg.jpg']
+    assert not page.has_pager and not page.has_next
+    print(f"  ✓ 图片 {len(page.images)} 张，链接 {len(page.links)} 个")
+    print()
+
+
+def test_site_pages():
+    """测试列表页、详情页和分页器状态"""
+    print("🧪 测试2: 列表页/详情页")
+
+    site = FixtureSite(sets=3, pages_per_set=2, images_per_page=4)
+    set_id = site.set_id(1)
+
+    page = extract_page(site.render_list_page(1), 'https://8se.me/photos/sort-hot.html', SUFFIXES)
+    assert page.photo_links == [f'https://8se.me/photo/id-{site.set_id(i)}.html' for i in range(3)]
+
+    first = extract_page(site.render_detail_page(set_id, 1), 'https://8se.me/photo/id-x/1.html', SUFFIXES)
+    assert first.title == f'套图 {set_id}'
+    assert first.photo_images == [f'https://8se.me{path}' for path in site.image_paths(set_id, 1)]
+    assert first.has_pager and first.has_next
+
+    last = extract_page(site.render_detail_page(set_id, 2), 'https://8se.me/photo/id-x/2.html', SUFFIXES)
+    assert last.has_pager and not last.has_next
+    print(f"  ✓ 套图链接 {len(page.photo_links)} 个，详情页图片 {len(first.photo_images)} 张")
+    print()
+
+
+def test_edge_cases():
+    """测试空页面和带编码声明的页面"""
+    print("🧪 测试3: 边界情况")
+
+    assert extract_page('', 'https://example.com/', SUFFIXES).images == []
+    xml_page = '<?xml version="1.0" encoding="utf-8"?><html><body><img src="/x.jpg"></body></html>'
+    assert extract_page(xml_page, 'https://example.com/', SUFFIXES).images == ['https://example.com/x.jpg']
+    assert is_image_url('https://example.com/a.JPEG?x=1', SUFFIXES)
+    assert not is_image_url('https://example.com/a.jpg.html', SUFFIXES)
+    print("  ✓ 边界情况处理正确")
+    print()
+
+
+class FakeDriver:
+    """只实现提取所需接口的假浏览器"""
+
+    def __init__(self, page_source, script_result=None, script_error=None):
+        self.page_source = page_source
+        self.script_result = script_result
+        self.script_error = script_error
+        self.script_calls = 0
+
+    def execute_script(self, script, *args):
+        self.script_calls += 1
+        if self.script_error:
+            raise self.script_error
+        return self.script_result
+
+
+def test_driver_extraction_modes():
+    """测试页面内提取和回退到 page_source"""
+    print("🧪 测试4: 页面内提取")
+
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=2)
+    html = site.render_detail_page(site.set_id(0), 1)
+    url = 'https://8se.me/photo/id-x/1.html'
+
+    config = Config()
+    config.OUTPUT_DIR = OUTPUT.name
+    config.JS_EXTRACTION = True
+    crawler = ImageCrawler(config)
+
+    driver = FakeDriver('', script_result={'title': 'JS标题', 'photo_images': ['https://8se.me/1.jpg'],
+                                           'has_pager': True, 'has_next': False})
+    page = crawler._extract_driver_page(driver, url, 'detail')
+    assert page.title == 'JS标题' and page.photo_images == ['https://8se.me/1.jpg']
+    assert page.has_pager and not page.has_next
+    print("  ✓ 使用页面内脚本返回的紧凑数据")
+
+    driver = FakeDriver(html, script_error=WebDriverException('javascript error'))
+    page = crawler._extract_driver_page(driver, url, 'detail')
+    assert len(page.photo_images) == 2
+    print("  ✓ 脚本失败时回退到 page_source")
+
+    config.JS_EXTRACTION = False
+    driver = FakeDriver(html, script_result={'title': '不应使用'})
+    page = crawler._extract_driver_page(driver, url, 'detail')
+    assert driver.script_calls == 0 and len(page.photo_images) == 2
+    print("  ✓ 关闭 JS_EXTRACTION 时直接解析 page_source")
+    print()
+
+
+if __name__ == '__main__':
+    test_generic_page()
+    test_site_pages()
+    test_edge_cases()
+    test_driver_extraction_modes()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+测试基准测试用的本地合成站点
+"""
+
+from io import BytesIO
+
+import requests
+from bs4 import BeautifulSoup
+from PIL import Image
+
+from fixture_server import FixtureSite, FixtureServer, FaultProfile, FaultRule, make_jpeg
+
+
+def test_make_jpeg_size():
+    """测试生成指定大小的有效JPEG"""
+    print("🧪 测试1: 合成JPEG")
+
+    for size in (20 * 1024, 200 * 1024):
+        data = make_jpeg(size)
+        assert abs(len(data) - size) <= 4, f"大小不符: {len(data)} != {size}"
+        Image.open(BytesIO(data)).verify()
+        print(f"  ✓ {size} bytes JPEG 可通过验证")
+    print()
+
+
+def test_site_structure():
+    """测试列表页、详情页、photoShow页和图片"""
+    print("🧪 测试2: 站点结构")
+
+    site = FixtureSite(sets=3, sets_per_list_page=2, pages_per_set=2, images_per_page=3,
+                       image_size=16 * 1024)
+    with FixtureServer(site) as server:
+        base = server.base_url
+
+        soup = BeautifulSoup(requests.get(f"{base}/photos/sort-hot.html", timeout=5).text, 'html.parser')
+        items = soup.find_all('div', class_='item photo')
+        assert len(items) == 2
+        soup = BeautifulSoup(requests.get(f"{base}/photos/sort-hot.html?page=2", timeout=5).text,
+                             'html.parser')
+        assert len(soup.find_all('div', class_='item photo')) == 1
+        detail_path = items[0].find('a')['href']
+        set_id = detail_path.split('id-')[-1].split('.')[0]
+        print(f"  ✓ 列表页共 {site.list_pages} 页，第一个套图: {set_id}")
+
+        soup = BeautifulSoup(requests.get(f"{base}/photo/id-{set_id}/1.html", timeout=5).text, 'html.parser')
+        assert len(soup.find_all('div', class_='item photo-image')) == 3
+        next_link = soup.find('div', class_='pager').find('a', class_='next')
+        assert 'disabled' not in next_link.get('class', [])
+
+        soup = BeautifulSoup(requests.get(f"{base}/photo/id-{set_id}/2.html", timeout=5).text, 'html.parser')
+        next_link = soup.find('div', class_='pager').find('a', class_='next')
+        assert 'disabled' in next_link.get('class', [])
+        assert requests.get(f"{base}/photo/id-{set_id}/3.html", timeout=5).status_code == 404
+        print("  ✓ 详情页分页器正确")
+
+        soup = BeautifulSoup(requests.get(f"{base}/photoShow.html?id={set_id}", timeout=5).text, 'html.parser')
+        assert len(soup.find_all('img')) == 6
+
+        html = requests.get(f"{base}/lazy.html?id={set_id}&batches=3", timeout=5).text
+        assert len(BeautifulSoup(html, 'html.parser').find_all('img')) == 3
+        assert 'var batches = [[' in html
+        print("  ✓ 懒加载页面只渲染第一批图片")
+
+        response = requests.get(f"{base}{site.image_paths(set_id, 1)[0]}", timeout=5)
+        assert response.headers['Content-Type'] == 'image/jpeg'
+        Image.open(BytesIO(response.content)).verify()
+        assert server.requests['image'] == 1
+        print(f"  ✓ 请求统计: {server.requests}")
+    print()
+
+
+def test_fault_injection():
+    """测试故障注入: 前N次403、429带Retry-After、截断"""
+    print("🧪 测试3: 故障注入")
+
+    faults = FaultProfile([
+        FaultRule(pattern=r'/0001_', fail_first=2),
+        FaultRule(pattern=r'/0002_', too_many=1.0, retry_after=7),
+        FaultRule(pattern=r'/0003_', truncate=1.0),
+    ])
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=3, image_size=16 * 1024, faults=faults)
+    with FixtureServer(site) as server:
+        first, second, third = [f"{server.base_url}{path}" for path in site.image_paths(site.set_id(0), 1)]
+
+        statuses = [requests.get(first, timeout=5).status_code for _ in range(3)]
+        assert statuses == [403, 403, 200], statuses
+        print(f"  ✓ 前两次403后恢复: {statuses}")
+
+        response = requests.get(second, timeout=5)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '7'
+        print("  ✓ 429 携带 Retry-After")
+
+        try:
+            requests.get(third, timeout=5).content
+            truncated = False
+        except requests.exceptions.RequestException:
+            truncated = True
+        assert truncated, "截断的响应应该导致读取失败"
+        assert server.requests['image_forbidden'] == 2
+        assert server.requests['image_truncate'] == 1
+        print(f"  ✓ 故障统计: {server.requests}")
+    print()
+
+
+if __name__ == '__main__':
+    test_make_jpeg_size()
+    test_site_structure()
+    test_fault_injection()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+测试套图调度队列: 组合优先级、运行中更新、主机健康度，以及大量套图时的惰性删除
+"""
+
+import os
+import json
+import time
+import random
+import tempfile
+
+from config import Config
+from frontier import Frontier, register_priority
+
+
+def test_combined_priorities():
+    """测试按 partial、small、rank 逐级排序"""
+    print("🧪 测试1: 组合优先级")
+
+    frontier = Frontier(['partial', 'small', 'rank'])
+    frontier.push('https://a.com/photo/id-1.html', images=40)
+    frontier.push('https://a.com/photo/id-2.html')
+    frontier.push('https://a.com/photo/id-3.html', partial=True, images=90)
+    frontier.push('https://a.com/photo/id-4.html', images=10)
+    assert not frontier.push('https://a.com/photo/id-4.html')
+
+    order = frontier.drain()
+    assert [url[-6] for url in order] == ['3', '4', '1', '2'], order
+    assert frontier.pop() is None and len(frontier) == 0
+    print("  ✓ 部分下载的优先，其次图片少的，图片数未知的最后")
+
+    try:
+        Frontier(['rank', 'unknown'])
+        raise AssertionError("未知的优先级应该报错")
+    except ValueError:
+        pass
+    print()
+
+
+def test_update_and_host_health():
+    """测试运行中更新优先级，以及失败的主机排到后面"""
+    print("🧪 测试2: 更新与主机健康度")
+
+    frontier = Frontier(['healthy', 'rank'])
+    for n in range(3):
+        frontier.push(f'https://bad.com/photo/id-{n}.html')
+        frontier.push(f'https://good.com/photo/id-{n}.html')
+    assert frontier.pop() == 'https://bad.com/photo/id-0.html'
+    frontier.record('https://bad.com/photo/id-0.html', success=False)
+    assert frontier.drain()[:3] == [f'https://good.com/photo/id-{n}.html' for n in range(3)]
+    print("  ✓ 失败后该主机的套图排到后面")
+
+    register_priority('pinned', lambda item, frontier: 0 if item.features.get('pinned') else 1)
+    frontier = Frontier(['pinned', 'rank'])
+    for n in range(5):
+        frontier.push(f'https://a.com/photo/id-{n}.html')
+    assert frontier.update('https://a.com/photo/id-3.html', pinned=True)
+    assert not frontier.update('https://a.com/photo/id-9.html')
+    assert frontier.pop() == 'https://a.com/photo/id-3.html'
+    assert frontier.pop() == 'https://a.com/photo/id-0.html'
+    print("  ✓ 自定义优先级和运行中更新")
+    print()
+
+
+def test_many_updates_stay_compact():
+    """测试大量更新后堆不会无限增长"""
+    print("🧪 测试3: 大量套图")
+
+    frontier = Frontier(['small', 'rank'])
+    total = 200000
+    for n in range(total):
+        frontier.push(f'https://a.com/photo/id-{n}.html', images=n % 50 + 1)
+    for n in range(0, total, 2):
+        frontier.update(f'https://a.com/photo/id-{n}.html', images=100)
+    assert len(frontier) == total
+    size = sum(len(heap) for heap in frontier._heaps.values())
+    assert size == frontier._size <= 2 * total + 1024
+    first = frontier.pop()
+    assert first == 'https://a.com/photo/id-1.html', first
+    print(f"  ✓ {total} 个套图，堆大小 {size}")
+    print()
+
+
+def test_host_health_at_scale():
+    """测试大量套图时按主机健康度排序: 每次 record() 不重新计算该主机的全部套图，顺序与逐个比较一致"""
+    print("🧪 测试4: 大量套图的主机健康度")
+
+    rng = random.Random(3)
+    frontier = Frontier(['partial', 'healthy', 'rank'])
+    queued = {}
+    for n in range(1000):
+        url = f'https://h{n % 20}.com/photo/id-{n}.html'
+        partial = rng.random() < 0.1
+        frontier.push(url, partial=partial)
+        queued[url] = (0 if partial else 1, f'h{n % 20}.com', n)
+    while queued:
+        rates = {host: frontier.host_failure_rate(host) for host in frontier._health}
+        expected = min(queued, key=lambda url: (queued[url][0], rates.get(queued[url][1], 0.0), queued[url][2]))
+        url = frontier.pop()
+        assert url == expected, (url, expected)
+        del queued[url]
+        frontier.record(url, success=rng.random() < 0.6)
+    print("  ✓ 1000 个套图、20 个主机随机成功/失败，弹出顺序与每次重新比较全部套图相同")
+
+    total = 100000
+    frontier = Frontier(['healthy', 'rank'])
+    for n in range(total):
+        frontier.push(f'https://h{n % 2}.com/photo/id-{n}.html')
+    start = time.perf_counter()
+    for n in range(200):
+        # 成功和失败交替，每次 record() 都改变该主机的失败率
+        frontier.record(frontier.pop(), success=n % 4 < 2)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 5, f"{elapsed:.1f}s"
+    frontier.record('https://h1.com/photo/id-1.html', success=False)
+    assert frontier.pop().startswith('https://h0.')
+    print(f"  ✓ {total} 个套图，200 次失败率变化的 pop + record 用时 {elapsed:.2f}s")
+    print()
+
+
+def test_crawler_features_from_metadata():
+    """测试从已有的 metadata.json 得到部分下载状态"""
+    print("🧪 测试5: 套图下载进度")
+
+    from crawler import ImageCrawler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.FRONTIER_PRIORITY = 'partial,rank'
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        crawler = ImageCrawler(config)
+        os.makedirs(os.path.join(tmp, 'b2'))
+        with open(os.path.join(tmp, 'b2', 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump({'images_downloaded': 5, 'images_failed': 2, 'total_images': 7}, f)
+
+        urls = [f'https://8se.me/photo/id-{photo_id}.html' for photo_id in ('a1', 'b2', 'c3')]
+        frontier = crawler._build_frontier(urls)
+        assert frontier.drain() == [urls[1], urls[0], urls[2]]
+        crawler.dns_cache.close()
+        print("  ✓ 未完成的套图排在最前")
+    print()
+
+
+if __name__ == '__main__':
+    test_combined_priorities()
+    test_update_and_host_health()
+    test_many_updates_stay_compact()
+    test_host_health_at_scale()
+    test_crawler_features_from_metadata()
+    print("✅ 所有测试完成!")
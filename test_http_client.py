@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+测试图片下载的 HTTP 客户端: 连接复用、HTTP/2（h2c）多路复用，以及未安装 httpx 时回退到 HTTP/1.1
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import Config
+from fixture_server import FixtureSite, FixtureServer, H2FixtureServer
+from http_client import Http2Client, RequestsClient, create_http_client
+
+
+def test_requests_client_reuses_connections():
+    """测试并发下载复用连接池中的连接"""
+    print("🧪 测试1: HTTP/1.1 连接复用")
+
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=5, image_size=16 * 1024)
+    client = RequestsClient(pool_size=4)
+    with FixtureServer(site) as server:
+        urls = [f"{server.base_url}{path}" for path in site.image_paths(site.set_id(0), 1)] * 8
+
+        def fetch(url):
+            with client.get(url, timeout=5, stream=True) as response:
+                return response.status_code, len(b''.join(response.iter_content(4096)))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(fetch, urls))
+        client.close()
+
+        assert results == [(200, len(site.image_bytes()))] * len(urls)
+        assert server.connections <= 4, server.connections
+        print(f"  ✓ {len(urls)} 个请求使用 {server.connections} 个连接")
+    print()
+
+
+def test_create_http_client():
+    """测试按配置创建客户端"""
+    print("🧪 测试2: 创建客户端")
+
+    config = Config()
+    config.HTTP_CLIENT = 'http1'
+    assert create_http_client(config).backend == 'http1'
+
+    config.HTTP_CLIENT = 'http2'
+    try:
+        import h2, httpx  # noqa: F401
+        expected = 'http2'
+    except ImportError:
+        expected = 'http1'
+    client = create_http_client(config)
+    assert client.backend == expected
+    client.close()
+    print(f"  ✓ HTTP_CLIENT=http2 -> {expected}")
+    print()
+
+
+def test_http2_client_multiplexes():
+    """测试 HTTP/2 客户端通过 h2c 在少数几个连接上并发下载图片（需要 httpx[http2]）"""
+    print("🧪 测试3: HTTP/2 多路复用")
+
+    reason = "未安装 httpx[http2]（pip install 'httpx[http2]'），跳过 HTTP/2 测试"
+    pytest.importorskip('h2', reason=reason)
+    pytest.importorskip('httpx', reason=reason)
+
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=5, image_size=48 * 1024, image_latency=0.01)
+    client = Http2Client(max_connections=2, prior_knowledge=True)
+    with H2FixtureServer(site) as server:
+        urls = [f"{server.base_url}{path}" for path in site.image_paths(site.set_id(0), 1)] * 8
+
+        def fetch(url):
+            with client.get(url, timeout=5, stream=True) as response:
+                body = b''.join(response.iter_content(4096))
+                return response.status_code, response.http_version, len(body)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(fetch, urls))
+
+        missing = client.get(f"{server.base_url}/missing.html", timeout=5)
+        assert missing.status_code == 404 and missing.content == b'not found'
+        client.close()
+
+        assert results == [(200, 'HTTP/2', len(site.image_bytes()))] * len(urls), results[:3]
+        assert server.connections <= 2, server.connections
+        print(f"  ✓ {len(urls)} 个请求通过 HTTP/2 使用 {server.connections} 个连接")
+    print()
+
+
+if __name__ == '__main__':
+    test_requests_client_reuses_connections()
+    test_create_http_client()
+    try:
+        test_http2_client_multiplexes()
+    except pytest.skip.Exception as e:
+        print(f"  ⏭ {e.msg}\n")
+    print("✅ 所有测试完成!")
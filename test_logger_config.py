@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+测试队列化日志: 共享输出、JSON Lines 格式和按代码位置限流
+"""
+
+import json
+import logging
+
+from logger_config import JsonLinesFormatter, RateLimitFilter, current_log_file, setup_logger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(message: str, level: int = logging.INFO, lineno: int = 10) -> logging.LogRecord:
+    return logging.LogRecord('crawler', level, 'crawler.py', lineno, message, None, None)
+
+
+def test_shared_sink():
+    """测试多次调用 setup_logger 共用同一个日志文件和队列"""
+    print("🧪 测试1: 共享日志输出")
+
+    first = setup_logger('crawler')
+    log_file = current_log_file()
+    second = setup_logger('proxy_manager')
+    assert current_log_file() == log_file
+    queue_handlers = [h for h in first.handlers if isinstance(h, logging.handlers.QueueHandler)]
+    assert len(queue_handlers) == 1 and queue_handlers[0] in second.handlers
+    print(f"  ✓ 所有 logger 写入 {log_file}")
+    print()
+
+
+def test_rate_limit_and_json_format():
+    """测试同一位置的重复日志被限流，以及 JSON Lines 格式"""
+    print("🧪 测试2: 限流与JSON格式")
+
+    clock = FakeClock()
+    rate_filter = RateLimitFilter(limit=3, interval=10, clock=clock)
+    passed = [rate_filter.filter(make_record(f"下载成功: {n}.jpg")) for n in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    assert rate_filter.filter(make_record("其它位置", lineno=20))
+    assert rate_filter.filter(make_record("最终下载失败", level=logging.ERROR))
+    print("  ✓ 每个窗口同一位置最多3条，ERROR 不限流")
+
+    clock.now += 10
+    record = make_record("下载成功: %s", lineno=10)
+    record.args = ('next.jpg',)
+    assert rate_filter.filter(record)
+    assert record.getMessage() == "下载成功: next.jpg (已省略 7 条同一位置的日志)"
+    print("  ✓ 下一个窗口报告省略的条数")
+
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry['level'] == 'INFO' and entry['logger'] == 'crawler'
+    assert entry['message'].startswith("下载成功: next.jpg")
+    print("  ✓ JSON Lines 格式")
+    print()
+
+
+if __name__ == '__main__':
+    test_shared_sink()
+    test_rate_limit_and_json_format()
+    print("✅ 所有测试完成!")
@@ -120,8 +120,8 @@ def test_download_summary():
         config.LIST_PAGES = 2
         crawler = ImageCrawler(config)
         
-        # 模拟一些套图数据
-        crawler.photo_sets = [
+        # 模拟一些套图数据（逐个写入运行日志）
+        photo_sets = [
             {
                 'title': '套图1',
                 'photo_id': 'photo001',
@@ -152,6 +152,8 @@ def test_download_summary():
                 'duration_seconds': 30
             }
         ]
+        for photo_info in photo_sets:
+            crawler.run_log.append(photo_info)
         
         crawler.stats['photos_found'] = 3
         crawler.stats['images_downloaded'] = 78
@@ -173,7 +175,13 @@ def test_download_summary():
         assert summary['photo_sets_failed'] == 1
         assert summary['total_images_downloaded'] == 78
         assert summary['total_images_failed'] == 5
-        assert len(summary['photos']) == 3
+        assert summary['average_images_per_set'] == round(80 / 3, 2)
+        assert [p['photo_id'] for p in summary['failed_sets']] == ['photo003']
+        
+        # 逐套图结果在运行日志中，摘要只包含汇总
+        with open(summary['run_log'], 'r', encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+        assert [e['photo_id'] for e in events if e['event'] == 'set'] == ['photo001', 'photo002', 'photo003']
         
         print("✓ 下载摘要生成成功")
         print(f"  - 摘要文件: {summary_path}")
@@ -239,6 +247,57 @@ def test_failed_downloads_tracking():
         print()
 
 
+def test_incremental_metadata():
+    """测试内存中增量更新元数据，定期原子写入"""
+    print("=" * 60)
+    print("测试 5: 增量元数据与原子写入")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = Config()
+        config.OUTPUT_DIR = temp_dir
+        config.METADATA_FLUSH_EVERY = 3
+        config.METADATA_FLUSH_INTERVAL = 3600
+        crawler = ImageCrawler(config)
+        
+        photo_id = "test_photo_inc"
+        photo_folder = os.path.join(temp_dir, photo_id)
+        os.makedirs(photo_folder)
+        with open(os.path.join(photo_folder, "existing.jpg"), 'w') as f:
+            f.write("test image content")
+        
+        # 打开套图时扫描一次目录
+        crawler.metadata.open(photo_folder, photo_id, f"https://example.com/photo/{photo_id}")
+        metadata_path = os.path.join(photo_folder, 'metadata.json')
+        
+        # 之后登记图片不再扫描目录，达到 METADATA_FLUSH_EVERY 时才写入
+        original_scandir = os.scandir
+        os.scandir = None
+        try:
+            crawler.metadata.add_image(photo_folder, "a.jpg")
+            crawler.metadata.add_image(photo_folder, "b.jpg")
+            assert not os.path.exists(metadata_path), "未达到落盘条件时不应写入"
+            crawler.metadata.add_image(photo_folder, "c.jpg")
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                assert json.load(f)['images_downloaded'] == 4
+            
+            metadata = crawler._update_photo_metadata(
+                photo_folder, photo_id, f"https://example.com/photo/{photo_id}", title="增量套图"
+            )
+        finally:
+            os.scandir = original_scandir
+        
+        assert metadata['image_files'] == ['a.jpg', 'b.jpg', 'c.jpg', 'existing.jpg']
+        assert not crawler.metadata.is_open(photo_folder), "套图结束后应从内存中移除"
+        assert sorted(os.listdir(photo_folder)) == ['existing.jpg', 'metadata.json'], "不应残留临时文件"
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            assert json.load(f)['title'] == "增量套图"
+        
+        print("✓ 增量元数据写入成功")
+        print(f"  - 图片数量: {metadata['images_downloaded']}")
+        print()
+
+
 def main():
     """运行所有测试"""
     print("\n")
@@ -252,6 +311,7 @@ def main():
         test_metadata_loading()
         test_download_summary()
         test_failed_downloads_tracking()
+        test_incremental_metadata()
         
         print("=" * 60)
         print("✓ 所有测试通过！")
@@ -262,6 +322,7 @@ def main():
         print("  2. 元数据加载（断点续传）")
         print("  3. 下载摘要生成")
         print("  4. 失败下载记录")
+        print("  5. 增量元数据与原子写入")
         print()
         return 0
         
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+测试页面就绪检测: 选择器与网络空闲信号、懒加载滚动在高度和图片数不再增长时停止，以及超时后的回退
+"""
+
+import os
+import json
+import tempfile
+
+from selenium.common.exceptions import WebDriverException
+
+from config import Config
+from crawler import ImageCrawler
+from tracer import Tracer
+
+
+class FakeDriver:
+    """
+    按脚本内容返回页面状态的浏览器
+    scroll_states 为每轮滚动后的 (图片数, 页面高度)，用完后保持最后一个
+    """
+
+    def __init__(self, ready_state='complete', selector_found=True, scroll_states=((10, 1000),), resources=3):
+        self.ready_state = ready_state
+        self.selector_found = selector_found
+        self.scroll_states = list(scroll_states)
+        self.resources = resources
+        self.selectors = []
+        self.scrolls = 0
+        self.idle_calls = []
+
+    def execute_script(self, script, *args):
+        if 'scrollTo' in script:
+            state = self.scroll_states[min(self.scrolls, len(self.scroll_states) - 1)]
+            self.scrolls += 1
+            return list(state)
+        if 'querySelector(arguments[0])' in script:
+            self.selectors.append(args[0])
+            return self.selector_found
+        if 'document.readyState' in script:
+            return self.ready_state
+        raise AssertionError(f"未预期的脚本: {script[:60]}")
+
+    def execute_async_script(self, script, idle_ms, timeout_ms):
+        self.idle_calls.append((idle_ms, timeout_ms))
+        if isinstance(self.resources, Exception):
+            raise self.resources
+        return self.resources
+
+
+def make_crawler(tmp):
+    config = Config()
+    config.OUTPUT_DIR = tmp
+    config.CATALOG_FILE = ''
+    config.RUN_LOG = False
+    config.RESPECT_ROBOTS_TXT = False
+    config.PAGE_READY_TIMEOUT = 0.2
+    config.NETWORK_IDLE_MS = 500
+    config.NETWORK_IDLE_TIMEOUT = 5
+    config.LAZY_SCROLL_MAX_ROUNDS = 5
+    config.LAZY_SCROLL_IDLE_MS = 300
+    crawler = ImageCrawler(config)
+    crawler.tracer = Tracer(os.path.join(tmp, 'trace.jsonl'), 'jsonl')
+    return crawler
+
+
+def page_ready_spans(crawler, tmp):
+    crawler.tracer.close()
+    crawler.http_client.close()
+    crawler.dns_cache.close()
+    with open(os.path.join(tmp, 'trace.jsonl'), 'r', encoding='utf-8') as f:
+        return [span['attrs'] for span in map(json.loads, f) if span['name'] == 'page_ready']
+
+
+def test_ready_signals():
+    """测试等待选择器和网络空闲，并滚动到图片数和高度不再变化"""
+    print("🧪 测试1: 就绪信号")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        crawler = make_crawler(tmp)
+        driver = FakeDriver(scroll_states=[(10, 1000), (20, 2000), (20, 2000)], resources=7)
+        crawler._wait_for_page_load(driver, 'https://a.com/photo/id-1.html', selectors=['.photo img', '.pager'])
+        assert driver.selectors == ['.photo img, .pager']
+        assert driver.scrolls == 3
+        # 第一次等待页面本身的网络空闲，之后每轮增长的滚动等待一次
+        assert driver.idle_calls == [(500, 5000), (300, 5000), (300, 5000)], driver.idle_calls
+        [attrs] = page_ready_spans(crawler, tmp)
+        assert attrs['resources'] == 7 and attrs['scroll_rounds'] == 3 and 'status' not in attrs, attrs
+        print("  ✓ 合并选择器等待一次，网络空闲返回资源数，第二轮后不再增长时停止滚动")
+    print()
+
+
+def test_scroll_and_network_idle():
+    """测试滚动轮数上限，以及网络空闲脚本没有结果时返回0"""
+    print("🧪 测试2: 滚动上限与网络空闲")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        crawler = make_crawler(tmp)
+        growing = FakeDriver(scroll_states=[(n, n * 1000) for n in range(1, 20)])
+        assert crawler._scroll_until_stable(growing) == 5 and growing.scrolls == 5
+        print("  ✓ 页面一直增长时最多滚动 LAZY_SCROLL_MAX_ROUNDS 轮")
+
+        stable = FakeDriver(scroll_states=[(4, 800)])
+        assert crawler._scroll_until_stable(stable) == 2 and len(stable.idle_calls) == 1
+        print("  ✓ 第二轮与第一轮相同时立即停止")
+
+        driver = FakeDriver(resources=None)
+        assert crawler._wait_for_network_idle(driver) == 0
+        assert crawler._wait_for_network_idle(driver, idle_ms=100) == 0
+        assert driver.idle_calls == [(500, 5000), (100, 5000)]
+        print("  ✓ 使用 NETWORK_IDLE_MS 和 NETWORK_IDLE_TIMEOUT，没有结果时返回0")
+        page_ready_spans(crawler, tmp)
+    print()
+
+
+def test_timeout_fallback():
+    """测试页面一直未就绪或选择器一直不出现时超时后继续，浏览器出错时也不抛出异常"""
+    print("🧪 测试3: 超时回退")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        crawler = make_crawler(tmp)
+        loading = FakeDriver(ready_state='loading')
+        crawler._wait_for_page_load(loading, 'https://a.com/slow.html', selectors=['.photo img'])
+        assert loading.selectors == [] and loading.idle_calls == [] and loading.scrolls == 0
+
+        missing = FakeDriver(ready_state='interactive', selector_found=False)
+        crawler._wait_for_page_load(missing, 'https://a.com/empty.html', selectors=['.photo img'])
+        assert missing.selectors and missing.idle_calls == []
+
+        broken = FakeDriver(resources=WebDriverException('script timeout'))
+        crawler._wait_for_page_load(broken, 'https://a.com/broken.html')
+        assert broken.scrolls == 0
+
+        statuses = [attrs['status'] for attrs in page_ready_spans(crawler, tmp)]
+        assert statuses == ['timeout', 'timeout', 'error'], statuses
+        print("  ✓ 超过 PAGE_READY_TIMEOUT 后放弃等待，继续处理页面（追踪中记为 timeout/error）")
+    print()
+
+
+if __name__ == '__main__':
+    test_ready_signals()
+    test_scroll_and_network_idle()
+    test_timeout_fallback()
+    print("✅ 所有测试完成!")
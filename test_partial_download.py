@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+测试断点续传: 截断的下载保留 .part 文件，用 Range 请求补齐；服务器不支持 Range 或图片已变化时重新下载
+"""
+
+import os
+import tempfile
+
+import requests
+
+from config import Config
+from fixture_server import FixtureSite, FixtureServer, FaultProfile, FaultRule
+from partial_download import PartialDownload
+
+
+def fetch(partial: PartialDownload, url: str):
+    response = requests.get(url, headers=partial.request_headers(url), stream=True, timeout=5)
+    return response.status_code, partial.receive(url, response)
+
+
+def test_resume_after_truncation():
+    """测试截断后续传，只传输剩余的字节"""
+    print("🧪 测试1: 截断后续传")
+
+    rule = FaultRule(truncate=1.0)
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=1, image_size=64 * 1024,
+                       faults=FaultProfile([rule]))
+    with FixtureServer(site) as server, tempfile.TemporaryDirectory() as tmp:
+        url = f"{server.base_url}{site.image_paths(site.set_id(0), 1)[0]}"
+        filepath = os.path.join(tmp, 'a.jpg')
+
+        partial = PartialDownload(filepath)
+        try:
+            fetch(partial, url)
+            raise AssertionError("截断的响应应该导致读取失败")
+        except requests.exceptions.RequestException:
+            pass
+        received = os.path.getsize(partial.path)
+        assert 0 < received < len(site.image_bytes())
+        print(f"  ✓ 中断后保留 {received} bytes")
+
+        # 下次运行重新打开 .part 文件
+        rule.rates['truncate'] = 0.0
+        sent_before = server.bytes_sent
+        partial = PartialDownload(filepath)
+        assert partial.request_headers(url) == {'Range': f'bytes={received}-', 'If-Range': site.image_etag()}
+        status, (content, resumed) = fetch(partial, url)
+        assert status == 206 and resumed == received
+        assert content == site.image_bytes()
+        assert server.bytes_sent - sent_before == len(content) - received
+        partial.discard()
+        assert not os.path.exists(partial.path) and not os.path.exists(partial.meta_path)
+        print(f"  ✓ Range 请求只传输剩余的 {len(content) - received} bytes")
+    print()
+
+
+def test_fallback_to_full_download():
+    """测试不支持 Range 或 If-Range 不匹配时从头下载"""
+    print("🧪 测试2: 回退到完整下载")
+
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=1, image_size=32 * 1024, range_requests=False)
+    with FixtureServer(site) as server, tempfile.TemporaryDirectory() as tmp:
+        url = f"{server.base_url}{site.image_paths(site.set_id(0), 1)[0]}"
+        filepath = os.path.join(tmp, 'a.jpg')
+
+        partial = PartialDownload(filepath)
+        partial.meta = {'url': url, 'etag': site.image_etag()}
+        partial._write_meta()
+        with open(partial.path, 'wb') as f:
+            f.write(site.image_bytes()[:1000])
+
+        status, (content, resumed) = fetch(PartialDownload(filepath), url)
+        assert status == 200 and resumed == 0 and content == site.image_bytes()
+        print("  ✓ 服务器忽略 Range 时覆盖 .part 文件")
+
+        site.range_requests = True
+        partial = PartialDownload(filepath)
+        partial.meta['etag'] = '"changed"'
+        partial.offset = 1000
+        status, (content, resumed) = fetch(partial, url)
+        assert status == 200 and resumed == 0 and content == site.image_bytes()
+        print("  ✓ 图片已变化（If-Range 不匹配）时重新下载")
+    print()
+
+
+def test_crawler_counts_transferred_bytes():
+    """测试爬虫续传时下载字节数只计入实际传输的部分"""
+    print("🧪 测试3: 续传的字节统计")
+
+    from crawler import ImageCrawler
+
+    rule = FaultRule(truncate=1.0)
+    site = FixtureSite(sets=1, pages_per_set=1, images_per_page=1, image_size=64 * 1024,
+                       faults=FaultProfile([rule]))
+    with FixtureServer(site) as server, tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.RESPECT_ROBOTS_TXT = False
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        crawler = ImageCrawler(config)
+        url = f"{server.base_url}{site.image_paths(site.set_id(0), 1)[0]}"
+        output_dir = os.path.join(tmp, site.set_id(0))
+        os.makedirs(output_dir)
+
+        partial = PartialDownload(os.path.join(output_dir, crawler._get_image_filename(url, site.set_id(0))))
+        try:
+            fetch(partial, url)
+        except requests.exceptions.RequestException:
+            pass
+        received = os.path.getsize(partial.path)
+        rule.rates['truncate'] = 0.0
+
+        assert crawler._download_single_image(url, output_dir, site.set_id(0))
+        crawler.http_client.close()
+        crawler.dns_cache.close()
+        assert crawler.stats['bytes_resumed'] == received
+        assert crawler.stats['bytes_downloaded'] == len(site.image_bytes()) - received, crawler.stats
+        print(f"  ✓ 续传 {received} bytes，只计入剩余的 {crawler.stats['bytes_downloaded']} bytes")
+    print()
+
+
+if __name__ == '__main__':
+    test_resume_after_truncation()
+    test_fallback_to_full_download()
+    test_crawler_counts_transferred_bytes()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+测试感知哈希近似去重: 缩放后的副本判定为重复，分辨率更高的版本替换旧文件，索引可从磁盘恢复
+"""
+
+import os
+import json
+import random
+import tempfile
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from phash_index import MultiIndexHash, PerceptualDedupe, image_hash
+
+
+def make_image(seed: int, size=(640, 480)) -> Image.Image:
+    rng = random.Random(seed)
+    img = Image.new('RGB', (640, 480), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(600), rng.randrange(440)
+        draw.ellipse((x, y, x + rng.randrange(40, 200), y + rng.randrange(40, 200)),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return img.resize(size, Image.Resampling.LANCZOS) if size != (640, 480) else img
+
+
+def jpeg(img: Image.Image, quality: int = 90) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def test_multi_index_hash():
+    """测试多索引哈希表找到阈值内最近的条目"""
+    print("🧪 测试1: 多索引哈希表")
+
+    rng = random.Random(1)
+    index = MultiIndexHash(threshold=6)
+    values = [rng.getrandbits(64) for _ in range(5000)]
+    for value in values:
+        index.add(value, 100)
+
+    target = values[1234]
+    near = target ^ (1 << 3) ^ (1 << 20) ^ (1 << 41) ^ (1 << 42) ^ (1 << 60)
+    assert index.find(near) == (1234, 5)
+    assert index.find(target ^ 0x7F) is None or index.find(target ^ 0x7F)[0] != 1234, "距离7超过阈值"
+    index.remove(1234)
+    assert index.find(target) is None
+    assert len(index) == 4999
+    print("  ✓ 距离5的哈希命中，删除后不再返回")
+    print()
+
+
+def test_skip_replace_and_reload():
+    """测试缩放副本被跳过、更高分辨率替换旧条目，以及重新加载索引"""
+    print("🧪 测试2: 跳过、替换与持久化")
+
+    original = make_image(7)
+    assert image_hash(jpeg(original))[0] != image_hash(jpeg(make_image(8)))[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'phash_index.jsonl')
+        dedupe = PerceptualDedupe(index_path, tmp, threshold=6)
+        a = os.path.join(tmp, 'set1', 'a.jpg')
+        decision = dedupe.claim(jpeg(original), a, 'https://example.com/a.jpg')
+        assert decision.action == 'new'
+        dedupe.commit(decision)
+        decision = dedupe.claim(jpeg(make_image(8)), os.path.join(tmp, 'set1', 'b.jpg'), 'https://example.com/b.jpg')
+        assert decision.action == 'new'
+        dedupe.commit(decision)
+
+        small = os.path.join(tmp, 'set2', 'small.jpg')
+        decision = dedupe.claim(jpeg(make_image(7, (320, 240)), 70), small, 'https://example.com/small.jpg')
+        assert decision.action == 'skip' and decision.match_path == os.path.join('set1', 'a.jpg'), decision.action
+        assert dedupe.is_duplicate(small)
+        print(f"  ✓ 缩小的副本判定为重复 (距离 {decision.distance})")
+
+        large = os.path.join(tmp, 'set3', 'large.jpg')
+        decision = dedupe.claim(jpeg(make_image(7, (1280, 960))), large, 'https://example.com/large.jpg')
+        assert decision.action == 'replace' and decision.match_url == 'https://example.com/a.jpg'
+        dedupe.release(decision)
+        assert dedupe.claim(jpeg(make_image(7, (320, 240)), 70), small, None).match_path == os.path.join('set1', 'a.jpg')
+        print("  ✓ 写入失败时撤销预留，已有图片的条目恢复")
+
+        decision = dedupe.claim(jpeg(make_image(7, (1280, 960))), large, 'https://example.com/large.jpg')
+        assert decision.action == 'replace'
+        dedupe.commit(decision)
+        print("  ✓ 更高分辨率的版本替换已有图片")
+        dedupe.close()
+
+        reloaded = PerceptualDedupe(index_path, tmp, threshold=6)
+        assert len(reloaded.index) == 2
+        assert reloaded.is_duplicate(small)
+        decision = reloaded.claim(jpeg(original), os.path.join(tmp, 'set4', 'again.jpg'), None)
+        assert decision.action == 'skip' and decision.match_path == os.path.join('set3', 'large.jpg')
+        reloaded.close()
+        print("  ✓ 重新加载后保留替换和重复记录")
+    print()
+
+
+def test_crawler_store_image():
+    """测试爬虫保存图片: 写入失败时保留旧文件，替换时更新旧文件所在套图的元数据"""
+    print("🧪 测试3: 爬虫保存与替换")
+
+    from config import Config
+    from crawler import ImageCrawler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        config.RESPECT_ROBOTS_TXT = False
+        config.PHASH_INDEX = 'phash_index.jsonl'
+        config.PHASH_REPLACE = True
+        crawler = ImageCrawler(config)
+        try:
+            set1 = os.path.join(tmp, 'set1')
+            os.makedirs(set1)
+            crawler.metadata.open(set1, 'set1', 'https://example.com/set1')
+            assert crawler._store_image(jpeg(make_image(7)), os.path.join(set1, 'a.jpg'), 'https://example.com/a.jpg')
+            crawler.metadata.add_image(set1, 'a.jpg')
+            crawler.metadata.flush(set1, final=True)
+
+            large = jpeg(make_image(7, (1280, 960)))
+            try:
+                crawler._store_image(large, os.path.join(tmp, 'missing', 'large.jpg'), 'https://example.com/large.jpg')
+                raise AssertionError("目录不存在时应抛出异常")
+            except OSError:
+                pass
+            assert os.path.exists(os.path.join(set1, 'a.jpg'))
+            print("  ✓ 新文件写入失败时旧文件和索引条目保持不变")
+
+            set2 = os.path.join(tmp, 'set2')
+            os.makedirs(set2)
+            assert crawler._store_image(large, os.path.join(set2, 'large.jpg'), 'https://example.com/large.jpg')
+            assert os.path.exists(os.path.join(set2, 'large.jpg'))
+            assert not os.path.exists(os.path.join(set1, 'a.jpg'))
+            assert [name for name in os.listdir(set2) if '.tmp' in name] == []
+            with open(os.path.join(set1, 'metadata.json'), encoding='utf-8') as f:
+                metadata = json.load(f)
+            assert metadata['image_files'] == [] and metadata['images_downloaded'] == 0
+            print("  ✓ 替换后删除旧文件，并从旧文件所在套图的元数据中移除")
+        finally:
+            crawler._close_components()
+
+        with open(os.path.join(tmp, 'phash_index.jsonl'), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert [record.get('path') or record.get('rm') for record in records] == [
+            os.path.join('set1', 'a.jpg'), os.path.join('set1', 'a.jpg'), os.path.join('set2', 'large.jpg')]
+        print("  ✓ 失败的写入不留下索引记录")
+    print()
+
+
+def test_crawler_skips_known_duplicate():
+    """测试重新运行时跳过之前判定为近似重复的图片: 不下载，也不登记到套图元数据"""
+    print("🧪 测试4: 跳过已知的近似重复")
+
+    import hashlib
+    from config import Config
+    from crawler import ImageCrawler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        config.RESPECT_ROBOTS_TXT = False
+        config.PHASH_INDEX = 'phash_index.jsonl'
+        config.SKIP_EXISTING = True
+        crawler = ImageCrawler(config)
+        try:
+            set1 = os.path.join(tmp, 'set1')
+            os.makedirs(set1)
+            crawler.metadata.open(set1, 'set1', 'https://example.com/set1')
+            assert crawler._store_image(jpeg(make_image(7)), os.path.join(set1, 'a.jpg'), 'https://example.com/a.jpg')
+            crawler.metadata.add_image(set1, 'a.jpg')
+
+            # 无法连接的地址: 跳过时不应发出请求
+            url = 'http://127.0.0.1:9/img/small.jpg'
+            filename = hashlib.md5(url.encode()).hexdigest() + '.jpg'
+            decision = crawler.dedupe.claim(jpeg(make_image(7, (320, 240))), os.path.join(set1, filename), url)
+            assert decision.action == 'skip'
+
+            assert crawler._download_single_image(url, set1, 'set1')
+            assert crawler.stats['images_duplicate'] == 1 and crawler.stats['images_skipped'] == 0
+            assert crawler.metadata.snapshot(set1)['image_files'] == ['a.jpg']
+            assert sorted(os.listdir(set1)) == ['a.jpg']
+
+            print("  ✓ 计为近似重复而不是已存在的文件，元数据只列出磁盘上的图片")
+        finally:
+            crawler._close_components()
+    print()
+
+
+if __name__ == '__main__':
+    test_multi_index_hash()
+    test_skip_replace_and_reload()
+    test_crawler_store_image()
+    test_crawler_skips_known_duplicate()
+    print("✅ 所有测试完成!")
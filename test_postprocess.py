@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试下载后的图片处理: 转码、去除EXIF、缩略图，以及结果写入套图元数据
+"""
+
+import os
+import tempfile
+
+from PIL import Image
+
+from metadata_store import MetadataStore
+from postprocess import ImagePostProcessor, process_image
+
+
+def make_jpeg(path: str, size=(800, 400), orientation: int = None):
+    img = Image.new('RGB', size)
+    for x in range(0, size[0], 16):
+        for y in range(0, size[1], 16):
+            img.putpixel((x, y), ((x * 7) % 256, (y * 3) % 256, (x + y) % 256))
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCamera'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(path, 'JPEG', quality=95, exif=exif)
+
+
+def test_process_image():
+    """测试转码为WebP、去除EXIF、按方向旋转并生成缩略图"""
+    print("🧪 测试1: 单张图片处理")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'abc.jpg')
+        make_jpeg(path, orientation=6)  # 顺时针旋转90度
+
+        result = process_image(path, 'webp', 75, 128)
+        assert result['status'] == 'success', result
+        assert result['output'] == os.path.join('webp', 'abc.webp')
+        assert result['saved_bytes'] == result['original_bytes'] - result['output_bytes']
+
+        with Image.open(os.path.join(tmp, result['output'])) as output:
+            assert output.format == 'WEBP' and output.size == (400, 800)
+            assert not output.getexif(), "转码后的图片不应包含EXIF"
+        with Image.open(os.path.join(tmp, result['thumbnail'])) as thumb:
+            assert max(thumb.size) == 128
+        print(f"  ✓ {result['original_bytes']} -> {result['output_bytes']} 字节，EXIF已去除")
+
+        with open(os.path.join(tmp, 'broken.jpg'), 'wb') as f:
+            f.write(b'not an image')
+        broken = process_image(os.path.join(tmp, 'broken.jpg'), 'webp', 75, 0)
+        assert broken['status'] == 'failed' and broken['error']
+        print("  ✓ 无法解码的图片记录为失败")
+    print()
+
+
+def test_pool_results_in_metadata():
+    """测试进程池处理结果汇总到套图元数据"""
+    print("🧪 测试2: 进程池与元数据")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetadataStore(('.jpg',), flush_every=1000)
+        store.open(tmp, 'set1', 'https://example.com/set1')
+        processor = ImagePostProcessor('webp', quality=70, thumbnail=0, workers=1, queue_size=2,
+                                       on_result=store.add_processed)
+        try:
+            for n in range(4):
+                filename = f'{n}.jpg'
+                make_jpeg(os.path.join(tmp, filename), size=(320, 240))
+                store.add_image(tmp, filename)
+                processor.submit(tmp, filename)
+            processor.wait(tmp)
+        finally:
+            processor.close()
+
+        metadata = store.flush(tmp, final=True)
+        processing = metadata['processing']
+        assert processing['images_processed'] == 4 and processing['images_failed'] == 0, processing
+        assert processing['saved_bytes'] == processing['original_bytes'] - processing['output_bytes']
+        assert sorted(metadata['processed_images']) == ['0.jpg', '1.jpg', '2.jpg', '3.jpg']
+        assert metadata['images_downloaded'] == 4, "转码输出不应计入原图数量"
+        print(f"  ✓ 4张图片处理完成，节省 {processing['saved_bytes']} 字节")
+    print()
+
+
+if __name__ == '__main__':
+    test_process_image()
+    test_pool_results_in_metadata()
+    print("✅ 所有测试完成!")
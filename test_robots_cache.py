@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+测试 robots.txt 缓存: 规则匹配、Crawl-delay / Request-rate、按主机延迟获取和跨运行缓存
+"""
+
+import os
+import tempfile
+
+from fixture_server import FixtureSite, FixtureServer
+from http_client import RequestsClient
+from robots_cache import RobotsCache, parse_robots
+
+
+ROBOTS = """
+# 注释
+User-agent: *
+Disallow: /private/
+Allow: /private/public.html
+Disallow: /*.php$
+Disallow: /search?
+Crawl-delay: 2
+
+User-agent: imagebot
+User-agent: otherbot
+Disallow: /
+Request-rate: 1/5s
+
+Sitemap: https://a.com/sitemap.xml
+"""
+
+
+def test_rules():
+    """测试规则匹配和请求间隔"""
+    print("🧪 测试1: 规则匹配")
+
+    rules = parse_robots(ROBOTS)
+    assert rules.can_fetch('/photo/1.html')
+    assert not rules.can_fetch('/private/a.html') and rules.can_fetch('/private/public.html')
+    assert not rules.can_fetch('/index.php') and rules.can_fetch('/index.php?x=1')
+    assert not rules.can_fetch('/search?q=1') and rules.can_fetch('/search')
+    assert rules.can_fetch('/robots.txt')
+    assert rules.delay == 2 and rules.sitemaps == ['https://a.com/sitemap.xml']
+    print("  ✓ 最长匹配、Allow 优先、通配符和 $ 结尾")
+
+    bot = parse_robots(ROBOTS, 'Mozilla/5.0 (compatible; ImageBot/1.0)')
+    assert not bot.can_fetch('/photo/1.html') and bot.delay == 5
+    print("  ✓ 按 User-agent 选择规则组，Request-rate 1/5s -> 5 秒")
+    print()
+
+
+def test_cache():
+    """测试按主机延迟获取、错误处理和磁盘缓存"""
+    print("🧪 测试2: 按主机缓存")
+
+    now = [1000.0]
+    responses = {'https://a.com/robots.txt': (200, ROBOTS), 'https://b.com/robots.txt': (404, '')}
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        if url not in responses:
+            raise ConnectionError('down')
+        return responses[url]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'robots_cache.json')
+        cache = RobotsCache(fetch, path, ttl=3600, clock=lambda: now[0])
+        assert fetched == [], "构造时不应获取"
+        assert not cache.can_fetch('https://a.com/private/x') and cache.can_fetch('https://a.com/')
+        assert cache.can_fetch('https://b.com/private/x'), "404 时没有限制"
+        assert cache.can_fetch('https://c.com/private/x'), "获取失败且没有旧规则时不限制"
+        assert fetched == ['https://a.com/robots.txt', 'https://b.com/robots.txt', 'https://c.com/robots.txt']
+        assert cache.cached_delay('a.com') == 2 and cache.cached_delay('d.com') == 0
+        print("  ✓ 每个主机只获取一次")
+        cache.close()
+
+        reloaded = RobotsCache(fetch, path, ttl=3600, clock=lambda: now[0])
+        assert not reloaded.can_fetch('https://a.com/private/x') and len(fetched) == 3
+        print("  ✓ 下次运行从缓存文件读取")
+
+        now[0] += 3601
+        del responses['https://a.com/robots.txt']
+        assert not reloaded.can_fetch('https://a.com/private/x'), "获取失败时使用过期的旧规则"
+        assert len(fetched) == 4
+        print("  ✓ 过期后重新获取，失败时使用旧规则")
+    print()
+
+
+def test_fetch_from_site():
+    """测试通过连接池从本地站点获取"""
+    print("🧪 测试3: 从站点获取")
+
+    site = FixtureSite(sets=1, robots_txt='User-agent: *\nDisallow: /photo/\nCrawl-delay: 1.5\n')
+    client = RequestsClient(pool_size=2)
+
+    def fetch(url):
+        with client.get(url, timeout=5) as response:
+            return response.status_code, response.text
+
+    with FixtureServer(site) as server:
+        cache = RobotsCache(fetch)
+        assert not cache.can_fetch(f"{server.base_url}/photo/id-1.html")
+        assert cache.can_fetch(f"{server.base_url}/photos/sort-hot.html")
+        assert cache.delay(server.base_url) == 1.5
+    client.close()
+    print("  ✓ Disallow 和 Crawl-delay 生效")
+    print()
+
+
+if __name__ == '__main__':
+    test_rules()
+    test_cache()
+    test_fetch_from_site()
+    print("✅ 所有测试完成!")
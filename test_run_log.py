@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试运行日志的滚动汇总、中间摘要和崩溃后从日志重建摘要
+"""
+
+import os
+import json
+import tempfile
+
+from run_log import RUN_LOG_FILE, RunAggregates, RunLog, rebuild_summary
+
+
+def make_set(n: int, status: str = 'success', images: int = 10, failed: int = 0) -> dict:
+    record = {
+        'title': f'套图{n}',
+        'photo_id': f'photo{n:03d}',
+        'photo_url': f'https://example.com/photo/{n:03d}',
+        'status': status,
+        'images_count': images,
+        'images_failed': failed,
+        'duration_seconds': 5,
+    }
+    if status != 'success':
+        record['error'] = 'timeout'
+    return record
+
+
+def test_aggregates_replace_retried_sets():
+    """测试重试成功的套图替换之前的失败结果"""
+    print("🧪 测试1: 滚动汇总")
+
+    aggregates = RunAggregates()
+    aggregates.add(make_set(1))
+    aggregates.add(make_set(2, 'failed', images=3, failed=7))
+    aggregates.add(make_set(3, 'failed', images=0))
+    assert aggregates.by_status == {'success': 1, 'failed': 2}
+    assert aggregates.images == 13 and aggregates.images_failed == 7
+
+    aggregates.add(make_set(2, 'success', images=10))
+    assert aggregates.sets == 3 and aggregates.retried == 1
+    assert aggregates.by_status == {'success': 2, 'failed': 1}
+    assert aggregates.images == 20 and aggregates.images_failed == 0
+    assert list(aggregates.failed_sets) == ['https://example.com/photo/003']
+    print("  ✓ 只保留失败的套图，重试结果替换旧结果")
+    print()
+
+
+def test_checkpoint_and_rebuild_after_crash():
+    """测试中间摘要，以及没有 end 事件、最后一行写了一半时重建摘要"""
+    print("🧪 测试2: 崩溃后重建摘要")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoints = []
+        run_log = RunLog(os.path.join(tmp, RUN_LOG_FILE), checkpoint=lambda: checkpoints.append(len(run_log)),
+                         checkpoint_interval=0)
+        run_log.start(run_date='2024-05-01 10:00:00', list_pages=2)
+        for n in range(5):
+            run_log.append(make_set(n, 'failed' if n == 4 else 'success', failed=1))
+        assert checkpoints == [1, 2, 3, 4, 5]
+        run_log.close()
+
+        # 模拟进程在写入下一行时被杀死
+        with open(run_log.path, 'a', encoding='utf-8') as f:
+            f.write('{"event":"set","photo_id":"photo0')
+
+        summary_path = rebuild_summary(tmp)
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        assert summary['complete'] is False
+        assert summary['run_date'] == '2024-05-01 10:00:00' and summary['list_pages_crawled'] == 2
+        assert summary['photo_sets_processed'] == 5 and summary['photo_sets_failed'] == 1
+        assert summary['total_images_downloaded'] == 50 and summary['total_images_failed'] == 5
+        assert [p['photo_id'] for p in summary['failed_sets']] == ['photo004']
+        with open(os.path.join(tmp, 'download_summary.txt'), 'r', encoding='utf-8') as f:
+            text = f.read()
+        assert '运行未结束' in text and 'photo004' in text
+        print("  ✓ 从运行日志重建摘要，跳过不完整的行")
+
+        assert rebuild_summary(os.path.join(tmp, 'missing')) is None
+    print()
+
+
+if __name__ == '__main__':
+    test_aggregates_replace_retried_sets()
+    test_checkpoint_and_rebuild_after_crash()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+测试多进程分片爬取的分片、配置传递和结果汇总
+"""
+
+import os
+import json
+import time
+import queue
+import tempfile
+
+from config import Config
+from crawler import ImageCrawler
+from fixture_server import FixtureSite, FixtureServer
+from sharded import apply_config, config_snapshot, crawl_shard, run_sharded, shard_urls
+
+
+def fake_shard(index, snapshot, urls, events):
+    """模拟工作进程: 每个套图成功2张、失败1张"""
+    config = apply_config(snapshot)
+    for url in urls:
+        photo_id = ImageCrawler._photo_id_from_url(url)
+        events.put(('photo_set', index, url, {
+            'title': f'套图 {photo_id}', 'photo_id': photo_id, 'photo_url': url, 'status': 'success',
+            'images_count': 2, 'images_failed': 1, 'total_pages': config.DETAIL_DEPTH,
+            'duration_seconds': 0,
+        }, [{'url': f'{url}#bad', 'error': 'HTTP 403'}]))
+    events.put(('done', index, {'pages_crawled': len(urls), 'images_downloaded': 2 * len(urls),
+                                'images_failed': len(urls)},
+                {'detail': {'count': len(urls), 'seconds': 0.5, 'bytes': 1000}}))
+
+
+def crashing_shard(index, snapshot, urls, events):
+    """模拟第二个工作进程在处理第一个套图前崩溃"""
+    if index == 1:
+        os._exit(3)
+    fake_shard(index, snapshot, urls, events)
+
+
+def make_crawler(output_dir: str) -> ImageCrawler:
+    config = Config()
+    config.RESPECT_ROBOTS_TXT = False
+    config.TRACE_FILE = ''
+    config.OUTPUT_DIR = output_dir
+    config.DETAIL_DEPTH = 4
+    return ImageCrawler(config)
+
+
+URLS = [f'https://8se.me/photo/id-{n:013x}.html' for n in range(5)]
+
+
+def test_shard_urls_and_config_snapshot():
+    """测试轮询分片和配置快照"""
+    print("🧪 测试1: 分片与配置快照")
+
+    shards = shard_urls(URLS, 2)
+    assert shards == [URLS[0::2], URLS[1::2]]
+    assert shard_urls(URLS[:1], 4) == [URLS[:1]]
+    print(f"  ✓ 5个套图分为 {[len(s) for s in shards]}")
+
+    config = Config()
+    config.DETAIL_DEPTH = 7
+    snapshot = config_snapshot(config)
+    assert snapshot['DETAIL_DEPTH'] == 7 and 'load_cookies' not in snapshot
+    json.dumps(snapshot)
+    print("  ✓ 配置快照只包含可序列化的大写属性")
+    print()
+
+
+def test_run_sharded_merges_results():
+    """测试协调进程汇总工作进程的结果并生成一份摘要"""
+    print("🧪 测试2: 汇总结果")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        crawler = make_crawler(output_dir)
+        run_sharded(crawler, URLS, 2, target=fake_shard)
+
+        with open(crawler.run_log.path, encoding='utf-8') as f:
+            sets = [json.loads(line) for line in f]
+        assert sorted(p['photo_url'] for p in sets) == URLS
+        assert all(p['total_pages'] == 4 for p in sets)
+        assert crawler.stats['images_downloaded'] == 10 and crawler.stats['pages_crawled'] == 5
+        assert crawler.stage_metrics['detail']['count'] == 5
+        assert len(crawler.failed_downloads) == 5
+        print(f"  ✓ 汇总 {len(crawler.run_log)} 个套图，写入同一个运行日志")
+
+        with open(crawler._generate_download_summary(), encoding='utf-8') as f:
+            summary = json.load(f)
+        assert summary['photo_sets_downloaded'] == 5 and summary['total_images_failed'] == 5
+        print("  ✓ 生成唯一的 download_summary.json")
+    print()
+
+
+def test_run_sharded_worker_crash():
+    """测试工作进程异常退出时未完成的套图记为失败"""
+    print("🧪 测试3: 工作进程崩溃")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        crawler = make_crawler(output_dir)
+        run_sharded(crawler, URLS, 2, target=crashing_shard)
+
+        aggregates = crawler.run_log.aggregates
+        assert aggregates.by_status == {'success': 3, 'failed': 2}, aggregates.by_status
+        assert sorted(aggregates.failed_sets) == [URLS[1], URLS[3]]
+        print(f"  ✓ 套图状态: {aggregates.by_status}")
+    print()
+
+
+def test_worker_honours_robots():
+    """测试工作进程按 robots.txt 的 Crawl-delay 等待，并保存获取的 robots.txt"""
+    print("🧪 测试4: 工作进程的请求间隔")
+
+    site = FixtureSite(sets=1, robots_txt='User-agent: *\nCrawl-delay: 0.3\n')
+    saved = config_snapshot(Config)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir, FixtureServer(site) as server:
+            config = Config()
+            config.OUTPUT_DIR = output_dir
+            config.TRACE_FILE = ''
+            config.CATALOG_FILE = ''
+            config.MIN_DELAY = 0
+            config.RESPECT_ROBOTS_TXT = True
+            # 不是套图地址，不会启动浏览器，只经过请求间隔
+            urls = [f"{server.base_url}/photo/not-a-set-{n}.html" for n in range(2)]
+            events = queue.Queue()
+            started = time.monotonic()
+            crawl_shard(0, config_snapshot(config), urls, events)
+            elapsed = time.monotonic() - started
+            assert elapsed >= 0.6, elapsed
+            assert os.path.exists(os.path.join(output_dir, 'robots_cache.json'))
+            kinds = []
+            while not events.empty():
+                kinds.append(events.get_nowait()[0])
+            assert kinds[-1] == 'done', kinds
+        print(f"  ✓ 按 Crawl-delay 等待 ({elapsed:.2f} 秒)，robots.txt 缓存已保存")
+    finally:
+        # crawl_shard 直接设置 Config 类属性，恢复以免影响其它测试
+        apply_config(saved)
+    print()
+
+
+def test_interrupted_worker_flushes_metadata():
+    """测试工作进程在套图中途中断时仍写入该套图已缓冲的元数据"""
+    print("🧪 测试5: 中断时写入元数据")
+
+    def interrupted(crawler, url, max_pages):
+        folder = os.path.join(crawler.config.OUTPUT_DIR, 'set1')
+        os.makedirs(folder)
+        crawler.metadata.open(folder, 'set1', url)
+        crawler.metadata.add_image(folder, 'a.jpg')
+        raise KeyboardInterrupt
+
+    saved = config_snapshot(Config)
+    original = ImageCrawler._crawl_photo_detail
+    ImageCrawler._crawl_photo_detail = interrupted
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            config = Config()
+            config.OUTPUT_DIR = output_dir
+            config.TRACE_FILE = ''
+            config.CATALOG_FILE = ''
+            config.RESPECT_ROBOTS_TXT = False
+            events = queue.Queue()
+            try:
+                crawl_shard(0, config_snapshot(config), URLS[:1], events)
+                raise AssertionError("应该传出 KeyboardInterrupt")
+            except KeyboardInterrupt:
+                pass
+            with open(os.path.join(output_dir, 'set1', 'metadata.json'), encoding='utf-8') as f:
+                assert json.load(f)['image_files'] == ['a.jpg']
+            assert events.get_nowait()[0] == 'done'
+        print("  ✓ 中断的套图元数据已写入，统计仍发回协调进程")
+    finally:
+        ImageCrawler._crawl_photo_detail = original
+        apply_config(saved)
+    print()
+
+
+if __name__ == '__main__':
+    test_shard_urls_and_config_snapshot()
+    test_run_sharded_merges_results()
+    test_run_sharded_worker_crash()
+    test_worker_honours_robots()
+    test_interrupted_worker_flushes_metadata()
+    print("✅ 所有测试完成!")
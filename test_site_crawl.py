@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+测试站点爬取: URL标准化、按域名分队列的广度优先队列、并发页面线程，以及并发 crawl_page 的统计计数
+"""
+
+import sys
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from crawler import ImageCrawler
+from extractor import PageData
+from site_crawl import SiteFrontier, domain_allowed, normalize_url, run_site_crawl
+
+
+def test_normalize_url():
+    """测试URL标准化"""
+    print("🧪 测试1: URL标准化")
+
+    assert normalize_url('HTTPS://Example.COM:443/a/b?z=1&a=2#top') == 'https://example.com/a/b?a=2&z=1'
+    assert normalize_url('http://example.com') == 'http://example.com/'
+    assert normalize_url('http://example.com:8080/x?utm_source=feed&id=3') == 'http://example.com:8080/x?id=3'
+    assert normalize_url('javascript:void(0)') is None and normalize_url('mailto:a@b.com') is None
+    assert domain_allowed('img.example.com', ['example.com']) and domain_allowed('example.com:8080', ['example.com'])
+    assert not domain_allowed('badexample.com', ['example.com'])
+    print("  ✓ 大小写、默认端口、片段、参数顺序和跟踪参数")
+    print()
+
+
+def test_frontier_order():
+    """测试广度优先顺序、去重、深度和页面数限制"""
+    print("🧪 测试2: 广度优先队列")
+
+    frontier = SiteFrontier(max_depth=2, max_pages=5)
+    assert frontier.add('https://a.com/', 0)
+    assert not frontier.add('https://a.com/', 1), "重复URL不应入队"
+    url, depth = frontier.get()
+    for link in ('https://a.com/1', 'https://b.com/1'):
+        frontier.add(link, 1)
+    frontier.add('https://a.com/deep', 3)
+    frontier.done(url)
+    first = frontier.get()
+    frontier.add('https://a.com/1/x', 2)
+    frontier.done(first[0])
+    second = frontier.get()
+    assert {first[0], second[0]} == {'https://a.com/1', 'https://b.com/1'} and second[1] == 1, "深度1先于深度2"
+    frontier.done(second[0])
+    assert frontier.get() == ('https://a.com/1/x', 2)
+    assert 'https://a.com/deep' not in [item for queue in frontier._queues.values() for item in queue]
+    print("  ✓ 按深度顺序分配，超过最大深度的链接不入队")
+
+    limited = SiteFrontier(max_depth=5, max_pages=2, domain_concurrency=2)
+    for n in range(5):
+        limited.add(f'https://a.com/{n}', 0)
+    assert limited.get() and limited.get() and limited.get() is None
+    print("  ✓ 达到 max_pages 后停止分配")
+    print()
+
+
+def test_domain_politeness():
+    """测试同一域名的请求间隔和并发数"""
+    print("🧪 测试3: 域名请求间隔")
+
+    frontier = SiteFrontier(max_depth=1, max_pages=10, domain_delay=0.2)
+    frontier.add('https://a.com/1', 0)
+    frontier.add('https://a.com/2', 0)
+    frontier.add('https://b.com/1', 0)
+    start = time.monotonic()
+    hosts = [frontier.get()[0].split('/')[2] for _ in range(2)]
+    assert sorted(hosts) == ['a.com', 'b.com'], "其它域名不需要等待"
+    frontier.done('https://a.com/1')
+    frontier.done('https://b.com/1')
+    assert frontier.get()[0] == 'https://a.com/2'
+    assert time.monotonic() - start >= 0.2, "同一域名应等待 domain_delay"
+    print("  ✓ 其它域名立即分配，同一域名等待请求间隔")
+    print()
+
+
+def test_run_site_crawl():
+    """测试并发爬取一个链接图，每个页面只处理一次，每个线程只创建一个处理器"""
+    print("🧪 测试4: 并发页面线程")
+
+    # 每个页面链接到3个下一层页面（含重复和站外链接）
+    def links_of(url):
+        path = url.split('/', 3)[3]
+        if path.count('/') >= 3:
+            return []
+        return [url.rstrip('/') + f'/{n}' for n in range(3)] + ['https://a.com/#top', 'javascript:void(0)']
+
+    fetched = []
+    lock = threading.Lock()
+    created = []
+
+    class FakeWorker:
+        def __init__(self):
+            created.append(self)
+            self.closed = False
+
+        def fetch(self, url, depth):
+            time.sleep(0.005)
+            with lock:
+                fetched.append((url, depth))
+            return links_of(url)
+
+        def close(self):
+            self.closed = True
+
+    frontier = SiteFrontier(max_depth=2, max_pages=100, domain_concurrency=4)
+    frontier.add('https://a.com/', 0)
+    processed = run_site_crawl(frontier, FakeWorker, workers=4)
+    urls = [url for url, _ in fetched]
+    assert processed == len(fetched) == 1 + 3 + 9, processed
+    assert len(set(urls)) == len(urls), "页面不应重复处理"
+    assert max(depth for _, depth in fetched) == 2
+    assert len(created) <= 4 and all(worker.closed for worker in created)
+    print(f"  ✓ {processed} 个页面，{len(created)} 个处理器（浏览器）")
+    print()
+
+
+def test_concurrent_page_stats():
+    """测试多个页面线程同时调用 crawl_page 时统计计数不丢失"""
+    print("🧪 测试5: 并发页面的统计计数")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        config.RESPECT_ROBOTS_TXT = False
+        config.MAX_DEPTH = 5
+        config.MAX_PAGES = 100000
+        crawler = ImageCrawler(config)
+        crawler.logger.disabled = True
+
+        def extract(driver, url, kind):
+            page = PageData()
+            page.images = [f"{url}/{n}.jpg" for n in range(3)]
+            return page
+
+        # 只保留计数逻辑: 不打开浏览器、不下载图片
+        crawler._navigate = lambda *args, **kwargs: None
+        crawler._extract_driver_page = extract
+        crawler._download_images_simple = lambda image_urls, page_name: None
+
+        pages = 8 * 300
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda n: crawler.crawl_page(f"https://a.com/p/{n}", driver=object()),
+                                  range(pages)))
+        finally:
+            sys.setswitchinterval(interval)
+            crawler._close_components()
+
+        assert crawler.stats['pages_crawled'] == pages, crawler.stats['pages_crawled']
+        assert crawler.stats['images_found'] == pages * 3, crawler.stats['images_found']
+        print(f"  ✓ {pages} 个页面、{pages * 3} 张图片，计数完整")
+    print()
+
+
+if __name__ == '__main__':
+    test_normalize_url()
+    test_frontier_order()
+    test_domain_politeness()
+    test_run_site_crawl()
+    test_concurrent_page_stats()
+    print("✅ 所有测试完成!")
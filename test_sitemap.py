@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+测试站点地图发现: 流式解析（gzip、sitemapindex、扩展标签）和只处理新的或已更新的套图
+"""
+
+import os
+import gzip
+import json
+import tempfile
+
+from config import Config
+from fixture_server import FixtureSite, FixtureServer
+from sitemap import open_xml_stream, parse_lastmod, parse_sitemap
+
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+  <url><loc>https://a.com/photo/id-1.html</loc><lastmod>2024-01-02T00:00:00Z</lastmod>
+    <image:image><image:loc>https://a.com/img/1.jpg</image:loc></image:image></url>
+  <url><loc> https://a.com/photo/id-2.html </loc></url>
+  <url><lastmod>2024-01-01</lastmod></url>
+</urlset>"""
+
+
+def test_parse_stream():
+    """测试分块的 gzip 流解析"""
+    print("🧪 测试1: 流式解析")
+
+    data = gzip.compress(URLSET)
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+    entries = list(parse_sitemap(open_xml_stream(chunks)))
+    assert [(kind, entry.loc) for kind, entry in entries] == [
+        ('url', 'https://a.com/photo/id-1.html'), ('url', 'https://a.com/photo/id-2.html')], entries
+    assert entries[0][1].lastmod == parse_lastmod('2024-01-02T08:00:00+08:00') and entries[1][1].lastmod is None
+    print("  ✓ gzip 分块解压，忽略 image:loc 和没有 loc 的条目")
+
+    assert parse_lastmod('2024-01-02T00:00:00Z') == 1704153600
+    assert parse_lastmod('not a date') is None
+    print("  ✓ lastmod 时区换算")
+    print()
+
+
+def test_discover_new_and_modified():
+    """测试从本地站点的站点地图索引发现套图，跳过未变化的套图"""
+    print("🧪 测试2: 只处理新的或已更新的套图")
+
+    from crawler import ImageCrawler
+
+    site = FixtureSite(sets=6)
+    site.sitemap_lastmod[2] = '2099-01-01T00:00:00+00:00'
+    with tempfile.TemporaryDirectory() as tmp, FixtureServer(site) as server:
+        config = Config()
+        config.OUTPUT_DIR = tmp
+        config.START_URL = f"{server.base_url}/photos/sort-hot.html"
+        config.RESPECT_ROBOTS_TXT = False
+        config.CATALOG_FILE = ''
+        config.RUN_LOG = False
+        crawler = ImageCrawler(config)
+
+        # 套图0、1已完整下载，套图2之后又更新了，套图3只下载了一部分
+        for index, downloaded in ((0, 10), (1, 10), (2, 10), (3, 4)):
+            folder = os.path.join(tmp, site.set_id(index))
+            os.makedirs(folder)
+            with open(os.path.join(folder, 'metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump({'last_update': '2024-06-01 00:00:00', 'images_downloaded': downloaded,
+                           'images_failed': 0, 'total_images': 10}, f)
+
+        urls = crawler._discover_from_sitemaps()
+        crawler.http_client.close()
+        crawler.dns_cache.close()
+        expected = [f"{server.base_url}/photo/id-{site.set_id(index)}.html" for index in (2, 3, 4, 5)]
+        assert urls == expected, urls
+    print("  ✓ 新套图、lastmod 更新的套图和未完成的套图，跳过已完整下载的套图")
+    print()
+
+
+def test_sitemap_argument():
+    """测试不带地址的 --sitemap 也启用站点地图发现"""
+    print("🧪 测试3: --sitemap 参数")
+
+    from main import parse_arguments
+
+    assert parse_arguments([]).sitemap is None
+    assert parse_arguments(['--sitemap']).sitemap == []
+    assert parse_arguments(['--sitemap', 'https://a.com/sitemap.xml']).sitemap == ['https://a.com/sitemap.xml']
+    print("  ✓ 未指定为 None，不带地址为空列表（自动查找站点地图）")
+    print()
+
+
+if __name__ == '__main__':
+    test_parse_stream()
+    test_discover_new_and_modified()
+    test_sitemap_argument()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+测试Span追踪功能
+"""
+
+import os
+import json
+import tempfile
+import threading
+
+from config import Config
+from tracer import Tracer, NullTracer, NULL_SPAN, create_tracer
+
+
+def test_null_tracer():
+    """测试关闭追踪时的空追踪器"""
+    print("=" * 60)
+    print("测试 1: 空追踪器")
+    print("=" * 60)
+
+    config = Config()
+    config.TRACE_FILE = ''
+    tracer = create_tracer(config)
+
+    assert isinstance(tracer, NullTracer)
+    with tracer.span('crawl', url='https://example.com') as span:
+        span.set(status='ok')
+        assert span is NULL_SPAN
+    assert tracer.bind(len) is len
+
+    print("✓ 未配置 TRACE_FILE 时不产生任何输出")
+    print()
+
+
+def test_jsonl_nested_spans():
+    """测试JSONL格式的嵌套Span"""
+    print("=" * 60)
+    print("测试 2: JSONL 嵌套Span")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'trace.jsonl')
+        tracer = Tracer(path, 'jsonl')
+
+        with tracer.span('photo_set', url='https://example.com/photo/id-1.html') as set_span:
+            with tracer.span('page', page=1):
+                with tracer.span('image', url='https://img.example.com/1.jpg') as image_span:
+                    image_span.set(bytes=2048, status='success')
+            set_span.set(status='success')
+
+        try:
+            with tracer.span('image', url='https://img.example.com/2.jpg'):
+                raise ValueError('boom')
+        except ValueError:
+            pass
+        tracer.close()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            spans = [json.loads(line) for line in f]
+
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span['name'], []).append(span)
+
+        root = by_name['photo_set'][0]
+        page = by_name['page'][0]
+        image = by_name['image'][0]
+        assert root['parent_id'] is None
+        assert page['parent_id'] == root['span_id']
+        assert image['parent_id'] == page['span_id']
+        assert image['trace_id'] == root['span_id']
+        assert image['attrs']['bytes'] == 2048
+        assert root['attrs']['status'] == 'success'
+        assert 'ValueError' in by_name['image'][1]['attrs']['error']
+
+        print(f"✓ 写入 {len(spans)} 个Span，父子关系正确")
+        print()
+
+
+def test_chrome_trace_with_threads():
+    """测试Chrome trace格式和跨线程绑定"""
+    print("=" * 60)
+    print("测试 3: Chrome trace 格式")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = Config()
+        config.TRACE_FILE = os.path.join(temp_dir, 'trace.json')
+        config.TRACE_FORMAT = ''
+        tracer = create_tracer(config)
+        assert tracer.format == 'chrome'
+
+        def download():
+            with tracer.span('image', url='https://img.example.com/3.jpg'):
+                pass
+
+        with tracer.span('photo_set') as set_span:
+            worker = threading.Thread(target=tracer.bind(download))
+            worker.start()
+            worker.join()
+        tracer.close()
+
+        with open(config.TRACE_FILE, 'r', encoding='utf-8') as f:
+            events = json.load(f)
+
+        complete = [e for e in events if e['ph'] == 'X']
+        image = next(e for e in complete if e['name'] == 'image')
+        parent = next(e for e in complete if e['name'] == 'photo_set')
+        assert image['args']['parent_id'] == set_span.span_id
+        assert image['tid'] != parent['tid']
+        assert image['ts'] >= parent['ts']
+        assert any(e['ph'] == 'M' for e in events)
+
+        print(f"✓ Chrome trace 可解析，共 {len(complete)} 个事件")
+        print()
+
+
+def main():
+    """运行所有测试"""
+    try:
+        test_null_tracer()
+        test_jsonl_nested_spans()
+        test_chrome_trace_with_threads()
+        print("✓ 所有追踪测试通过！")
+        return 0
+    except AssertionError as e:
+        print(f"\n✗ 测试失败: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+测试紧凑URL集合: 指纹表的添加/查询、扩容、内存占用和 mmap 快照
+"""
+
+import os
+import sys
+import tempfile
+
+from url_set import FingerprintSet, UrlSet, create_url_set
+
+
+def test_fingerprint_set():
+    """测试添加、查询和扩容"""
+    print("🧪 测试1: 指纹表")
+
+    urls = [f"https://8se.me/photo/id-{n:012x}.html" for n in range(20000)]
+    table = FingerprintSet()
+    table.update(urls[:10000])
+    table.add(urls[0])
+    assert len(table) == 10000
+    assert all(url in table for url in urls[:10000])
+    assert not any(url in table for url in urls[10000:]), "未加入的URL不应存在"
+
+    per_url = table.memory_bytes / len(table)
+    python_set = set(urls[:10000])
+    set_bytes = sys.getsizeof(python_set) + sum(sys.getsizeof(url) for url in python_set)
+    assert per_url < set_bytes / len(python_set) / 4, per_url
+    print(f"  ✓ 扩容后仍然正确，每个URL {per_url:.1f} 字节（set: {set_bytes / len(python_set):.0f} 字节）")
+    print()
+
+
+def test_snapshot():
+    """测试映射到文件并在重新打开后保留内容"""
+    print("🧪 测试2: mmap 快照")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'visited_urls.fpset')
+        table = FingerprintSet(path)
+        for n in range(5000):
+            table.add(f"https://a.com/{n}")
+        table.close()
+
+        reopened = FingerprintSet(path)
+        assert len(reopened) == 5000 and 'https://a.com/4999' in reopened and 'https://a.com/5000' not in reopened
+        reopened.add('https://a.com/5000')
+        reopened.close()
+        assert len(FingerprintSet(path)) == 5001
+        print("  ✓ 重新映射后内容不变")
+
+        class Config:
+            VISITED_SET = 'compact'
+            VISITED_SET_SNAPSHOT = True
+            OUTPUT_DIR = tmpdir
+
+        with open(os.path.join(tmpdir, 'downloaded_images.fpset'), 'wb') as f:
+            f.write(b'broken')
+        recreated = create_url_set(Config, 'downloaded_images')
+        assert isinstance(recreated, FingerprintSet) and len(recreated) == 0
+        recreated.close()
+        # OUTPUT_DIR 是一个文件: 无法创建映射文件，改用内存集合
+        Config.OUTPUT_DIR = os.path.join(tmpdir, 'downloaded_images.fpset')
+        fallback = create_url_set(Config, 'visited_urls')
+        fallback.add('https://a.com/1')
+        assert isinstance(fallback, FingerprintSet) and 'https://a.com/1' in fallback
+        fallback.close()
+        Config.VISITED_SET = 'memory'
+        assert isinstance(create_url_set(Config, 'visited_urls'), UrlSet)
+        print("  ✓ 损坏的文件重新创建，无法创建时使用内存集合，默认使用 set")
+    print()
+
+
+if __name__ == '__main__':
+    test_fingerprint_set()
+    test_snapshot()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+测试套图任务队列的租约、心跳、确认和工作节点模式
+"""
+
+import os
+import json
+import tempfile
+
+from config import Config
+from crawler import ImageCrawler
+from work_queue import DONE, FAILED, MemoryWorkQueue, SQLiteWorkQueue, WorkQueue, create_work_queue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+URLS = [f'https://8se.me/photo/id-{n:013x}.html' for n in range(3)]
+
+
+def check_lease_semantics(make_queue):
+    clock = FakeClock()
+    node_a, node_b = make_queue(clock)
+    assert node_a.put(URLS) == 3 and node_a.put(URLS[:1]) == 0
+
+    first = node_a.lease('a', 60)
+    second = node_b.lease('b', 60)
+    assert first.url == URLS[0] and second.url == URLS[1], (first, second)
+
+    # 心跳延长租约
+    clock.now += 50
+    assert node_a.heartbeat(first, 60) and node_b.heartbeat(second, 60)
+    clock.now += 50
+    assert node_b.lease('b', 60).url == URLS[2]
+    assert node_b.lease('b', 60) is None, "未过期的任务不应被重新领取"
+
+    # node_a 的租约过期后由 node_b 接管，node_a 的确认无效
+    clock.now += 11
+    taken = node_b.lease('b', 60)
+    assert taken.url == URLS[0] and taken.attempts == 2
+    assert not node_a.ack(first) and not node_a.heartbeat(first, 60)
+    assert node_b.ack(taken)
+
+    # 失败的任务重新排队，达到最大尝试次数后标记为 failed
+    assert node_b.nack(second, 'HTTP 403')
+    retry = node_a.lease('a', 60)
+    assert retry.url == URLS[1] and retry.attempts == 2
+    assert node_a.nack(retry, 'HTTP 403 again')
+
+    counts = node_a.counts()
+    assert counts[DONE] == 1 and counts[FAILED] == 1 and counts['leased'] == 1, counts
+    assert node_b.failures() == [{'url': URLS[1], 'attempts': 2, 'error': 'HTTP 403 again'}]
+    assert not node_a.is_drained()
+
+
+def test_memory_queue():
+    """测试内存队列（网络后端的测试替身）"""
+    print("🧪 测试1: 内存队列租约语义")
+
+    def make(clock):
+        queue = MemoryWorkQueue(max_attempts=2, clock=clock)
+        return queue, queue
+
+    check_lease_semantics(make)
+    print("  ✓ 领取、心跳、过期接管、确认和重试")
+
+    class PartialQueue(WorkQueue):
+        def put(self, urls):
+            return 0
+
+    try:
+        PartialQueue()
+        raise AssertionError("未实现全部方法的后端不应能创建")
+    except TypeError:
+        pass
+    print("  ✓ 未实现全部接口的后端在创建时报错")
+    print()
+
+
+def test_sqlite_queue_two_nodes():
+    """测试两个连接（模拟两个节点）共享同一个SQLite队列"""
+    print("🧪 测试2: SQLite队列")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'queue.db')
+        nodes = []
+
+        def make(clock):
+            nodes.extend([SQLiteWorkQueue(path, max_attempts=2, clock=clock),
+                          SQLiteWorkQueue(path, max_attempts=2, clock=clock)])
+            return nodes
+
+        check_lease_semantics(make)
+        for node in nodes:
+            node.close()
+
+        queue = create_work_queue(f'sqlite://{path}')
+        assert isinstance(queue, SQLiteWorkQueue) and queue.counts()[DONE] == 1
+        queue.close()
+    assert isinstance(create_work_queue('memory://'), MemoryWorkQueue)
+    print("  ✓ 两个节点通过同一个文件协调")
+    print()
+
+
+def test_worker_mode():
+    """测试工作节点从队列领取套图，成功确认、失败重试"""
+    print("🧪 测试3: 工作节点模式")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config()
+        config.RESPECT_ROBOTS_TXT = False
+        config.TRACE_FILE = ''
+        config.OUTPUT_DIR = tmp
+        config.MIN_DELAY = 0
+        config.QUEUE_VISIBILITY_TIMEOUT = 30
+        crawler = ImageCrawler(config)
+
+        attempts = {}
+
+        def crawl_photo_detail(url, max_pages):
+            attempts[url] = attempts.get(url, 0) + 1
+            # 第二个套图第一次失败，之后成功
+            status = 'failed' if url == URLS[1] and attempts[url] == 1 else 'success'
+            crawler.run_log.append({'photo_url': url, 'status': status, 'error': 'timeout'})
+
+        crawler._crawl_photo_detail = crawl_photo_detail
+        queue = MemoryWorkQueue(max_attempts=3)
+        queue.put(URLS)
+
+        processed = crawler._work_queue(queue)
+        assert processed == 4 and attempts[URLS[1]] == 2
+        assert queue.counts()[DONE] == 3 and queue.is_drained()
+        assert crawler.run_log.aggregates.by_status == {'success': 3}
+        assert crawler.run_log.aggregates.retried == 1
+        print(f"  ✓ 处理 {processed} 次，全部套图完成")
+    print()
+
+
+def test_nodes_share_output_dir():
+    """测试多个节点共享输出目录: 各自写运行日志和摘要，摘要包含整个队列的状态"""
+    print("🧪 测试4: 共享输出目录")
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        def run_node(node, worker):
+            config = Config()
+            config.RESPECT_ROBOTS_TXT = False
+            config.TRACE_FILE = ''
+            config.CATALOG_FILE = ''
+            config.OUTPUT_DIR = tmp
+            config.MIN_DELAY = 0
+            config.WORK_QUEUE = os.path.join(tmp, 'queue.db')
+            config.QUEUE_WORKER = worker
+            config.QUEUE_NODE = node
+            config.QUEUE_MAX_ATTEMPTS = 1
+            crawler = ImageCrawler(config)
+            crawler._discover_photo_urls = lambda: list(URLS)
+
+            def crawl_photo_detail(url, max_pages):
+                status = 'failed' if url == URLS[1] else 'success'
+                crawler.run_log.append({'photo_url': url, 'photo_id': url[-18:-5], 'status': status,
+                                        'error': 'HTTP 403'})
+
+            crawler._crawl_photo_detail = crawl_photo_detail
+            crawler.crawl()
+
+        run_node('node-a', worker=False)
+        run_node('node-b', worker=True)
+
+        def read_sets(node):
+            with open(os.path.join(tmp, f'run_log.{node}.jsonl'), encoding='utf-8') as f:
+                return [event for event in map(json.loads, f) if event['event'] == 'set']
+
+        assert len(read_sets('node-a')) == 3 and read_sets('node-b') == []
+        assert not os.path.exists(os.path.join(tmp, 'run_log.jsonl'))
+        print("  ✓ 后加入的节点不覆盖其它节点的运行日志")
+
+        for node in ('node-a', 'node-b'):
+            with open(os.path.join(tmp, f'download_summary.{node}.json'), encoding='utf-8') as f:
+                summary = json.load(f)
+            assert summary['queue']['counts'][DONE] == 2 and summary['queue']['counts'][FAILED] == 1
+            assert [task['url'] for task in summary['queue']['failures']] == [URLS[1]]
+            assert os.path.exists(os.path.join(tmp, f'download_summary.{node}.txt'))
+        print("  ✓ 每个节点的摘要包含整个队列的完成数和失败的任务")
+    print()
+
+
+if __name__ == '__main__':
+    test_memory_queue()
+    test_sqlite_queue_two_nodes()
+    test_worker_mode()
+    test_nodes_share_output_dir()
+    print("✅ 所有测试完成!")
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import threading
+import itertools
+from typing import Optional, Dict, Callable
+
+
+class _NullSpan:
+    """关闭追踪时使用的空Span，所有操作均为空操作"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """空追踪器（默认），开销仅为一次方法调用"""
+    enabled = False
+
+    def span(self, name: str, parent=None, **attrs):
+        return NULL_SPAN
+
+    def current_span(self):
+        return None
+
+    def bind(self, func: Callable) -> Callable:
+        return func
+
+    def close(self):
+        pass
+
+
+class Span:
+    """一个计时区间，支持嵌套和附加属性"""
+    __slots__ = ('tracer', 'name', 'attrs', 'span_id', 'parent_id', 'trace_id',
+                 'thread_id', 'start', 'duration')
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'], attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(tracer._ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.thread_id = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **attrs):
+        """附加或覆盖属性（如 bytes、status）"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.thread_id = threading.get_ident()
+        self.tracer._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs['error'] = f"{exc_type.__name__}: {str(exc)[:200]}"
+        self.tracer._emit(self)
+        return False
+
+
+class Tracer:
+    """
+    Span追踪器，将嵌套的计时区间写入文件
+
+    支持两种格式:
+      - jsonl: 每个Span结束时写入一行JSON（含 span_id/parent_id）
+      - chrome: Chrome trace-event 格式，可在 chrome://tracing 或 Perfetto 中离线打开
+    """
+    enabled = True
+
+    def __init__(self, path: str, fmt: str = 'jsonl'):
+        if fmt not in ('jsonl', 'chrome'):
+            raise ValueError(f"不支持的追踪格式: {fmt}")
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.format = fmt
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._known_threads = set()
+        # 以墙钟时间为基准，用 perf_counter 计算偏移，保证时间戳单调
+        self._epoch = time.time()
+        self._perf_base = time.perf_counter()
+        self._file = open(path, 'w', encoding='utf-8')
+        if fmt == 'chrome':
+            # trace-event 的JSON数组格式允许缺少结尾的 ]，崩溃时文件仍可打开
+            self._file.write('[\n')
+
+    def span(self, name: str, parent: Optional[Span] = None, **attrs) -> Span:
+        """创建Span，未指定parent时使用当前线程正在进行的Span"""
+        if parent is None:
+            parent = self.current_span()
+        return Span(self, name, parent, attrs)
+
+    def current_span(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def bind(self, func: Callable) -> Callable:
+        """绑定当前Span，使在线程池中执行的函数仍挂在正确的父Span下"""
+        parent = self.current_span()
+        if parent is None:
+            return func
+
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            stack.append(parent)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stack.remove(parent)
+        return wrapper
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _timestamp(self, perf: float) -> float:
+        return self._epoch + (perf - self._perf_base)
+
+    def _emit(self, span: Span):
+        if self.format == 'chrome':
+            event = {
+                'name': span.name,
+                'cat': 'crawler',
+                'ph': 'X',
+                'ts': round(self._timestamp(span.start) * 1e6, 1),
+                'dur': round(span.duration * 1e6, 1),
+                'pid': self._pid,
+                'tid': span.thread_id,
+                'args': dict(span.attrs, span_id=span.span_id, parent_id=span.parent_id)
+            }
+        else:
+            event = {
+                'name': span.name,
+                'trace_id': span.trace_id,
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'start': round(self._timestamp(span.start), 6),
+                'duration_ms': round(span.duration * 1000, 3),
+                'thread': span.thread_id,
+                'attrs': span.attrs
+            }
+        line = json.dumps(event, ensure_ascii=False, default=str)
+
+        with self._lock:
+            if self._file is None:
+                return
+            if self.format == 'chrome' and span.thread_id not in self._known_threads:
+                self._known_threads.add(span.thread_id)
+                self._file.write(json.dumps({
+                    'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': span.thread_id,
+                    'args': {'name': self._thread_name(span.thread_id)}
+                }) + ',\n')
+            self._file.write(line + (',\n' if self.format == 'chrome' else '\n'))
+            self._file.flush()
+
+    @staticmethod
+    def _thread_name(thread_id: int) -> str:
+        for thread in threading.enumerate():
+            if thread.ident == thread_id:
+                return thread.name
+        return str(thread_id)
+
+    def close(self):
+        """结束写入并关闭文件"""
+        with self._lock:
+            if self._file is None:
+                return
+            if self.format == 'chrome':
+                self._file.write(json.dumps({
+                    'name': 'process_name', 'ph': 'M', 'pid': self._pid,
+                    'args': {'name': 'crawler'}
+                }) + '\n]\n')
+            self._file.close()
+            self._file = None
+
+
+def create_tracer(config):
+    """根据配置创建追踪器，未配置 TRACE_FILE 时返回空追踪器"""
+    path = getattr(config, 'TRACE_FILE', '')
+    if not path:
+        return NullTracer()
+
+    fmt = getattr(config, 'TRACE_FORMAT', '') or ('chrome' if path.endswith('.json') else 'jsonl')
+    return Tracer(path, fmt)
@@ -0,0 +1,223 @@
+"""
+紧凑的URL集合 - 用于 visited_urls / downloaded_images
+
+  VISITED_SET=memory    Python set，保存完整URL字符串（默认，每个URL约100+字节）
+  VISITED_SET=compact   FingerprintSet，每个URL只保存 64 位指纹（约 8 / 负载率 ≈ 12 字节）
+
+FingerprintSet 是开放寻址（线性探测）哈希表，槽位为 mmap 中的 uint64 数组，指纹 0 表示空槽。
+两个不同URL的指纹相同（被误判为已存在）的概率约为 n / 2^64，千万级URL时可以忽略。
+负载率超过 MAX_LOAD 时容量翻倍并重新插入。
+
+VISITED_SET_SNAPSHOT=true 时表直接映射到 OUTPUT_DIR 下的文件（MAP_SHARED），
+写入由操作系统落盘，下次启动只需重新映射文件，不需要加载或重建；
+此时已访问的页面和已下载的图片URL跨运行保留，删除 *.fpset 文件可以重新开始。
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from typing import Iterable, Optional
+
+
+MAGIC = b'FPSET001'
+# 文件头: magic, 元素数, 容量（槽位数）
+HEADER = struct.Struct('<8sQQ')
+HEADER_SIZE = 64
+SLOT_SIZE = 8
+MAX_LOAD = 0.7
+MIN_CAPACITY = 1 << 12
+
+
+def fingerprint(url: str) -> int:
+    """URL的 64 位指纹（0 保留给空槽）"""
+    value = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class UrlSet(set):
+    """内存中的URL集合（默认），与 FingerprintSet 接口相同"""
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FingerprintSet:
+    """64 位指纹的开放寻址哈希表，可映射到文件（线程安全，只支持添加和查询）"""
+
+    def __init__(self, path: Optional[str] = None, capacity: int = MIN_CAPACITY):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._slots = None
+        if path and os.path.exists(path):
+            self._open(path)
+        else:
+            self._file, self._map = self._allocate(self._round_capacity(capacity), path)
+            self._attach(0)
+
+    @staticmethod
+    def _round_capacity(capacity: int) -> int:
+        size = MIN_CAPACITY
+        while size < capacity:
+            size <<= 1
+        return size
+
+    @staticmethod
+    def _allocate(capacity: int, path: Optional[str]):
+        """创建空表，返回 (文件, mmap)；path 为空时使用匿名映射"""
+        size = HEADER_SIZE + capacity * SLOT_SIZE
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(path, 'w+b')
+            f.truncate(size)
+            table = mmap.mmap(f.fileno(), size)
+        else:
+            f = None
+            table = mmap.mmap(-1, size)
+        HEADER.pack_into(table, 0, MAGIC, 0, capacity)
+        return f, table
+
+    def _open(self, path: str):
+        f = open(path, 'r+b')
+        try:
+            table = mmap.mmap(f.fileno(), 0)
+        except ValueError:
+            f.close()
+            raise ValueError(f"URL集合文件为空: {path}")
+        magic, count, capacity = HEADER.unpack_from(table, 0) if len(table) >= HEADER_SIZE else (b'', 0, 0)
+        if magic != MAGIC or len(table) != HEADER_SIZE + capacity * SLOT_SIZE:
+            table.close()
+            f.close()
+            raise ValueError(f"URL集合文件格式错误: {path}")
+        self._file, self._map = f, table
+        self._attach(count)
+
+    def _attach(self, count: int):
+        self._count = count
+        self._capacity = HEADER.unpack_from(self._map, 0)[2]
+        self._mask = self._capacity - 1
+        self._slots = memoryview(self._map)[HEADER_SIZE:].cast('Q')
+
+    def _detach(self):
+        if self._slots is not None:
+            self._slots.release()
+            self._slots = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _find(self, value: int) -> int:
+        """返回指纹所在的槽位，或应插入的空槽位"""
+        slots, mask = self._slots, self._mask
+        index = value & mask
+        while True:
+            current = slots[index]
+            if current == value or current == 0:
+                return index
+            index = (index + 1) & mask
+
+    def __contains__(self, url: str) -> bool:
+        value = fingerprint(url)
+        with self._lock:
+            return self._slots[self._find(value)] == value
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, url: str):
+        value = fingerprint(url)
+        with self._lock:
+            index = self._find(value)
+            if self._slots[index] == value:
+                return
+            self._slots[index] = value
+            self._count += 1
+            struct.pack_into('<Q', self._map, 8, self._count)
+            if self._count > self._capacity * MAX_LOAD:
+                self._grow()
+
+    def update(self, urls: Iterable[str]):
+        for url in urls:
+            self.add(url)
+
+    def _grow(self):
+        """容量翻倍: 写入新表（文件时为临时文件）后替换"""
+        capacity = self._capacity * 2
+        tmp_path = f"{self.path}.tmp" if self.path else None
+        new_file, new_map = self._allocate(capacity, tmp_path)
+        new_slots = memoryview(new_map)[HEADER_SIZE:].cast('Q')
+        mask = capacity - 1
+        for value in self._slots:
+            if value:
+                index = value & mask
+                while new_slots[index]:
+                    index = (index + 1) & mask
+                new_slots[index] = value
+        struct.pack_into('<Q', new_map, 8, self._count)
+        count = self._count
+        self._detach()
+        if self.path:
+            # 关闭映射后再替换文件（Windows 不能替换已映射的文件）
+            new_slots.release()
+            new_map.flush()
+            new_map.close()
+            new_file.close()
+            os.replace(tmp_path, self.path)
+            self._open(self.path)
+        else:
+            self._file, self._map, self._slots = new_file, new_map, new_slots
+            self._count, self._capacity, self._mask = count, capacity, mask
+
+    @property
+    def memory_bytes(self) -> int:
+        return HEADER_SIZE + self._capacity * SLOT_SIZE
+
+    def flush(self):
+        with self._lock:
+            if self._map is not None and self.path:
+                self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None and self.path:
+                self._map.flush()
+            self._detach()
+
+
+def create_url_set(config, name: str, logger=None):
+    """
+    根据 VISITED_SET 创建URL集合；compact 且 VISITED_SET_SNAPSHOT 时映射到 OUTPUT_DIR/<name>.fpset，
+    文件损坏时重新创建，无法创建（目录不可写等）时改用内存中的集合
+    """
+    if (getattr(config, 'VISITED_SET', '') or 'memory').lower() != 'compact':
+        return UrlSet()
+    if not config.VISITED_SET_SNAPSHOT:
+        return FingerprintSet()
+    path = os.path.join(config.OUTPUT_DIR, f"{name}.fpset")
+    try:
+        url_set = FingerprintSet(path)
+    except (OSError, ValueError) as e:
+        if logger:
+            logger.warning(f"无法打开URL集合 {path}，重新创建: {e}")
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+            url_set = FingerprintSet(path)
+        except (OSError, ValueError) as e:
+            if logger:
+                logger.warning(f"无法创建URL集合 {path}，改用内存集合（不保存到下次运行）: {e}")
+            return FingerprintSet()
+    if logger and len(url_set):
+        logger.info(f"已映射 {name}: {len(url_set)} 个URL")
+    return url_set
@@ -0,0 +1,337 @@
+"""
+套图任务队列 - 多台机器共享同一目标站点和输出目录时协调爬取
+
+语义:
+  lease      领取一个任务，在 visibility_timeout 秒内其他节点不可见
+  heartbeat  处理期间续租；节点宕机后租约过期，任务会被重新领取
+  ack        任务完成
+  nack       任务失败，未超过最大尝试次数时重新排队，否则标记为 failed
+
+后端:
+  SQLiteWorkQueue   本地/共享文件系统上的 SQLite 文件（默认）
+  MemoryWorkQueue   进程内实现，可在测试中替代网络后端
+
+create_work_queue('queue.db') / create_work_queue('sqlite:///path/queue.db') /
+create_work_queue('memory://')；其它后端通过 register_backend(scheme, factory) 注册。
+"""
+
+import time
+import uuid
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Task:
+    """一次租约对应的套图任务"""
+    __slots__ = ('url', 'lease_id', 'attempts', 'lease_expires')
+
+    def __init__(self, url: str, lease_id: str, attempts: int, lease_expires: float):
+        self.url = url
+        self.lease_id = lease_id
+        self.attempts = attempts
+        self.lease_expires = lease_expires
+
+    def __repr__(self):
+        return f"Task({self.url!r}, attempts={self.attempts})"
+
+
+class WorkQueue(ABC):
+    """任务队列接口，后端实现全部抽象方法"""
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def put(self, urls: Iterable[str]) -> int:
+        """加入任务（已存在的URL忽略），返回新加入的数量"""
+
+    @abstractmethod
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Task]:
+        """领取一个待处理或租约已过期的任务，没有时返回None"""
+
+    @abstractmethod
+    def heartbeat(self, task: Task, visibility_timeout: float) -> bool:
+        """续租，租约已被其他节点接管时返回False"""
+
+    @abstractmethod
+    def ack(self, task: Task) -> bool:
+        """确认完成"""
+
+    @abstractmethod
+    def nack(self, task: Task, error: str = '') -> bool:
+        """处理失败，重新排队或标记为 failed"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数（租约已过期的任务计为 pending）"""
+
+    @abstractmethod
+    def failures(self) -> List[Dict]:
+        """最终失败的任务及最后一次错误"""
+
+    def close(self):
+        pass
+
+    def is_drained(self) -> bool:
+        """没有待处理和处理中的任务"""
+        counts = self.counts()
+        return counts.get(PENDING, 0) == 0 and counts.get(LEASED, 0) == 0
+
+
+class MemoryWorkQueue(WorkQueue):
+    """进程内任务队列"""
+
+    def __init__(self, max_attempts: int = 3, clock: Callable[[], float] = time.time):
+        super().__init__(max_attempts)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # url -> {'status', 'lease_id', 'worker', 'lease_expires', 'attempts', 'error'}
+        self._tasks: Dict[str, Dict] = {}
+
+    def put(self, urls: Iterable[str]) -> int:
+        added = 0
+        with self._lock:
+            for url in urls:
+                if url not in self._tasks:
+                    self._tasks[url] = {'status': PENDING, 'lease_id': None, 'worker': None,
+                                        'lease_expires': 0.0, 'attempts': 0, 'error': None}
+                    added += 1
+        return added
+
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Task]:
+        now = self._clock()
+        with self._lock:
+            for url, task in self._tasks.items():
+                if task['status'] == PENDING or (task['status'] == LEASED and task['lease_expires'] <= now):
+                    task.update(status=LEASED, lease_id=uuid.uuid4().hex, worker=worker,
+                                lease_expires=now + visibility_timeout, attempts=task['attempts'] + 1)
+                    return Task(url, task['lease_id'], task['attempts'], task['lease_expires'])
+        return None
+
+    def _owned(self, task: Task) -> Optional[Dict]:
+        entry = self._tasks.get(task.url)
+        if entry and entry['status'] == LEASED and entry['lease_id'] == task.lease_id:
+            return entry
+        return None
+
+    def heartbeat(self, task: Task, visibility_timeout: float) -> bool:
+        with self._lock:
+            entry = self._owned(task)
+            if not entry:
+                return False
+            entry['lease_expires'] = task.lease_expires = self._clock() + visibility_timeout
+            return True
+
+    def ack(self, task: Task) -> bool:
+        with self._lock:
+            entry = self._owned(task)
+            if not entry:
+                return False
+            entry.update(status=DONE, lease_id=None)
+            return True
+
+    def nack(self, task: Task, error: str = '') -> bool:
+        with self._lock:
+            entry = self._owned(task)
+            if not entry:
+                return False
+            status = FAILED if entry['attempts'] >= self.max_attempts else PENDING
+            entry.update(status=status, lease_id=None, lease_expires=0.0, error=error)
+            return True
+
+    def counts(self) -> Dict[str, int]:
+        now = self._clock()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for task in self._tasks.values():
+                status = task['status']
+                if status == LEASED and task['lease_expires'] <= now:
+                    status = PENDING
+                counts[status] += 1
+        return counts
+
+    def failures(self) -> List[Dict]:
+        with self._lock:
+            return [{'url': url, 'attempts': task['attempts'], 'error': task['error']}
+                    for url, task in self._tasks.items() if task['status'] == FAILED]
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """基于 SQLite 文件的任务队列，多个进程/节点通过同一个文件协调"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        url TEXT PRIMARY KEY,
+        status TEXT NOT NULL DEFAULT 'pending',
+        lease_id TEXT,
+        worker TEXT,
+        lease_expires REAL NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created REAL NOT NULL,
+        updated REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, clock: Callable[[], float] = time.time):
+        super().__init__(max_attempts)
+        self.path = path
+        self._clock = clock
+        # 心跳线程与主线程共用连接，由锁串行化
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+
+    def put(self, urls: Iterable[str]) -> int:
+        now = self._clock()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO tasks (url, created, updated) VALUES (?, ?, ?)',
+                ((url, now, now) for url in urls)
+            )
+            self._conn.execute('COMMIT')
+            return self._conn.total_changes - before
+
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Task]:
+        now = self._clock()
+        lease_id = uuid.uuid4().hex
+        with self._lock:
+            # BEGIN IMMEDIATE 获取写锁，保证同一任务不会被两个节点同时领取
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    "SELECT url, attempts FROM tasks WHERE status = 'pending' "
+                    "OR (status = 'leased' AND lease_expires <= ?) ORDER BY created, rowid LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if not row:
+                    self._conn.execute('COMMIT')
+                    return None
+                url, attempts = row
+                expires = now + visibility_timeout
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'leased', lease_id = ?, worker = ?, lease_expires = ?, "
+                    "attempts = ?, updated = ? WHERE url = ?",
+                    (lease_id, worker, expires, attempts + 1, now, url)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return Task(url, lease_id, attempts + 1, expires)
+
+    def _update_owned(self, task: Task, assignments: str, params: tuple) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE tasks SET {assignments}, updated = ? "
+                "WHERE url = ? AND lease_id = ? AND status = 'leased'",
+                params + (self._clock(), task.url, task.lease_id)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, task: Task, visibility_timeout: float) -> bool:
+        expires = self._clock() + visibility_timeout
+        if self._update_owned(task, 'lease_expires = ?', (expires,)):
+            task.lease_expires = expires
+            return True
+        return False
+
+    def ack(self, task: Task) -> bool:
+        return self._update_owned(task, "status = 'done', lease_id = NULL", ())
+
+    def nack(self, task: Task, error: str = '') -> bool:
+        status = FAILED if task.attempts >= self.max_attempts else PENDING
+        return self._update_owned(task, 'status = ?, lease_id = NULL, lease_expires = 0, error = ?',
+                                  (status, error))
+
+    def counts(self) -> Dict[str, int]:
+        now = self._clock()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT CASE WHEN status = 'leased' AND lease_expires <= ? THEN 'pending' ELSE status END, "
+                "COUNT(*) FROM tasks GROUP BY 1",
+                (now,)
+            ).fetchall()
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+    def failures(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, attempts, error FROM tasks WHERE status = 'failed' ORDER BY created, rowid"
+            ).fetchall()
+        return [{'url': url, 'attempts': attempts, 'error': error} for url, attempts, error in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseKeeper:
+    """处理任务期间在后台线程中定期续租"""
+
+    def __init__(self, queue: WorkQueue, task: Task, visibility_timeout: float, logger=None):
+        self.queue = queue
+        self.task = task
+        self.visibility_timeout = visibility_timeout
+        self.logger = logger
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+
+    def _run(self):
+        interval = max(self.visibility_timeout / 3, 0.05)
+        while not self._stop.wait(interval):
+            try:
+                if not self.queue.heartbeat(self.task, self.visibility_timeout):
+                    self.lost = True
+                    if self.logger:
+                        self.logger.warning(f"任务租约已失效: {self.task.url}")
+                    return
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"续租失败: {self.task.url} - {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+_BACKENDS: Dict[str, Callable[..., WorkQueue]] = {
+    'sqlite': lambda location, **kwargs: SQLiteWorkQueue(location, **kwargs),
+    'memory': lambda location, **kwargs: MemoryWorkQueue(**kwargs),
+}
+
+
+def register_backend(scheme: str, factory: Callable[..., WorkQueue]):
+    """注册队列后端，factory(location, max_attempts=...) 返回 WorkQueue"""
+    _BACKENDS[scheme] = factory
+
+
+def create_work_queue(url: str, max_attempts: int = 3) -> WorkQueue:
+    """根据地址创建队列: 普通路径或 sqlite:///path 使用 SQLite，memory:// 使用内存队列"""
+    # sqlite:///abs/path -> /abs/path，sqlite://rel/path -> rel/path
+    scheme, sep, location = url.partition('://')
+    if not sep:
+        scheme, location = 'sqlite', url
+    if scheme not in _BACKENDS:
+        raise ValueError(f"不支持的任务队列后端: {scheme}")
+    return _BACKENDS[scheme](location, max_attempts=max_attempts)